@@ -0,0 +1,181 @@
+"""Compares the checkpointed rating replay in utils.rating against the old seasonleaderboard loop,
+on a synthetic history of 100k matches between 2000 players, and times re-rating that history after deleting a match.
+Run with: python -m benchmarks.bench_rating
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import trueskill
+
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.rating import RatingReplay, replay_season, rerate_match
+from utils.sqlite import setup_db
+
+MATCHES = 100_000
+PLAYERS = 2000
+# The old loop scans the whole player list a couple times per match, so we only give it a part of the history.
+OLD_MATCHES = 10_000
+
+
+def old_replay(matches: list[tuple[int, int, int]]) -> list[dict]:
+    all_players = []
+
+    for winner_id, loser_id, _ in matches:
+        if winner_id not in [p["user_id"] for p in all_players]:
+            all_players.append(
+                {
+                    "user_id": winner_id,
+                    "wins": 0,
+                    "losses": 0,
+                    "rating": trueskill.Rating(),
+                }
+            )
+        if loser_id not in [p["user_id"] for p in all_players]:
+            all_players.append(
+                {
+                    "user_id": loser_id,
+                    "wins": 0,
+                    "losses": 0,
+                    "rating": trueskill.Rating(),
+                }
+            )
+
+        winner = [p for p in all_players if p["user_id"] == winner_id][0]
+        loser = [p for p in all_players if p["user_id"] == loser_id][0]
+
+        winner["rating"], loser["rating"] = trueskill.rate_1vs1(
+            winner["rating"], loser["rating"]
+        )
+        winner["wins"] += 1
+        loser["losses"] += 1
+
+    return all_players
+
+
+def new_replay(matches: list[tuple[int, int, int]]) -> dict[int, dict]:
+    replay = RatingReplay()
+    for winner_id, loser_id, _ in matches:
+        replay.add_match(winner_id, loser_id)
+    return replay.players
+
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - start, result)
+
+
+async def timed_async(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = await function(*args)
+    return (time.perf_counter() - start, result)
+
+
+async def bench_database(matches: list[tuple[int, int, int]]) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "database.db")
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1)
+        await db.connect()
+
+        try:
+            # Logging the matches with their ratings, like the bot would have.
+            replay = RatingReplay()
+            rows = []
+            for i, (winner_id, loser_id, timestamp) in enumerate(matches):
+                old_winner = replay.get_player(winner_id)["rating"]
+                old_loser = replay.get_player(loser_id)["rating"]
+                replay.add_match(winner_id, loser_id)
+                new_winner = replay.players[winner_id]["rating"]
+                new_loser = replay.players[loser_id]["rating"]
+                rows.append(
+                    (i, winner_id, loser_id, timestamp)
+                    + (old_winner.mu, old_winner.sigma, old_loser.mu, old_loser.sigma)
+                    + (new_winner.mu, new_winner.sigma, new_loser.mu, new_loser.sigma)
+                )
+
+            await db.executemany(
+                """INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+            await db.executemany(
+                """INSERT INTO trueskill (user_id, rating, deviation, wins, losses) VALUES (?, ?, ?, ?, ?)""",
+                [
+                    (
+                        user_id,
+                        p["rating"].mu,
+                        p["rating"].sigma,
+                        p["wins"],
+                        p["losses"],
+                    )
+                    for user_id, p in replay.players.items()
+                ],
+            )
+
+            start, end = matches[0][2], matches[-1][2]
+
+            cold, _ = await timed_async(replay_season, db, start, end)
+            # Someone looking at the same season again, with a couple new matches since.
+            warm, _ = await timed_async(replay_season, db, start, end)
+
+            print(
+                f"replay_season over {len(matches)} matches: "
+                f"cold {cold * 1000:.0f}ms, from a checkpoint {warm * 1000:.0f}ms"
+            )
+
+            # The worst case, deleting the very first match touches pretty much the whole history.
+            for name, match_id in [("first", 0), ("middle", len(matches) // 2)]:
+                async with db.transaction() as conn:
+                    rerate_time, (rerated, _) = await timed_async(
+                        rerate_match, conn, match_id
+                    )
+
+                print(
+                    f"rerate_match on the {name} match: "
+                    f"{rerated} matches re-calculated in {rerate_time * 1000:.0f}ms"
+                )
+        finally:
+            await db.close()
+
+
+def main() -> None:
+    random.seed(0)
+
+    # A couple of regulars play most of the matches.
+    players = [random.getrandbits(60) for _ in range(PLAYERS)]
+    weights = [1 / (i + 1) for i in range(PLAYERS)]
+    start = int(time.time()) - 365 * 24 * 60 * 60
+
+    matches = []
+    for i in range(MATCHES):
+        winner_id, loser_id = random.choices(players, weights, k=2)
+        while loser_id == winner_id:
+            loser_id = random.choices(players, weights)[0]
+        matches.append((winner_id, loser_id, start + i * 300))
+
+    old_time, old_players = timed(old_replay, matches[:OLD_MATCHES])
+    new_time, new_players = timed(new_replay, matches[:OLD_MATCHES])
+    assert {p["user_id"]: p["wins"] for p in old_players} == {
+        user_id: p["wins"] for user_id, p in new_players.items()
+    }
+
+    print(
+        f"replay over {OLD_MATCHES} matches: old {old_time * 1000:.0f}ms, "
+        f"new {new_time * 1000:.0f}ms ({old_time / new_time:.1f}x faster)"
+    )
+
+    full_time, _ = timed(new_replay, matches)
+    print(f"replay over {MATCHES} matches: new {full_time * 1000:.0f}ms")
+
+    asyncio.run(bench_database(matches))
+
+
+if __name__ == "__main__":
+    main()
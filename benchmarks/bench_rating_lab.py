@@ -0,0 +1,123 @@
+"""Compares re-calculating a synthetic history of 100k matches between 2000 players with many TrueSkill parameters,
+once with trueskill.rate_1vs1 one set after another, and once with the batched numpy version in utils.rating_lab.
+Needs numpy from requirements-lab.txt. Run with: python -m benchmarks.bench_rating_lab
+"""
+
+import math
+import random
+import time
+
+import trueskill
+
+from utils.rating_lab import RatingParameters, build_history, run_experiments
+
+MATCHES = 100_000
+PLAYERS = 2000
+# The trueskill package is slow enough that we only give it a part of the history and a couple of sets.
+OLD_MATCHES = 10_000
+OLD_SETS = 3
+
+
+def get_parameter_sets(amount: int) -> list[RatingParameters]:
+    """A grid of beta and tau values around the defaults, without decay to keep it comparable."""
+    side = math.ceil(math.sqrt(amount))
+    return [
+        RatingParameters(
+            beta=25 / 6 * (0.5 + i / side),
+            tau=25 / 300 * (0.5 + j / side),
+            decay_factor=1,
+        )
+        for i in range(side)
+        for j in range(side)
+    ][:amount]
+
+
+def old_experiment(
+    matches: list[tuple[int, int, int]], parameters: RatingParameters
+) -> float:
+    """The log loss of one set of parameters, going through trueskill.rate_1vs1."""
+    env = trueskill.TrueSkill(
+        mu=parameters.mu,
+        sigma=parameters.sigma,
+        beta=parameters.beta,
+        tau=parameters.tau,
+        draw_probability=parameters.draw_probability,
+    )
+    ratings = {}
+    loss = 0.0
+
+    for winner_id, loser_id, _ in matches:
+        winner = ratings.get(winner_id, env.create_rating())
+        loser = ratings.get(loser_id, env.create_rating())
+
+        chance = env.cdf(
+            (winner.mu - loser.mu)
+            / math.sqrt(2 * env.beta**2 + winner.sigma**2 + loser.sigma**2)
+        )
+        loss -= math.log(max(chance, 1e-15))
+
+        ratings[winner_id], ratings[loser_id] = env.rate_1vs1(winner, loser)
+
+    return loss / len(matches)
+
+
+def main() -> None:
+    random.seed(0)
+
+    # A couple of regulars play most of the matches, and the better player wins more often.
+    players = [random.getrandbits(60) for _ in range(PLAYERS)]
+    weights = [1 / (i + 1) for i in range(PLAYERS)]
+    skills = {user_id: random.gauss(0, 1) for user_id in players}
+    start = int(time.time()) - 365 * 24 * 60 * 60
+
+    matches = []
+    for i in range(MATCHES):
+        first, second = random.choices(players, weights, k=2)
+        while second == first:
+            second = random.choices(players, weights)[0]
+        chance = 1 / (1 + math.exp(skills[second] - skills[first]))
+        winner, loser = (first, second) if random.random() < chance else (second, first)
+        matches.append((winner, loser, start + i * 300))
+
+    history = build_history(matches)
+    old_matches = matches[:OLD_MATCHES]
+    old_history = build_history(old_matches)
+    parameter_sets = get_parameter_sets(OLD_SETS)
+
+    old_start = time.perf_counter()
+    old_losses = [old_experiment(old_matches, p) for p in parameter_sets]
+    old_time = time.perf_counter() - old_start
+
+    new_start = time.perf_counter()
+    new_results = run_experiments(old_history, parameter_sets)
+    new_time = time.perf_counter() - new_start
+
+    for old_loss, result in zip(old_losses, new_results):
+        assert math.isclose(old_loss, result.log_loss, rel_tol=1e-4)
+
+    old_rate = OLD_MATCHES * OLD_SETS / old_time
+    new_rate = OLD_MATCHES * OLD_SETS / new_time
+    print(
+        f"{OLD_SETS} parameter sets over {OLD_MATCHES} matches: "
+        f"trueskill {old_rate:,.0f} matches/s, numpy {new_rate:,.0f} matches/s "
+        f"({new_rate / old_rate:.1f}x faster)"
+    )
+
+    for amount in (1, 10, 100):
+        parameter_sets = get_parameter_sets(amount)
+
+        start_time = time.perf_counter()
+        results = run_experiments(history, parameter_sets)
+        elapsed = time.perf_counter() - start_time
+
+        best = min(results, key=lambda result: result.log_loss)
+        print(
+            f"{amount} parameter sets over {MATCHES} matches: {elapsed:.2f}s, "
+            f"{MATCHES * amount / elapsed:,.0f} matches/s, "
+            f"best log loss {best.log_loss:.4f} "
+            f"(beta {best.parameters.beta:.2f}, tau {best.parameters.tau:.3f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
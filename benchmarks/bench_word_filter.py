@@ -0,0 +1,104 @@
+"""Compares the single compiled bad word filter in utils.word_filter against the old loop,
+which compiled two regexes per word for every message.
+Uses a list of a few thousand words and a corpus of chat messages with the length of real ones.
+Run with: python -m benchmarks.bench_word_filter
+"""
+
+import random
+import re
+import string
+import time
+
+from utils.word_filter import WordFilter
+
+WORDS = 3000
+MESSAGES = 10_000
+# The old loop is slow enough that we only give it a part of the messages.
+OLD_MESSAGES = 20
+
+# Common words to build the messages out of, so that the words of the list show up inside of them sometimes.
+VOCABULARY = (
+    "the a to and i you it is that of in for this have on my be just so but not with "
+    "can what was are get do like if me we your at all good one game gg lol yeah no "
+    "play match set wins lost ranked queue anyone netplay arena code here there "
+    "mario fox falco marth sheik peach pikachu ness ganondorf joker steve kazuya "
+    "ledge trap combo punish neutral spacing frame data buffer input shield grab "
+    "class assess passing glass bass badly cathedral scatter dogma"
+).split()
+
+
+def old_find(words: list[str], content: str) -> str | None:
+    """What the message filter did before, for every message."""
+    separators = ()
+    excluded = string.ascii_letters + string.digits
+
+    for word in words:
+        formatted_word = f"[{separators}]*".join(list(word))
+        regex_true = re.compile(rf"{formatted_word}", re.IGNORECASE)
+        regex_false = re.compile(
+            rf"([{excluded}]+{word})|({word}[{excluded}]+)", re.IGNORECASE
+        )
+
+        if (
+            regex_true.search(content) is not None
+            and regex_false.search(content) is None
+        ):
+            return word
+
+    return None
+
+
+def get_message() -> str:
+    """Most chat messages are a couple of words, some are long, none are over the limit of 2000."""
+    length = min(int(random.expovariate(1 / 60)) + 1, 2000)
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        word = random.choice(VOCABULARY)
+        words.append(word.capitalize() if random.random() < 0.1 else word)
+    message = " ".join(words)[:length]
+
+    # Sometimes someone actually says one of the words, or tries to hide it.
+    if random.random() < 0.01:
+        message += f" {random.choice(['ass', 'bad', 'c(a)t', 'D(o)g'])}!"
+    return message
+
+
+def main() -> None:
+    random.seed(0)
+
+    words = ["ass", "bad", "cat", "dog"] + [
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(4, 10)))
+        for _ in range(WORDS - 4)
+    ]
+    messages = [get_message() for _ in range(MESSAGES)]
+
+    build_start = time.perf_counter()
+    word_filter = WordFilter(words)
+    build_time = time.perf_counter() - build_start
+
+    new_start = time.perf_counter()
+    new_results = [word_filter.find(message) for message in messages]
+    new_time = time.perf_counter() - new_start
+
+    old_start = time.perf_counter()
+    old_results = [old_find(words, message) for message in messages[:OLD_MESSAGES]]
+    old_time = time.perf_counter() - old_start
+
+    assert old_results == new_results[:OLD_MESSAGES]
+
+    old_average = old_time / OLD_MESSAGES * 1_000_000
+    new_average = new_time / MESSAGES * 1_000_000
+    print(
+        f"{WORDS} words, {MESSAGES} messages with an average length of "
+        f"{sum(map(len, messages)) / MESSAGES:.0f}, "
+        f"{sum(result is not None for result in new_results)} with a word"
+    )
+    print(f"building the filter: {build_time * 1000:.1f}ms")
+    print(
+        f"old {old_average:,.1f}µs per message, new {new_average:,.1f}µs per message "
+        f"({old_average / new_average:,.0f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
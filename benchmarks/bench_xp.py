@@ -0,0 +1,56 @@
+"""Compares the XP threshold table in utils.xp against the old level functions.
+Run with: python -m benchmarks.bench_xp
+"""
+
+import random
+import timeit
+
+from utils.xp import get_level_from_xp, get_xp_for_level, get_xp_till_next_level
+
+
+def old_get_xp_for_level(level: int) -> int:
+    if level < 0:
+        return 0
+
+    return sum(get_xp_till_next_level(i, 0) for i in range(level))
+
+
+def old_get_level_from_xp(xp: int) -> int:
+    level = 0
+    while old_get_xp_for_level(level) <= xp:
+        level += 1
+    return max(level - 1, 0)
+
+
+def main() -> None:
+    random.seed(0)
+
+    # Roughly what our leaderboard looks like, most people are below level 30.
+    xp_values = [
+        get_xp_for_level(min(int(random.expovariate(1 / 15)), 120))
+        + random.randint(0, 500)
+        for _ in range(1000)
+    ]
+    levels = [get_level_from_xp(xp) for xp in xp_values]
+
+    for name, old, new, inputs in [
+        ("get_level_from_xp", old_get_level_from_xp, get_level_from_xp, xp_values),
+        ("get_xp_for_level", old_get_xp_for_level, get_xp_for_level, levels),
+    ]:
+        assert [old(i) for i in inputs] == [new(i) for i in inputs]
+
+        old_time = min(
+            timeit.repeat(lambda: [old(i) for i in inputs], number=1, repeat=3)
+        )
+        new_time = min(
+            timeit.repeat(lambda: [new(i) for i in inputs], number=1, repeat=3)
+        )
+
+        print(
+            f"{name}: {len(inputs)} calls, old {old_time * 1000:.2f}ms, "
+            f"new {new_time * 1000:.2f}ms ({old_time / new_time:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Simulates thousands of players joining the ranked queue in utils.ranked_queue,
+and measures how long they wait for a match and how close their matches are.
+The first-come-first-serve pairing is there for comparison, that is what pinging a role gets you at best.
+Run with: python -m benchmarks.sim_ranked_queue
+"""
+
+import random
+import statistics
+import time
+
+import trueskill
+
+from utils.ranked_queue import QUEUE_TIME, RankedQueue
+
+JOINS = 5000
+# The average amount of seconds between two players joining.
+ARRIVAL_INTERVAL = 15
+# How often the cog pairs up the waiting players.
+TICK = 10
+
+
+def conservative(rating: trueskill.Rating) -> float:
+    return rating.mu - 3 * rating.sigma
+
+
+def make_players() -> list[tuple[float, int, trueskill.Rating]]:
+    """Gets you the join time, user ID and rating of every synthetic player, sorted by join time."""
+    players = []
+    now = 0.0
+
+    for user_id in range(JOINS):
+        now += random.expovariate(1 / ARRIVAL_INTERVAL)
+        rating = trueskill.Rating(random.gauss(25, 4), random.uniform(1.5, 25 / 3))
+        players.append((now, user_id, rating))
+
+    return players
+
+
+def report(
+    name: str,
+    pairs: list[tuple[int, int, float]],
+    ratings: dict[int, trueskill.Rating],
+    timed_out: int,
+) -> None:
+    waits = sorted(wait for _, _, wait in pairs)
+    differences = [
+        abs(conservative(ratings[first]) - conservative(ratings[second])) * 100
+        for first, second, _ in pairs
+    ]
+    quality = [
+        trueskill.quality_1vs1(ratings[first], ratings[second])
+        for first, second, _ in pairs
+    ]
+
+    print(
+        f"{name}: {len(pairs)} matches, {timed_out} timed out, "
+        f"wait p50 {waits[len(waits) // 2]:.0f}s p90 {waits[int(len(waits) * 0.9)]:.0f}s, "
+        f"rank difference avg {statistics.mean(differences):.0f} p90 {sorted(differences)[int(len(differences) * 0.9)]:.0f}, "
+        f"match quality avg {statistics.mean(quality):.3f}"
+    )
+
+
+def simulate_queue(players: list[tuple[float, int, trueskill.Rating]]) -> None:
+    now = 0.0
+    queue = RankedQueue(clock=lambda: now)
+
+    joined_at = {}
+    pairs = []
+    timed_out = 0
+    join_time = 0.0
+    next_tick = TICK
+
+    def expire() -> int:
+        expired = [
+            user_id
+            for user_id in list(queue.players)
+            if now - joined_at[user_id] >= QUEUE_TIME
+        ]
+        for user_id in expired:
+            queue.remove(user_id)
+        return len(expired)
+
+    for joined, user_id, rating in players:
+        # Every tick that happened before this player joined.
+        while next_tick <= joined:
+            now = next_tick
+            timed_out += expire()
+            for first, second in queue.pair_waiting():
+                pairs.append((first, second, now - joined_at[first]))
+            next_tick += TICK
+
+        now = joined
+        joined_at[user_id] = joined
+
+        start = time.perf_counter()
+        opponent = queue.join(user_id, conservative(rating))
+        join_time += time.perf_counter() - start
+
+        if opponent is not None:
+            pairs.append((opponent, user_id, now - joined_at[opponent]))
+
+    ratings = {user_id: rating for _, user_id, rating in players}
+    report("rating queue", pairs, ratings, timed_out + len(queue))
+    print(f"rating queue: {join_time / len(players) * 1e6:.1f}µs per join")
+
+
+def simulate_fifo(players: list[tuple[float, int, trueskill.Rating]]) -> None:
+    waiting = None
+    pairs = []
+
+    for joined, user_id, _ in players:
+        if waiting is not None and joined - waiting[0] < QUEUE_TIME:
+            pairs.append((waiting[1], user_id, joined - waiting[0]))
+            waiting = None
+        else:
+            waiting = (joined, user_id)
+
+    ratings = {user_id: rating for _, user_id, rating in players}
+    report("first come first serve", pairs, ratings, JOINS - 2 * len(pairs))
+
+
+def main() -> None:
+    random.seed(0)
+    players = make_players()
+
+    simulate_fifo(players)
+    simulate_queue(players)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@ import asyncio
 import random
 from typing import Optional, Union
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -613,7 +612,7 @@ class Admin(commands.Cog):
             return
 
         # Getting the stored past user- and nicknames.
-        async with aiosqlite.connect("./db/database.db") as db:
+        async with self.bot.db.reader() as db:
             usernames = await db.execute_fetchall(
                 """SELECT * FROM usernames WHERE user_id = :user_id""",
                 {"user_id": user.id},
@@ -702,19 +701,16 @@ class Admin(commands.Cog):
         # 160 + 80 (For the set by header) * 25 (Max number of embed fields) = 6000.
         note = note[:160]
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """INSERT INTO notes VALUES (:note_id, :user_id, :timestamp, :mod_id, :note)""",
-                {
-                    "note_id": note_id,
-                    "user_id": user.id,
-                    "timestamp": timestamp,
-                    "mod_id": ctx.author.id,
-                    "note": note,
-                },
-            )
-
-            await db.commit()
+        await self.bot.db.execute(
+            """INSERT INTO notes VALUES (:note_id, :user_id, :timestamp, :mod_id, :note)""",
+            {
+                "note_id": note_id,
+                "user_id": user.id,
+                "timestamp": timestamp,
+                "mod_id": ctx.author.id,
+                "note": note,
+            },
+        )
 
         await ctx.send(
             f"Set a new note (ID: `{note_id}`) for {user.mention} to:\n`{note}`"
@@ -726,11 +722,10 @@ class Admin(commands.Cog):
     @utils.check.is_moderator()
     async def modnote_view(self, ctx: commands.Context, user: discord.User) -> None:
         """Views all of the notes of a user."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_notes = await db.execute_fetchall(
-                """SELECT * FROM notes WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
+        user_notes = await self.bot.db.fetchall(
+            """SELECT * FROM notes WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
         if len(user_notes) == 0:
             await ctx.send("This user does not have any notes set.")
@@ -762,24 +757,22 @@ class Admin(commands.Cog):
         self, ctx: commands.Context, user: discord.User, note_id: str
     ) -> None:
         """Deletes a moderator note from a user."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_note = await db.execute_fetchall(
-                """SELECT * FROM notes WHERE user_id = :user_id AND note_id = :note_id""",
-                {"user_id": user.id, "note_id": note_id},
-            )
-
-            if len(matching_note) == 0:
-                await ctx.send(
-                    "I could not find any note with this ID. \n"
-                    f"View all of the notes of a user with `{ctx.prefix}modnote view <@user>`"
-                )
-                return
+        matching_note = await self.bot.db.fetchall(
+            """SELECT * FROM notes WHERE user_id = :user_id AND note_id = :note_id""",
+            {"user_id": user.id, "note_id": note_id},
+        )
 
-            await db.execute(
-                """DELETE FROM notes WHERE user_id = :user_id AND note_id = :note_id""",
-                {"user_id": user.id, "note_id": note_id},
+        if len(matching_note) == 0:
+            await ctx.send(
+                "I could not find any note with this ID. \n"
+                f"View all of the notes of a user with `{ctx.prefix}modnote view <@user>`"
             )
-            await db.commit()
+            return
+
+        await self.bot.db.execute(
+            """DELETE FROM notes WHERE user_id = :user_id AND note_id = :note_id""",
+            {"user_id": user.id, "note_id": note_id},
+        )
 
         await ctx.send(f"Deleted note ID {note_id}.")
 
@@ -790,11 +783,10 @@ class Admin(commands.Cog):
         if not interaction.namespace.user:
             return []
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_notes = await db.execute_fetchall(
-                """SELECT note_id FROM notes WHERE user_id = :user_id""",
-                {"user_id": interaction.namespace.user.id},
-            )
+        user_notes = await self.bot.db.fetchall(
+            """SELECT note_id FROM notes WHERE user_id = :user_id""",
+            {"user_id": interaction.namespace.user.id},
+        )
 
         note_ids = [str(note[0]) for note in user_notes]
 
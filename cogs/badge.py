@@ -1,4 +1,3 @@
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -17,21 +16,18 @@ class Badge(commands.Cog):
 
     async def new_profile(self, user: discord.User) -> None:
         """Creates a new userbadges profile entry, if the user is not found in the database."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_users = await db.execute_fetchall(
-                """SELECT * FROM userbadges WHERE :user_id = user_id""",
-                {"user_id": user.id},
-            )
-
-            if len(matching_users) != 0:
-                return
+        matching_users = await self.bot.db.fetchall(
+            """SELECT * FROM userbadges WHERE :user_id = user_id""",
+            {"user_id": user.id},
+        )
 
-            await db.execute(
-                """INSERT INTO userbadges VALUES (:user_id, :badges)""",
-                {"user_id": user.id, "badges": ""},
-            )
+        if len(matching_users) != 0:
+            return
 
-            await db.commit()
+        await self.bot.db.execute(
+            """INSERT INTO userbadges VALUES (:user_id, :badges)""",
+            {"user_id": user.id, "badges": ""},
+        )
 
     @commands.hybrid_group()
     @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
@@ -92,7 +88,7 @@ class Badge(commands.Cog):
 
         added_badges = []
 
-        async with aiosqlite.connect("./db/database.db") as db:
+        async with self.bot.db.transaction() as db:
             user_badges = await db.execute_fetchall(
                 """SELECT badges FROM userbadges WHERE :user_id = user_id""",
                 {"user_id": user.id},
@@ -112,8 +108,6 @@ class Badge(commands.Cog):
                 {"badges": user_badges, "user_id": user.id},
             )
 
-            await db.commit()
-
         await ctx.send(f"Added badge(s) {' '.join(added_badges)} to {user.mention}.")
 
     @badge.command(name="remove")
@@ -130,37 +124,29 @@ class Badge(commands.Cog):
         # No emoji check here, since the bot could lose access in the meantime.
         # Also it doesnt really work with slash commands anyways.
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_users = await db.execute_fetchall(
-                """SELECT * FROM userbadges WHERE :user_id = user_id""",
-                {"user_id": user.id},
-            )
-
-            if len(matching_users) == 0:
-                await ctx.send("This user did not have any badges.")
-                return
+        badges = await self.bot.db.fetchall(
+            """SELECT badges FROM userbadges WHERE :user_id = user_id""",
+            {"user_id": user.id},
+        )
 
-            badges = await db.execute_fetchall(
-                """SELECT badges FROM userbadges WHERE :user_id = user_id""",
-                {"user_id": user.id},
-            )
+        if len(badges) == 0:
+            await ctx.send("This user did not have any badges.")
+            return
 
-            badges = badges[0][0].split(" ")
+        badges = badges[0][0].split(" ")
 
-            if badge not in badges:
-                await ctx.send("This user did not have this badge.")
-                return
-
-            badges.remove(badge)
+        if badge not in badges:
+            await ctx.send("This user did not have this badge.")
+            return
 
-            badges = " ".join(badges)
+        badges.remove(badge)
 
-            await db.execute(
-                """UPDATE userbadges SET badges = :badges WHERE user_id = :user_id""",
-                {"badges": badges, "user_id": user.id},
-            )
+        badges = " ".join(badges)
 
-            await db.commit()
+        await self.bot.db.execute(
+            """UPDATE userbadges SET badges = :badges WHERE user_id = :user_id""",
+            {"badges": badges, "user_id": user.id},
+        )
 
         await ctx.send(f"Removed badge {badge} from {user.mention}.")
 
@@ -171,22 +157,19 @@ class Badge(commands.Cog):
     @utils.check.is_moderator()
     async def badge_clear(self, ctx: commands.Context, user: discord.User) -> None:
         """Removes all badges from a user."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_users = await db.execute_fetchall(
-                """SELECT * FROM userbadges WHERE :user_id = user_id""",
-                {"user_id": user.id},
-            )
-
-            if len(matching_users) == 0:
-                await ctx.send("This user did not have any badges.")
-                return
+        matching_users = await self.bot.db.fetchall(
+            """SELECT * FROM userbadges WHERE :user_id = user_id""",
+            {"user_id": user.id},
+        )
 
-            await db.execute(
-                """DELETE FROM userbadges WHERE :user_id = user_id""",
-                {"user_id": user.id},
-            )
+        if len(matching_users) == 0:
+            await ctx.send("This user did not have any badges.")
+            return
 
-            await db.commit()
+        await self.bot.db.execute(
+            """DELETE FROM userbadges WHERE :user_id = user_id""",
+            {"user_id": user.id},
+        )
 
         await ctx.send(f"Cleared all badges from {user.mention}.")
 
@@ -216,12 +199,9 @@ class Badge(commands.Cog):
             return
 
         if not info_text:
-            async with aiosqlite.connect("./db/database.db") as db:
-                await db.execute(
-                    """DELETE FROM badgeinfo WHERE badge = :badge""", {"badge": badge}
-                )
-
-                await db.commit()
+            await self.bot.db.execute(
+                """DELETE FROM badgeinfo WHERE badge = :badge""", {"badge": badge}
+            )
 
             await ctx.send(f"Deleted the info text for {badge}.")
             return
@@ -229,7 +209,7 @@ class Badge(commands.Cog):
         # 1000 characters seems like a good limit.
         info_text = info_text[:1000]
 
-        async with aiosqlite.connect("./db/database.db") as db:
+        async with self.bot.db.transaction() as db:
             # We just delete the entry to make sure that no duplicates sneak in.
             await db.execute(
                 """DELETE FROM badgeinfo WHERE badge = :badge""", {"badge": badge}
@@ -240,8 +220,6 @@ class Badge(commands.Cog):
                 {"badge": badge, "info": info_text},
             )
 
-            await db.commit()
-
         await ctx.send(f"Updated badgeinfo of {badge} to: \n`{info_text}`")
 
     @commands.hybrid_command()
@@ -251,7 +229,7 @@ class Badge(commands.Cog):
         """Gets you information about a given badge."""
         match = Match(latinise=True, ignore_case=True, include_partial=True)
 
-        async with aiosqlite.connect("./db/database.db") as db:
+        async with self.bot.db.reader() as db:
             # Searching for the matching badge, since our badges are mostly animated
             # this would mean that otherwise only nitro users could search for them.
             all_badges = await db.execute_fetchall("""SELECT badge FROM badgeinfo""")
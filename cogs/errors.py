@@ -1,4 +1,3 @@
-import aiosqlite
 from discord.ext import commands
 from stringmatch import Match
 
@@ -28,11 +27,8 @@ class Errors(commands.Cog):
                 command.qualified_name for command in self.bot.walk_commands()
             ]
 
-            async with aiosqlite.connect("./db/database.db") as db:
-                all_macros = await db.execute_fetchall("""SELECT name FROM macros""")
-
             # Appending all macro names to the list to get those too.
-            command_list.extend(m[0] for m in all_macros)
+            command_list.extend(self.bot.macros.get_names())
 
             if ctx.invoked_with in command_list:
                 return
@@ -1,10 +1,8 @@
 from itertools import cycle
 
-import aiosqlite
 import discord
 from discord.ext import commands, tasks
 
-from cogs.levels import Levels
 from utils.ids import BGChannelIDs, BGRoleIDs, GuildIDs, TGChannelIDs, TGRoleIDs
 
 
@@ -59,22 +57,17 @@ class Events(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
-        lvl = Levels(self.bot)
+        lvl = self.bot.get_cog("Levels")
 
-        await lvl.create_new_profile(member)
+        user_level, _, _ = await lvl.xp_ledger.get(member.id)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM muted WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
-            user_level = await db.execute_fetchall(
-                """SELECT level FROM level WHERE id = :id""",
-                {"id": member.id},
-            )
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM muted WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         if member.guild.id == GuildIDs.TRAINING_GROUNDS:
-            await lvl.update_level_role(member, user_level[0][0], member.guild)
+            await lvl.update_level_role(member, user_level, member.guild)
 
             channel = self.bot.get_channel(TGChannelIDs.GENERAL_CHANNEL)
             rules = self.bot.get_channel(TGChannelIDs.RULES_CHANNEL)
@@ -161,26 +154,23 @@ class Events(commands.Cog):
     async def on_user_update(self, before: discord.User, after: discord.User) -> None:
         # For tracking the last 5 username updates.
         if before.name != after.name:
-            async with aiosqlite.connect("./db/database.db") as db:
-                await db.execute(
-                    """INSERT INTO usernames VALUES (:user_id, :old_name, :timestamp)""",
-                    {
-                        "user_id": before.id,
-                        "old_name": before.name,
-                        "timestamp": int(discord.utils.utcnow().timestamp()),
-                    },
-                )
-
-                # This will keep only the lastest 5 entries, in order to not flood the db too much.
-                # I think the timestamp + user id will be enough to identify a unique entry,
-                # not sure if you can even change your name twice in 1s, rate limit wise.
-                await db.execute(
-                    """DELETE FROM usernames WHERE user_id = :user_id AND timestamp NOT IN
-                    (SELECT timestamp FROM usernames WHERE user_id = :user_id ORDER BY timestamp DESC LIMIT 5)""",
-                    {"user_id": before.id},
-                )
+            await self.bot.db.execute(
+                """INSERT INTO usernames VALUES (:user_id, :old_name, :timestamp)""",
+                {
+                    "user_id": before.id,
+                    "old_name": before.name,
+                    "timestamp": int(discord.utils.utcnow().timestamp()),
+                },
+            )
 
-                await db.commit()
+            # This will keep only the lastest 5 entries, in order to not flood the db too much.
+            # I think the timestamp + user id will be enough to identify a unique entry,
+            # not sure if you can even change your name twice in 1s, rate limit wise.
+            await self.bot.db.execute(
+                """DELETE FROM usernames WHERE user_id = :user_id AND timestamp NOT IN
+                (SELECT timestamp FROM usernames WHERE user_id = :user_id ORDER BY timestamp DESC LIMIT 5)""",
+                {"user_id": before.id},
+            )
 
     @commands.Cog.listener()
     async def on_member_update(
@@ -188,24 +178,21 @@ class Events(commands.Cog):
     ) -> None:
         # For tracking the last 5 nickname updates.
         if before.display_name not in [after.display_name, before.name]:
-            async with aiosqlite.connect("./db/database.db") as db:
-                await db.execute(
-                    """INSERT INTO nicknames VALUES (:user_id, :old_name, :guild_id, :timestamp)""",
-                    {
-                        "user_id": before.id,
-                        "old_name": before.display_name,
-                        "guild_id": before.guild.id,
-                        "timestamp": int(discord.utils.utcnow().timestamp()),
-                    },
-                )
-
-                await db.execute(
-                    """DELETE FROM nicknames WHERE user_id = :user_id AND timestamp NOT IN
-                    (SELECT timestamp FROM nicknames WHERE user_id = :user_id ORDER BY timestamp DESC LIMIT 5)""",
-                    {"user_id": before.id},
-                )
+            await self.bot.db.execute(
+                """INSERT INTO nicknames VALUES (:user_id, :old_name, :guild_id, :timestamp)""",
+                {
+                    "user_id": before.id,
+                    "old_name": before.display_name,
+                    "guild_id": before.guild.id,
+                    "timestamp": int(discord.utils.utcnow().timestamp()),
+                },
+            )
 
-                await db.commit()
+            await self.bot.db.execute(
+                """DELETE FROM nicknames WHERE user_id = :user_id AND timestamp NOT IN
+                (SELECT timestamp FROM nicknames WHERE user_id = :user_id ORDER BY timestamp DESC LIMIT 5)""",
+                {"user_id": before.id},
+            )
 
         # For announcing boosts/premium memberships.
         if len(before.roles) < len(after.roles):
@@ -246,30 +233,15 @@ class Events(commands.Cog):
 
     @commands.Cog.listener()
     async def on_command(self, ctx: commands.Context) -> None:
-        async with aiosqlite.connect("./db/database.db") as db:
-            # If the command is not in the db, add it.
-            matching_command = await db.execute_fetchall(
-                """SELECT * FROM commands WHERE command = :command""",
-                {"command": ctx.command.qualified_name},
-            )
-
-            if len(matching_command) == 0:
-                await db.execute(
-                    """INSERT INTO commands VALUES (:command, 0, 0)""",
-                    {"command": ctx.command.qualified_name},
-                )
-                await db.commit()
-
-            # Update the command usage.
-            await db.execute(
-                """UPDATE commands SET uses = uses + 1, last_used = :last_used WHERE command = :command""",
-                {
-                    "command": ctx.command.qualified_name,
-                    "last_used": int(discord.utils.utcnow().timestamp()),
-                },
-            )
-
-            await db.commit()
+        # Adds the command if it is not in the db yet, and updates the command usage.
+        await self.bot.db.execute(
+            """INSERT INTO commands VALUES (:command, 1, :last_used)
+            ON CONFLICT(command) DO UPDATE SET uses = uses + 1, last_used = excluded.last_used""",
+            {
+                "command": ctx.command.qualified_name,
+                "last_used": int(discord.utils.utcnow().timestamp()),
+            },
+        )
 
     # These just log when the bot loses/regains connection
     @commands.Cog.listener()
@@ -1,6 +1,5 @@
 from typing import Mapping, Optional, Union
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -113,6 +112,7 @@ class Responses(discord.ui.Select):
                 description=f"""
 - ```{self.prefix}reloadcogs <cogs>```\n - Owner only, reloads some or all of the modules of this bot.
 - ```{self.prefix}synccommands <guild>```\n - Owner only, syncs application commands to one or all guilds.
+- ```{self.prefix}messagestats```\n - Owner only, shows how long every stage of handling a message takes.
 - ```{self.prefix}editrole <property> <role> <value>```\n - Edits a role's properties to the given value.
 - ```{self.prefix}clearmmpings```\n - Clears all matchmaking pings.
 - ```{self.prefix}records```\n - Shows ban records.
@@ -120,6 +120,9 @@ class Responses(discord.ui.Select):
 - ```{self.prefix}recentmatches```\n - Shows the 20 most recent matches of ranked matchmaking.
 - ```{self.prefix}matchhistory <@user>```\n - Shows the 10 most recent matches of a user.
 - ```{self.prefix}deletematch <match_id>```\n - Deletes a match from the database and restores ratings.
+- ```{self.prefix}correctmatch <match_id>```\n - Swaps the winner and loser of a match and restores ratings.
+- ```{self.prefix}rebuildrankedstats```\n - Re-calculates the ranked stats of every player.
+- ```{self.prefix}ratingdecay```\n - Shows the last rating decays and a dry run of the next one.
 - ```{self.prefix}rolemenu new <message ID> <emoji> <role>```\n - Adds an entry for a role menu.
 - ```{self.prefix}rolemenu delete <message ID>```\n - Deletes every entry for a Message with a role menu.
 - ```{self.prefix}rolemenu modify <message ID> <exclusive> <role(s)>```\n - Sets special permissions for a Role menu.
@@ -173,9 +176,13 @@ class Responses(discord.ui.Select):
 - ```{self.prefix}doubles```\n - Used for 2v2 matchmaking in our arena channels.
 - ```{self.prefix}funnies <message>```\n - Used for non-competitive matchmaking in our arena channels.
 - ```{self.prefix}ranked```\n - Used for 1v1 ranked matchmaking in our ranked channels.
+- ```{self.prefix}rankedqueue```\n - Pairs you up with someone close to your rating for a ranked match.
+- ```{self.prefix}leavequeue```\n - Takes you out of the ranked queue.
 - ```{self.prefix}startmatch <@user>```\n - Starts a ranked match with a user.
 - ```{self.prefix}reportmatch <@user>```\n - Winner of the ranked match can use this as a shortcut for reporting matches.
 - ```{self.prefix}rankedstats <@user>```\n - The ranked stats of a user.
+- ```{self.prefix}h2h <@user> <@user>```\n - The head to head record of two users.
+- ```{self.prefix}ratinghistory <@user> <daily/weekly>```\n - The rating history of a user.
 - ```{self.prefix}leaderboard```\n - Leaderboards of ranked matchmaking.
 - ```{self.prefix}seasonleaderbaord <start> <end>```\n - Leaderboards of ranked matchmaking between two timestamps.
     """,
@@ -304,11 +311,10 @@ class CustomHelp(commands.HelpCommand):
         )
 
         # Gets the usage stats from the database.
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_command = await db.execute_fetchall(
-                """SELECT uses, last_used FROM commands WHERE command = :command""",
-                {"command": command.qualified_name},
-            )
+        matching_command = await self.context.bot.db.fetchall(
+            """SELECT uses, last_used FROM commands WHERE command = :command""",
+            {"command": command.qualified_name},
+        )
 
         # The command.help is just the docstring inside every command.
         embed.add_field(name="Help:", value=command.help, inline=False)
@@ -462,11 +468,10 @@ class Help(commands.Cog):
         full_command = f"{ctx.prefix}{command_full_name} {cmd.signature}"
 
         # Gets the usage stats from the database.
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_command = await db.execute_fetchall(
-                """SELECT uses, last_used FROM commands WHERE command = :command""",
-                {"command": cmd.qualified_name},
-            )
+        matching_command = await self.bot.db.fetchall(
+            """SELECT uses, last_used FROM commands WHERE command = :command""",
+            {"command": cmd.qualified_name},
+        )
 
         # Unfortunately we need to construct our own embed,
         # since a lot of the stuff used is exclusive to the HelpCommand class
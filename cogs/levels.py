@@ -1,15 +1,16 @@
-import asyncio
 import random
 from math import floor
 from typing import Optional
 
-import aiosqlite
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 import utils
-from utils.ids import GuildIDs, GuildNames, TGChannelIDs, TGLevelRoleIDs
+import utils.message_pipeline
+import utils.xp
+import utils.xp_ledger
+from utils.ids import GuildIDs, GuildNames
 from utils.image import get_dominant_colour
 
 
@@ -21,85 +22,41 @@ class Levels(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
-    def get_xp_till_next_level(self, current_level: int, current_xp: int) -> int:
-        """Gets you the amount of XP you need to level up to the next level.
-        Taken from: https://github.com/Mee6/Mee6-documentation/blob/master/docs/levels_xp.md
-        Since we used to use Mee6, we decided to keep the same formula.
-        """
-        return max(5 * (current_level**2) + (50 * current_level) + 100 - current_xp, 0)
-
-    def get_xp_for_level(self, level: int) -> int:
-        """Gets you the amount of XP you need to reach a certain level."""
-        if level < 0:
-            return 0
-
-        return sum(self.get_xp_till_next_level(i, 0) for i in range(level))
-
-    def get_level_from_xp(self, xp: int) -> int:
-        """Gets you the level you are at from a certain amount of XP."""
-        level = 0
-        while self.get_xp_for_level(level) <= xp:
-            level += 1
-        return max(level - 1, 0)
-
-    async def create_new_profile(self, user: discord.User) -> None:
-        """Creates a profile for a user."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_profile = await db.execute_fetchall(
-                """SELECT * FROM level WHERE id = :id""",
-                {"id": user.id},
-            )
-
-            if len(matching_profile) != 0:
-                return
-
-            await db.execute(
-                """INSERT INTO level VALUES (:id, :level, :xp, :messages)""",
-                {
-                    "id": user.id,
-                    "level": 0,
-                    "xp": 0,
-                    "messages": 0,
-                },
-            )
-            await db.commit()
-
-    async def add_xp(self, user_id: int, xp_gained: int) -> tuple[int, int, int]:
-        """Adds XP to a user and returns the old level, new level and new XP."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_profile = await db.execute_fetchall(
-                """SELECT * FROM level WHERE id = :id""",
-                {"id": user_id},
-            )
-
-            old_level = matching_profile[0][1]
-            old_xp = matching_profile[0][2]
-
-            new_xp = old_xp + xp_gained
-            new_level = self.get_level_from_xp(new_xp)
+        self.xp_ledger = utils.xp_ledger.XPLedger(
+            self.bot.db, utils.xp.get_level_from_xp
+        )
+        self.flush_xp.start()
 
-            await db.execute(
-                """UPDATE level SET xp = :new_xp, messages = messages + 1, level = :new_level WHERE id = :id""",
-                {
-                    "new_xp": new_xp,
-                    "new_level": new_level,
-                    "id": user_id,
-                },
-            )
+        self.bot.message_pipeline.add_stage(
+            "levels", utils.message_pipeline.XP_STAGE, self.gain_xp
+        )
 
-            await db.commit()
+    async def cog_load(self) -> None:
+        # Loading everyone into memory for the leaderboard.
+        await self.xp_ledger.load()
+
+    async def cog_unload(self) -> None:
+        self.bot.message_pipeline.remove_stage("levels")
+        self.flush_xp.cancel()
+        # Making sure we do not lose any XP when shutting down.
+        await self.xp_ledger.flush()
+
+    async def add_xp(
+        self, user_id: int, xp_gained: int, messages: int = 1
+    ) -> tuple[int, int, int]:
+        """Adds XP to a user and returns the old level, new level and new XP.
+        The change is only written to the database on the next flush.
+        """
+        return await self.xp_ledger.add_xp(user_id, xp_gained, messages)
 
-        return (old_level, new_level, new_xp)
+    @tasks.loop(seconds=5)
+    async def flush_xp(self) -> None:
+        """Writes the XP gained in the last few seconds to the database."""
+        await self.xp_ledger.flush()
 
     def get_all_level_roles(self, guild: discord.Guild) -> list[discord.Role]:
-        defaultrole = discord.utils.get(guild.roles, id=TGLevelRoleIDs.RECRUIT_ROLE)
-        level10 = discord.utils.get(guild.roles, id=TGLevelRoleIDs.LEVEL_10_ROLE)
-        level25 = discord.utils.get(guild.roles, id=TGLevelRoleIDs.LEVEL_25_ROLE)
-        level50 = discord.utils.get(guild.roles, id=TGLevelRoleIDs.LEVEL_50_ROLE)
-        level75 = discord.utils.get(guild.roles, id=TGLevelRoleIDs.LEVEL_75_ROLE)
-        level100 = discord.utils.get(guild.roles, id=TGLevelRoleIDs.LEVEL_100_ROLE)
-
-        return [defaultrole, level10, level25, level50, level75, level100]
+        """Gets you every level role, lowest first."""
+        return self.bot.level_roles.get_roles(guild)
 
     async def assign_level_role(
         self,
@@ -120,101 +77,54 @@ class Levels(commands.Cog):
         """Assigns you a new role depending on your level and removes all of the other ones.
         Returns the new role.
         """
-        rolegiven = None
-
         levelroles = self.get_all_level_roles(guild)
-
-        [defaultrole, level10, level25, level50, level75, level100] = levelroles
+        role = self.bot.level_roles.get_role(guild, level)
 
         try:
             member = await guild.fetch_member(user.id)
         except discord.NotFound:
             return
 
-        if level >= 100:
-            if level100 not in member.roles:
-                rolegiven = await self.assign_level_role(member, levelroles, level100)
+        if role in member.roles:
+            return None
 
-        elif level >= 75:
-            if level75 not in member.roles:
-                rolegiven = await self.assign_level_role(member, levelroles, level75)
-
-        elif level >= 50:
-            if level50 not in member.roles:
-                rolegiven = await self.assign_level_role(member, levelroles, level50)
-
-        elif level >= 25:
-            if level25 not in member.roles:
-                rolegiven = await self.assign_level_role(member, levelroles, level25)
-
-        elif level >= 10:
-            if level10 not in member.roles:
-                rolegiven = await self.assign_level_role(member, levelroles, level10)
-
-        else:
-            if defaultrole not in member.roles:
-                rolegiven = await self.assign_level_role(
-                    member, levelroles, defaultrole
-                )
-
-        return rolegiven
+        return await self.assign_level_role(member, levelroles, role)
 
     def get_next_role(
         self, current_xp: int, current_level: int, guild: discord.Guild
     ) -> tuple[int, int, Optional[discord.Role]]:
         """Gets you the next role, if there is any, plus the levels and XP needed to get there."""
-        levelroles = self.get_all_level_roles(guild)
+        next_tier = self.bot.level_roles.get_next_tier(guild, current_level)
 
-        [_, level10, level25, level50, level75, level100] = levelroles
-
-        if current_level >= 100:
+        if next_tier is None:
             return (0, 0, None)
 
-        if current_level >= 75:
-            return (
-                100 - current_level,
-                self.get_xp_for_level(100),
-                level100,
-            )
-
-        if current_level >= 50:
-            return (75 - current_level, self.get_xp_for_level(75), level75)
-
-        if current_level >= 25:
-            return (50 - current_level, self.get_xp_for_level(50), level50)
-
-        if current_level >= 10:
-            return (25 - current_level, self.get_xp_for_level(25), level25)
-
-        return (10 - current_level, self.get_xp_for_level(10), level10)
-
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
-        if message.author.bot:
-            return
+        next_level, next_role = next_tier
+        return (
+            next_level - current_level,
+            utils.xp.get_xp_for_level(next_level),
+            next_role,
+        )
 
-        if not message.guild:
-            return
+    async def gain_xp(self, context: utils.message_pipeline.MessageContext) -> bool:
+        """Gives the author of a message some XP, if they did not get any recently."""
+        message = context.message
 
-        if message.guild.id != GuildIDs.TRAINING_GROUNDS:
-            return
+        if context.guild_id != GuildIDs.TRAINING_GROUNDS:
+            return False
 
-        if message.channel.id in TGChannelIDs.BLACKLISTED_CHANNELS:
-            return
-
-        if self.bot.recent_messages.get(message.author.id) is not None:
-            return
+        if context.is_blacklisted_channel or context.is_system:
+            return False
 
-        if message.is_system():
-            return
+        if message.author.id in self.bot.recent_messages:
+            return False
 
-        # Doesn't really matter what we set it to, as long as it's not None.
-        self.bot.recent_messages[message.author.id] = True
+        # You can only gain XP once every 30 seconds.
+        # This is to prevent the user from spamming messages and getting a lot of xp.
+        self.bot.recent_messages.add(message.author.id, 30)
 
         xp_amount = random.randint(15, 25)
 
-        await self.create_new_profile(message.author)
-
         old_level, new_level, _ = await self.add_xp(message.author.id, xp_amount)
 
         if old_level != new_level:
@@ -229,15 +139,7 @@ class Levels(commands.Cog):
 
             await message.channel.send(sent_message)
 
-        # We wait 30 seconds before removing the user from the recent_messages dict.
-        # This is to prevent the user from spamming messages and getting a lot of xp.
-        # Maybe replace this with a loop that runs every X seconds and removes all users from the dict?
-        await asyncio.sleep(30)
-
-        try:
-            self.bot.recent_messages.pop(message.author.id)
-        except KeyError:
-            pass
+        return False
 
     @commands.hybrid_group()
     @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
@@ -273,8 +175,6 @@ class Levels(commands.Cog):
             await ctx.send("To remove XP, please use the xp remove command.")
             return
 
-        await self.create_new_profile(user)
-
         old_level, new_level, new_xp = await self.add_xp(user.id, amount)
 
         if old_level != new_level:
@@ -301,8 +201,6 @@ class Levels(commands.Cog):
             await ctx.send("To add XP, please use the xp add command.")
             return
 
-        await self.create_new_profile(user)
-
         old_level, new_level, new_xp = await self.add_xp(user.id, -amount)
 
         if old_level != new_level:
@@ -344,29 +242,16 @@ class Levels(commands.Cog):
             colour=colour,
         )
 
-        await self.create_new_profile(user)
-
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_profile = await db.execute_fetchall(
-                """SELECT * FROM level WHERE id = :id""",
-                {"id": user.id},
-            )
+        level, xp, messages = await self.xp_ledger.get(user.id)
 
-            level = matching_profile[0][1]
-            xp = matching_profile[0][2]
-            messages = matching_profile[0][3]
+        rank = self.xp_ledger.get_rank(user.id)
+        next_user = self.xp_ledger.get_by_rank(rank + 1)
+        prev_user = self.xp_ledger.get_by_rank(rank - 1)
 
-            leaderboard_rank = await db.execute_fetchall(
-                """SELECT row_number() OVER (ORDER BY xp DESC) AS rank, id, level, xp, messages FROM level""",
-            )
-            rank = next((i[0] for i in leaderboard_rank if i[1] == user.id), 0)
-            next_user = next((i for i in leaderboard_rank if i[0] == rank + 1), None)
-            prev_user = next((i for i in leaderboard_rank if i[0] == rank - 1), None)
-
-            await db.commit()
-
-        xp_progress = xp - self.get_xp_for_level(level)
-        xp_needed = self.get_xp_for_level(level + 1) - self.get_xp_for_level(level)
+        xp_progress = xp - utils.xp.get_xp_for_level(level)
+        xp_needed = utils.xp.get_xp_for_level(level + 1) - utils.xp.get_xp_for_level(
+            level
+        )
 
         [next_role_level, next_role_xp, next_role] = self.get_next_role(
             xp, level, ctx.guild
@@ -405,13 +290,12 @@ class Levels(commands.Cog):
                 inline=False,
             )
 
+        neighbours = await self.bot.user_resolver.resolve(
+            i[1] for i in (prev_user, next_user) if i is not None
+        )
+
         if prev_user is not None:
-            prev_member = self.bot.get_user(prev_user[1])
-            if prev_member is None:
-                try:
-                    prev_member = await self.bot.fetch_user(prev_user[1])
-                except (discord.NotFound, discord.HTTPException):
-                    prev_member = "Unknown User"
+            prev_member = neighbours[prev_user[1]] or "Unknown User"
 
             embed.add_field(
                 name="User above",
@@ -420,12 +304,7 @@ class Levels(commands.Cog):
             )
 
         if next_user is not None:
-            next_member = self.bot.get_user(next_user[1])
-            if next_member is None:
-                try:
-                    next_member = await self.bot.fetch_user(next_user[1])
-                except (discord.NotFound, discord.HTTPException):
-                    next_member = "Unknown User"
+            next_member = neighbours[next_user[1]] or "Unknown User"
 
             embed.add_field(
                 name="User below",
@@ -466,25 +345,12 @@ class Levels(commands.Cog):
             colour=self.bot.colour,
         )
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            leaderboard = await db.execute_fetchall(
-                """SELECT row_number() OVER (ORDER BY xp DESC) AS rank, id, level, xp, messages FROM level""",
-            )
-
-            total_messages = await db.execute_fetchall(
-                """SELECT SUM(messages) FROM level""",
-            )
-
-            total_xp = await db.execute_fetchall(
-                """SELECT SUM(xp) FROM level""",
-            )
+        leaderboard = self.xp_ledger.get_leaderboard(1, 25)
 
-            await db.commit()
+        users = await self.bot.user_resolver.resolve(i[1] for i in leaderboard)
 
-        for rank, user_id, level, xp, messages in leaderboard[:25]:
-            user = self.bot.get_user(user_id)
-            if user is None:
-                user = await self.bot.fetch_user(user_id)
+        for rank, user_id, level, xp, messages in leaderboard:
+            user = users[user_id] or "Unknown User"
 
             embed.add_field(
                 name=f"#{rank} - {discord.utils.escape_markdown(str(user))}",
@@ -493,7 +359,7 @@ class Levels(commands.Cog):
             )
 
         embed.set_footer(
-            text=f"Total server stats: {total_xp[0][0]:,}XP - {total_messages[0][0]:,} messages",
+            text=f"Total server stats: {self.xp_ledger.total_xp:,}XP - {self.xp_ledger.total_messages:,} messages",
         )
 
         embed.set_thumbnail(url=ctx.guild.icon.url)
@@ -1,9 +1,9 @@
-import aiosqlite
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 import utils.check
+import utils.message_pipeline
 import utils.search
 from utils.ids import GuildIDs
 from views.macro import MacroButton
@@ -17,32 +17,38 @@ class Macros(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
-        # Listens for the macros.
-        async with aiosqlite.connect("./db/database.db") as db:
-            macro_names = await db.execute_fetchall("""SELECT name FROM macros""")
-
-            for name in macro_names:
-                # It returns tuples, so we need the first (and only) entry
-                name = name[0]
-                if (
-                    len(message.content.split()) == 1
-                    and message.content == (f"{self.bot.main_prefix}{name}")
-                    or message.content.startswith(f"{self.bot.main_prefix}{name} ")
-                ):
-                    matching_macro = await db.execute_fetchall(
-                        """SELECT payload FROM macros WHERE name = :name""",
-                        {"name": name},
-                    )
-                    payload = matching_macro[0][0]
-                    await message.channel.send(payload)
-
-                    await db.execute(
-                        """UPDATE macros SET uses = uses + 1 WHERE name = :name""",
-                        {"name": name},
-                    )
-                    await db.commit()
+        self.bot.message_pipeline.add_stage(
+            "macros", utils.message_pipeline.MACRO_STAGE, self.send_macro
+        )
+        self.flush_macro_uses.start()
+
+    async def cog_unload(self) -> None:
+        self.bot.message_pipeline.remove_stage("macros")
+        self.flush_macro_uses.cancel()
+        # Making sure we do not lose any uses when shutting down.
+        await self.bot.macros.flush()
+
+    @tasks.loop(seconds=60)
+    async def flush_macro_uses(self) -> None:
+        """Writes the uses of the macros in the last minute to the database."""
+        await self.bot.macros.flush()
+
+    async def send_macro(self, context: utils.message_pipeline.MessageContext) -> bool:
+        """Listens for the macros, which are used like commands.
+        Consumes the message if it was one, so it does not get looked up as a command too.
+        """
+        # Only messages starting with the prefix have a name to look up.
+        if not context.invoked_name:
+            return False
+
+        macro = self.bot.macros.get(context.invoked_name)
+        if macro is None:
+            return False
+
+        await context.message.channel.send(macro.payload)
+        self.bot.macros.add_use(macro.name)
+
+        return True
 
     @commands.hybrid_command()
     @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
@@ -61,21 +67,10 @@ class Macros(commands.Cog):
     @utils.check.is_moderator()
     async def deletemacro(self, ctx: commands.Context, name: str) -> None:
         """Deletes a macro with the specified name."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            macro_names = await db.execute_fetchall(
-                """SELECT * FROM macros WHERE name = :name""", {"name": name}
-            )
-
-            # If the macro does not exist we want some kind of error message for the user.
-            if len(macro_names) == 0:
-                await ctx.send(f"The macro `{name}` was not found. Please try again.")
-                return
-
-            await db.execute(
-                """DELETE FROM macros WHERE name = :name""", {"name": name}
-            )
-
-            await db.commit()
+        # If the macro does not exist we want some kind of error message for the user.
+        if not await self.bot.macros.delete(name):
+            await ctx.send(f"The macro `{name}` was not found. Please try again.")
+            return
 
         await ctx.send(f"Deleted macro `{name}`")
 
@@ -83,10 +78,7 @@ class Macros(commands.Cog):
     async def deletemacro_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice]:
-        async with aiosqlite.connect("./db/database.db") as db:
-            macros = await db.execute_fetchall("""SELECT name FROM macros""")
-
-        return utils.search.autocomplete_choices(current, [m[0] for m in macros])
+        return utils.search.autocomplete_choices(current, self.bot.macros.get_names())
 
     @commands.hybrid_command(aliases=["macros", "listmacros", "macrostats"])
     @app_commands.guilds(*GuildIDs.ALL_GUILDS)
@@ -94,30 +86,23 @@ class Macros(commands.Cog):
     async def macro(self, ctx: commands.Context, *, macro: str = None) -> None:
         """Gives you detailed information about a macro, or lists every macro saved."""
         if macro is None:
-            async with aiosqlite.connect("./db/database.db") as db:
-                macro_list = await db.execute_fetchall("""SELECT name FROM macros""")
-
-            # It returns a list of tuples, so we need to extract them.
-            macro_names = [m[0] for m in macro_list]
+            macro_names = self.bot.macros.get_names()
             await ctx.send(
                 "The registered macros are:\n"
                 f"`{self.bot.main_prefix}{f', {self.bot.main_prefix}'.join(macro_names)}`"
             )
             return
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_macro = await db.execute_fetchall(
-                """SELECT * FROM macros WHERE name = :name""", {"name": macro}
-            )
+        matching_macro = self.bot.macros.get(macro)
 
         # If the macro does not exist we want some kind of error message for the user.
-        if len(matching_macro) == 0:
+        if matching_macro is None:
             await ctx.send(
                 f"I could not find this macro. List all macros with `{self.bot.main_prefix}macros`."
             )
             return
 
-        name, payload, uses, author_id = matching_macro[0]
+        name, payload, uses, author_id = matching_macro
 
         embed = discord.Embed(
             title="Macro info",
@@ -132,10 +117,7 @@ class Macros(commands.Cog):
     async def macro_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice]:
-        async with aiosqlite.connect("./db/database.db") as db:
-            macros = await db.execute_fetchall("""SELECT name FROM macros""")
-
-        return utils.search.autocomplete_choices(current, [m[0] for m in macros])
+        return utils.search.autocomplete_choices(current, self.bot.macros.get_names())
 
     @createmacro.error
     async def createmacro_error(
@@ -1,13 +1,21 @@
-import asyncio
 from typing import Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+import utils.background
 import utils.check
+import utils.expiry
+import utils.message_pipeline
+import utils.ping_registry
+import utils.ranked_queue
+import utils.thread_activity
 from utils.ids import GetIDFunctions, GuildIDs
 
+# How long a matchmaking thread can go without a message before we delete it, in seconds.
+THREAD_INACTIVITY = 60 * 60
+
 
 class Pings(discord.ui.Select):
     """Handles the Pings for the recentpings command."""
@@ -83,13 +91,38 @@ class Matchmaking(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
-        # Clears the Matchmaking Pings on Startup.
-        self.clear_mmrequests()
+        # The ranked queue of every guild, and the context every waiting player joined the queue with.
+        # We need that context later on to start the match, once someone is paired up.
+        # You can wait in the queues of multiple guilds at once, so the contexts are by guild ID and user ID.
+        self.ranked_queues: dict[int, utils.ranked_queue.RankedQueue] = {}
+        self.queue_contexts: dict[tuple[int, int], commands.Context] = {}
+        self.queue_expiry = utils.expiry.ExpiryTracker(self.expire_queue_entry)
+
+        # The ranked matches started from the queue and the threads being deleted, which run in the background.
+        self.background_tasks = utils.background.BackgroundTasks("bot.matchmaking")
+
+        # The matchmaking threads get deleted after 60 minutes without a message.
+        self.matchmaking_channels = set(GetIDFunctions.get_all_mm_channels())
+        self.thread_activity = utils.thread_activity.ThreadActivityTracker(
+            THREAD_INACTIVITY, self.on_thread_inactive
+        )
 
         self.archive_threads.start()
+        self.pair_ranked_queues.start()
+
+        self.bot.message_pipeline.add_stage(
+            "matchmaking",
+            utils.message_pipeline.ACTIVITY_STAGE,
+            self.track_message,
+            ignore_bots=False,
+        )
 
     def cog_unload(self) -> None:
+        self.bot.message_pipeline.remove_stage("matchmaking")
         self.archive_threads.cancel()
+        self.pair_ranked_queues.cancel()
+        self.queue_expiry.stop()
+        self.thread_activity.stop()
 
     def get_embed_colour(self, mm_type: str) -> Optional[discord.Colour]:
         """Returns the colour of the Matchmaking Type."""
@@ -124,67 +157,40 @@ class Matchmaking(commands.Cog):
             return None
 
     def get_recent_pings(self, mm_type: str, timestamp: float, guild_id: int) -> str:
-        """Gets a list with every Ping saved, as long it is not older than the cutoff time."""
-
-        user_pings = self.bot.matchmaking_pings[mm_type]
+        """Gets a list with every recent Ping, the newest first. Pings from other servers show the server name."""
 
         list_of_searches = []
 
-        for ping in user_pings:
-            ping_timestamp = user_pings[f"{ping}"]["time"]
-            difference = timestamp - ping_timestamp
-
-            if difference < self.bot.matchmaking_ping_time:
-                ping_channel = user_pings[f"{ping}"]["channel"]
-                ping_guild = user_pings[f"{ping}"]["guild"]
-
-                if guild_id == ping_guild:
-                    ping_message = f"- <@!{ping}>, in <#{ping_channel}>, <t:{round(ping_timestamp)}:R>\n"
-                else:
-                    ping_guild_object = self.bot.get_guild(ping_guild)
-                    ping_guild_name = (
-                        ping_guild_object.name
-                        if ping_guild_object
-                        else "Unknown Server"
-                    )
-                    ping_message = f"- <@!{ping}>, in {ping_guild_name}, <t:{round(ping_timestamp)}:R>\n"
+        for ping in self.bot.matchmaking_pings.get_all_recent(mm_type, timestamp):
+            if ping.guild_id == guild_id:
+                ping_message = f"- <@!{ping.user_id}>, in <#{ping.channel_id}>, <t:{round(ping.timestamp)}:R>\n"
+            else:
+                ping_guild_object = self.bot.get_guild(ping.guild_id)
+                ping_guild_name = (
+                    ping_guild_object.name if ping_guild_object else "Unknown Server"
+                )
+                ping_message = f"- <@!{ping.user_id}>, in {ping_guild_name}, <t:{round(ping.timestamp)}:R>\n"
 
-                list_of_searches.append(ping_message)
-
-        list_of_searches.reverse()
+            list_of_searches.append(ping_message)
 
         return "".join(list_of_searches) or "Looks like no one has pinged recently :("
 
-    def store_ping(self, ctx: commands.Context, mm_type: str, timestamp: float) -> None:
-        """Saves a Matchmaking Ping of any type in the according dict."""
-
-        self.bot.matchmaking_pings[mm_type][str(ctx.author.id)] = {
-            "time": timestamp,
-            "channel": ctx.channel.id,
-            "guild": ctx.guild.id,
-        }
-
-    def delete_ping(self, ctx: commands.Context, mm_type: str) -> None:
-        """Deletes a specific Matchmaking Ping of any type from the according dict."""
-
-        try:
-            del self.bot.matchmaking_pings[mm_type][str(ctx.author.id)]
-        except KeyError:
-            logger = self.bot.get_logger("bot.mm")
-            logger.warning(
-                f"Tried to delete a {mm_type} ping by {str(ctx.author)} but the ping was already deleted."
-            )
+    async def store_ping(
+        self, ctx: commands.Context, mm_type: str, timestamp: float
+    ) -> None:
+        """Saves a Matchmaking Ping of any type, replacing the last one of the user."""
+        await self.bot.matchmaking_pings.add(
+            mm_type,
+            utils.ping_registry.Ping(
+                ctx.author.id, ctx.channel.id, ctx.guild.id, timestamp
+            ),
+        )
 
-    def clear_mmrequests(self) -> None:
-        """Clears every Matchmaking Ping in the Singles, Doubles, Funnies and Ranked dicts."""
+    async def clear_mmrequests(self) -> None:
+        """Clears every Matchmaking Ping of every type."""
         logger = self.bot.get_logger("bot.mm")
 
-        self.bot.matchmaking_pings = {
-            "singles": {},
-            "doubles": {},
-            "funnies": {},
-            "ranked": {},
-        }
+        await self.bot.matchmaking_pings.clear()
 
         logger.info("Successfully deleted all matchmaking pings!")
 
@@ -222,6 +228,7 @@ class Matchmaking(commands.Cog):
             thread_message = (
                 f"Hi there, {ctx.author.mention}! Please use this thread for communicating with your opponent."
                 f"\nOnce you found an opponent, start your ranked set by using `{self.bot.main_prefix}startmatch @Your Opponent`."
+                f"\nYou can also use `{self.bot.main_prefix}rankedqueue` to get paired up with someone close to your rating."
                 "\nGood luck, have fun!"
             )
         elif mm_type == "doubles":
@@ -257,7 +264,7 @@ class Matchmaking(commands.Cog):
             await ctx.send("Processing request...", ephemeral=True)
 
         if open_channel and not timeout:
-            self.store_ping(ctx, mm_type, timestamp)
+            await self.store_ping(ctx, mm_type, timestamp)
 
         searches = self.get_recent_pings(mm_type, timestamp, ctx.guild.id)
         embed.description = searches
@@ -283,10 +290,6 @@ class Matchmaking(commands.Cog):
         await mm_thread.add_user(ctx.author)
         await mm_thread.send(thread_message)
 
-        if open_channel:
-            await asyncio.sleep(self.bot.matchmaking_ping_time)
-            self.delete_ping(ctx, mm_type)
-
     @commands.Cog.listener()
     async def on_thread_update(
         self, before: discord.Thread, after: discord.Thread
@@ -310,12 +313,62 @@ class Matchmaking(commands.Cog):
             logger.info(f"Deleting archived thread {after.name} ({after.id})")
             await after.delete()
 
+    def is_matchmaking_thread(self, channel: discord.abc.Messageable) -> bool:
+        """Checks if a channel is a thread in one of our matchmaking channels."""
+        return (
+            isinstance(channel, discord.Thread)
+            and channel.parent_id in self.matchmaking_channels
+        )
+
+    def on_thread_inactive(self, thread_id: int, guild_id: int) -> None:
+        """Deletes a matchmaking thread once it has no activity for 60 minutes.
+        Gets called by the thread activity tracker.
+        """
+        guild = self.bot.get_guild(guild_id)
+        thread = guild.get_thread(thread_id) if guild else None
+
+        if thread is None:
+            return
+
+        # If we missed a message somehow, the thread gets a new deadline.
+        if not self.thread_activity.is_inactive(thread):
+            self.thread_activity.track(thread)
+            return
+
+        logger = self.bot.get_logger("bot.matchmaking")
+        logger.info(
+            f"Deleting thread {thread.name} ({thread.id}) automatically because of inactivity."
+        )
+        self.background_tasks.run(thread.delete())
+
+    async def track_message(
+        self, context: utils.message_pipeline.MessageContext
+    ) -> bool:
+        """Pushes back the deadline of a matchmaking thread when a message is sent in there."""
+        message = context.message
+        if self.is_matchmaking_thread(message.channel):
+            self.thread_activity.touch(
+                message.channel.id, context.guild_id, message.created_at.timestamp()
+            )
+
+        return False
+
+    @commands.Cog.listener()
+    async def on_thread_create(self, thread: discord.Thread) -> None:
+        if self.is_matchmaking_thread(thread):
+            self.thread_activity.track(thread)
+
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent) -> None:
+        self.thread_activity.remove(payload.thread_id)
+
     @tasks.loop(minutes=15)
     async def archive_threads(self) -> None:
-        """Deletes all threads in matchmaking channels that have no activity for 60 minutes.
-        Runs every 15 minutes as to not spam the API too much."""
-
-        for channel_id in GetIDFunctions.get_all_mm_channels():
+        """Makes sure every thread in our matchmaking channels is tracked, in case we missed one.
+        The threads are deleted by the thread activity tracker once they have no activity for 60 minutes,
+        this only reads cached IDs and makes no API calls.
+        """
+        for channel_id in self.matchmaking_channels:
             channel = self.bot.get_channel(channel_id)
 
             # These are 100% either going to be GuildChannels or None, but why not rule out everything else too.
@@ -323,28 +376,80 @@ class Matchmaking(commands.Cog):
                 continue
 
             for thread in channel.threads:
-                # Both the id and the message can be None.
-                if thread.last_message_id is None:
-                    continue
+                self.thread_activity.track(thread)
 
-                try:
-                    last_message = await thread.fetch_message(thread.last_message_id)
-                except discord.NotFound:
-                    continue
+    @archive_threads.before_loop
+    async def before_archive_threads(self) -> None:
+        await self.bot.wait_until_ready()
+
+    def leave_queue(self, user_id: int, guild_id: int) -> Optional[commands.Context]:
+        """Takes a player out of the ranked queue and gets you the context they joined with."""
+        if guild_id in self.ranked_queues:
+            self.ranked_queues[guild_id].remove(user_id)
+        self.queue_expiry.remove((guild_id, user_id))
+        return self.queue_contexts.pop((guild_id, user_id), None)
+
+    def expire_queue_entry(self, key: tuple[int, int], _) -> None:
+        """Takes a player out of the ranked queue once they waited too long.
+        Gets called by the expiry tracker, with the guild ID and user ID as the key.
+        """
+        guild_id, user_id = key
+        ctx = self.leave_queue(user_id, guild_id)
+
+        if ctx is not None:
+            self.background_tasks.run(
+                ctx.channel.send(
+                    f"{ctx.author.mention}, we could not find a ranked opponent for you in time. "
+                    "You have been removed from the queue."
+                )
+            )
 
-                if (
-                    discord.utils.utcnow().timestamp()
-                    - last_message.created_at.timestamp()
-                    >= 3600
-                ):
+    def start_queue_match(
+        self, first_ctx: commands.Context, second_ctx: commands.Context
+    ) -> None:
+        """Starts a ranked match between two players who got paired up in the queue.
+        The match runs in the channel of the player who waited longer.
+        Everything is sent to the channels directly, since the interactions of slash commands
+        run out after 15 minutes, which a player waiting in the queue and then a Bo5 easily takes.
+        """
+
+        async def start() -> None:
+            first, second = first_ctx.author, second_ctx.author
+            channel = first_ctx.channel
+
+            if channel != second_ctx.channel:
+                await second_ctx.channel.send(
+                    f"{second.mention}, you have been paired up with {first.mention} for a ranked match! "
+                    f"Head over to {channel.mention} to play."
+                )
+
+            await channel.send(
+                f"{first.mention} and {second.mention}, you have been paired up for a ranked match!"
+            )
+            await self.bot.get_cog("Ranking").play_match(channel, first, second)
+
+        self.background_tasks.run(start())
+
+    @tasks.loop(seconds=10)
+    async def pair_ranked_queues(self) -> None:
+        """Pairs up the players in the ranked queues whose rating windows have grown wide enough."""
+        for guild_id, queue in self.ranked_queues.items():
+            for first_id, second_id in queue.pair_waiting():
+                first_ctx = self.leave_queue(first_id, guild_id)
+                second_ctx = self.leave_queue(second_id, guild_id)
+
+                # Should not happen, but one bad entry must not stop the loop for everyone.
+                if first_ctx is None or second_ctx is None:
                     logger = self.bot.get_logger("bot.matchmaking")
-                    logger.info(
-                        f"Deleting thread {thread.name} ({thread.id}) automatically because of inactivity."
+                    logger.warning(
+                        f"Could not find the queue context of {first_id} or {second_id}, skipping their match."
                     )
-                    await thread.delete()
+                    continue
 
-    @archive_threads.before_loop
-    async def before_archive_threads(self) -> None:
+                self.start_queue_match(first_ctx, second_ctx)
+
+    @pair_ranked_queues.before_loop
+    async def before_pair_ranked_queues(self) -> None:
         await self.bot.wait_until_ready()
 
     @commands.hybrid_command(
@@ -416,6 +521,81 @@ class Matchmaking(commands.Cog):
 
         await self.handle_request(ctx, "ranked", timeout=error.retry_after)
 
+    @commands.hybrid_command(aliases=["rankedq", "joinqueue"])
+    @commands.guild_only()
+    @app_commands.guilds(*GuildIDs.ALL_GUILDS)
+    async def rankedqueue(self, ctx: commands.Context) -> None:
+        """Puts you in the queue for a ranked match against someone close to your rating.
+        The longer you wait, the further apart in rating your opponent can be.
+        """
+        ArenaClass = GetIDFunctions.get_mm_channel_class(ctx.guild.id)
+
+        channel_id = (
+            ctx.channel.parent_id
+            if isinstance(ctx.channel, discord.Thread)
+            else ctx.channel.id
+        )
+
+        if (
+            channel_id not in ArenaClass.OPEN_RANKED_ARENAS
+            and channel_id not in ArenaClass.CLOSED_RANKED_ARENAS
+        ):
+            await ctx.send(
+                "Please only use this command in our ranked arena channels!",
+                ephemeral=True,
+            )
+            return
+
+        # New players start out at 25 with a deviation of 25 / 3, so their conservative rating is 0.
+        player = await self.bot.db.fetchone(
+            """SELECT rating - 3 * deviation FROM trueskill WHERE user_id = :user_id""",
+            {"user_id": ctx.author.id},
+        )
+        rating = player[0] if player else 0.0
+
+        queue = self.ranked_queues.setdefault(
+            ctx.guild.id, utils.ranked_queue.RankedQueue()
+        )
+        opponent_id = queue.join(ctx.author.id, rating)
+
+        if opponent_id is None:
+            self.queue_contexts[(ctx.guild.id, ctx.author.id)] = ctx
+            self.queue_expiry.add(
+                (ctx.guild.id, ctx.author.id), utils.ranked_queue.QUEUE_TIME, None
+            )
+
+            await ctx.send(
+                f"{ctx.author.mention}, you joined the ranked queue! "
+                f"There are {len(queue)} players waiting right now. "
+                f"You will be paired up with someone close to your rating within the next {round(utils.ranked_queue.QUEUE_TIME / 60)} minutes, "
+                f"or use `{self.bot.main_prefix}leavequeue` to leave the queue."
+            )
+            return
+
+        # In case they were already in the queue and joined again.
+        self.leave_queue(ctx.author.id, ctx.guild.id)
+        opponent_ctx = self.leave_queue(opponent_id, ctx.guild.id)
+
+        if opponent_ctx is None:
+            await ctx.send(
+                f"{ctx.author.mention}, something went wrong finding you an opponent, please join the queue again."
+            )
+            return
+
+        await ctx.send(f"{ctx.author.mention}, we found you a ranked opponent!")
+        self.start_queue_match(opponent_ctx, ctx)
+
+    @commands.hybrid_command(aliases=["leaverankedqueue", "leaveq"])
+    @commands.guild_only()
+    @app_commands.guilds(*GuildIDs.ALL_GUILDS)
+    async def leavequeue(self, ctx: commands.Context) -> None:
+        """Takes you out of the ranked queue."""
+        if self.leave_queue(ctx.author.id, ctx.guild.id) is None:
+            await ctx.send("You are not in the ranked queue.", ephemeral=True)
+            return
+
+        await ctx.send(f"{ctx.author.mention}, you left the ranked queue.")
+
     @commands.hybrid_command()
     @app_commands.guilds(*GuildIDs.ALL_GUILDS)
     async def recentpings(self, ctx: commands.Context) -> None:
@@ -430,7 +610,7 @@ class Matchmaking(commands.Cog):
     @utils.check.is_moderator()
     async def clearmmpings(self, ctx: commands.Context) -> None:
         """Clears the Matchmaking Pings manually."""
-        self.clear_mmrequests()
+        await self.clear_mmrequests()
         await ctx.send("Cleared the matchmaking pings!")
 
 
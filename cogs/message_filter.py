@@ -1,14 +1,14 @@
-import re
-import string
+import asyncio
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
+import utils.message_pipeline
 from cogs.warn import Warn
 from utils.ids import AdminVars, GuildIDs, TGChannelIDs, TGRoleIDs
+from utils.word_filter import WordFilter
 
-with open(r"./files/badwords.txt", encoding="utf-8") as file:
-    file = file.read().split()
+BADWORDS_PATH = r"./files/badwords.txt"
 
 
 class MessageFilter(commands.Cog):
@@ -24,19 +24,51 @@ class MessageFilter(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+        self.word_filter = WordFilter.from_file(BADWORDS_PATH)
+        self.reload_words.start()
+
+        self.admin_guilds = {guild.id for guild in GuildIDs.ADMIN_GUILDS}
+        self.bot.message_pipeline.add_stage(
+            "message_filter",
+            utils.message_pipeline.FILTER_STAGE,
+            self.filter_message,
+            ignore_bots=False,
+        )
+
+    async def cog_unload(self) -> None:
+        self.bot.message_pipeline.remove_stage("message_filter")
+        self.reload_words.cancel()
+
+    @tasks.loop(seconds=30)
+    async def reload_words(self) -> None:
+        """Loads the bad words again if the file changed, so we do not need to restart the bot for that."""
+        if not self.word_filter.is_outdated():
+            return
+
+        # Compiling a couple thousand words takes a moment, so we do it off the event loop.
+        self.word_filter = await asyncio.to_thread(WordFilter.from_file, BADWORDS_PATH)
+
+        logger = self.bot.get_logger("bot.autowarn")
+        logger.info(f"Reloaded {len(self.word_filter)} blacklisted words.")
+
+    async def filter_message(
+        self, context: utils.message_pipeline.MessageContext
+    ) -> bool:
+        """Checks a message for invite links and bad words.
+        Consumes the message if it got deleted, so it does not earn XP or trigger anything else.
+        """
+        message = context.message
+
         # Dont want any recursive stuff to happen,
         # so any messages from tabuu 3.0 wont get checked, just in case.
-        if message.author == self.bot.user:
-            return
+        if context.is_own:
+            return False
 
         # Wont check dm's either.
-        if not message.guild:
-            return
+        if context.guild_id not in self.admin_guilds:
+            return False
 
-        if message.guild.id not in [g.id for g in GuildIDs.ADMIN_GUILDS]:
-            return
+        deleted = False
 
         # Searches for invite links, no need for regex as there are a million ways to disguise invite links anyways.
         # This is just a basic filter which is not designed to stop 100% of invite links coming in
@@ -45,7 +77,7 @@ class MessageFilter(commands.Cog):
                 "discord.gg" in message.content
                 or "discordapp.com/invite" in message.content
             )
-            and message.guild.id == GuildIDs.TRAINING_GROUNDS
+            and context.guild_id == GuildIDs.TRAINING_GROUNDS
             and isinstance(message.author, discord.Member)
         ):
             guild = self.bot.get_guild(GuildIDs.TRAINING_GROUNDS)
@@ -60,68 +92,55 @@ class MessageFilter(commands.Cog):
                 await message.channel.send(
                     f"Please don't send invite links here {message.author.mention}"
                 )
-
-        # Searches for bad words using regex.
-        # string.digits+string.whitespace+string.punctuation
-        # add the above for very strict ruling, might end up with false positives.
-        separators = ()
-        # Add/remove these depending on strictness, do +'/'+'-' and so on for urls in the future maybe.
-        excluded = string.ascii_letters + string.digits
+                # The message still gets checked for bad words below, same as always.
+                deleted = True
 
         # Checks if a message contains one of the words in the badwords.txt file.
-        for word in file:
-            formatted_word = f"[{separators}]*".join(list(word))
-            regex_true = re.compile(rf"{formatted_word}", re.IGNORECASE)
-            regex_false = re.compile(
-                rf"([{excluded}]+{word})|({word}[{excluded}]+)", re.IGNORECASE
-            )
+        # The strictness of the matching can be changed in utils/word_filter.py.
+        word = self.word_filter.find(message.content)
+        if word is None:
+            return deleted
 
-            # Checks if a word matches, and then double checks again.
-            if (
-                regex_true.search(message.content) is not None
-                and regex_false.search(message.content) is None
-            ):
-                # Adds the warning.
-                reason = (
-                    "Automatic warning for using a blacklisted word:\n"
-                    + message.content
-                )
+        logger = self.bot.get_logger("bot.autowarn")
+        logger.info(f"Automatically warning {message.author} for the word {word!r}.")
 
-                if len(reason[1000:]) > 0:
-                    reason = f"{reason[:997]}..."
+        # Adds the warning.
+        reason = "Automatic warning for using a blacklisted word:\n" + message.content
 
-                await Warn.add_warn(self, message.guild.me, message.author, reason)
-                await message.channel.send(
-                    f"{message.author.mention} has been automatically warned for using a blacklisted word!"
-                )
+        if len(reason[1000:]) > 0:
+            reason = f"{reason[:997]}..."
 
-                try:
-                    await message.delete()
-                except discord.HTTPException as exc:
-                    logger = self.bot.get_logger("bot.autowarn")
-                    logger.warning(
-                        f"Tried to delete a message for containing a blacklisted word, but it failed: {exc}"
-                    )
-
-                try:
-                    await message.author.send(
-                        f"You have been automatically warned in the {message.guild.name} Server "
-                        "for sending a message containing a blacklisted word.\n"
-                        f"{AdminVars.APPEAL_MESSAGE}"
-                    )
-                except discord.HTTPException as exc:
-                    logger = self.bot.get_logger("bot.autowarn")
-                    logger.warning(
-                        f"Tried to message automatic warn reason to {str(message.author)}, but it failed: {exc}"
-                    )
-
-                # This function here checks the warn count on each user
-                # and if it reaches a threshold it will mute/kick/ban the user.
-                await Warn.check_warn_count(
-                    self, message.guild, message.channel, message.author
-                )
+        await Warn.add_warn(self, message.guild.me, message.author, reason)
+        await message.channel.send(
+            f"{message.author.mention} has been automatically warned for using a blacklisted word!"
+        )
+
+        try:
+            if not deleted:
+                await message.delete()
+        except discord.HTTPException as exc:
+            logger.warning(
+                f"Tried to delete a message for containing a blacklisted word, but it failed: {exc}"
+            )
+
+        try:
+            await message.author.send(
+                f"You have been automatically warned in the {message.guild.name} Server "
+                "for sending a message containing a blacklisted word.\n"
+                f"{AdminVars.APPEAL_MESSAGE}"
+            )
+        except discord.HTTPException as exc:
+            logger.warning(
+                f"Tried to message automatic warn reason to {str(message.author)}, but it failed: {exc}"
+            )
+
+        # This function here checks the warn count on each user
+        # and if it reaches a threshold it will mute/kick/ban the user.
+        await Warn.check_warn_count(
+            self, message.guild, message.channel, message.author
+        )
 
-                break
+        return True
 
 
 async def setup(bot) -> None:
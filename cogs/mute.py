@@ -1,7 +1,6 @@
 import asyncio
 from datetime import datetime, timedelta
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -24,19 +23,16 @@ class Mute(commands.Cog):
         # Checks if the user is already flagged as muted in the file.
         # If not, goes ahead and adds the mute.
         # No reason to have someone in there multiple times.
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM muted WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
-
-            if len(matching_user) == 0:
-                await db.execute(
-                    """INSERT INTO muted VALUES (:user_id, :muted)""",
-                    {"user_id": member.id, "muted": True},
-                )
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM muted WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
-                await db.commit()
+        if len(matching_user) == 0:
+            await self.bot.db.execute(
+                """INSERT OR IGNORE INTO muted VALUES (:user_id, :muted)""",
+                {"user_id": member.id, "muted": True},
+            )
 
         # Tries to add the muted roles in each server.
         for guild_id in [x.id for x in GuildIDs.ADMIN_GUILDS]:
@@ -59,13 +55,10 @@ class Mute(commands.Cog):
         Removes the muted entry from the database
         and tries to remove the role in both servers.
         """
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """DELETE FROM muted WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
-
-            await db.commit()
+        await self.bot.db.execute(
+            """DELETE FROM muted WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         # Tries to remove the muted roles in each server.
         for guild_id in [x.id for x in GuildIDs.ADMIN_GUILDS]:
@@ -124,11 +117,10 @@ class Mute(commands.Cog):
     ) -> None:
         """Mutes a member in all servers indefinitely.
         Also tries to DM the member the reason for the mute."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM muted WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM muted WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         # We check again if the user is muted here because i dont want the user to get dm'd again if he already is muted.
         # Didn't wanna put a separate dm function as well because the dm's change depending on what command calls it.
@@ -157,11 +149,10 @@ class Mute(commands.Cog):
     @utils.check.is_moderator()
     async def unmute(self, ctx: commands.Context, member: discord.Member) -> None:
         """Unmutes a member in all servers and tries to notify them via DM."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM muted WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM muted WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         if len(matching_user) != 0:
             await self.remove_mute(member)
@@ -212,11 +203,10 @@ class Mute(commands.Cog):
             return
 
         # Now this is basically just "%mute, wait specified time, %unmute" but automated into one command.
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM muted WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM muted WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         # The mute block from %mute, with the inclusion of time_muted.
         if len(matching_user) == 0:
@@ -241,11 +231,10 @@ class Mute(commands.Cog):
         await asyncio.sleep(seconds)
 
         # Need to refresh the contents of the database.
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM muted WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM muted WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         # The unmute block from %unmute,
         # no need for another unmute confirmation if the user was unmuted before manually.
@@ -83,6 +83,32 @@ class Owner(commands.Cog):
         )
         await ctx.send(embed=embed)
 
+    @commands.command(aliases=["pipelinestats", "messagetimings"])
+    @commands.is_owner()
+    async def messagestats(self, ctx: commands.Context) -> None:
+        """Shows how long every stage of handling a message takes,
+        since the bot started or since the stage was added.
+        """
+        embed = discord.Embed(
+            title="Message pipeline stats",
+            colour=self.bot.colour,
+            description="Times in milliseconds, the percentiles are over the last 1000 messages of each stage.",
+        )
+
+        for name, stats in self.bot.message_pipeline.get_stats():
+            embed.add_field(
+                name=name,
+                value=f"Messages: {stats.calls}\n"
+                f"Consumed: {stats.consumed}\n"
+                f"Errors: {stats.errors}\n"
+                f"Average: {stats.get_average() * 1000:.3f}\n"
+                f"p50 / p99: {stats.get_percentile(0.5) * 1000:.3f} / "
+                f"{stats.get_percentile(0.99) * 1000:.3f}\n"
+                f"Max: {stats.max * 1000:.3f}",
+            )
+
+        await ctx.send(embed=embed)
+
 
 async def setup(bot) -> None:
     await bot.add_cog(Owner(bot))
@@ -1,6 +1,5 @@
 import json
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -43,30 +42,27 @@ class Profile(commands.Cog):
 
     async def make_new_profile(self, user: discord.User) -> None:
         """Creates a new profile for the user, if the user does not already have a profile set up."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_profile = await db.execute_fetchall(
-                """SELECT * FROM profile WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
+        matching_profile = await self.bot.db.fetchall(
+            """SELECT * FROM profile WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
-            if len(matching_profile) != 0:
-                return
-
-            await db.execute(
-                """INSERT INTO profile VALUES (:user_id, :tag, :region, :mains, :secondaries, :pockets, :note, :colour)""",
-                {
-                    "user_id": user.id,
-                    "tag": f"{str(user)}",
-                    "region": "",
-                    "mains": "",
-                    "secondaries": "",
-                    "pockets": "",
-                    "note": "",
-                    "colour": 0,
-                },
-            )
+        if len(matching_profile) != 0:
+            return
 
-            await db.commit()
+        await self.bot.db.execute(
+            """INSERT INTO profile VALUES (:user_id, :tag, :region, :mains, :secondaries, :pockets, :note, :colour)""",
+            {
+                "user_id": user.id,
+                "tag": f"{str(user)}",
+                "region": "",
+                "mains": "",
+                "secondaries": "",
+                "pockets": "",
+                "note": "",
+                "colour": 0,
+            },
+        )
 
     def character_autocomplete(self, current: str) -> list[app_commands.Choice]:
         """Autocompletion for the Smash characters.
@@ -123,11 +119,10 @@ class Profile(commands.Cog):
         if user is None:
             user = ctx.author
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM profile WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM profile WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
         if len(matching_user) == 0:
             await ctx.send("This user did not set up their profile yet.")
@@ -145,7 +140,7 @@ class Profile(commands.Cog):
         if region:
             embed.add_field(name="Region:", value=region, inline=True)
 
-        player, _, _, _ = await Ranking.get_player(self, user)
+        player, _, _ = await Ranking.get_player(self, user)
 
         embed.add_field(
             name="TabuuSkill",
@@ -170,22 +165,19 @@ class Profile(commands.Cog):
     @app_commands.guilds(*GuildIDs.ALL_GUILDS)
     async def deleteprofile(self, ctx: commands.Context) -> None:
         """Deletes your profile."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM profile WHERE user_id = :user_id""",
-                {"user_id": ctx.author.id},
-            )
-
-            if len(matching_user) == 0:
-                await ctx.send("You have no profile saved.")
-                return
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM profile WHERE user_id = :user_id""",
+            {"user_id": ctx.author.id},
+        )
 
-            await db.execute(
-                """DELETE FROM profile WHERE user_id = :user_id""",
-                {"user_id": ctx.author.id},
-            )
+        if len(matching_user) == 0:
+            await ctx.send("You have no profile saved.")
+            return
 
-            await db.commit()
+        await self.bot.db.execute(
+            """DELETE FROM profile WHERE user_id = :user_id""",
+            {"user_id": ctx.author.id},
+        )
 
         await ctx.send(f"Successfully deleted your profile, {ctx.author.mention}.")
 
@@ -197,22 +189,19 @@ class Profile(commands.Cog):
         self, ctx: commands.Context, user: discord.User
     ) -> None:
         """Deletes the profile of another user, just in case."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM profile WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
-
-            if len(matching_user) == 0:
-                await ctx.send("This user has no profile saved.")
-                return
+        matching_user = await self.bot.db.fetchall(
+            """SELECT * FROM profile WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
-            await db.execute(
-                """DELETE FROM profile WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
+        if len(matching_user) == 0:
+            await ctx.send("This user has no profile saved.")
+            return
 
-            await db.commit()
+        await self.bot.db.execute(
+            """DELETE FROM profile WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
         await ctx.send(
             f"{ctx.author.mention}, I have successfully deleted the profile of {discord.utils.escape_markdown(str(user))}."
@@ -225,11 +214,10 @@ class Profile(commands.Cog):
 
         await self.make_new_profile(ctx.author)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_mains = await db.execute_fetchall(
-                """SELECT mains FROM profile WHERE user_id = :user_id""",
-                {"user_id": ctx.author.id},
-            )
+        matching_mains = await self.bot.db.fetchall(
+            """SELECT mains FROM profile WHERE user_id = :user_id""",
+            {"user_id": ctx.author.id},
+        )
 
         chars = matching_mains[0][0].split(" ") if len(matching_mains[0][0]) else []
         view = CharacterView(ctx.author, chars, "mains", 7)
@@ -247,11 +235,10 @@ class Profile(commands.Cog):
         """Sets your secondaries on your smash profile."""
         await self.make_new_profile(ctx.author)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_secondaries = await db.execute_fetchall(
-                """SELECT secondaries FROM profile WHERE user_id = :user_id""",
-                {"user_id": ctx.author.id},
-            )
+        matching_secondaries = await self.bot.db.fetchall(
+            """SELECT secondaries FROM profile WHERE user_id = :user_id""",
+            {"user_id": ctx.author.id},
+        )
 
         chars = (
             matching_secondaries[0][0].split(" ")
@@ -274,11 +261,10 @@ class Profile(commands.Cog):
         """Sets your pockets on your smash profile."""
         await self.make_new_profile(ctx.author)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_pockets = await db.execute_fetchall(
-                """SELECT pockets FROM profile WHERE user_id = :user_id""",
-                {"user_id": ctx.author.id},
-            )
+        matching_pockets = await self.bot.db.fetchall(
+            """SELECT pockets FROM profile WHERE user_id = :user_id""",
+            {"user_id": ctx.author.id},
+        )
 
         chars = matching_pockets[0][0].split(" ") if len(matching_pockets[0][0]) else []
         view = CharacterView(ctx.author, chars, "pockets", 10)
@@ -304,13 +290,10 @@ class Profile(commands.Cog):
 
         await self.make_new_profile(ctx.author)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """UPDATE profile SET tag = :tag WHERE user_id = :user_id""",
-                {"tag": tag, "user_id": ctx.author.id},
-            )
-
-            await db.commit()
+        await self.bot.db.execute(
+            """UPDATE profile SET tag = :tag WHERE user_id = :user_id""",
+            {"tag": tag, "user_id": ctx.author.id},
+        )
 
         await ctx.send(
             f"{ctx.author.mention}, I have set your tag to: `{discord.utils.remove_markdown(tag)}`"
@@ -343,13 +326,10 @@ class Profile(commands.Cog):
 
         await self.make_new_profile(ctx.author)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """UPDATE profile SET note = :note WHERE user_id = :user_id""",
-                {"note": note, "user_id": ctx.author.id},
-            )
-
-            await db.commit()
+        await self.bot.db.execute(
+            """UPDATE profile SET note = :note WHERE user_id = :user_id""",
+            {"note": note, "user_id": ctx.author.id},
+        )
 
         if note == "":
             await ctx.send(f"{ctx.author.mention}, I have deleted your note.")
@@ -390,24 +370,23 @@ class Profile(commands.Cog):
             await ctx.send("Please input a valid character!")
             return
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            # We look for the players that have registered the character in their profile.
-            # We sort it by the length of the mains, which does roughly correlate to the amount of mains.
-            # So that a solo-main will show up near the top.
-            matching_mains = await db.execute_fetchall(
-                """SELECT user_id FROM profile WHERE INSTR(mains, :character) ORDER BY length(mains)""",
-                {"character": matching_character},
-            )
+        # We look for the players that have registered the character in their profile.
+        # We sort it by the length of the mains, which does roughly correlate to the amount of mains.
+        # So that a solo-main will show up near the top.
+        matching_mains = await self.bot.db.fetchall(
+            """SELECT user_id FROM profile WHERE INSTR(mains, :character) ORDER BY length(mains)""",
+            {"character": matching_character},
+        )
 
-            matching_secondaries = await db.execute_fetchall(
-                """SELECT user_id FROM profile WHERE INSTR(secondaries, :character) ORDER BY length(secondaries)""",
-                {"character": matching_character},
-            )
+        matching_secondaries = await self.bot.db.fetchall(
+            """SELECT user_id FROM profile WHERE INSTR(secondaries, :character) ORDER BY length(secondaries)""",
+            {"character": matching_character},
+        )
 
-            matching_pockets = await db.execute_fetchall(
-                """SELECT user_id FROM profile WHERE INSTR(pockets, :character) ORDER BY length(pockets)""",
-                {"character": matching_character},
-            )
+        matching_pockets = await self.bot.db.fetchall(
+            """SELECT user_id FROM profile WHERE INSTR(pockets, :character) ORDER BY length(pockets)""",
+            {"character": matching_character},
+        )
 
         try:
             emoji_converter = commands.PartialEmojiConverter()
@@ -428,29 +407,27 @@ class Profile(commands.Cog):
                 title=f"{matching_character} Players:", colour=self.bot.colour
             )
 
-        mains_list = []
         # We have to cap it off at some point, I think 50 sounds pretty reasonable for our server.
-        for player in matching_mains[:50]:
-            # First we see if the user is in the cache.
-            user = self.bot.get_user(player[0])
-            # If not we have to fetch the user, this can take some time.
-            if not user:
-                user = await self.bot.fetch_user(player[0])
-            mains_list.append(discord.utils.escape_markdown(str(user)))
-
-        secondaries_list = []
-        for player in matching_secondaries[:50]:
-            user = self.bot.get_user(player[0])
-            if not user:
-                user = await self.bot.fetch_user(player[0])
-            secondaries_list.append(discord.utils.escape_markdown(str(user)))
-
-        pockets_list = []
-        for player in matching_pockets[:50]:
-            user = self.bot.get_user(player[0])
-            if not user:
-                user = await self.bot.fetch_user(player[0])
-            pockets_list.append(discord.utils.escape_markdown(str(user)))
+        players = (
+            matching_mains[:50] + matching_secondaries[:50] + matching_pockets[:50]
+        )
+        # Fetching the users that are not in the cache can take some time, so we do it all at once.
+        users = await self.bot.user_resolver.resolve(player[0] for player in players)
+
+        mains_list = [
+            discord.utils.escape_markdown(str(users[player[0]] or "Unknown User"))
+            for player in matching_mains[:50]
+        ]
+
+        secondaries_list = [
+            discord.utils.escape_markdown(str(users[player[0]] or "Unknown User"))
+            for player in matching_secondaries[:50]
+        ]
+
+        pockets_list = [
+            discord.utils.escape_markdown(str(users[player[0]] or "Unknown User"))
+            for player in matching_pockets[:50]
+        ]
 
         embed.add_field(
             name="Mains:",
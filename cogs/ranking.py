@@ -1,14 +1,18 @@
 import asyncio
 import datetime
 import random
+import time
 
-import aiosqlite
 import discord
 import trueskill
 from discord import app_commands
 from discord.ext import commands, tasks
 
 import utils.check
+import utils.ranked_stats
+import utils.rating
+import utils.rating_decay
+import utils.rating_history
 import utils.time
 from utils.character import match_character
 from utils.ids import Emojis, GetIDFunctions, GuildIDs, GuildNames
@@ -32,42 +36,11 @@ class Ranking(commands.Cog):
         self, player: trueskill.Rating, guild: discord.Guild
     ) -> discord.Role:
         """Retrieves the ranked role of a user."""
-        rating = self.get_display_rank(player)
-
-        RoleClass = GetIDFunctions.get_mm_role_class(guild.id)
-
-        # We multiply the rating by 100 and add 1000, compared to the original
-        # Microsoft TrueSkill algorithm. So a rating of 5000 equals a rank of 40,
-        # the ranks were used in Halo 3 where 50 was the highest rank.
-        # A rating of 40 was also fairly hard to achieve
-        # so this is the current max rank for us.
-        if rating >= 5000:
-            return discord.utils.get(guild.roles, id=RoleClass.GROUNDS_MASTER)
-        elif rating >= 4200:
-            return discord.utils.get(guild.roles, id=RoleClass.FIVE_STAR)
-        elif rating >= 3400:
-            return discord.utils.get(guild.roles, id=RoleClass.FOUR_STAR)
-        elif rating >= 2600:
-            return discord.utils.get(guild.roles, id=RoleClass.THREE_STAR)
-        elif rating >= 1800:
-            return discord.utils.get(guild.roles, id=RoleClass.TWO_STAR)
-        else:
-            # This rank should hopefully also be fairly hard to obtain,
-            # if you do not lose every single match.
-            # This would equal a rank of below 8 in Halo 3.
-            return discord.utils.get(guild.roles, id=RoleClass.ONE_STAR)
+        return self.bot.ranked_roles.get_role(guild, self.get_display_rank(player))
 
     def get_all_ranked_roles(self, guild: discord.Guild) -> list[discord.Role]:
-        """Gets you every ranked role."""
-        RoleClass = GetIDFunctions.get_mm_role_class(guild.id)
-
-        role1 = discord.utils.get(guild.roles, id=RoleClass.ONE_STAR)
-        role2 = discord.utils.get(guild.roles, id=RoleClass.TWO_STAR)
-        role3 = discord.utils.get(guild.roles, id=RoleClass.THREE_STAR)
-        role4 = discord.utils.get(guild.roles, id=RoleClass.FOUR_STAR)
-        role5 = discord.utils.get(guild.roles, id=RoleClass.FIVE_STAR)
-        role6 = discord.utils.get(guild.roles, id=RoleClass.GROUNDS_MASTER)
-        return [role1, role2, role3, role4, role5, role6]
+        """Gets you every ranked role, lowest first."""
+        return self.bot.ranked_roles.get_roles(guild)
 
     async def remove_ranked_roles(
         self, member: discord.Member, guild: discord.Guild
@@ -88,7 +61,7 @@ class Ranking(commands.Cog):
         so its fine to remove ALL others first and then give the new one out.
         Also we only start to give these out at 5 games played automatically.
         """
-        player, wins, losses, _ = await self.get_player(member)
+        player, wins, losses = await self.get_player(member)
 
         if wins + losses >= threshold:
             role = await self.get_ranked_role(player, guild)
@@ -103,32 +76,29 @@ class Ranking(commands.Cog):
         """Creates an entry in the ranked file for a user,
         if the user is not already in there.
         """
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_player = await db.execute_fetchall(
-                """SELECT * FROM trueskill WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
+        matching_player = await self.bot.db.fetchall(
+            """SELECT * FROM trueskill WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
-            if len(matching_player) == 0:
-                rating = 25.0
-                deviation = 25 / 3
-                wins = 0
-                losses = 0
-                matches = ""
-
-                await db.execute(
-                    """INSERT INTO trueskill VALUES (:user_id, :rating, :deviation, :wins, :losses, :matches)""",
-                    {
-                        "user_id": user.id,
-                        "rating": rating,
-                        "deviation": deviation,
-                        "wins": wins,
-                        "losses": losses,
-                        "matches": matches,
-                    },
-                )
+        if len(matching_player) == 0:
+            rating = 25.0
+            deviation = 25 / 3
+            wins = 0
+            losses = 0
 
-                await db.commit()
+            # The recent form starts out empty.
+            await self.bot.db.execute(
+                """INSERT OR IGNORE INTO trueskill (user_id, rating, deviation, wins, losses)
+                VALUES (:user_id, :rating, :deviation, :wins, :losses)""",
+                {
+                    "user_id": user.id,
+                    "rating": rating,
+                    "deviation": deviation,
+                    "wins": wins,
+                    "losses": losses,
+                },
+            )
 
     async def update_ranked_profiles(
         self,
@@ -138,15 +108,16 @@ class Ranking(commands.Cog):
         loser_rating: trueskill.Rating,
     ) -> None:
         """Updates a ranked profile with the new stats."""
-        async with aiosqlite.connect("./db/database.db") as db:
+        async with self.bot.db.transaction() as db:
             await db.execute(
-                """UPDATE trueskill SET
+                f"""UPDATE trueskill SET
                     wins = wins + 1,
-                    matches = matches || "W",
+                    {utils.ranked_stats.ADD_RESULT_SQL},
                     rating = :new_rating,
                     deviation = :new_deviation
                     WHERE user_id = :user_id""",
                 {
+                    "won": 1,
                     "new_rating": winner_rating.mu,
                     "new_deviation": winner_rating.sigma,
                     "user_id": winner.id,
@@ -154,19 +125,19 @@ class Ranking(commands.Cog):
             )
 
             await db.execute(
-                """UPDATE trueskill SET
+                f"""UPDATE trueskill SET
                     losses = losses + 1,
-                    matches = matches || "L",
+                    {utils.ranked_stats.ADD_RESULT_SQL},
                     rating = :new_rating,
                     deviation = :new_deviation
                     WHERE user_id = :user_id""",
                 {
+                    "won": 0,
                     "new_rating": loser_rating.mu,
                     "new_deviation": loser_rating.sigma,
                     "user_id": loser.id,
                 },
             )
-            await db.commit()
 
     async def log_match(
         self,
@@ -178,9 +149,10 @@ class Ranking(commands.Cog):
         old_loser: trueskill.Rating,
         new_loser: trueskill.Rating,
     ) -> None:
-        """Logs a match in the database."""
+        """Logs a match in the database, and adds it to the ranked stats of both players."""
+        timestamp = int(discord.utils.utcnow().timestamp())
 
-        async with aiosqlite.connect("./db/database.db") as db:
+        async with self.bot.db.transaction() as db:
             await db.execute(
                 """INSERT INTO matches VALUES (
                 :match_id,
@@ -199,7 +171,7 @@ class Ranking(commands.Cog):
                     "match_id": match_id,
                     "winner_id": winner.id,
                     "loser_id": loser.id,
-                    "timestamp": int(discord.utils.utcnow().timestamp()),
+                    "timestamp": timestamp,
                     "old_winner_rating": old_winner.mu,
                     "old_winner_deviation": old_winner.sigma,
                     "old_loser_rating": old_loser.mu,
@@ -211,7 +183,32 @@ class Ranking(commands.Cog):
                 },
             )
 
-            await db.commit()
+            await utils.ranked_stats.record_match(
+                db,
+                winner.id,
+                loser.id,
+                timestamp,
+                old_winner,
+                new_winner,
+                old_loser,
+                new_loser,
+            )
+            await utils.ranked_stats.record_head_to_head(
+                db,
+                winner.id,
+                loser.id,
+                timestamp,
+                old_winner,
+                new_winner,
+                old_loser,
+                new_loser,
+            )
+            await utils.rating_history.record_history(
+                db,
+                match_id,
+                timestamp,
+                [(winner.id, old_winner, new_winner), (loser.id, old_loser, new_loser)],
+            )
 
     async def save_match(
         self, winner: discord.User, loser: discord.User, guild: discord.Guild
@@ -222,8 +219,8 @@ class Ranking(commands.Cog):
         await self.create_ranked_profile(winner)
         await self.create_ranked_profile(loser)
 
-        winner_rating, _, _, _ = await self.get_player(winner)
-        loser_rating, _, _, _ = await self.get_player(loser)
+        winner_rating, _, _ = await self.get_player(winner)
+        loser_rating, _, _ = await self.get_player(loser)
 
         # Getting the updated ratings and updating the database.
         new_winner_rating, new_loser_rating = trueskill.rate_1vs1(
@@ -278,44 +275,31 @@ class Ranking(commands.Cog):
             f"{loser.mention}: **{self.get_display_rank(loser_rating)}** → **{self.get_display_rank(new_loser_rating)}** ({loser_diff_str})\n\n"
         )
 
-    async def get_player(
-        self, user: discord.User
-    ) -> tuple[trueskill.Rating, int, int, str]:
-        """Gets a player rating, their wins, losses and matches from the database."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_user = await db.execute_fetchall(
-                """SELECT * FROM trueskill WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
+    async def get_player(self, user: discord.User) -> tuple[trueskill.Rating, int, int]:
+        """Gets a player rating, their wins and losses from the database."""
+        matching_user = await self.bot.db.fetchall(
+            """SELECT rating, deviation, wins, losses FROM trueskill WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
         return (
             (
-                trueskill.Rating(matching_user[0][1], matching_user[0][2]),
+                trueskill.Rating(matching_user[0][0], matching_user[0][1]),
+                matching_user[0][2],
                 matching_user[0][3],
-                matching_user[0][4],
-                matching_user[0][5],
             )
             if matching_user
-            else (trueskill.Rating(), 0, 0, "")
+            else (trueskill.Rating(), 0, 0)
         )
 
     def get_display_rank(self, player: trueskill.Rating) -> float:
         """Gets the conservatively estimated rank of a player, scaled."""
-        # This is the formula used by Microsoft, for example in Halo 3.
-        # But we multiply by 100 and add 1000 to get a nicer number.
-        return max(round(((player.mu - 3 * player.sigma) * 100) + 1000), 0)
+        return utils.rating.get_display_rank(player)
 
     def get_potential(self, player: trueskill.Rating) -> float:
         """Gets the maximum rank of a player, scaled."""
         return max(round(((player.mu + 3 * player.sigma) * 100) + 1000), 0)
 
-    def decay_deviation(self, player: trueskill.Rating) -> trueskill.Rating:
-        """Decays the deviation of a player by 3.33%."""
-        # 3.33% was chosen because a decently rated player (~25 games played) has a deviation of ~2.6,
-        # with a 3.33% decay, the deviation will be at the maximum value after 36 decay steps.
-        # We decay the deviation every month, so it will take 3 years.
-        return trueskill.Rating(player.mu, min(player.sigma * (31 / 30), 25 / 3))
-
     @commands.hybrid_command(aliases=["reportgame"], cooldown_after_parsing=True)
     @commands.cooldown(1, 41, commands.BucketType.user)
     @commands.guild_only()
@@ -469,6 +453,18 @@ class Ranking(commands.Cog):
             ctx.command.reset_cooldown(ctx)
             return
 
+        await self.play_match(ctx, ctx.author, member)
+
+    async def play_match(
+        self,
+        destination: discord.abc.Messageable,
+        author: discord.Member,
+        member: discord.Member,
+    ) -> None:
+        """Walks two players through a ranked match, from the stage bans to reporting it.
+        Every message goes to the destination, which is the context of the startmatch command,
+        or the channel itself for matches that were not started by a command.
+        """
         # Need to keep track of the score
         player_one_score = 0
         player_two_score = 0
@@ -478,21 +474,23 @@ class Ranking(commands.Cog):
         player_one_dsr = []
         player_two_dsr = []
 
-        best_of_view = BestOfButtons(ctx.author)
-        await ctx.send(
-            f"{ctx.author.mention}, do you want to play a Best of 3 or a Best of 5?",
+        best_of_view = BestOfButtons(author)
+        await destination.send(
+            f"{author.mention}, do you want to play a Best of 3 or a Best of 5?",
             view=best_of_view,
         )
 
         await best_of_view.wait()
 
         if not best_of_view.choice:
-            await ctx.send("You didn't choose a format in time!\nCancelling match.")
+            await destination.send(
+                "You didn't choose a format in time!\nCancelling match."
+            )
             return
 
-        arena_view = ArenaButton(ctx.author, best_of_view.choice)
+        arena_view = ArenaButton(author, best_of_view.choice)
 
-        await ctx.send(
+        await destination.send(
             f"**Best of {best_of_view.choice}** selected.\n"
             "Please host an arena and share the Code/Password here. Click the button when you're ready.",
             view=arena_view,
@@ -501,29 +499,31 @@ class Ranking(commands.Cog):
         timeout = await arena_view.wait()
 
         if timeout:
-            await ctx.send("You didn't host an arena in time!\nCancelling match.")
+            await destination.send(
+                "You didn't host an arena in time!\nCancelling match."
+            )
             return
 
         # The players pick their characters.
         # In Game 1, this is done before the stage bans.
         # After that, the players pick their characters after the stage bans.
-        character_view = CharacterView(ctx.author, member, None)
+        character_view = CharacterView(author, member, None)
 
-        character_view.message = await ctx.send(
-            f"{ctx.author.mention} and {member.mention}: Pick a character for Game 1!",
+        character_view.message = await destination.send(
+            f"{author.mention} and {member.mention}: Pick a character for Game 1!",
             view=character_view,
         )
 
         timeout = await character_view.wait()
 
         if timeout:
-            await ctx.send(
+            await destination.send(
                 "A player did not select their character in time.\nCancelling match."
             )
             return
 
-        await ctx.send(
-            f"{ctx.author.mention} has chosen {character_view.player_one_choice}. ({match_character(character_view.player_one_choice)[0]})\n"
+        await destination.send(
+            f"{author.mention} has chosen {character_view.player_one_choice}. ({match_character(character_view.player_one_choice)[0]})\n"
             f"{member.mention} has chosen {character_view.player_two_choice}. ({match_character(character_view.player_two_choice)[0]})"
         )
 
@@ -537,24 +537,24 @@ class Ranking(commands.Cog):
         ]
 
         # The first stage ban is special, so we cannot move this into the loop.
-        stage_select = StarterStageButtons(ctx.author, member)
+        stage_select = StarterStageButtons(author, member)
 
-        await ctx.send(
-            f"**Stage select**\n{ctx.author.mention}, please **ban 1 stage**:",
+        await destination.send(
+            f"**Stage select**\n{author.mention}, please **ban 1 stage**:",
             view=stage_select,
         )
 
         await stage_select.wait()
 
         if not stage_select.choice:
-            await ctx.send("No stage selected in time.\nCancelling match.")
+            await destination.send("No stage selected in time.\nCancelling match.")
             return
 
-        game = PlayerButtons(ctx.author, member, game_count + 1)
+        game = PlayerButtons(author, member, game_count + 1)
 
         game_message = (
             f"**Game {game_count + 1}/{best_of_view.choice} - {stage_select.choice}**\n"
-            f"{ctx.author.mention} "
+            f"{author.mention} "
             f"({character_view.player_one_choice} {match_character(character_view.player_one_choice)[0]}) "
             f"**{player_one_score}** - **{player_two_score}** "
             f"{member.mention} "
@@ -563,12 +563,14 @@ class Ranking(commands.Cog):
             f"When you're done, click on the button of the winner of Game {game_count + 1} to report the match."
         )
 
-        await ctx.send(game_message, view=game)
+        await destination.send(game_message, view=game)
 
         timeout = await game.wait()
 
         if timeout:
-            await ctx.send("You didn't report the match in time!\nCancelling match.")
+            await destination.send(
+                "You didn't report the match in time!\nCancelling match."
+            )
             return
 
         # Looping the rest of the stage bans until the game is over.
@@ -579,19 +581,19 @@ class Ranking(commands.Cog):
 
             # Incrementing counters, adding stages to the DSR list and assigning the correct views.
             game_count += 1
-            if game.winner == ctx.author:
+            if game.winner == author:
                 player_one_score += 1
                 player_two_dsr.append(stage_select.choice)
                 stage_select = CounterpickStageButtons(
-                    ctx.author,
+                    author,
                     member,
                     player_one_dsr,
                     2 if best_of_view.choice == 5 else 3,
                 )
                 character_view = CharacterView(
-                    ctx.author,
+                    author,
                     member,
-                    ctx.author,
+                    author,
                     last_choice_author,
                     last_choice_member,
                 )
@@ -601,12 +603,12 @@ class Ranking(commands.Cog):
                 player_one_dsr.append(stage_select.choice)
                 stage_select = CounterpickStageButtons(
                     member,
-                    ctx.author,
+                    author,
                     player_two_dsr,
                     2 if best_of_view.choice == 5 else 3,
                 )
                 character_view = CharacterView(
-                    ctx.author, member, member, last_choice_author, last_choice_member
+                    author, member, member, last_choice_author, last_choice_member
                 )
 
             # Checking if the score threshold has been reached.
@@ -623,7 +625,7 @@ class Ranking(commands.Cog):
                 break
 
             # The winner of the previous set can ban three stages, then the loser can pick one (that he hasnt won on yet).
-            await ctx.send(
+            await destination.send(
                 f"Game {game_count}/{best_of_view.choice} reported! {game.winner.mention} won! "
                 f"(Score: **{player_one_score} - {player_two_score})**\n"
                 f"{game.winner.mention}, please ban {2 if best_of_view.choice == 5 else 3} stages:",
@@ -633,14 +635,14 @@ class Ranking(commands.Cog):
             await stage_select.wait()
 
             if not stage_select.choice:
-                await ctx.send("No stage selected in time.\nCancelling match.")
+                await destination.send("No stage selected in time.\nCancelling match.")
                 return
 
-            next_game = PlayerButtons(ctx.author, member, game_count + 1)
+            next_game = PlayerButtons(author, member, game_count + 1)
 
             # Then the two players pick their characters.
             # First the winner and then the loser.
-            character_view.message = await ctx.send(
+            character_view.message = await destination.send(
                 f"{game.winner.mention}, please pick a character for the next Game!",
                 view=character_view,
             )
@@ -648,7 +650,7 @@ class Ranking(commands.Cog):
             timeout = await character_view.wait()
 
             if timeout:
-                await ctx.send(
+                await destination.send(
                     "A player did not select their character in time.\nCancelling match."
                 )
                 return
@@ -664,7 +666,7 @@ class Ranking(commands.Cog):
 
             game_message = (
                 f"**Game {game_count + 1}/{best_of_view.choice} - {stage_select.choice}**\n"
-                f"{ctx.author.mention} "
+                f"{author.mention} "
                 f"({character_view.player_one_choice} {match_character(character_view.player_one_choice)[0]}) "
                 f"**{player_one_score}** - **{player_two_score}** "
                 f"{member.mention} "
@@ -675,12 +677,12 @@ class Ranking(commands.Cog):
 
             # And finally the match starts.
             # The cycle repeats until the game is over.
-            await ctx.send(game_message, view=next_game)
+            await destination.send(game_message, view=next_game)
 
             timeout = await next_game.wait()
 
             if timeout:
-                await ctx.send(
+                await destination.send(
                     "You didn't report the match in time!\nCancelling match."
                 )
                 return
@@ -688,19 +690,19 @@ class Ranking(commands.Cog):
             game = next_game
 
         # When the game is over we report the match automatically and update the ratings etc.
-        await ctx.send(
+        await destination.send(
             f"Game {game_count}/{best_of_view.choice} reported! {game.winner.mention} won!\n"
             "The final result of the match is: "
-            f"{ctx.author.mention} **{player_one_score} - {player_two_score}** {member.mention}!"
+            f"{author.mention} **{player_one_score} - {player_two_score}** {member.mention}!"
             "\nReporting match automatically.."
         )
 
         if player_one_score > player_two_score:
-            message = await self.save_match(ctx.author, member, ctx.guild)
+            message = await self.save_match(author, member, author.guild)
         else:
-            message = await self.save_match(member, ctx.author, ctx.guild)
+            message = await self.save_match(member, author, author.guild)
 
-        await ctx.send(message)
+        await destination.send(message)
 
     @commands.hybrid_command(aliases=["rankstats"])
     @app_commands.guilds(*GuildIDs.ALL_GUILDS)
@@ -716,11 +718,30 @@ class Ranking(commands.Cog):
         if member is None:
             member = ctx.author
 
-        rating, wins, losses, matches = await self.get_player(member)
+        # Everything we need is kept up to date when a match gets logged, so this is a single read.
+        player = await self.bot.db.fetchone(
+            f"""SELECT rating, deviation, wins, losses,
+            {utils.ranked_stats.POSITION_SQL}, {utils.ranked_stats.LEADERBOARD_SIZE_SQL},
+            {utils.ranked_stats.FORM_COLUMNS}, {utils.ranked_stats.STATS_COLUMNS}
+            FROM trueskill LEFT JOIN ranked_player_stats USING (user_id)
+            WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
+
+        if player is None or player[2] + player[3] == 0:
+            await ctx.send("This user hasn't played a ranked match yet.")
+            return
+
+        mu, sigma, wins, losses, position, leaderboard_size, *columns = player
+        rating = trueskill.Rating(mu, sigma)
+        form = utils.ranked_stats.RecentForm(*columns[:5])
+        # Players who never finished a match do not have any stats yet.
+        stats = utils.ranked_stats.PlayerStats(
+            columns[5:] if columns[-1] is not None else None
+        )
 
-        # Gets the last 5 games played and reverses that string.
-        last5games = matches[-5:]
-        gamelist = last5games[::-1]
+        # Gets the last 5 games played, the most recent one first.
+        gamelist = form.last_results(5)
 
         # Subs in the emojis.
         gamelist = gamelist.replace("W", Emojis.WIN_EMOJI)
@@ -732,111 +753,32 @@ class Ranking(commands.Cog):
 
         colour = await get_dominant_colour(member.display_avatar)
 
-        # We also go through the players matches to get their recent performance swings.
-        async with aiosqlite.connect("./db/database.db") as db:
-            recent_matches = await db.execute_fetchall(
-                """SELECT * FROM matches WHERE winner_id = :user_id OR loser_id = :user_id ORDER BY timestamp DESC LIMIT 5""",
-                {"user_id": member.id},
-            )
-
-            complete_leaderboard = await db.execute_fetchall(
-                """SELECT row_number() OVER (ORDER BY (rating - 3 * deviation) DESC) as row_num, user_id FROM trueskill WHERE wins + losses > 4"""
-            )
-
-            best_win = await db.execute_fetchall(
-                """SELECT * FROM matches WHERE winner_id = :user_id ORDER BY (old_loser_rating - 3 * old_loser_deviation) DESC LIMIT 1""",
-                {"user_id": member.id},
-            )
-
-            average_opponents = await db.execute_fetchall(
-                """
-                SELECT
-                    CASE WHEN winner_id = :user_id THEN
-                        old_loser_rating
-                    ELSE
-                        old_winner_rating
-                    END rating,
-                    CASE WHEN winner_id = :user_id THEN
-                        old_loser_deviation
-                    ELSE
-                        old_winner_deviation
-                    END deviation
-                FROM matches
-                WHERE winner_id = :user_id OR loser_id = :user_id
-                """,
-                {"user_id": member.id},
-            )
-
-            # This sql statement basically fetches either the highest rating after a win, after a loss, or before a loss,
-            # together with a timestamp. You can gain rating by losing, but you cannot lose rating by winning.
-            highest_rating = await db.execute_fetchall(
-                """
-                SELECT
-                    CASE WHEN winner_id = :user_id THEN
-                        new_winner_rating
-                    ELSE
-                        CASE WHEN new_loser_rating - 3 * new_loser_deviation < old_loser_rating - 3 * old_loser_deviation THEN
-                            old_loser_rating
-                        ELSE
-                            new_loser_rating
-                        END
-                    END rating,
-                    CASE WHEN winner_id = :user_id THEN
-                        new_winner_deviation
-                    ELSE
-                        CASE WHEN new_loser_rating - 3 * new_loser_deviation < old_loser_rating - 3 * old_loser_deviation THEN
-                            old_loser_deviation
-                        ELSE
-                            new_loser_deviation
-                        END
-                    END deviation,
-                    timestamp
-                FROM matches
-                WHERE winner_id = :user_id OR loser_id = :user_id
-                ORDER BY rating - 3 * deviation
-                DESC LIMIT 1""",
-                {"user_id": member.id},
-            )
+        # The rating before their last 5 matches, for their recent performance swings.
+        # If there are none we take the current one. Should never really happen, but who knows.
+        old_mu, old_sigma = (
+            stats.recent_ratings[0]
+            if stats.recent_ratings
+            else (rating.mu, rating.sigma)
+        )
 
-        # If the recent matches are empty, we set the old rating to the current one.
-        # Should never really happen, but who knows.
-        if not recent_matches:
-            old_mu = rating.mu
-            old_sigma = rating.sigma
-        # If there are matches we get the old rating from the last match.
-        # We have to check if the user was the winner or loser to get the correct rating.
-        # And then we get it from the last match in the list, 5 matches ago.
-        elif recent_matches[-1][1] == member.id:
-            old_mu = recent_matches[-1][4]
-            old_sigma = recent_matches[-1][5]
-        elif recent_matches[-1][2] == member.id:
-            old_mu = recent_matches[-1][6]
-            old_sigma = recent_matches[-1][7]
-
-        if not best_win:
+        if stats.best_win is None:
             highest_win = "*N/A*"
         else:
-            user = self.bot.get_user(best_win[0][2])
-            if not user:
-                try:
-                    user = await self.bot.fetch_user(best_win[0][2])
-                except discord.NotFound:
-                    user = "Unknown User"
+            user = (
+                await self.bot.user_resolver.resolve_one(stats.best_win_opponent)
+                or "Unknown User"
+            )
             highest_win = (
                 f"vs. **{str(user)}**\n"
-                f"***({self.get_display_rank(trueskill.Rating(best_win[0][6], best_win[0][7]))}**, "
-                f"<t:{best_win[0][3]}:d>)*"
+                f"***({self.get_display_rank(stats.best_win)}**, "
+                f"<t:{stats.best_win_timestamp}:d>)*"
             )
 
-        if not average_opponents:
+        if not stats.opponents:
             average_opponent = "*N/A*"
         else:
-            average_ratings = [
-                self.get_display_rank(trueskill.Rating(opponent[0], opponent[1]))
-                for opponent in average_opponents
-            ]
             average_opponent = (
-                f"**≈{round(sum(average_ratings) / len(average_ratings))}**"
+                f"**≈{round(stats.opponent_rank_sum / stats.opponents)}**"
             )
 
         recent_rating = self.get_display_rank(rating) - self.get_display_rank(
@@ -854,37 +796,19 @@ class Ranking(commands.Cog):
         all_time_win = (
             # We do not really need the min here, it's just a kind of failsafe.
             max(
-                self.get_display_rank(
-                    trueskill.Rating(highest_rating[0][0], highest_rating[0][1])
-                ),
+                self.get_display_rank(stats.peak),
                 self.get_display_rank(rating),
             )
-            if highest_rating
+            if stats.peak
             else self.get_display_rank(rating)
         )
 
-        # Getting the longest and current win and lose streaks.
-        longest_winstreak = 0
-        current_winstreak = 0
-        longest_losestreak = 0
-        current_losestreak = 0
-        for m in matches:
-            if m == "W":
-                current_winstreak += 1
-                current_losestreak = 0
-            else:
-                current_losestreak += 1
-                current_winstreak = 0
-
-            longest_winstreak = max(longest_winstreak, current_winstreak)
-            longest_losestreak = max(longest_losestreak, current_losestreak)
-
         # We basically check double here, because we want the current time stamp
         # if the player still has the highest rating that they ever achieved.
         timestamp_win = (
             round(discord.utils.utcnow().timestamp())
             if self.get_display_rank(rating) == all_time_win
-            else highest_rating[0][2]
+            else stats.peak_timestamp
         )
 
         embed = discord.Embed(title=f"Ranked stats of {str(member)}", colour=colour)
@@ -911,36 +835,28 @@ class Ranking(commands.Cog):
         else:
             embed.add_field(name="Rank", value="*Unranked*", inline=True)
 
-        # This will only yield the top half of the leaderboard.
-        leaderboard_top = complete_leaderboard[: len(complete_leaderboard) // 2]
-
-        if any((pos := i) and member.id == m for (i, m) in leaderboard_top):
-            if pos <= 5:  # noqa: F821
-                index = pos - 1  # noqa: F821
-            elif pos <= 10:  # noqa: F821
+        # We only show the position for the top half of the leaderboard.
+        if position is not None and position <= leaderboard_size // 2:
+            if position <= 5:
+                index = position - 1
+            elif position <= 10:
                 index = 5
-            elif pos <= 15:  # noqa: F821
+            elif position <= 15:
                 index = 6
-            elif pos <= 20:  # noqa: F821
+            elif position <= 20:
                 index = 7
             # The last index is an empty string.
             else:
                 index = 8
 
             percent = min(
-                max(
-                    round(
-                        ((pos - 1) / len(complete_leaderboard)) * 100,
-                        2,  # noqa: F821
-                    ),
-                    0.01,
-                ),
+                max(round(((position - 1) / leaderboard_size) * 100, 2), 0.01),
                 100,
             )
 
             embed.add_field(
                 name="Leaderboard",
-                value=f"{Emojis.LEADERBOARD_EMOJIS[index]} **#{pos}** *(Top {percent}%)*",  # noqa: F821
+                value=f"{Emojis.LEADERBOARD_EMOJIS[index]} **#{position}** *(Top {percent}%)*",
                 inline=True,
             )
         else:
@@ -955,12 +871,12 @@ class Ranking(commands.Cog):
         embed.add_field(name="Last Matches", value=f"**{gamelist}**", inline=True)
         embed.add_field(
             name="Longest Winning Streak",
-            value=f"**{longest_winstreak}** *(Current: {current_winstreak})*",
+            value=f"**{form.longest_winstreak}** *(Current: {form.current_winstreak})*",
             inline=True,
         )
         embed.add_field(
             name="Longest Losing Streak",
-            value=f"**{longest_losestreak}** *(Current: {current_losestreak})*",
+            value=f"**{form.longest_losestreak}** *(Current: {form.current_losestreak})*",
             inline=True,
         )
         embed.add_field(
@@ -979,10 +895,10 @@ class Ranking(commands.Cog):
         # Typing does that in the slash version, and in the message version it displays the bot as typing in chat.
         await ctx.typing()
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            top_10 = await db.execute_fetchall(
-                """SELECT * FROM trueskill WHERE wins + losses > 4 ORDER BY (rating - 3 * deviation) DESC LIMIT 10"""
-            )
+        top_10 = await self.bot.db.fetchall(
+            """SELECT user_id, rating, deviation, wins, losses FROM trueskill WHERE wins + losses > 4
+            ORDER BY (rating - 3 * deviation) DESC LIMIT 10"""
+        )
 
         embed = discord.Embed(
             title=f"Top 10 Players of {GuildNames.TRAINING_GROUNDS} Ranked Matchmaking",
@@ -992,9 +908,13 @@ class Ranking(commands.Cog):
 
         guild = self.bot.get_guild(GuildIDs.TRAINING_GROUNDS)
 
-        async with aiosqlite.connect("./db/database.db") as db:
+        # Fetching the users that are not in the cache used to take up the majority of the commands time,
+        # so we fetch them all at once.
+        users = await self.bot.user_resolver.resolve(u[0] for u in top_10)
+
+        async with self.bot.db.reader() as db:
             for r, u in enumerate(top_10, start=1):
-                user_id, rating, deviation, wins, losses, _ = u
+                user_id, rating, deviation, wins, losses = u
 
                 # Getting the mains of the players, too.
                 mains = await db.execute_fetchall(
@@ -1004,10 +924,7 @@ class Ranking(commands.Cog):
                 # If they don't have any registered mains, we just display nothing.
                 display_mains = f"{mains[0][0]}" if mains else ""
 
-                # Trying to see if the user is in the cache, if not we have to fetch them.
-                # This takes up the majority of the commands time.
-                if not (user := self.bot.get_user(user_id)):
-                    user = await self.bot.fetch_user(user_id)
+                user = users[user_id] or "Unknown User"
 
                 player = trueskill.Rating(rating, deviation)
 
@@ -1041,57 +958,12 @@ class Ranking(commands.Cog):
 
         guild = self.bot.get_guild(GuildIDs.TRAINING_GROUNDS)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            season_matches = await db.execute_fetchall(
-                """SELECT * FROM matches WHERE timestamp BETWEEN :start AND :end""",
-                {"start": start, "end": end},
-            )
-
         # Re-calculating the matches, with every player starting at the default rating.
+        season_players = await utils.rating.replay_season(self.bot.db, start, end)
 
-        all_players = []
-
-        for match in season_matches:
-            _, winner_id, loser_id, _, _, _, _, _, _, _, _, _ = match
-
-            # We need to check if the player is already in the list, if not we add them.
-            if winner_id not in [p["user_id"] for p in all_players]:
-                all_players.append(
-                    {
-                        "user_id": winner_id,
-                        "wins": 0,
-                        "losses": 0,
-                        "rating": trueskill.Rating(),
-                    }
-                )
-            if loser_id not in [p["user_id"] for p in all_players]:
-                all_players.append(
-                    {
-                        "user_id": loser_id,
-                        "wins": 0,
-                        "losses": 0,
-                        "rating": trueskill.Rating(),
-                    }
-                )
-
-            # Then we get both players from the list.
-
-            winner = [p for p in all_players if p["user_id"] == winner_id][0]
-            loser = [p for p in all_players if p["user_id"] == loser_id][0]
-
-            # And update their ratings.
-
-            new_winner, new_loser = trueskill.rate_1vs1(
-                winner["rating"], loser["rating"]
-            )
-
-            winner["rating"] = new_winner
-            loser["rating"] = new_loser
-
-            # And finally we update their wins and losses.
-
-            winner["wins"] += 1
-            loser["losses"] += 1
+        all_players = [
+            {"user_id": user_id, **player} for user_id, player in season_players.items()
+        ]
 
         # Now we get rid of the players that did not play at least 5 matches.
         all_players = [p for p in all_players if p["wins"] + p["losses"] > 4]
@@ -1107,7 +979,9 @@ class Ranking(commands.Cog):
             colour=0x3498DB,
         )
 
-        async with aiosqlite.connect("./db/database.db") as db:
+        users = await self.bot.user_resolver.resolve(u["user_id"] for u in top_10)
+
+        async with self.bot.db.reader() as db:
             for r, u in enumerate(top_10, start=1):
                 user_id = u["user_id"]
                 player = u["rating"]
@@ -1121,8 +995,7 @@ class Ranking(commands.Cog):
 
                 display_mains = f"{mains[0][0]}" if mains else ""
 
-                if not (user := self.bot.get_user(user_id)):
-                    user = await self.bot.fetch_user(user_id)
+                user = users[user_id] or "Unknown User"
 
                 rank = await self.get_ranked_role(player, guild)
 
@@ -1137,6 +1010,150 @@ class Ranking(commands.Cog):
         embed.timestamp = discord.utils.utcnow()
         await ctx.send(embed=embed)
 
+    @commands.hybrid_command(aliases=["headtohead", "matchup"])
+    @app_commands.guilds(*GuildIDs.ALL_GUILDS)
+    @app_commands.describe(
+        player="The player whose record you want to see.",
+        opponent="Their opponent, or yourself if you leave this empty.",
+    )
+    async def h2h(
+        self,
+        ctx: commands.Context,
+        player: discord.User,
+        opponent: discord.User = None,
+    ) -> None:
+        """Gets you the head to head record of two players in ranked matchmaking."""
+        if opponent is None:
+            player, opponent = ctx.author, player
+
+        record = await self.bot.db.fetchone(
+            """SELECT wins, losses, last_played, rating_swing FROM head_to_head
+            WHERE player_id = :player_id AND opponent_id = :opponent_id""",
+            {"player_id": player.id, "opponent_id": opponent.id},
+        )
+
+        if record is None:
+            await ctx.send(
+                f"{str(player)} and {str(opponent)} have not played a ranked match against each other yet."
+            )
+            return
+
+        wins, losses, last_played, rating_swing = record
+        # The swing is in conservative rating, so we scale it like the display rank.
+        rating_swing = round(rating_swing * 100)
+
+        embed = discord.Embed(
+            title=f"Head to Head: {str(player)} vs {str(opponent)}",
+            colour=0x3498DB,
+        )
+        embed.set_thumbnail(url=player.display_avatar.url)
+        embed.add_field(name="Matches Played", value=f"**{wins + losses}**")
+        embed.add_field(name=f"Wins of {str(player)}", value=f"**{wins}**")
+        embed.add_field(name=f"Wins of {str(opponent)}", value=f"**{losses}**")
+        embed.add_field(
+            name="Win Percentage", value=f"**{round(wins/(wins+losses) * 100)}%**"
+        )
+        embed.add_field(
+            name=f"Rating Swing of {str(player)}",
+            value=f"**{'+' if rating_swing > 0 else '±' if rating_swing == 0 else ''}{rating_swing}**",
+        )
+        embed.add_field(name="Last Played", value=f"<t:{last_played}:R>")
+
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(aliases=["ratinggraph", "rankhistory"])
+    @app_commands.guilds(*GuildIDs.ALL_GUILDS)
+    @app_commands.describe(
+        user="The player whose rating history you want to see.",
+        period="Either daily or weekly, weekly if you leave this empty.",
+    )
+    async def ratinghistory(
+        self, ctx: commands.Context, user: discord.User, period: str = "weekly"
+    ) -> None:
+        """Gets you the rating history of a player in ranked matchmaking, one point per day or week."""
+        period = period.lower()
+
+        if period not in utils.rating_history.PERIODS:
+            await ctx.send(
+                f"Please choose one of these periods: {', '.join(utils.rating_history.PERIODS)}"
+            )
+            return
+
+        # The latest periods, oldest first.
+        summaries = await self.bot.db.fetchall(
+            """SELECT * FROM (
+                SELECT period_start, matches, open_rating, close_rating, low_rating, high_rating
+                FROM rating_history_summary WHERE user_id = :user_id AND period = :period
+                ORDER BY period_start DESC LIMIT :limit
+            ) ORDER BY period_start""",
+            {
+                "user_id": user.id,
+                "period": period,
+                "limit": utils.rating_history.HISTORY_PERIODS,
+            },
+        )
+
+        if not summaries:
+            await ctx.send(f"{str(user)} has not played any ranked matches yet.")
+            return
+
+        first_rating = utils.rating_history.get_display_rating(summaries[0][2])
+        last_rating = utils.rating_history.get_display_rating(summaries[-1][3])
+        lowest = utils.rating_history.get_display_rating(
+            min(summary[4] for summary in summaries)
+        )
+        highest = utils.rating_history.get_display_rating(
+            max(summary[5] for summary in summaries)
+        )
+
+        change = last_rating - first_rating
+        if change == 0:
+            change = "±0"
+        elif change > 0:
+            change = f"+{change}"
+
+        sparkline = utils.rating_history.get_sparkline(
+            [summary[3] for summary in summaries]
+        )
+
+        embed = discord.Embed(
+            title=f"Rating History of {str(user)}",
+            description=f"```{sparkline}```",
+            colour=0x3498DB,
+        )
+        embed.set_thumbnail(url=user.display_avatar.url)
+        embed.add_field(
+            name="Timeframe",
+            value=f"<t:{summaries[0][0]}:d> - <t:{summaries[-1][0]}:d>",
+        )
+        embed.add_field(
+            name="Matches Played",
+            value=f"**{sum(summary[1] for summary in summaries)}**",
+        )
+        embed.add_field(name="Rating Change", value=f"**{change}**")
+        embed.add_field(name="Lowest Rating", value=f"**{lowest}**")
+        embed.add_field(name="Highest Rating", value=f"**{highest}**")
+        embed.add_field(name="Current Rating", value=f"**{last_rating}**")
+
+        # The last couple of periods in more detail, the most recent one first.
+        details = []
+        for period_start, matches, open_rating, close_rating, _, _ in reversed(
+            summaries[-utils.rating_history.HISTORY_DETAILS :]
+        ):
+            open_rating = utils.rating_history.get_display_rating(open_rating)
+            close_rating = utils.rating_history.get_display_rating(close_rating)
+            details.append(
+                f"<t:{period_start}:d>: {open_rating} → **{close_rating}** ({matches} matches)"
+            )
+
+        embed.add_field(
+            name=f"Last {len(details)} {'Days' if period == 'daily' else 'Weeks'}",
+            value="\n".join(details),
+            inline=False,
+        )
+
+        await ctx.send(embed=embed)
+
     @commands.hybrid_command()
     @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
     @app_commands.default_permissions(administrator=True)
@@ -1145,10 +1162,9 @@ class Ranking(commands.Cog):
         """Gets you the last 20 matches played in Ranked Matchmaking."""
         await ctx.typing()
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            recent_matches = await db.execute_fetchall(
-                """SELECT * FROM matches ORDER BY timestamp DESC LIMIT 20"""
-            )
+        recent_matches = await self.bot.db.fetchall(
+            """SELECT * FROM matches ORDER BY timestamp DESC LIMIT 20"""
+        )
 
         embed = discord.Embed(
             title=f"Last 20 Matches of {GuildNames.TRAINING_GROUNDS} Ranked Matchmaking",
@@ -1156,6 +1172,10 @@ class Ranking(commands.Cog):
             colour=0x3498DB,
         )
 
+        users = await self.bot.user_resolver.resolve(
+            user_id for match in recent_matches for user_id in match[1:3]
+        )
+
         for match in recent_matches:
             (
                 match_id,
@@ -1172,13 +1192,8 @@ class Ranking(commands.Cog):
                 new_loser_sigma,
             ) = match
 
-            winner = self.bot.get_user(winner_id)
-            loser = self.bot.get_user(loser_id)
-
-            if not winner:
-                winner = await self.bot.fetch_user(winner_id)
-            if not loser:
-                loser = await self.bot.fetch_user(loser_id)
+            winner = users[winner_id] or "Unknown User"
+            loser = users[loser_id] or "Unknown User"
 
             embed.add_field(
                 name=f"#{match_id} - <t:{timestamp}:F>",
@@ -1201,11 +1216,10 @@ class Ranking(commands.Cog):
         """Gets you the last 10 matches of a player."""
         await ctx.typing()
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            recent_matches = await db.execute_fetchall(
-                """SELECT * FROM matches WHERE winner_id = :user_id OR loser_id = :user_id ORDER BY timestamp DESC LIMIT 10""",
-                {"user_id": user.id},
-            )
+        recent_matches = await self.bot.db.fetchall(
+            """SELECT * FROM matches WHERE winner_id = :user_id OR loser_id = :user_id ORDER BY timestamp DESC LIMIT 10""",
+            {"user_id": user.id},
+        )
 
         embed = discord.Embed(
             title=f"Last 10 Matches of {str(user)}",
@@ -1213,6 +1227,10 @@ class Ranking(commands.Cog):
             colour=0x3498DB,
         )
 
+        users = await self.bot.user_resolver.resolve(
+            user_id for match in recent_matches for user_id in match[1:3]
+        )
+
         for match in recent_matches:
             (
                 match_id,
@@ -1229,13 +1247,8 @@ class Ranking(commands.Cog):
                 new_loser_sigma,
             ) = match
 
-            winner = self.bot.get_user(winner_id)
-            loser = self.bot.get_user(loser_id)
-
-            if not winner:
-                winner = await self.bot.fetch_user(winner_id)
-            if not loser:
-                loser = await self.bot.fetch_user(loser_id)
+            winner = users[winner_id] or "Unknown User"
+            loser = users[loser_id] or "Unknown User"
 
             embed.add_field(
                 name=f"#{match_id} - <t:{timestamp}:F>",
@@ -1250,12 +1263,12 @@ class Ranking(commands.Cog):
         embed.timestamp = discord.utils.utcnow()
         await ctx.send(embed=embed)
 
-    @commands.hybrid_command()
-    @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
-    @app_commands.default_permissions(administrator=True)
-    @utils.check.is_moderator()
-    async def deletematch(self, ctx: commands.Context, match_id: int) -> None:
-        """Deletes a match from the database and restores the previous ratings."""
+    async def change_match(
+        self, ctx: commands.Context, match_id: int, swap: bool
+    ) -> None:
+        """Deletes a match or swaps its winner and loser, after asking for confirmation.
+        Every later match that is affected by it gets re-calculated.
+        """
         await ctx.typing()
 
         def check(m: discord.Message) -> bool:
@@ -1265,187 +1278,214 @@ class Ranking(commands.Cog):
                 and m.channel == ctx.channel
             )
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            match = await db.execute_fetchall(
-                """SELECT * FROM matches WHERE match_id = :match_id""",
-                {"match_id": match_id},
-            )
+        match = await self.bot.db.fetchall(
+            """SELECT * FROM matches WHERE match_id = :match_id""",
+            {"match_id": match_id},
+        )
 
-            if not match:
-                await ctx.send("Invalid Match ID! Please try again.")
-                return
+        if not match:
+            await ctx.send("Invalid Match ID! Please try again.")
+            return
 
-            winner = match[0][1]
-            loser = match[0][2]
-            timestamp = match[0][3]
+        winner = match[0][1]
+        loser = match[0][2]
 
-            new_match = await db.execute_fetchall(
-                """SELECT * FROM matches WHERE timestamp > :timestamp AND
-                 (winner_id = :winner_id OR loser_id = :loser_id OR winner_id = :loser_id OR loser_id = :winner_id)""",
-                {"timestamp": timestamp, "winner_id": winner, "loser_id": loser},
-            )
+        users = await self.bot.user_resolver.resolve([winner, loser])
+        winner_user = users[winner] or "Unknown User"
+        loser_user = users[loser] or "Unknown User"
 
-            if new_match:
-                await ctx.send(
-                    "Could not delete match as one or both users played another match after this one."
-                )
-                return
+        embed = discord.Embed(
+            title=f"Match #{match_id}: {str(winner_user)} vs {str(loser_user)}",
+            description=f"**Winner: {str(winner_user)}\n\nRatings Before → After**\n\n"
+            f"**{str(winner_user)}**: {self.get_display_rank(trueskill.Rating(match[0][4], match[0][5]))}"
+            f" → {self.get_display_rank(trueskill.Rating(match[0][8], match[0][9]))}"
+            f"\n**{str(loser_user)}**: {self.get_display_rank(trueskill.Rating(match[0][6], match[0][7]))}"
+            f" → {self.get_display_rank(trueskill.Rating(match[0][10], match[0][11]))}",
+            colour=0x3498DB,
+        )
+        embed.set_thumbnail(url=ctx.guild.icon.url)
 
-            winner_user = self.bot.get_user(winner)
-            loser_user = self.bot.get_user(loser)
-
-            if not winner_user:
-                winner_user = await self.bot.fetch_user(winner)
-            if not loser_user:
-                loser_user = await self.bot.fetch_user(loser)
-
-            embed = discord.Embed(
-                title=f"Match #{match_id}: {str(winner_user)} vs {str(loser_user)}",
-                description=f"**Winner: {str(winner_user)}\n\nRatings Before → After**\n\n"
-                f"**{str(winner_user)}**: {self.get_display_rank(trueskill.Rating(match[0][4], match[0][5]))}"
-                f" → {self.get_display_rank(trueskill.Rating(match[0][8], match[0][9]))}"
-                f"\n**{str(loser_user)}**: {self.get_display_rank(trueskill.Rating(match[0][6], match[0][7]))}"
-                f" → {self.get_display_rank(trueskill.Rating(match[0][10], match[0][11]))}",
-                colour=0x3498DB,
-            )
-            embed.set_thumbnail(url=ctx.guild.icon.url)
+        action = (
+            f"make {str(loser_user)} the winner of this match"
+            if swap
+            else "delete this match"
+        )
 
-            await ctx.send(
-                "Are you sure you want to delete this match and restore the previous ratings?\n"
-                "**Type y to verify** or **Type n to cancel**.",
-                embed=embed,
-            )
+        await ctx.send(
+            f"Are you sure you want to {action} and re-calculate the ratings of every match played after it?\n"
+            "**Type y to verify** or **Type n to cancel**.",
+            embed=embed,
+        )
 
-            try:
-                msg = await self.bot.wait_for("message", check=check, timeout=60)
-            except asyncio.TimeoutError:
-                await ctx.send(
-                    f"Delete request for Match {match_id} timed out! Please try again."
-                )
+        try:
+            msg = await self.bot.wait_for("message", check=check, timeout=60)
+        except asyncio.TimeoutError:
+            await ctx.send(f"Request for Match {match_id} timed out! Please try again.")
+            return
+
+        if msg.content.lower() != "y":
+            await ctx.send(f"Request for Match {match_id} cancelled.")
+            return
+
+        async with self.bot.db.transaction() as db:
+            # Someone else could have deleted it while we were waiting.
+            if not await db.execute_fetchall(
+                """SELECT 1 FROM matches WHERE match_id = :match_id""",
+                {"match_id": match_id},
+            ):
+                await ctx.send("Invalid Match ID! Please try again.")
                 return
 
-            if msg.content.lower() == "y":
-                await db.execute(
-                    """DELETE FROM matches WHERE match_id = :match_id""",
-                    {"match_id": match_id},
-                )
-                await db.execute(
-                    """UPDATE trueskill SET rating = :rating, deviation = :deviation, wins = wins - 1,
-                     matches = SUBSTR(matches, 1, LENGTH(matches)-1) WHERE user_id = :user_id""",
-                    {
-                        "rating": match[0][4],
-                        "deviation": match[0][5],
-                        "user_id": winner,
-                    },
-                )
-                await db.execute(
-                    """UPDATE trueskill SET rating = :rating, deviation = :deviation, losses = losses - 1,
-                     matches = SUBSTR(matches, 1, LENGTH(matches)-1) WHERE user_id = :user_id""",
-                    {
-                        "rating": match[0][6],
-                        "deviation": match[0][7],
-                        "user_id": loser,
-                    },
-                )
-                await db.commit()
+            rerated, affected_players = await utils.rating.rerate_match(
+                db, match_id, swap
+            )
+            await utils.ranked_stats.rebuild_stats(db, affected_players)
+            await utils.ranked_stats.rebuild_form(db, (winner, loser))
+            await utils.ranked_stats.rebuild_head_to_head(db, affected_players)
+            await utils.rating_history.rebuild_history(db, affected_players)
 
-                # Updating the roles, if the member is still on the server.
+        # Updating the roles of everyone affected who is still on the server.
+        # The two players of the match might not be cached, so we fetch them.
+        for user_id in affected_players:
+            member = ctx.guild.get_member(user_id)
+
+            if member is None and user_id in (winner, loser):
                 try:
-                    winner_member = await ctx.guild.fetch_member(winner)
-                    await self.update_ranked_role(winner_member, ctx.guild)
+                    member = await ctx.guild.fetch_member(user_id)
                 except (discord.Forbidden, discord.HTTPException, discord.NotFound):
-                    pass
+                    continue
 
+            if member is not None:
                 try:
-                    loser_member = await ctx.guild.fetch_member(loser)
-                    await self.update_ranked_role(loser_member, ctx.guild)
-                except (discord.Forbidden, discord.HTTPException, discord.NotFound):
+                    await self.update_ranked_role(member, ctx.guild)
+                except (discord.Forbidden, discord.HTTPException):
                     pass
 
-                await ctx.send(
-                    f"Match #{match_id} deleted successfully! Ratings were restored."
-                )
-            else:
-                await ctx.send(f"Delete request for {match_id} cancelled.")
-                return
+        await ctx.send(
+            f"Match #{match_id} {'corrected' if swap else 'deleted'} successfully! "
+            f"Re-calculated {rerated} later matches of {len(affected_players)} players."
+        )
 
-    @tasks.loop(time=datetime.time(12, 0, 0))
-    async def decay_ratings(self) -> None:
-        """Decays the ratings of all inactive players every first of the month at 12:00 CET."""
-        # Chose the first cause why not.
-        if datetime.datetime.now().day != 1:
-            return
+    @commands.hybrid_command()
+    @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
+    @app_commands.default_permissions(administrator=True)
+    @utils.check.is_moderator()
+    async def deletematch(self, ctx: commands.Context, match_id: int) -> None:
+        """Deletes a match from the database and re-calculates the ratings of every match after it."""
+        await self.change_match(ctx, match_id, swap=False)
 
-        logger = self.bot.get_logger("bot.ranked")
+    @commands.hybrid_command()
+    @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
+    @app_commands.default_permissions(administrator=True)
+    @utils.check.is_moderator()
+    async def correctmatch(self, ctx: commands.Context, match_id: int) -> None:
+        """Swaps the winner and loser of a match that was reported the wrong way around,
+        and re-calculates the ratings of every match after it.
+        """
+        await self.change_match(ctx, match_id, swap=True)
 
-        # This gets the timestamp of the first day of the last month at 12:00.
-        # Timezones really dont matter too much here.
-        first_last_month = (
-            datetime.datetime(
-                datetime.datetime.now().year,
-                (datetime.datetime.now().month - 1),
-                1,
-                12,
-                0,
-                0,
-                0,
-            ).timestamp()
-            if datetime.datetime.now().month != 1
-            else datetime.datetime(
-                (datetime.datetime.now().year - 1),
-                12,
-                1,
-                12,
-                0,
-                0,
-                0,
-            ).timestamp()
-        )
+    @commands.hybrid_command()
+    @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
+    @app_commands.default_permissions(administrator=True)
+    @utils.check.is_moderator()
+    async def rebuildrankedstats(self, ctx: commands.Context) -> None:
+        """Re-calculates the ranked stats, head to head records and rating history of every player from the match history.
+        Only needed if they somehow got out of sync with the matches.
+        """
+        await ctx.typing()
 
-        active_players = []
+        async with self.bot.db.transaction() as db:
+            players = await utils.ranked_stats.rebuild_stats(db)
+            await utils.ranked_stats.rebuild_head_to_head(db)
+            await utils.rating_history.rebuild_history(db)
 
-        logger.info("Starting to decay deviations for this month...")
+        await ctx.send(f"Rebuilt the ranked stats of {players} players.")
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            # First we go through the matches that were played in the last month and see who has competed in them.
-            matches = await db.execute_fetchall(
-                """SELECT winner_id, loser_id FROM matches WHERE timestamp > :first_last_month""",
-                {"first_last_month": first_last_month},
+    @commands.hybrid_command(aliases=["decaystatus", "decaypreview"])
+    @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
+    @app_commands.default_permissions(administrator=True)
+    @utils.check.is_moderator()
+    async def ratingdecay(self, ctx: commands.Context) -> None:
+        """Shows you the last rating decays, and how many players the next one would decay.
+        This is only a dry run, nothing gets changed.
+        """
+        async with self.bot.db.reader() as db:
+            runs = await db.execute_fetchall(
+                """SELECT period, timestamp, players, duration FROM rating_decay_runs
+                ORDER BY period DESC LIMIT 3"""
             )
+            last_period = await utils.rating_decay.get_last_period(db)
 
-            for winner_id, loser_id in matches:
-                if winner_id not in active_players:
-                    active_players.append(winner_id)
-                if loser_id not in active_players:
-                    active_players.append(loser_id)
+            missed_periods = utils.rating_decay.get_missed_periods(
+                last_period, datetime.datetime.now()
+            )
+            next_period = (
+                missed_periods[0]
+                if missed_periods
+                else utils.rating_decay.get_next_period(last_period)
+            )
+            players = await utils.rating_decay.decay_period(
+                db, next_period, dry_run=True
+            )
+
+        embed = discord.Embed(title="Rating Decay", colour=0x3498DB)
+
+        run_list = []
+        for period, timestamp, decayed, duration in runs:
+            if decayed is None:
+                run_list.append(f"**{period}**: Decayed before it was recorded")
+            else:
+                run_list.append(
+                    f"**{period}**: Decayed {decayed} players <t:{timestamp}:R> in {duration:.3f} seconds"
+                )
+
+        embed.add_field(
+            name="Last Decays",
+            value="\n".join(run_list) or "None yet.",
+            inline=False,
+        )
 
-            all_players = await db.execute_fetchall(
-                """SELECT user_id, rating, deviation FROM trueskill"""
+        next_decay = int(utils.rating_decay.get_period_start(next_period).timestamp())
+        embed.add_field(
+            name=f"Next Decay: {next_period}",
+            value=f"Due <t:{next_decay}:R>. "
+            f"{players} players would be decayed if nobody else plays until then.",
+            inline=False,
+        )
+
+        await ctx.send(embed=embed)
+
+    async def catch_up_decay(self) -> None:
+        """Decays the ratings for every month that is due but was not decayed yet."""
+        logger = self.bot.get_logger("bot.ranked")
+
+        async with self.bot.db.transaction() as db:
+            periods = utils.rating_decay.get_missed_periods(
+                await utils.rating_decay.get_last_period(db), datetime.datetime.now()
             )
 
-            for player in all_players:
-                # If the player has not competed in a match in the last month, we decay their deviation.
-                # Currently we decay it by just 1% every month.
-                if player[0] not in active_players:
-                    logger.info(f"Decaying rating of Player {player[0]}")
+            for period in periods:
+                logger.info(f"Starting to decay deviations for {period}...")
+                start = time.perf_counter()
 
-                    rating = trueskill.Rating(player[1], player[2])
-                    decayed_rating = self.decay_deviation(rating)
-                    await db.execute(
-                        """UPDATE trueskill SET deviation = :new_deviation WHERE user_id = :user_id""",
-                        {
-                            "new_deviation": decayed_rating.sigma,
-                            "user_id": player[0],
-                        },
-                    )
+                players = await utils.rating_decay.decay_period(db, period)
 
-            await db.commit()
+                logger.info(
+                    f"Finished decaying deviations for {period}: "
+                    f"Decayed {players} players in {time.perf_counter() - start:.3f} seconds."
+                )
 
-        logger.info("Finished decaying deviations for this month.")
+    @tasks.loop(time=utils.rating_decay.DECAY_TIME)
+    async def decay_ratings(self) -> None:
+        """Decays the ratings of all inactive players every first of the month at 12:00 CET."""
+        # Running every day, in case the decay of a month is still missing for some reason.
+        await self.catch_up_decay()
 
     @decay_ratings.before_loop
     async def before_decay_ratings(self) -> None:
         await self.bot.wait_until_ready()
+        # If the bot was offline when the decay was due, we catch up on it right away.
+        await self.catch_up_decay()
 
     @reportmatch.error
     async def reportmatch_error(
@@ -1481,6 +1521,13 @@ class Ranking(commands.Cog):
         if isinstance(error, commands.BadArgument):
             await ctx.send("Please provide a valid match ID.")
 
+    @correctmatch.error
+    async def correctmatch_error(
+        self, ctx: commands.Context, error: commands.CommandError
+    ) -> None:
+        if isinstance(error, commands.BadArgument):
+            await ctx.send("Please provide a valid match ID.")
+
     @startmatch.error
     async def startmatch_error(
         self, ctx: commands.Context, error: commands.CommandError
@@ -1490,6 +1537,24 @@ class Ranking(commands.Cog):
                 f"You are on cooldown! Try again in {round(error.retry_after)} seconds."
             )
 
+    @ratinghistory.error
+    async def ratinghistory_error(
+        self, ctx: commands.Context, error: commands.CommandError
+    ) -> None:
+        if isinstance(error, commands.UserNotFound):
+            await ctx.send("I could not find this user, please try again.")
+        else:
+            raise error
+
+    @h2h.error
+    async def h2h_error(
+        self, ctx: commands.Context, error: commands.CommandError
+    ) -> None:
+        if isinstance(error, commands.UserNotFound):
+            await ctx.send("I could not find this user, please try again.")
+        else:
+            raise error
+
     @seasonleaderboard.error
     async def seasonleaderboard_error(
         self, ctx: commands.Context, error: commands.CommandError
@@ -2,7 +2,6 @@ import asyncio
 import datetime
 import random
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
@@ -41,8 +40,12 @@ class Reminder(commands.Cog):
             # Unfortunately we need a second try/except block because
             # people can block your bot and this would throw an error otherwise,
             # and we dont wanna interrupt the loop.
+            member = await self.bot.user_resolver.resolve_one(user_id)
+            if member is None:
+                logger.info(f"Could not notify user {user_id}, the user was not found.")
+                return
+
             try:
-                member = await self.bot.fetch_user(user_id)
                 await member.send(
                     f"<@!{user_id}>, you wanted me to remind you of `{message}`, "
                     f"{read_time} ago, in a deleted channel."
@@ -107,19 +110,17 @@ class Reminder(commands.Cog):
             reminder_id = random.randint(1000000, 9999999)
             reminder_date = int(discord.utils.utcnow().timestamp() + seconds)
 
-            async with aiosqlite.connect("./db/database.db") as db:
-                await db.execute(
-                    """INSERT INTO reminder VALUES (:user_id, :reminder_id, :channel_id, :date, :read_time, :message)""",
-                    {
-                        "user_id": ctx.author.id,
-                        "reminder_id": reminder_id,
-                        "channel_id": ctx.channel.id,
-                        "date": reminder_date,
-                        "read_time": reminder_time,
-                        "message": reminder_message,
-                    },
-                )
-                await db.commit()
+            await self.bot.db.execute(
+                """INSERT INTO reminder VALUES (:user_id, :reminder_id, :channel_id, :date, :read_time, :message)""",
+                {
+                    "user_id": ctx.author.id,
+                    "reminder_id": reminder_id,
+                    "channel_id": ctx.channel.id,
+                    "date": reminder_date,
+                    "read_time": reminder_time,
+                    "message": reminder_message,
+                },
+            )
 
             message_dt = datetime.datetime.fromtimestamp(
                 discord.utils.utcnow().timestamp() + seconds
@@ -139,11 +140,10 @@ class Reminder(commands.Cog):
         """
         Displays your active reminders.
         """
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_reminders = await db.execute_fetchall(
-                """SELECT * FROM reminder WHERE user_id = :user_id""",
-                {"user_id": ctx.author.id},
-            )
+        user_reminders = await self.bot.db.fetchall(
+            """SELECT * FROM reminder WHERE user_id = :user_id""",
+            {"user_id": ctx.author.id},
+        )
 
         reminder_list = []
 
@@ -187,24 +187,22 @@ class Reminder(commands.Cog):
     async def deletereminder(self, ctx: commands.Context, reminder_id: str) -> None:
         """Deletes a reminder of yours."""
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_reminder = await db.execute_fetchall(
-                """SELECT * FROM reminder WHERE user_id = :user_id AND reminder_id = :reminder_id""",
-                {"user_id": ctx.author.id, "reminder_id": reminder_id},
-            )
+        matching_reminder = await self.bot.db.fetchall(
+            """SELECT * FROM reminder WHERE user_id = :user_id AND reminder_id = :reminder_id""",
+            {"user_id": ctx.author.id, "reminder_id": reminder_id},
+        )
 
-            if len(matching_reminder) == 0:
-                await ctx.send(
-                    "I could not find any reminder with this ID. \n"
-                    f"View all of your active reminders with `{ctx.prefix}viewreminders`"
-                )
-                return
-
-            await db.execute(
-                """DELETE FROM reminder WHERE user_id = :user_id AND reminder_id = :reminder_id""",
-                {"user_id": ctx.author.id, "reminder_id": reminder_id},
+        if len(matching_reminder) == 0:
+            await ctx.send(
+                "I could not find any reminder with this ID. \n"
+                f"View all of your active reminders with `{ctx.prefix}viewreminders`"
             )
-            await db.commit()
+            return
+
+        await self.bot.db.execute(
+            """DELETE FROM reminder WHERE user_id = :user_id AND reminder_id = :reminder_id""",
+            {"user_id": ctx.author.id, "reminder_id": reminder_id},
+        )
 
         await ctx.send(f"Deleted reminder ID {reminder_id}.")
 
@@ -212,11 +210,10 @@ class Reminder(commands.Cog):
     async def deletereminder_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice]:
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_reminders = await db.execute_fetchall(
-                """SELECT reminder_id FROM reminder WHERE user_id = :user_id""",
-                {"user_id": interaction.user.id},
-            )
+        user_reminders = await self.bot.db.fetchall(
+            """SELECT reminder_id FROM reminder WHERE user_id = :user_id""",
+            {"user_id": interaction.user.id},
+        )
 
         reminder_ids = [str(reminder[0]) for reminder in user_reminders]
 
@@ -238,27 +235,24 @@ class Reminder(commands.Cog):
 
         date_now = discord.utils.utcnow().timestamp()
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            expired_reminders = await db.execute_fetchall(
-                """SELECT * FROM reminder WHERE date < :date_now""",
-                {"date_now": int(date_now)},
-            )
+        expired_reminders = await self.bot.db.fetchall(
+            """SELECT * FROM reminder WHERE date < :date_now""",
+            {"date_now": int(date_now)},
+        )
 
-            for reminder in expired_reminders:
-                user_id, reminder_id, channel_id, _, read_time, message = reminder
+        for reminder in expired_reminders:
+            user_id, reminder_id, channel_id, _, read_time, message = reminder
 
-                logger.info(
-                    f"Reminder #{reminder_id} from user {user_id} has passed. Notifying user and deleting reminder..."
-                )
-
-                await self.notify_user(user_id, channel_id, message, read_time)
-
-            await db.execute(
-                """DELETE FROM reminder WHERE date < :date_now""",
-                {"date_now": int(date_now)},
+            logger.info(
+                f"Reminder #{reminder_id} from user {user_id} has passed. Notifying user and deleting reminder..."
             )
 
-            await db.commit()
+            await self.notify_user(user_id, channel_id, message, read_time)
+
+        await self.bot.db.execute(
+            """DELETE FROM reminder WHERE date < :date_now""",
+            {"date_now": int(date_now)},
+        )
 
     @reminder_loop.before_loop
     async def before_reminder_loop(self) -> None:
@@ -1,12 +1,20 @@
-import aiosqlite
+from typing import Optional
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 import utils.check
+import utils.role_menus
 from utils.ids import GuildIDs, TGChannelIDs
 
 
+def get_message_id(message: str) -> Optional[int]:
+    """Converts the message ID the user typed in, if it is one."""
+    message = message.strip()
+    return int(message) if message.isdigit() else None
+
+
 class Rolemenu(commands.Cog):
     """Contains the commands used to make or modify role menus.
     As well as the listeners to add/remove these roles accordingly.
@@ -15,6 +23,24 @@ class Rolemenu(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
+        # Every role menu by message ID, loaded in cog_load.
+        self.menus = utils.role_menus.RoleMenuIndex(self.bot.db)
+
+    async def cog_load(self) -> None:
+        await self.menus.load()
+
+    def get_message_choices(self, current: str) -> list[app_commands.Choice]:
+        """Gets you the autocomplete choices for the messages of the role menus."""
+        message_ids = [str(message_id) for message_id in self.menus.get_message_ids()]
+
+        choices = [
+            app_commands.Choice(name=m_id, value=m_id)
+            for m_id in message_ids
+            if current in m_id
+        ]
+
+        return choices[:25]
+
     @commands.hybrid_group()
     @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
     @app_commands.default_permissions(administrator=True)
@@ -62,34 +88,10 @@ class Rolemenu(commands.Cog):
             )
             return
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            rolemenu_message = await db.execute_fetchall(
-                """SELECT exclusive, rolereq FROM reactrole WHERE message_id = :message_id""",
-                {"message_id": message},
-            )
-
-            # If a message already exists in the database,
-            # it will use these values for exclusivity and rolereq,
-            # otherwise we'll use the default values.
-            if len(rolemenu_message) == 0:
-                exclusive = False
-                rolereq = None
-            else:
-                exclusive = rolemenu_message[0][0]
-                rolereq = rolemenu_message[0][1]
-
-            await db.execute(
-                """INSERT INTO reactrole VALUES (:message_id, :exclusive, :rolereq, :emoji, :role)""",
-                {
-                    "message_id": message,
-                    "exclusive": exclusive,
-                    "rolereq": rolereq,
-                    "emoji": emoji,
-                    "role": role.id,
-                },
-            )
-
-            await db.commit()
+        # If a role menu already exists on this message,
+        # it will keep its values for exclusivity and rolereq,
+        # otherwise we'll use the default values.
+        await self.menus.add_entry(reactionmessage.id, emoji, role.id)
 
         await ctx.send(
             f"Added an entry for Message ID #{message}, Emoji {emoji}, and Role {role.name}",
@@ -139,28 +141,13 @@ class Rolemenu(commands.Cog):
             # This is just for the confirmation message.
             rolereq_name_store = "None"
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            rolemenu_entries = await db.execute_fetchall(
-                """SELECT * FROM reactrole WHERE message_id = :message_id""",
-                {"message_id": message},
-            )
-
-            if len(rolemenu_entries) == 0:
-                await ctx.send(
-                    "I didn't find an entry for this message.", ephemeral=True
-                )
-                return
+        message_id = get_message_id(message)
 
-            await db.execute(
-                """UPDATE reactrole SET exclusive = :exclusive, rolereq = :rolereq WHERE message_id = :message_id""",
-                {
-                    "exclusive": exclusive,
-                    "rolereq": rolereq_id_store,
-                    "message_id": message,
-                },
-            )
-
-            await db.commit()
+        if message_id is None or not await self.menus.modify(
+            message_id, exclusive, rolereq_id_store
+        ):
+            await ctx.send("I didn't find an entry for this message.", ephemeral=True)
+            return
 
         await ctx.send(
             f"I have set the Role requirement to {rolereq_name_store} "
@@ -172,20 +159,7 @@ class Rolemenu(commands.Cog):
     async def modifyrolemenu_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice]:
-        async with aiosqlite.connect("./db/database.db") as db:
-            message_id = await db.execute_fetchall(
-                """SELECT message_id FROM reactrole"""
-            )
-
-        message_ids = [str(id[0]) for id in list(set(message_id))]
-
-        choices = [
-            app_commands.Choice(name=m_id, value=m_id)
-            for m_id in message_ids
-            if current in m_id
-        ]
-
-        return choices[:25]
+        return self.get_message_choices(current)
 
     @rolemenu.command(name="delete")
     @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
@@ -195,22 +169,11 @@ class Rolemenu(commands.Cog):
     async def rolemenu_delete(self, ctx: commands.Context, message: str) -> None:
         """Completely deletes a role menu entry from the database."""
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            rolemenu_entries = await db.execute_fetchall(
-                """SELECT * FROM reactrole WHERE message_id = :message_id""",
-                {"message_id": message},
-            )
+        message_id = get_message_id(message)
 
-            if len(rolemenu_entries) == 0:
-                await ctx.send("This message was not used for role menus.")
-                return
-
-            await db.execute(
-                """DELETE FROM reactrole WHERE message_id = :message_id""",
-                {"message_id": message},
-            )
-
-            await db.commit()
+        if message_id is None or not await self.menus.delete(message_id):
+            await ctx.send("This message was not used for role menus.")
+            return
 
         await ctx.send(f"Deleted every entry for Message ID #{message}.")
 
@@ -218,20 +181,7 @@ class Rolemenu(commands.Cog):
     async def deleterolemenu_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice]:
-        async with aiosqlite.connect("./db/database.db") as db:
-            message_id = await db.execute_fetchall(
-                """SELECT message_id FROM reactrole"""
-            )
-
-        message_ids = [str(id[0]) for id in list(set(message_id))]
-
-        choices = [
-            app_commands.Choice(name=m_id, value=m_id)
-            for m_id in message_ids
-            if current in m_id
-        ]
-
-        return choices[:25]
+        return self.get_message_choices(current)
 
     @rolemenu.command(name="get")
     @app_commands.guilds(*GuildIDs.ADMIN_GUILDS)
@@ -239,10 +189,9 @@ class Rolemenu(commands.Cog):
     @utils.check.is_moderator()
     async def rolemenu_get(self, ctx: commands.Context) -> None:
         """Lists every currently active role menu."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            rolemenu_entries = await db.execute_fetchall(
-                """SELECT * FROM reactrole ORDER BY message_id ASC"""
-            )
+        rolemenu_entries = await self.bot.db.fetchall(
+            """SELECT * FROM reactrole ORDER BY message_id ASC"""
+        )
 
         unique_messages = []
         embed_description = []
@@ -296,6 +245,11 @@ class Rolemenu(commands.Cog):
         # The listener to actually add the correct role on a raw reaction event.
         # Also does the checking for the special properties.
 
+        # Most reactions are not on role menus, which we know without any database access.
+        menu = self.menus.get(payload.message_id)
+        if menu is None:
+            return
+
         # Reactions outside of the server would throw an error otherwise.
         if not payload.guild_id:
             return
@@ -303,69 +257,44 @@ class Rolemenu(commands.Cog):
         if payload.member.bot:
             return
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_entries = await db.execute_fetchall(
-                """SELECT * FROM reactrole WHERE message_id = :message_id""",
-                {"message_id": payload.message_id},
-            )
-
-        if len(matching_entries) == 0:
-            return
-
-        # These values *should* be the same for every entry of a message.
-        exclusive = matching_entries[0][1]
-        rolereq = matching_entries[0][2]
+        guild = self.bot.get_guild(payload.guild_id)
 
-        if rolereq is not None:
+        if menu.required_role_ids:
             # You can have more than one required role,
             # you dont need every though, only one of them will be enough.
             roles_required = [
-                discord.utils.get(
-                    self.bot.get_guild(payload.guild_id).roles,
-                    id=int(role_required),
-                )
-                for role_required in rolereq.split()
+                discord.utils.get(guild.roles, id=role_required)
+                for role_required in menu.required_role_ids
             ]
 
             if all(role not in payload.member.roles for role in roles_required):
                 # Checks if the user does not have the required roles.
-                for entry in matching_entries:
-                    _, _, _, emoji, role = entry
-                    # We only send a message if the entry matches.
-                    if str(payload.emoji) == emoji:
-                        wanted_role = discord.utils.get(
-                            self.bot.get_guild(payload.guild_id).roles, id=role
+                # We only send a message if the entry matches.
+                for role in menu.get_roles_to_add(str(payload.emoji)):
+                    wanted_role = discord.utils.get(guild.roles, id=role)
+
+                    # Sends a message telling them what roles they need.
+                    try:
+                        await payload.member.send(
+                            f"The role {wanted_role.name} was not added to you "
+                            "due to not having one or more of the following roles: "
+                            f"{', '.join([missing_role.name for missing_role in roles_required])}.\n\n"
+                            f"Check <#{TGChannelIDs.RULES_CHANNEL}> for information "
+                            f"or inquire in <#{TGChannelIDs.HELP_CHANNEL}> if you cannot find the details on the required roles.",
                         )
-
-                        # Sends a message telling them what roles they need.
-                        try:
-                            await payload.member.send(
-                                f"The role {wanted_role.name} was not added to you "
-                                "due to not having one or more of the following roles: "
-                                f"{', '.join([missing_role.name for missing_role in roles_required])}.\n\n"
-                                f"Check <#{TGChannelIDs.RULES_CHANNEL}> for information "
-                                f"or inquire in <#{TGChannelIDs.HELP_CHANNEL}> if you cannot find the details on the required roles.",
-                            )
-                        except discord.HTTPException:
-                            pass
+                    except discord.HTTPException:
+                        pass
                 return
 
-        if exclusive == 1:
-            for entry in matching_entries:
-                _, _, _, _, role = entry
-                role_tbd = discord.utils.get(
-                    self.bot.get_guild(payload.guild_id).roles, id=role
-                )
+        if menu.exclusive:
+            for role in menu.get_role_ids():
+                role_tbd = discord.utils.get(guild.roles, id=role)
                 if role_tbd in payload.member.roles:
                     await payload.member.remove_roles(role_tbd)
 
-        for entry in matching_entries:
-            _, _, _, emoji, role = entry
-            if str(payload.emoji) == emoji:
-                role_tbd = discord.utils.get(
-                    self.bot.get_guild(payload.guild_id).roles, id=role
-                )
-                await payload.member.add_roles(role_tbd)
+        for role in menu.get_roles_to_add(str(payload.emoji)):
+            role_tbd = discord.utils.get(guild.roles, id=role)
+            await payload.member.add_roles(role_tbd)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(
@@ -373,29 +302,19 @@ class Rolemenu(commands.Cog):
     ) -> None:
         # The listener to remove the correct role on a raw reaction remove event.
         # Does not need any additional checking.
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_entries = await db.execute_fetchall(
-                """SELECT * FROM reactrole WHERE message_id = :message_id""",
-                {"message_id": payload.message_id},
-            )
-
-        if len(matching_entries) == 0:
+        menu = self.menus.get(payload.message_id)
+        if menu is None:
             return
 
-        for entry in matching_entries:
-            _, _, _, emoji, role = entry
-            # The last 20 digits are the emoji ID, if it is custom.
-            # I have to do this because of animated emojis.
-            # And this event here doesnt recognise them properly.
-            # It doesnt send any information on whether or not the emoji is animated or not.
-            if str(payload.emoji)[-20:] == emoji[-20:]:
-                role_tbd = discord.utils.get(
-                    self.bot.get_guild(payload.guild_id).roles, id=role
-                )
-                # Also i have to get the member like this because this event listener is bs.
-                await self.bot.get_guild(payload.guild_id).get_member(
-                    payload.user_id
-                ).remove_roles(role_tbd)
+        # This event does not recognise animated emojis properly, so this only goes by the emoji ID.
+        for role in menu.get_roles_to_remove(str(payload.emoji)):
+            role_tbd = discord.utils.get(
+                self.bot.get_guild(payload.guild_id).roles, id=role
+            )
+            # Also i have to get the member like this because this event listener is bs.
+            await self.bot.get_guild(payload.guild_id).get_member(
+                payload.user_id
+            ).remove_roles(role_tbd)
 
     @rolemenu_new.error
     async def rolemenu_new_error(
@@ -1,45 +1,224 @@
-import json
-from datetime import datetime, timezone
+import datetime
+from typing import Optional
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+import utils.background
 import utils.check
 import utils.embed
+import utils.expiry
+import utils.starboard
 from utils.ids import GuildIDs, TGChannelIDs
 
+CONFIG_PATH = r"./files/starboard.json"
+# Dont want to update any old messages, 1 week seems fine.
+MAX_AGE = datetime.timedelta(days=7)
+# How long we wait before editing a starboard message, so that a burst of reactions is only one edit.
+EDIT_DELAY = 5
+
 
 class Starboard(commands.Cog):
     """Contains the Starboard commands and listeners.
     Currently we only use this for our Charity Events.
+
+    The star counts are tracked from the reaction events, and the edits to the starboard messages
+    wait for a couple of seconds, so that every reaction in the meantime is covered by one edit.
+    Before an edit goes out, the count is fetched again, so a missed event does not stick around.
     """
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
+        self.config = utils.starboard.load_config(CONFIG_PATH)
+        self.stars = utils.starboard.StarCounter()
+        # The messages we saw reactions on, from the fetch that seeded their star count.
+        self.messages: dict[int, discord.Message] = {}
+
+        # The ID of the starboard message of every starred message, loaded in cog_load.
+        self.starboard_ids: dict[int, int] = {}
+        # The embeds of the starboard messages, so we only ever need to fetch them once.
+        self.starboard_embeds: dict[int, discord.Embed] = {}
+        # The starred messages whose starboard message is being sent right now.
+        self.posting: set[int] = set()
+
+        # The starred messages whose starboard message needs an edit soon, with their channel ID.
+        self.pending_edits = utils.expiry.ExpiryTracker(self.on_edit_due)
+        self.background_tasks = utils.background.BackgroundTasks("bot.starboard")
+
+    async def cog_load(self) -> None:
+        entries = await self.bot.db.fetchall(
+            """SELECT original_id, starboard_id FROM starboardmessages"""
+        )
+        self.starboard_ids = dict(entries)
+
+    def cog_unload(self) -> None:
+        self.pending_edits.stop()
+
     starboard_channel = TGChannelIDs.STARBOARD_CHANNEL
     listening_channels = TGChannelIDs.STARBOARD_LISTENING_CHANNELS
 
-    async def update_starboard_message(
-        self, reaction: discord.Reaction, message_id: int
+    async def get_starboard_channel(self) -> discord.TextChannel:
+        return self.bot.get_channel(
+            self.starboard_channel
+        ) or await self.bot.fetch_channel(self.starboard_channel)
+
+    def get_count_value(self, count: int) -> str:
+        return f"**{count} {self.config.emoji}**"
+
+    async def seed_stars(self, channel_id: int, message_id: int) -> Optional[int]:
+        """Fetches a message we have not seen yet and counts its stars."""
+        channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(
+            channel_id
+        )
+
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            return None
+
+        self.messages[message_id] = message
+
+        # Every message from before the last week gets forgotten again.
+        oldest_id = discord.utils.time_snowflake(discord.utils.utcnow() - MAX_AGE)
+        for pruned_id in self.stars.prune(oldest_id):
+            self.messages.pop(pruned_id, None)
+
+        return next(
+            (
+                reaction.count
+                for reaction in message.reactions
+                if str(reaction.emoji) == self.config.emoji
+            ),
+            0,
+        )
+
+    async def update_stars(
+        self, payload: discord.RawReactionActionEvent, delta: int
     ) -> None:
-        """Updates the starboard message with the new value for the
-        reaction count whenever a reaction is removed or added.
+        """Applies a reaction to the star count of a message,
+        and posts it to the starboard or schedules an edit of its starboard message.
         """
-        star_channel = await self.bot.fetch_channel(self.starboard_channel)
+        # The listener for reactions for the starboard.
+        # First we check if the reaction happened in the right channel.
+        if payload.channel_id not in self.listening_channels:
+            return
+
+        if str(payload.emoji) != self.config.emoji:
+            return
+
+        # The age is in the ID of the message, so old ones do not need to be fetched at all.
+        if discord.utils.snowflake_time(payload.message_id) < (
+            discord.utils.utcnow() - MAX_AGE
+        ):
+            return
+
+        count = await self.stars.update(
+            payload.message_id,
+            delta,
+            lambda: self.seed_stars(payload.channel_id, payload.message_id),
+        )
+        if count is None:
+            return
+
+        if payload.message_id in self.starboard_ids:
+            # Just editing the number on already existing messages, once the reactions calm down.
+            self.schedule_edit(payload.channel_id, payload.message_id)
+            return
+
+        if count >= self.config.threshold and payload.message_id not in self.posting:
+            self.posting.add(payload.message_id)
+            try:
+                await self.post_message(self.messages[payload.message_id], count)
+            finally:
+                self.posting.discard(payload.message_id)
+
+    async def post_message(self, message: discord.Message, count: int) -> None:
+        """Sends a new starboard message for a message that reached the threshold."""
+        star_channel = await self.get_starboard_channel()
+
+        # Again dont want error messages,
+        # so if the content is invalid it gets replaced by a whitespace character.
+        if len(message.content) == 0 or len(message.content[2000:]) > 0:
+            message.content = "\u200b"
+
+        embed = discord.Embed(
+            description=message.content,
+            colour=message.author.colour,
+        )
+        embed.add_field(
+            name="\u200b",
+            value=self.get_count_value(count),
+        )
+        embed.add_field(
+            name="\u200b",
+            value=f"[Message Link]({message.jump_url})",
+        )
+        embed.set_author(
+            name=f"{str(message.author)} ({message.author.id})",
+            icon_url=message.author.display_avatar.url,
+        )
+        embed.set_footer(text=f"{message.id}")
+        embed.timestamp = discord.utils.utcnow()
+
+        embed = utils.embed.add_attachments_to_embed(embed, message)
+
+        star_message = await star_channel.send(embed=embed)
+
+        await self.bot.db.execute(
+            """INSERT INTO starboardmessages VALUES (:original_id, :starboard_id)""",
+            {
+                "original_id": message.id,
+                "starboard_id": star_message.id,
+            },
+        )
+        self.starboard_ids[message.id] = star_message.id
+        self.starboard_embeds[star_message.id] = embed
+
+        # Reactions that came in while we were sending it.
+        if self.stars.counts.get(message.id, count) != count:
+            self.schedule_edit(message.channel.id, message.id)
+
+    def schedule_edit(self, channel_id: int, message_id: int) -> None:
+        """Edits the starboard message of a message in a couple of seconds, unless that is already planned."""
+        if message_id not in self.pending_edits:
+            self.pending_edits.add(message_id, EDIT_DELAY, channel_id)
+
+    def on_edit_due(self, message_id: int, channel_id: int) -> None:
+        self.background_tasks.run(self.update_starboard_message(channel_id, message_id))
+
+    async def update_starboard_message(self, channel_id: int, message_id: int) -> None:
+        """Updates the starboard message with the current star count of a message.
+        Whatever reactions came in since the edit was scheduled are all covered by this one edit.
+        """
+        starboard_id = self.starboard_ids.get(message_id)
+        if starboard_id is None:
+            return
+
+        # Fetching the count again, in case we missed any reaction events.
+        count = await self.stars.reseed(
+            message_id, lambda: self.seed_stars(channel_id, message_id)
+        )
+        if count is None:
+            return
+
+        star_channel = await self.get_starboard_channel()
 
         try:
-            edit_message = await star_channel.fetch_message(message_id)
-            new_embed = edit_message.embeds[0]
-            new_value = f"**{reaction.count} {str(reaction.emoji)}**"
+            new_embed = self.starboard_embeds.get(starboard_id)
+            if new_embed is None:
+                edit_message = await star_channel.fetch_message(starboard_id)
+                new_embed = edit_message.embeds[0]
+                self.starboard_embeds[starboard_id] = new_embed
+
+            new_value = self.get_count_value(count)
 
             if new_embed.fields[0].value == new_value:
                 return
 
             new_embed.set_field_at(0, name="\u200b", value=new_value)
-            await edit_message.edit(embed=new_embed)
+            await star_channel.get_partial_message(starboard_id).edit(embed=new_embed)
         except discord.errors.NotFound:
             return
 
@@ -82,13 +261,12 @@ class Starboard(commands.Cog):
             await ctx.send("Please enter a valid emoji.")
             return
 
-        with open(r"./files/starboard.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        data["emoji"] = emoji
+        self.config = self.config._replace(emoji=emoji)
+        utils.starboard.save_config(CONFIG_PATH, self.config)
 
-        with open(r"./files/starboard.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        # The counts we have are of the old emoji.
+        self.stars = utils.starboard.StarCounter()
+        self.messages.clear()
 
         await ctx.send(f"Changed the emoji to: `{emoji}`")
 
@@ -105,13 +283,8 @@ class Starboard(commands.Cog):
             await ctx.send("Please input a valid integer.")
             return
 
-        with open(r"./files/starboard.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        data["threshold"] = threshold
-
-        with open(r"./files/starboard.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        self.config = self.config._replace(threshold=threshold)
+        utils.starboard.save_config(CONFIG_PATH, self.config)
 
         await ctx.send(f"Changed the threshold to: `{threshold}`")
 
@@ -119,87 +292,7 @@ class Starboard(commands.Cog):
     async def on_raw_reaction_add(
         self, payload: discord.RawReactionActionEvent
     ) -> None:
-        # The listener for reactions for the starboard.
-        # First we check if the reaction happened in the right channel.
-        if payload.channel_id not in self.listening_channels:
-            return
-
-        with open(r"./files/starboard.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # These prevent error messages in my console if the setup wasnt done yet.
-        if "emoji" not in data:
-            data["emoji"] = "placeholder"
-
-        if "threshold" not in data:
-            data["threshold"] = 100
-
-        if str(payload.emoji) != data["emoji"]:
-            return
-
-        channel = await self.bot.fetch_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
-
-        # Dont want to update any old messages, 1 week seems fine.
-        if (datetime.now(timezone.utc) - message.created_at).days > 7:
-            return
-
-        for reaction in message.reactions:
-            if (
-                str(reaction.emoji) == data["emoji"]
-                and reaction.count >= data["threshold"]
-            ):
-                async with aiosqlite.connect("./db/database.db") as db:
-                    matching_entry = await db.execute_fetchall(
-                        """SELECT starboard_id FROM starboardmessages WHERE :original_id = original_id""",
-                        {"original_id": payload.message_id},
-                    )
-
-                # Just editing the number on already existing messages.
-                if len(matching_entry) != 0:
-                    await self.update_starboard_message(reaction, matching_entry[0][0])
-                    return
-
-                # If it doesnt already exist, it creates a new message.
-                star_channel = await self.bot.fetch_channel(self.starboard_channel)
-
-                # Again dont want error messages,
-                # so if the content is invalid it gets replaced by a whitespace character.
-                if len(message.content) == 0 or len(message.content[2000:]) > 0:
-                    message.content = "\u200b"
-
-                embed = discord.Embed(
-                    description=message.content,
-                    colour=message.author.colour,
-                )
-                embed.add_field(
-                    name="\u200b",
-                    value=f"**{reaction.count} {str(reaction.emoji)}**",
-                )
-                embed.add_field(
-                    name="\u200b",
-                    value=f"[Message Link]({message.jump_url})",
-                )
-                embed.set_author(
-                    name=f"{str(message.author)} ({message.author.id})",
-                    icon_url=message.author.display_avatar.url,
-                )
-                embed.set_footer(text=f"{message.id}")
-                embed.timestamp = discord.utils.utcnow()
-
-                embed = utils.embed.add_attachments_to_embed(embed, message)
-
-                star_message = await star_channel.send(embed=embed)
-
-                async with aiosqlite.connect("./db/database.db") as db:
-                    await db.execute(
-                        """INSERT INTO starboardmessages VALUES (:original_id, :starboard_id)""",
-                        {
-                            "original_id": message.id,
-                            "starboard_id": star_message.id,
-                        },
-                    )
-                    await db.commit()
+        await self.update_stars(payload, 1)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(
@@ -207,44 +300,32 @@ class Starboard(commands.Cog):
     ) -> None:
         # If the amount of reactions to a starboard message decrease,
         # we also wanna update the message then.
-        if payload.channel_id not in self.listening_channels:
-            return
-
-        with open(r"./files/starboard.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
+        await self.update_stars(payload, -1)
 
-        # These prevent error messages in my console if the setup wasnt done yet.
-        if "emoji" not in data:
-            data["emoji"] = "placeholder"
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(
+        self, payload: discord.RawReactionClearEvent
+    ) -> None:
+        self.clear_stars(payload.channel_id, payload.message_id)
 
-        if "threshold" not in data:
-            data["threshold"] = 100
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(
+        self, payload: discord.RawReactionClearEmojiEvent
+    ) -> None:
+        if str(payload.emoji) == self.config.emoji:
+            self.clear_stars(payload.channel_id, payload.message_id)
 
-        if str(payload.emoji) != data["emoji"]:
+    def clear_stars(self, channel_id: int, message_id: int) -> None:
+        """Forgets the star count of a message after its reactions got removed all at once,
+        which does not send a remove event for every single reaction.
+        """
+        if channel_id not in self.listening_channels:
             return
 
-        channel = await self.bot.fetch_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
-
-        # Dont want to update any old messages, 1 week seems fine.
-        if (datetime.now(timezone.utc) - message.created_at).days > 7:
-            return
+        self.stars.forget(message_id)
 
-        for reaction in message.reactions:
-            if (
-                str(reaction.emoji) == data["emoji"]
-                and reaction.count >= data["threshold"]
-            ):
-                async with aiosqlite.connect("./db/database.db") as db:
-                    matching_entry = await db.execute_fetchall(
-                        """SELECT starboard_id FROM starboardmessages WHERE :original_id = original_id""",
-                        {"original_id": payload.message_id},
-                    )
-
-                # Just editing the number on already existing messages.
-                if len(matching_entry) != 0:
-                    await self.update_starboard_message(reaction, matching_entry[0][0])
-                    return
+        if message_id in self.starboard_ids:
+            self.schedule_edit(channel_id, message_id)
 
     @starboard_threshold.error
     async def starboard_threshold_error(
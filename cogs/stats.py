@@ -5,7 +5,6 @@ import time
 from functools import reduce
 from io import StringIO
 
-import aiosqlite
 import discord
 import psutil
 from discord import app_commands
@@ -48,11 +47,10 @@ class Stats(commands.Cog):
         sorted_members = sorted(ctx.guild.members, key=lambda x: x.joined_at)
         index = sorted_members.index(member)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            badges = await db.execute_fetchall(
-                """SELECT badges FROM userbadges WHERE :user_id = user_id""",
-                {"user_id": member.id},
-            )
+        badges = await self.bot.db.fetchall(
+            """SELECT badges FROM userbadges WHERE :user_id = user_id""",
+            {"user_id": member.id},
+        )
 
         badges = "None" if len(badges) == 0 or badges[0][0] == "" else badges[0][0]
 
@@ -309,9 +307,7 @@ class Stats(commands.Cog):
         ram_total = round(psutil.virtual_memory()[0] / (1024 * 1024 * 1024), 2)
         ram_percent = round((ram_used / ram_total) * 100, 1)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            macro_list = await db.execute_fetchall("""SELECT name FROM macros""")
-
+        async with self.bot.db.reader() as db:
             all_commands = await db.execute_fetchall(
                 """SELECT SUM(uses) FROM commands"""
             )
@@ -342,6 +338,7 @@ Servers: {len(self.bot.guilds)}
 Total Users: {len(set(self.bot.get_all_members()))}
 Latency: {round(self.bot.latency * 1000)}ms
 Uptime: {str(datetime.timedelta(seconds=uptime_seconds)).split('.', maxsplit=1)[0]}
+User Lookup Hit Rate: {round(self.bot.user_resolver.hit_rate * 100, 1)}% ({self.bot.user_resolver.misses} fetched)
 ```
         """
 
@@ -363,7 +360,7 @@ RAM Usage: {ram_used}GB/{ram_total}GB ({ram_percent}%)
 
         listeners_description = f"""
 ```yml
-Number of Message Commands: {message_commands + len(macro_list)}
+Number of Message Commands: {message_commands + len(self.bot.macros)}
 Number of Application Commands: {slash_commands}
 Number of Events: {len(self.bot.extra_events)}
 Commands executed: {all_commands[0][0]}
@@ -1,6 +1,5 @@
 from typing import Optional, Union
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -17,65 +16,64 @@ class UltimateFrameData(commands.Cog):
 
     async def handle_stats(self, ctx: commands.Context, character: str) -> None:
         """Handles displaying the stats for a character."""
-        async with aiosqlite.connect("./db/ultimateframedata.db") as db:
-            stats = await db.execute_fetchall(
-                """SELECT * FROM stats WHERE character = :character""",
-                {"character": character},
-            )
-
-            if len(stats) == 0:
-                await ctx.send(
-                    "Character not found.\nMake sure you are not searching for special characters like Pokemon Trainer or Pyra & Mythra, but instead for the individual characters like Charizard or Mythra."
-                )
-                return
+        stats = await self.bot.ufd_db.fetchall(
+            """SELECT * FROM stats WHERE character = :character""",
+            {"character": character},
+        )
 
-            # The following queries are used to get the rank of each stat for the character.
-            # The SUBSTR is needed because the data is stored as "Stat - Value" (Weight - 113).
-            weights = await db.execute_fetchall(
-                """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(weight, 9) AS INTEGER) DESC) as row_num, character FROM stats""",
-                {"character": character},
+        if len(stats) == 0:
+            await ctx.send(
+                "Character not found.\nMake sure you are not searching for special characters like Pokemon Trainer or Pyra & Mythra, but instead for the individual characters like Charizard or Mythra."
             )
+            return
 
-            gravities = await db.execute_fetchall(
-                """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(gravity, 11, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
-                {"character": character},
-            )
+        # The following queries are used to get the rank of each stat for the character.
+        # The SUBSTR is needed because the data is stored as "Stat - Value" (Weight - 113).
+        weights = await self.bot.ufd_db.fetchall(
+            """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(weight, 9) AS INTEGER) DESC) as row_num, character FROM stats""",
+            {"character": character},
+        )
 
-            walk_speeds = await db.execute_fetchall(
-                """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(walk_speed, 14, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
-                {"character": character},
-            )
+        gravities = await self.bot.ufd_db.fetchall(
+            """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(gravity, 11, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
+            {"character": character},
+        )
 
-            run_speeds = await db.execute_fetchall(
-                """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(run_speed, 13, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
-                {"character": character},
-            )
+        walk_speeds = await self.bot.ufd_db.fetchall(
+            """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(walk_speed, 14, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
+            {"character": character},
+        )
 
-            initial_dashs = await db.execute_fetchall(
-                """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(initial_dash, 16, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
-                {"character": character},
-            )
+        run_speeds = await self.bot.ufd_db.fetchall(
+            """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(run_speed, 13, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
+            {"character": character},
+        )
 
-            air_speeds = await db.execute_fetchall(
-                """SELECT row_number() OVER (ORDER BY CAST(SUBSTR(air_speed, 13, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
-                {"character": character},
-            )
+        initial_dashs = await self.bot.ufd_db.fetchall(
+            """SELECT row_number() OVER(ORDER BY CAST(SUBSTR(initial_dash, 16, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
+            {"character": character},
+        )
 
-            total_air_accelerations = await db.execute_fetchall(
-                """SELECT row_number() OVER (ORDER BY CAST(SUBSTR(total_air_acceleration, 26, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
-                {"character": character},
-            )
+        air_speeds = await self.bot.ufd_db.fetchall(
+            """SELECT row_number() OVER (ORDER BY CAST(SUBSTR(air_speed, 13, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
+            {"character": character},
+        )
+
+        total_air_accelerations = await self.bot.ufd_db.fetchall(
+            """SELECT row_number() OVER (ORDER BY CAST(SUBSTR(total_air_acceleration, 26, 5) AS FLOAT) DESC) as row_num, character FROM stats""",
+            {"character": character},
+        )
 
-            # Gets the actual ranks.
-            weight = [w[0] for w in weights if w[1] == character][0]
-            gravity = [g[0] for g in gravities if g[1] == character][0]
-            walk_speed = [w[0] for w in walk_speeds if w[1] == character][0]
-            run_speed = [r[0] for r in run_speeds if r[1] == character][0]
-            initial_dash = [i[0] for i in initial_dashs if i[1] == character][0]
-            air_speed = [a[0] for a in air_speeds if a[1] == character][0]
-            total_air_acceleration = [
-                t[0] for t in total_air_accelerations if t[1] == character
-            ][0]
+        # Gets the actual ranks.
+        weight = [w[0] for w in weights if w[1] == character][0]
+        gravity = [g[0] for g in gravities if g[1] == character][0]
+        walk_speed = [w[0] for w in walk_speeds if w[1] == character][0]
+        run_speed = [r[0] for r in run_speeds if r[1] == character][0]
+        initial_dash = [i[0] for i in initial_dashs if i[1] == character][0]
+        air_speed = [a[0] for a in air_speeds if a[1] == character][0]
+        total_air_acceleration = [
+            t[0] for t in total_air_accelerations if t[1] == character
+        ][0]
 
         stats = stats[0]
 
@@ -213,18 +211,17 @@ class UltimateFrameData(commands.Cog):
 
         move_name = self.replace_common_abbreviations(move_name)
 
-        async with aiosqlite.connect("./db/ultimateframedata.db") as db:
-            move = await db.execute_fetchall(
-                """SELECT * FROM moves WHERE character = :character AND TRIM(input) = :move_name COLLATE NOCASE 
-                OR character = :character AND TRIM(move_name) = :move_name COLLATE NOCASE
-                OR character = :character AND TRIM(full_move_name) = :move_name COLLATE NOCASE""",
-                {"character": character, "move_name": move_name},
-            )
+        move = await self.bot.ufd_db.fetchall(
+            """SELECT * FROM moves WHERE character = :character AND TRIM(input) = :move_name COLLATE NOCASE 
+            OR character = :character AND TRIM(move_name) = :move_name COLLATE NOCASE
+            OR character = :character AND TRIM(full_move_name) = :move_name COLLATE NOCASE""",
+            {"character": character, "move_name": move_name},
+        )
 
-            all_moves = await db.execute_fetchall(
-                """SELECT full_move_name FROM moves WHERE character = :character""",
-                {"character": character},
-            )
+        all_moves = await self.bot.ufd_db.fetchall(
+            """SELECT full_move_name FROM moves WHERE character = :character""",
+            {"character": character},
+        )
 
         # If a unique move was found, we can just send the embed.
         if len(move) == 1:
@@ -337,8 +334,7 @@ class UltimateFrameData(commands.Cog):
 
         choices = []
 
-        async with aiosqlite.connect("./db/ultimateframedata.db") as db:
-            chars = await db.execute_fetchall("""SELECT character FROM stats""")
+        chars = await self.bot.ufd_db.fetchall("""SELECT character FROM stats""")
 
         chars = [c[0].title() for c in chars]
 
@@ -367,11 +363,10 @@ class UltimateFrameData(commands.Cog):
 
         character = interaction.namespace.character.lower()
 
-        async with aiosqlite.connect("./db/ultimateframedata.db") as db:
-            raw_moves = await db.execute_fetchall(
-                """SELECT full_move_name FROM moves WHERE character = :character""",
-                {"character": character},
-            )
+        raw_moves = await self.bot.ufd_db.fetchall(
+            """SELECT full_move_name FROM moves WHERE character = :character""",
+            {"character": character},
+        )
 
         match = Match(ignore_case=True, include_partial=True)
 
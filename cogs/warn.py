@@ -1,7 +1,6 @@
 import datetime
 import random
 
-import aiosqlite
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
@@ -32,18 +31,16 @@ class Warn(commands.Cog):
         warn_id = random.randint(100000, 999999)
         warndate = int(discord.utils.utcnow().timestamp())
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """INSERT INTO warnings VALUES (:user_id, :warn_id, :mod_id, :reason, :timestamp)""",
-                {
-                    "user_id": member.id,
-                    "warn_id": warn_id,
-                    "mod_id": author.id,
-                    "reason": reason,
-                    "timestamp": warndate,
-                },
-            )
-            await db.commit()
+        await self.bot.db.execute(
+            """INSERT INTO warnings VALUES (:user_id, :warn_id, :mod_id, :reason, :timestamp)""",
+            {
+                "user_id": member.id,
+                "warn_id": warn_id,
+                "mod_id": author.id,
+                "reason": reason,
+                "timestamp": warndate,
+            },
+        )
 
         # And this second part here logs the warn into the warning log discord channel.
         channel = self.bot.get_channel(TGChannelIDs.INFRACTION_LOGS)
@@ -68,11 +65,10 @@ class Warn(commands.Cog):
         Also DMs them informing the User of said action.
         """
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_warnings = await db.execute_fetchall(
-                """SELECT * FROM warnings WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
+        user_warnings = await self.bot.db.fetchall(
+            """SELECT * FROM warnings WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         warns = len(user_warnings)
 
@@ -153,11 +149,10 @@ class Warn(commands.Cog):
         if member is None:
             member = ctx.author
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_warnings = await db.execute_fetchall(
-                """SELECT * FROM warnings WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
+        user_warnings = await self.bot.db.fetchall(
+            """SELECT * FROM warnings WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         warns = len(user_warnings)
 
@@ -173,12 +168,10 @@ class Warn(commands.Cog):
     @utils.check.is_moderator()
     async def clearwarns(self, ctx: commands.Context, member: discord.Member) -> None:
         """Deletes all warnings of a user from the database."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """DELETE FROM warnings WHERE user_id = :user_id""",
-                {"user_id": member.id},
-            )
-            await db.commit()
+        await self.bot.db.execute(
+            """DELETE FROM warnings WHERE user_id = :user_id""",
+            {"user_id": member.id},
+        )
 
         await ctx.send(f"Cleared all warnings for {member.mention}.")
 
@@ -189,11 +182,10 @@ class Warn(commands.Cog):
     @utils.check.is_moderator()
     async def warndetails(self, ctx: commands.Context, user: discord.User) -> None:
         """Gets you the details of a Users warnings."""
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_warnings = await db.execute_fetchall(
-                """SELECT * FROM warnings WHERE user_id = :user_id""",
-                {"user_id": user.id},
-            )
+        user_warnings = await self.bot.db.fetchall(
+            """SELECT * FROM warnings WHERE user_id = :user_id""",
+            {"user_id": user.id},
+        )
 
         if len(user_warnings) == 0:
             await ctx.send(f"{user.mention} doesn't have any active warnings (yet).")
@@ -233,23 +225,21 @@ class Warn(commands.Cog):
         """Deletes a specific warning of a user, by the randomly generated warning ID.
         Use warndetails to see these warning IDs.
         """
-        async with aiosqlite.connect("./db/database.db") as db:
-            warning = await db.execute_fetchall(
-                """SELECT * FROM warnings WHERE user_id = :user_id AND warn_id = :warn_id""",
-                {"user_id": member.id, "warn_id": warn_id},
-            )
-
-            if len(warning) == 0:
-                await ctx.send(
-                    f"I couldnt find a warning with the ID {warn_id} for {member.mention}."
-                )
-                return
+        warning = await self.bot.db.fetchall(
+            """SELECT * FROM warnings WHERE user_id = :user_id AND warn_id = :warn_id""",
+            {"user_id": member.id, "warn_id": warn_id},
+        )
 
-            await db.execute(
-                """DELETE FROM warnings WHERE user_id = :user_id AND warn_id = :warn_id""",
-                {"user_id": member.id, "warn_id": warn_id},
+        if len(warning) == 0:
+            await ctx.send(
+                f"I couldnt find a warning with the ID {warn_id} for {member.mention}."
             )
-            await db.commit()
+            return
+
+        await self.bot.db.execute(
+            """DELETE FROM warnings WHERE user_id = :user_id AND warn_id = :warn_id""",
+            {"user_id": member.id, "warn_id": warn_id},
+        )
 
         await ctx.send(f"Deleted warning {warn_id} for {member.mention}")
 
@@ -260,11 +250,10 @@ class Warn(commands.Cog):
         if not interaction.namespace.member:
             return []
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            user_warnings = await db.execute_fetchall(
-                """SELECT warn_id FROM warnings WHERE user_id = :user_id""",
-                {"user_id": interaction.namespace.member.id},
-            )
+        user_warnings = await self.bot.db.fetchall(
+            """SELECT warn_id FROM warnings WHERE user_id = :user_id""",
+            {"user_id": interaction.namespace.member.id},
+        )
 
         warn_ids = [str(warn[0]) for warn in user_warnings]
 
@@ -286,13 +275,10 @@ class Warn(commands.Cog):
 
         expires_at = discord.utils.utcnow() - datetime.timedelta(days=30)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """DELETE FROM warnings WHERE timestamp < :expires_at""",
-                {"expires_at": int(expires_at.timestamp())},
-            )
-
-            await db.commit()
+        await self.bot.db.execute(
+            """DELETE FROM warnings WHERE timestamp < :expires_at""",
+            {"expires_at": int(expires_at.timestamp())},
+        )
 
         logger.info("Warnloop finished.")
 
@@ -4,9 +4,18 @@ from logging import Logger
 import discord
 from discord.ext import commands
 
+import utils.database
+import utils.expiry
 import utils.logger
+import utils.macro_table
+import utils.message_pipeline
+import utils.migrations
+import utils.ping_registry
+import utils.role_tiers
 import utils.sqlite
 import utils.startup
+import utils.users
+from utils.ids import TGChannelIDs
 
 
 class Tabuu3(commands.Bot):
@@ -24,13 +33,6 @@ class Tabuu3(commands.Bot):
         # To be used in the stats command.
         self.version_number = "9.37.0"
 
-        self.matchmaking_pings = {
-            "singles": {},
-            "doubles": {},
-            "funnies": {},
-            "ranked": {},
-        }
-
         # A check to make sure persistent buttons do not get added twice.
         self.modmail_button_added = None
 
@@ -40,8 +42,37 @@ class Tabuu3(commands.Bot):
         # The time we store matchmaking pings for, in seconds.
         self.matchmaking_ping_time = 1800
 
-        # A dict of recent messages, used for the level system.
-        self.recent_messages = {}
+        # The users who recently gained XP, used for the level system.
+        self.recent_messages = utils.expiry.ExpiryTracker()
+
+        # The shared database connections, opened in setup_hook.
+        self.db = utils.database.Database("./db/database.db")
+        self.ufd_db = utils.database.Database("./db/ultimateframedata.db", readers=2)
+
+        # The recent matchmaking pings of every type, loaded in setup_hook.
+        self.matchmaking_pings = utils.ping_registry.PingRegistry(
+            self.db, self.matchmaking_ping_time
+        )
+
+        # Every macro, loaded in setup_hook.
+        self.macros = utils.macro_table.MacroTable(self.db)
+
+        # Resolves user IDs to users, for leaderboards and such.
+        self.user_resolver = utils.users.UserResolver(self)
+
+        # The roles for reaching a certain rating or level, cached per guild.
+        self.ranked_roles = utils.role_tiers.RoleTiers(
+            utils.role_tiers.get_ranked_tiers
+        )
+        self.level_roles = utils.role_tiers.RoleTiers(utils.role_tiers.get_level_tiers)
+
+        # Every message goes through the stages of the cogs in this, with the commands coming last.
+        self.message_pipeline = utils.message_pipeline.MessagePipeline(
+            self.main_prefix, TGChannelIDs.BLACKLISTED_CHANNELS
+        )
+        self.message_pipeline.add_stage(
+            "commands", utils.message_pipeline.COMMAND_STAGE, self.process_command
+        )
 
     async def setup_hook(self) -> None:
         # We need to set up some stuff at startup.
@@ -49,16 +80,62 @@ class Tabuu3(commands.Bot):
         utils.startup.generate_files()
 
         await utils.sqlite.setup_db()
+        await utils.migrations.run_migrations()
         await utils.sqlite.setup_ufd()
 
+        await self.db.connect()
+        await self.ufd_db.connect()
+
+        await self.matchmaking_pings.load(discord.utils.utcnow().timestamp())
+        await self.macros.load()
+
         for filename in os.listdir(r"./cogs"):
             if filename.endswith(".py"):
                 await self.load_extension(f"cogs.{filename[:-3]}")
 
+    async def close(self) -> None:
+        # Closing the cogs and the connection to discord first,
+        # so nothing tries to write to the database after we closed it.
+        await super().close()
+
+        self.recent_messages.stop()
+
+        await self.db.close()
+        await self.ufd_db.close()
+
+    async def on_message(self, message: discord.Message) -> None:
+        # Replaces the default, which would only process the commands.
+        await self.message_pipeline.process(message, self.user.id)
+
+    async def process_command(
+        self, context: utils.message_pipeline.MessageContext
+    ) -> bool:
+        if context.prefix is None:
+            return False
+
+        await self.process_commands(context.message)
+        return True
+
     def get_logger(self, name: str) -> Logger:
         # Just attaching it to the bot so we dont have to import it everywhere.
         return utils.logger.get_logger(name)
 
+    def clear_role_tiers(self, guild: discord.Guild) -> None:
+        # The cached ranked and level roles could be outdated now.
+        self.ranked_roles.clear(guild.id)
+        self.level_roles.clear(guild.id)
+
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        self.clear_role_tiers(role.guild)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.clear_role_tiers(role.guild)
+
+    async def on_guild_role_update(
+        self, before: discord.Role, after: discord.Role
+    ) -> None:
+        self.clear_role_tiers(after.guild)
+
     async def on_ready(self) -> None:
         print(
             f"Lookin' good, connected as: {str(bot.user)}, at: {discord.utils.utcnow().strftime('%d-%m-%Y %H:%M:%S')} UTC"
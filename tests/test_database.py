@@ -0,0 +1,161 @@
+import asyncio
+
+import aiosqlite
+import pytest
+
+from utils.database import Database
+
+
+def test_group_commit(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+
+    async def run() -> None:
+        db = Database(filepath, readers=1, commit_window=0.01)
+        await db.connect()
+
+        await db.execute("""CREATE TABLE level(id INTEGER PRIMARY KEY, xp INTEGER)""")
+
+        commits = 0
+        commit = db.writer.commit
+
+        async def count_commits() -> None:
+            nonlocal commits
+            commits += 1
+            await commit()
+
+        db.writer.commit = count_commits
+
+        # All of these arrive within the same window, so they are committed together.
+        await asyncio.gather(
+            *[
+                db.execute("""INSERT INTO level VALUES (:id, 0)""", {"id": i})
+                for i in range(100)
+            ]
+        )
+        assert commits == 1
+        assert await db.fetchone("""SELECT COUNT(*) FROM level""") == (100,)
+
+        # A failing write does not take the rest of the batch down with it.
+        results = await asyncio.gather(
+            db.execute("""INSERT INTO level VALUES (1, 0)"""),
+            db.execute("""UPDATE level SET xp = 5 WHERE id = 2"""),
+            return_exceptions=True,
+        )
+        assert isinstance(results[0], aiosqlite.IntegrityError)
+        assert results[1] is None
+        assert await db.fetchone("""SELECT xp FROM level WHERE id = 2""") == (5,)
+
+        # Not even the rows before the failing one of an executemany are kept.
+        results = await asyncio.gather(
+            db.executemany(
+                """INSERT INTO level VALUES (?, 0)""", [(1000,), (1001,), (1001,)]
+            ),
+            db.execute("""INSERT INTO level VALUES (1002, 0)"""),
+            return_exceptions=True,
+        )
+        assert isinstance(results[0], aiosqlite.IntegrityError)
+        assert results[1] is None
+        assert await db.fetchall(
+            """SELECT id FROM level WHERE id >= 1000 ORDER BY id"""
+        ) == [(1002,)]
+
+        # If the commit and even the rollback fail, the callers get the error and the writer keeps going.
+        rollback = db.writer.rollback
+
+        async def fail() -> None:
+            raise aiosqlite.OperationalError("database is locked")
+
+        db.writer.commit = fail
+        db.writer.rollback = fail
+        with pytest.raises(aiosqlite.OperationalError):
+            await db.execute("""INSERT INTO level VALUES (2000, 0)""")
+
+        db.writer.commit = count_commits
+        db.writer.rollback = rollback
+        await rollback()
+        await db.execute("""INSERT INTO level VALUES (2001, 0)""")
+        assert await db.fetchall("""SELECT id FROM level WHERE id >= 2000""") == [
+            (2001,)
+        ]
+
+        # Writes that are still queued up get committed on close.
+        task = asyncio.create_task(
+            db.executemany(
+                """UPDATE level SET xp = :xp WHERE id = :id""",
+                [{"id": i, "xp": 10} for i in range(10)],
+            )
+        )
+        await asyncio.sleep(0)
+        await db.close()
+        await task
+
+        with pytest.raises(RuntimeError):
+            await db.execute("""DELETE FROM level""")
+
+        async with aiosqlite.connect(filepath) as conn:
+            assert await conn.execute_fetchall(
+                """SELECT COUNT(*) FROM level WHERE xp = 10"""
+            ) == [(10,)]
+            assert await conn.execute_fetchall("""PRAGMA journal_mode""") == [("wal",)]
+
+    asyncio.run(run())
+
+
+def test_shared_connections(tmp_path, monkeypatch) -> None:
+    filepath = str(tmp_path / "database.db")
+
+    async def run() -> None:
+        db = Database(filepath, readers=2, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.execute(
+                """CREATE TABLE level(id INTEGER PRIMARY KEY, xp INTEGER)"""
+            )
+            writer, readers = db.writer, list(db.readers)
+
+            # No matter how many reads and writes come in, nothing opens a new connection.
+            connections = 0
+            connect = aiosqlite.connect
+
+            def count_connections(*args, **kwargs) -> aiosqlite.Connection:
+                nonlocal connections
+                connections += 1
+                return connect(*args, **kwargs)
+
+            monkeypatch.setattr(aiosqlite, "connect", count_connections)
+
+            await asyncio.gather(
+                *[
+                    db.execute("""INSERT INTO level VALUES (:id, 0)""", {"id": i})
+                    for i in range(20)
+                ],
+                *[db.fetchone("""SELECT COUNT(*) FROM level""") for _ in range(20)],
+            )
+            assert connections == 0
+            assert db.writer is writer
+            assert db.readers == readers
+
+            # Every reader goes back into the pool once it is done, the one idle the longest goes out first.
+            assert db.idle_readers.qsize() == 2
+            async with db.reader() as first:
+                async with db.reader() as second:
+                    assert {first, second} == set(readers)
+                    assert db.idle_readers.empty()
+
+                    # With every reader in use, the next read waits for one to come back.
+                    waiting = asyncio.create_task(
+                        db.fetchone("""SELECT COUNT(*) FROM level""")
+                    )
+                    await asyncio.sleep(0.01)
+                    assert not waiting.done()
+
+                assert await waiting == (20,)
+
+            assert db.idle_readers.qsize() == 2
+            async with db.reader() as reader:
+                assert reader is second
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,41 @@
+import asyncio
+
+from utils.expiry import ExpiryTracker
+
+
+def test_expiry_tracker() -> None:
+    async def run() -> None:
+        expired = []
+        tracker = ExpiryTracker(lambda key, value: expired.append((key, value)))
+
+        tracker.add("a", 0.05)
+        tracker.add("b", 0.2, "value")
+        tracker.add("c", 10)
+        assert "a" in tracker
+        assert tracker.get("b") == "value"
+        assert len(tracker) == 3
+
+        # Adding a key again pushes its expiry back.
+        tracker.add("c", 0.1)
+        # Removed keys do not count as expired.
+        tracker.remove("a")
+        assert "a" not in tracker
+
+        await asyncio.sleep(0.15)
+        assert expired == [("c", True)]
+        assert "c" not in tracker
+        assert "b" in tracker
+
+        # A new earliest entry wakes the background task up early.
+        tracker.add("d", 0.01)
+        await asyncio.sleep(0.03)
+        assert expired == [("c", True), ("d", True)]
+
+        await asyncio.sleep(0.2)
+        assert expired == [("c", True), ("d", True), ("b", "value")]
+        assert len(tracker) == 0
+        assert tracker.next_expiry() is None
+
+        tracker.stop()
+
+    asyncio.run(run())
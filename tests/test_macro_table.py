@@ -0,0 +1,93 @@
+import asyncio
+
+import aiosqlite
+
+from utils.database import Database
+from utils.macro_table import Macro, MacroTable
+from utils.migrations import run_migrations
+from utils.sqlite import setup_db
+
+
+def test_macro_table(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.execute("""INSERT INTO macros VALUES ('hi', 'Hello!', 5, 1)""")
+
+            macros = MacroTable(db)
+            await macros.load()
+            assert "hi" in macros
+            assert macros.get("hi") == Macro("hi", "Hello!", 5, 1)
+            assert macros.get("bye") is None
+
+            assert await macros.create("bye", "Goodbye!", 2)
+            assert not await macros.create("hi", "Hello again!", 2)
+            assert len(macros) == 2
+
+            # Creating the same macro twice at once only works for one of them.
+            assert sorted(
+                await asyncio.gather(
+                    macros.create("same", "First!", 3),
+                    macros.create("same", "Second!", 4),
+                )
+            ) == [False, True]
+            assert macros.get("same").payload == "First!"
+            assert await macros.delete("same")
+            assert sorted(macros.get_names()) == ["bye", "hi"]
+
+            # Uses count right away, but are not written yet.
+            macros.add_use("hi")
+            macros.add_use("hi")
+            macros.add_use("bye")
+            macros.add_use("nothing")
+            assert macros.get("hi").uses == 7
+            assert await db.fetchall(
+                """SELECT name, uses FROM macros ORDER BY name"""
+            ) == [("bye", 0), ("hi", 5)]
+
+            await macros.flush()
+            await macros.flush()
+            assert macros.get("hi").uses == 7
+            assert await db.fetchall(
+                """SELECT name, uses FROM macros ORDER BY name"""
+            ) == [("bye", 1), ("hi", 7)]
+
+            # Deleting a macro drops its uses that were not written yet.
+            macros.add_use("bye")
+            assert await macros.delete("bye")
+            assert not await macros.delete("bye")
+            await macros.flush()
+            assert await db.fetchall("""SELECT name, uses FROM macros""") == [("hi", 7)]
+
+            # A failed flush keeps the uses, and the next one writes them together with the new ones.
+            executemany = db.executemany
+
+            async def fail(*args) -> None:
+                raise aiosqlite.OperationalError("database is locked")
+
+            db.executemany = fail
+            macros.add_use("hi")
+            assert not await macros.flush()
+            assert macros.get("hi").uses == 8
+
+            db.executemany = executemany
+            macros.add_use("hi")
+            assert await macros.flush()
+            assert not macros.buffer
+            assert await db.fetchall("""SELECT name, uses FROM macros""") == [("hi", 9)]
+
+            # Loading again gives us the same.
+            reloaded = MacroTable(db)
+            await reloaded.load()
+            assert reloaded.macros == macros.macros
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,137 @@
+import asyncio
+from typing import Optional
+
+from utils.message_pipeline import (
+    COMMAND_STAGE,
+    FILTER_STAGE,
+    MACRO_STAGE,
+    XP_STAGE,
+    MessageContext,
+    MessagePipeline,
+)
+
+
+class FakeAuthor:
+    def __init__(self, user_id: int, bot: bool = False) -> None:
+        self.id = user_id
+        self.bot = bot
+
+
+class FakeGuild:
+    id = 1
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int) -> None:
+        self.id = channel_id
+
+
+class FakeMessage:
+    def __init__(
+        self,
+        content: str,
+        author: FakeAuthor,
+        channel_id: int = 10,
+        guild: Optional[FakeGuild] = FakeGuild(),
+    ) -> None:
+        self.id = 1000
+        self.content = content
+        self.author = author
+        self.channel = FakeChannel(channel_id)
+        self.guild = guild
+
+    def is_system(self) -> bool:
+        return False
+
+
+def test_message_pipeline() -> None:
+    pipeline = MessagePipeline("%", [20])
+    seen = []
+
+    def make_stage(name: str, consumes: bool):
+        async def stage(context: MessageContext) -> bool:
+            seen.append((name, context.invoked_name))
+            if name == "broken":
+                raise ValueError
+            return consumes and context.prefix is not None
+
+        return stage
+
+    # Added out of order, and one of them twice.
+    pipeline.add_stage("commands", COMMAND_STAGE, make_stage("commands", True))
+    pipeline.add_stage("macros", MACRO_STAGE, make_stage("macros", True))
+    pipeline.add_stage(
+        "filter", FILTER_STAGE, make_stage("filter", False), ignore_bots=False
+    )
+    pipeline.add_stage("xp", XP_STAGE, make_stage("broken", False))
+    pipeline.add_stage("xp", XP_STAGE, make_stage("xp", False))
+
+    async def run() -> None:
+        user = FakeAuthor(5)
+
+        assert await pipeline.process(FakeMessage("hello there", user), 99) is None
+        assert seen == [
+            ("filter", None),
+            ("xp", None),
+            ("macros", None),
+            ("commands", None),
+        ]
+
+        # The macro consumes it, so it never gets to the commands.
+        seen.clear()
+        consumed_by = await pipeline.process(FakeMessage("%macro arg", user), 99)
+        assert consumed_by == "macros"
+        assert seen == [("filter", "macro"), ("xp", "macro"), ("macros", "macro")]
+
+        # Bots only go through the stages that want them.
+        seen.clear()
+        await pipeline.process(FakeMessage("%macro", FakeAuthor(6, bot=True)), 99)
+        assert seen == [("filter", "macro")]
+
+        # A broken stage does not stop the others.
+        pipeline.add_stage("xp", XP_STAGE, make_stage("broken", False))
+        seen.clear()
+        assert await pipeline.process(FakeMessage("hi", user), 99) is None
+        assert [name for name, _ in seen] == ["filter", "broken", "macros", "commands"]
+
+        pipeline.remove_stage("commands")
+        assert [name for name, _ in pipeline.get_stats()] == [
+            "filter",
+            "xp",
+            "macros",
+            "total",
+        ]
+
+    asyncio.run(run())
+
+    stats = dict(pipeline.get_stats())
+    assert stats["filter"].calls == 4
+    assert stats["xp"].calls == 3
+    assert stats["xp"].errors == 1
+    assert stats["macros"].consumed == 1
+    assert stats["total"].calls == 4
+    assert stats["total"].consumed == 1
+    assert 0 < stats["filter"].get_percentile(0.5) <= stats["filter"].max
+
+
+def test_message_context() -> None:
+    own = FakeAuthor(99, bot=True)
+    blacklisted = frozenset([20])
+
+    context = MessageContext(FakeMessage("%macro", own, 20), 99, "%", blacklisted)
+    assert context.is_bot and context.is_own
+    assert context.is_blacklisted_channel
+    assert context.guild_id == 1
+    assert context.invoked_name == "macro"
+
+    # Only split at spaces, like the macros always were.
+    context = MessageContext(
+        FakeMessage("%macro\nmore", FakeAuthor(5), guild=None), 99, "%", blacklisted
+    )
+    assert not context.is_bot and not context.is_own
+    assert not context.is_blacklisted_channel
+    assert context.guild_id is None
+    assert context.invoked_name == "macro\nmore"
+
+    context = MessageContext(FakeMessage("hi %", FakeAuthor(5)), 99, "%", blacklisted)
+    assert context.prefix is None and context.invoked_name is None
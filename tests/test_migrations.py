@@ -0,0 +1,162 @@
+import asyncio
+
+import aiosqlite
+import pytest
+
+import utils.migrations
+from utils.migrations import MIGRATIONS, run_migrations
+from utils.sqlite import setup_db
+
+
+async def create_fixture(filepath: str) -> None:
+    # The original schema, with some of the duplicates that happened in production.
+    await setup_db(filepath)
+
+    async with aiosqlite.connect(filepath) as db:
+        await db.executemany(
+            """INSERT INTO level VALUES (:id, :level, :xp, :messages)""",
+            [
+                {"id": 1, "level": 3, "xp": 300, "messages": 30},
+                {"id": 1, "level": 0, "xp": 0, "messages": 0},
+                {"id": 2, "level": 1, "xp": 100, "messages": 10},
+                {"id": None, "level": 1, "xp": 100, "messages": 10},
+            ],
+        )
+        await db.executemany(
+            """INSERT INTO trueskill VALUES (:user_id, 25.0, 8.333, 0, 0, :matches)""",
+            [
+                {"user_id": 1, "matches": "WWLWW"},
+                {"user_id": 1, "matches": ""},
+                {"user_id": 2, "matches": "L"},
+            ],
+        )
+        await db.executemany(
+            """INSERT INTO commands VALUES (:command, :uses, 0)""",
+            [
+                {"command": "ping", "uses": 5},
+                {"command": "ping", "uses": 1},
+                {"command": "help", "uses": 2},
+            ],
+        )
+        # The match IDs are random, so they can show up more than once.
+        await db.executemany(
+            """INSERT INTO matches (match_id, winner_id, loser_id, timestamp) VALUES (1, 1, 2, :timestamp)""",
+            [{"timestamp": 100}, {"timestamp": 200}],
+        )
+        await db.commit()
+
+
+async def get_query_plan(db: aiosqlite.Connection, sql: str) -> str:
+    rows = await db.execute_fetchall(f"EXPLAIN QUERY PLAN {sql}")
+    return " ".join(row[3] for row in rows)
+
+
+def test_run_migrations(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+    asyncio.run(create_fixture(filepath))
+
+    assert asyncio.run(run_migrations(filepath)) == len(MIGRATIONS)
+    # Running them again should not do anything.
+    assert asyncio.run(run_migrations(filepath)) == len(MIGRATIONS)
+
+    async def check() -> None:
+        async with aiosqlite.connect(filepath) as db:
+            # The oldest row per key is kept, and the rows without a key are dropped.
+            assert await db.execute_fetchall(
+                "SELECT id, xp FROM level ORDER BY id"
+            ) == [(1, 300), (2, 100)]
+            assert await db.execute_fetchall(
+                "SELECT user_id FROM trueskill ORDER BY user_id"
+            ) == [(1,), (2,)]
+            assert await db.execute_fetchall(
+                "SELECT command, uses FROM commands ORDER BY command"
+            ) == [("help", 2), ("ping", 5)]
+
+            # The W/L history is turned into the recent form.
+            assert (
+                await db.execute_fetchall(
+                    """SELECT user_id, recent_results, recent_count, current_streak,
+                longest_winstreak, longest_losestreak FROM trueskill ORDER BY user_id"""
+                )
+                == [(1, 0b11011, 5, 2, 2, 1), (2, 0, 1, -1, 0, 1)]
+            )
+            assert "matches" not in [
+                column[1]
+                for column in await db.execute_fetchall("PRAGMA table_info(trueskill)")
+            ]
+
+            # The untouched tables keep their data.
+            assert await db.execute_fetchall("SELECT match_id FROM matches") == [
+                (1,),
+                (1,),
+            ]
+
+            # The head to head records are backfilled from the match history.
+            assert await db.execute_fetchall(
+                "SELECT player_id, opponent_id, wins, losses, last_played FROM head_to_head ORDER BY player_id"
+            ) == [(1, 2, 2, 0, 200), (2, 1, 0, 2, 200)]
+            assert await db.execute_fetchall(
+                "SELECT user_id, match_id, timestamp FROM rating_history ORDER BY user_id, timestamp"
+            ) == [(1, 1, 100), (1, 1, 200), (2, 1, 100), (2, 1, 200)]
+
+            # The current month counts as decayed already.
+            assert (
+                len(await db.execute_fetchall("SELECT * FROM rating_decay_runs")) == 1
+            )
+
+            # Every migration is recorded once.
+            assert await db.execute_fetchall(
+                "SELECT version, name FROM schema_version ORDER BY version"
+            ) == [(i + 1, m.__name__) for i, m in enumerate(MIGRATIONS)]
+            assert await db.execute_fetchall("SELECT * FROM pending_rebuilds") == []
+
+            # Duplicate keys are now rejected.
+            with pytest.raises(aiosqlite.IntegrityError):
+                await db.execute("INSERT INTO level VALUES (2, 0, 0, 0)")
+
+            # And the hot queries no longer scan the whole table.
+            for query in [
+                "SELECT * FROM level WHERE id = 1",
+                "SELECT * FROM trueskill WHERE user_id = 1",
+                "SELECT * FROM matches WHERE winner_id = 1 OR loser_id = 1 ORDER BY timestamp DESC LIMIT 5",
+                "SELECT * FROM matches WHERE match_id = 1",
+                "SELECT * FROM head_to_head WHERE player_id = 1 AND opponent_id = 2",
+                "SELECT 1 FROM matches WHERE loser_id = 1 AND timestamp > 0 AND timestamp <= 100",
+                "SELECT * FROM rating_history_summary WHERE user_id = 1 AND period = 'weekly' ORDER BY period_start DESC LIMIT 30",
+                "SELECT * FROM reminder WHERE date < 100",
+                "SELECT * FROM starboardmessages WHERE original_id = 1",
+                "SELECT * FROM warnings WHERE user_id = 1",
+            ]:
+                plan = await get_query_plan(db, query)
+                assert "SEARCH" in plan and "SCAN" not in plan, (query, plan)
+
+    asyncio.run(check())
+
+
+def test_failed_rebuild(tmp_path, monkeypatch) -> None:
+    filepath = str(tmp_path / "database.db")
+    asyncio.run(create_fixture(filepath))
+
+    async def fail(db: aiosqlite.Connection) -> None:
+        raise aiosqlite.OperationalError("database is locked")
+
+    # The migrations and the other rebuilds are done, but the failed one is still requested.
+    # That does not stop the startup.
+    monkeypatch.setitem(utils.migrations.REBUILDS, "head_to_head", fail)
+    assert asyncio.run(run_migrations(filepath)) == len(MIGRATIONS)
+
+    async def get_state() -> tuple[list, list]:
+        async with aiosqlite.connect(filepath) as db:
+            return (
+                await db.execute_fetchall(
+                    "SELECT name FROM pending_rebuilds ORDER BY name"
+                ),
+                await db.execute_fetchall("SELECT player_id FROM head_to_head"),
+            )
+
+    assert asyncio.run(get_state()) == ([("head_to_head",)], [])
+
+    # So it runs again on the next startup.
+    monkeypatch.undo()
+    assert asyncio.run(run_migrations(filepath)) == len(MIGRATIONS)
+    assert asyncio.run(get_state()) == ([], [(1,), (2,)])
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from utils.order_statistics import FenwickTree, OrderStatisticList
+
+
+def test_fenwick_tree() -> None:
+    values = [3, 0, 5, 1, 2]
+    tree = FenwickTree(values)
+
+    assert [tree.prefix_sum(i) for i in range(6)] == [0, 3, 3, 8, 9, 11]
+    assert tree.find(0) == (0, 0)
+    assert tree.find(3) == (2, 0)
+    assert tree.find(7) == (2, 4)
+    assert tree.find(10) == (4, 1)
+
+    tree.add(1, 4)
+    assert tree.prefix_sum(2) == 7
+    assert tree.find(5) == (1, 2)
+
+
+def test_order_statistic_list() -> None:
+    random.seed(1)
+
+    # A tiny load, so that we split and drop a lot of buckets.
+    values = random.sample(range(10_000), 500)
+    order_list = OrderStatisticList(values[:200], load=8)
+    reference = sorted(values[:200])
+
+    for value in values[200:]:
+        order_list.add(value)
+        reference.append(value)
+    reference.sort()
+
+    for i, value in enumerate(random.sample(values, 300)):
+        order_list.remove(value)
+        reference.remove(value)
+
+        if random.random() < 0.5:
+            new_value = random.randint(10_000, 20_000) * 1000 + i
+            order_list.add(new_value)
+            reference.append(new_value)
+            reference.sort()
+
+    assert len(order_list) == len(reference)
+    assert list(order_list) == reference
+
+    for position, value in enumerate(reference):
+        assert order_list[position] == value
+        assert order_list.index(value) == position
+        assert value in order_list
+
+    assert order_list[-1] == reference[-1]
+    assert order_list.slice(10, 40) == reference[10:40]
+    assert order_list.slice(-5, 3) == reference[:3]
+    assert order_list.slice(len(reference) - 2, len(reference) + 5) == reference[-2:]
+
+    assert -1 not in order_list
+    with pytest.raises(ValueError):
+        order_list.remove(-1)
+    with pytest.raises(IndexError):
+        order_list[len(reference)]
+
+
+def test_order_statistic_list_empty() -> None:
+    order_list = OrderStatisticList()
+
+    assert len(order_list) == 0
+    assert order_list.slice(0, 10) == []
+    assert 5 not in order_list
+
+    order_list.add(5)
+    order_list.remove(5)
+    assert list(order_list) == []
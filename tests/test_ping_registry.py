@@ -0,0 +1,64 @@
+import asyncio
+
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.ping_registry import Ping, PingRegistry
+from utils.sqlite import setup_db
+
+
+def test_ping_registry(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            pings = PingRegistry(db, max_age=1800)
+
+            await pings.add("singles", Ping(1, 10, 100, 0))
+            await pings.add("singles", Ping(2, 10, 100, 100))
+            await pings.add("singles", Ping(3, 20, 200, 200))
+            await pings.add("doubles", Ping(1, 10, 100, 300))
+            # Pinging again replaces the old ping, even in another guild.
+            await pings.add("singles", Ping(2, 20, 200, 400))
+
+            assert pings.get_recent("singles", 100, 500) == [Ping(1, 10, 100, 0)]
+            assert pings.get_all_recent("singles", 500) == [
+                Ping(2, 20, 200, 400),
+                Ping(3, 20, 200, 200),
+                Ping(1, 10, 100, 0),
+            ]
+            assert pings.get_all_recent("doubles", 500) == [Ping(1, 10, 100, 300)]
+
+            # The first one expires, then the replaced one is cleaned up too.
+            assert pings.get_recent("singles", 100, 1800) == []
+            assert len(pings.queues[("singles", 100)]) == 1
+            assert pings.get_recent("singles", 100, 1900) == []
+            assert ("singles", 100) not in pings.queues
+            assert pings.get_all_recent("singles", 1900) == [
+                Ping(2, 20, 200, 400),
+                Ping(3, 20, 200, 200),
+            ]
+
+            # After a restart everything that is still recent is back.
+            restarted = PingRegistry(db, max_age=1800)
+            await restarted.load(2000)
+            assert restarted.get_all_recent("singles", 2000) == [Ping(2, 20, 200, 400)]
+            assert restarted.get_all_recent("doubles", 2000) == [Ping(1, 10, 100, 300)]
+            assert await db.fetchone("""SELECT COUNT(*) FROM matchmaking_pings""") == (
+                2,
+            )
+
+            await restarted.clear()
+            assert restarted.get_all_recent("singles", 2000) == []
+            assert await db.fetchone("""SELECT COUNT(*) FROM matchmaking_pings""") == (
+                0,
+            )
+        finally:
+            await db.close()
+
+    asyncio.run(run())
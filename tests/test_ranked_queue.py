@@ -0,0 +1,61 @@
+import random
+
+from utils.ranked_queue import RankedQueue
+
+
+def test_ranked_queue() -> None:
+    now = 0.0
+    queue = RankedQueue(
+        base_window=2, window_growth=0.1, max_window=10, clock=lambda: now
+    )
+
+    # Nobody close enough yet.
+    assert queue.join(1, 10.0) is None
+    assert queue.join(2, 15.0) is None
+    now = 5.0
+    assert queue.join(3, 0.0) is None
+    assert len(queue) == 3
+
+    # The closest neighbour gets picked, and both leave the queue.
+    assert queue.join(4, 13.5) == 2
+    assert 2 not in queue and 4 not in queue
+
+    # Joining again only updates the rating.
+    assert queue.join(1, 9.0) is None
+    assert len(queue) == 2
+
+    # After 20 seconds, the windows are not wide enough for 9 apart yet.
+    now = 20.0
+    assert queue.pair_waiting() == []
+
+    # After 100 seconds they fit, the one who joined first comes first.
+    now = 100.0
+    queue.join(5, 30.0)
+    assert queue.pair_waiting() == [(1, 3)]
+    assert queue.remove(5)
+    assert not queue.remove(5)
+    assert len(queue) == 0
+
+
+def test_ranked_queue_pairs_closest() -> None:
+    now = 0.0
+    queue = RankedQueue(
+        base_window=0, window_growth=1, max_window=100, clock=lambda: now
+    )
+
+    random.seed(4)
+    ratings = {user_id: random.uniform(0, 40) for user_id in range(200)}
+    for user_id, rating in ratings.items():
+        assert queue.join(user_id, rating) is None
+
+    # Once everyone fits everyone, we pair up neighbours, the closest ones first.
+    now = 1000.0
+    pairs = queue.pair_waiting()
+    assert len(queue) == 0
+    assert sorted(user_id for pair in pairs for user_id in pair) == list(range(200))
+
+    ordered = sorted(ratings, key=ratings.get)
+    closest = min(
+        zip(ordered, ordered[1:]), key=lambda pair: ratings[pair[1]] - ratings[pair[0]]
+    )
+    assert tuple(sorted(pairs[0])) == tuple(sorted(closest))
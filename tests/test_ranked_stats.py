@@ -0,0 +1,274 @@
+import asyncio
+import random
+
+import pytest
+import trueskill
+
+import utils.ranked_stats
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.rating import get_display_rank
+from utils.sqlite import setup_db
+
+
+def test_recent_form(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+    random.seed(2)
+    results = [random.random() < 0.6 for _ in range(100)]
+
+    form = utils.ranked_stats.RecentForm.from_history("WWLWLLLW")
+    assert form.last_results(5) == "WLLLW"
+    assert (form.current_winstreak, form.current_losestreak) == (1, 0)
+    assert (form.longest_winstreak, form.longest_losestreak) == (2, 3)
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.execute(
+                """INSERT INTO trueskill (user_id, rating, deviation, wins, losses) VALUES (1, 25, 25 / 3, 0, 0)"""
+            )
+
+            # The SQL version has to end up at the same place as the Python one.
+            form = utils.ranked_stats.RecentForm()
+            for won in results:
+                form.add_result(won)
+                await db.execute(
+                    f"""UPDATE trueskill SET {utils.ranked_stats.ADD_RESULT_SQL} WHERE user_id = 1""",
+                    {"won": int(won)},
+                )
+
+                row = await db.fetchone(
+                    f"""SELECT {utils.ranked_stats.FORM_COLUMNS} FROM trueskill WHERE user_id = 1"""
+                )
+                assert row == tuple(form.to_parameters(1).values())[1:]
+
+            history = "".join("W" if won else "L" for won in results)
+            assert form.last_results(20) == history[::-1][:16]
+
+            # Rebuilding it from the matches gets us the same form, too.
+            await db.executemany(
+                """INSERT INTO matches (match_id, winner_id, loser_id, timestamp) VALUES (:i, :winner_id, :loser_id, :i)""",
+                [
+                    {"i": i, "winner_id": 1 if won else 2, "loser_id": 2 if won else 1}
+                    for i, won in enumerate(results)
+                ],
+            )
+            await db.execute("""UPDATE trueskill SET recent_results = 0""")
+            async with db.transaction() as conn:
+                await utils.ranked_stats.rebuild_form(conn, [1])
+
+            assert (
+                await db.fetchone(
+                    f"""SELECT {utils.ranked_stats.FORM_COLUMNS} FROM trueskill WHERE user_id = 1"""
+                )
+                == tuple(form.to_parameters(1).values())[1:]
+            )
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+def test_ranked_player_stats(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+    random.seed(11)
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            # Reporting matches like the ranking cog does.
+            ratings = {user_id: trueskill.Rating() for user_id in range(12)}
+            await db.executemany(
+                """INSERT INTO trueskill (user_id, rating, deviation, wins, losses) VALUES (:user_id, 25, 25 / 3, 0, 0)""",
+                [{"user_id": user_id} for user_id in ratings],
+            )
+
+            for i in range(200):
+                winner_id, loser_id = random.sample(range(12), 2)
+                old_winner, old_loser = ratings[winner_id], ratings[loser_id]
+                new_winner, new_loser = trueskill.rate_1vs1(old_winner, old_loser)
+                ratings[winner_id], ratings[loser_id] = new_winner, new_loser
+
+                async with db.transaction() as conn:
+                    for user_id, rating, result in (
+                        (winner_id, new_winner, "W"),
+                        (loser_id, new_loser, "L"),
+                    ):
+                        await conn.execute(
+                            """UPDATE trueskill SET rating = :rating, deviation = :deviation,
+                            wins = wins + :won, losses = losses + 1 - :won WHERE user_id = :user_id""",
+                            {
+                                "rating": rating.mu,
+                                "deviation": rating.sigma,
+                                "won": int(result == "W"),
+                                "user_id": user_id,
+                            },
+                        )
+                    await conn.execute(
+                        """INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (i, winner_id, loser_id, i * 60)
+                        + (
+                            old_winner.mu,
+                            old_winner.sigma,
+                            old_loser.mu,
+                            old_loser.sigma,
+                        )
+                        + (
+                            new_winner.mu,
+                            new_winner.sigma,
+                            new_loser.mu,
+                            new_loser.sigma,
+                        ),
+                    )
+                    await utils.ranked_stats.record_match(
+                        conn,
+                        winner_id,
+                        loser_id,
+                        i * 60,
+                        old_winner,
+                        new_winner,
+                        old_loser,
+                        new_loser,
+                    )
+                    await utils.ranked_stats.record_head_to_head(
+                        conn,
+                        winner_id,
+                        loser_id,
+                        i * 60,
+                        old_winner,
+                        new_winner,
+                        old_loser,
+                        new_loser,
+                    )
+
+            incremental = await db.fetchall(
+                """SELECT * FROM ranked_player_stats ORDER BY user_id"""
+            )
+
+            # The stats we keep up to date have to match what the old queries got us.
+            leaderboard = await db.fetchall(
+                """SELECT user_id, row_number() OVER (ORDER BY (rating - 3 * deviation) DESC) FROM trueskill WHERE wins + losses > 4"""
+            )
+            positions = dict(leaderboard)
+            assert (
+                await db.fetchall(
+                    f"""SELECT user_id, {utils.ranked_stats.POSITION_SQL}, {utils.ranked_stats.LEADERBOARD_SIZE_SQL}
+                FROM trueskill ORDER BY user_id"""
+                )
+                == [
+                    (user_id, positions.get(user_id), len(positions))
+                    for user_id in range(12)
+                ]
+            )
+
+            for row in incremental:
+                user_id = row[0]
+                stats = utils.ranked_stats.PlayerStats(row[1:])
+
+                best_win = await db.fetchone(
+                    """SELECT loser_id, old_loser_rating, timestamp FROM matches WHERE winner_id = :user_id
+                    ORDER BY (old_loser_rating - 3 * old_loser_deviation) DESC LIMIT 1""",
+                    {"user_id": user_id},
+                )
+                assert best_win == (
+                    stats.best_win_opponent,
+                    stats.best_win.mu,
+                    stats.best_win_timestamp,
+                )
+
+                opponents = await db.fetchall(
+                    """SELECT old_loser_rating, old_loser_deviation FROM matches WHERE winner_id = :user_id
+                    UNION ALL
+                    SELECT old_winner_rating, old_winner_deviation FROM matches WHERE loser_id = :user_id""",
+                    {"user_id": user_id},
+                )
+                assert stats.opponents == len(opponents)
+                assert stats.opponent_rank_sum == sum(
+                    get_display_rank(trueskill.Rating(*opponent))
+                    for opponent in opponents
+                )
+
+                # Before or after a loss, or after a win.
+                candidates = []
+                for match in await db.fetchall(
+                    """SELECT * FROM matches WHERE winner_id = :user_id OR loser_id = :user_id""",
+                    {"user_id": user_id},
+                ):
+                    if match[1] == user_id:
+                        candidates.append(trueskill.Rating(match[8], match[9]))
+                    else:
+                        candidates.append(trueskill.Rating(match[6], match[7]))
+                        candidates.append(trueskill.Rating(match[10], match[11]))
+
+                peak = max(candidates, key=utils.ranked_stats.conservative_rating)
+                assert get_display_rank(stats.peak) == get_display_rank(peak)
+
+            # Rebuilding from the match history gets us to the same place.
+            async with db.transaction() as conn:
+                assert await utils.ranked_stats.rebuild_stats(conn) == 12
+
+            rebuilt = await db.fetchall(
+                """SELECT * FROM ranked_player_stats ORDER BY user_id"""
+            )
+            for old_row, new_row in zip(incremental, rebuilt, strict=True):
+                assert old_row[0] == new_row[0]
+                assert old_row[1:-1] == pytest.approx(new_row[1:-1])
+
+            # Every pair shows up twice, once from each side.
+            head_to_head = await db.fetchall(
+                """SELECT * FROM head_to_head ORDER BY player_id, opponent_id"""
+            )
+            for player_id, opponent_id, wins, losses, last_played, _ in head_to_head:
+                assert (opponent_id, player_id, losses, wins, last_played) in [
+                    row[:5] for row in head_to_head
+                ]
+                assert (
+                    await db.fetchone(
+                        """SELECT COUNT(*), MAX(timestamp) FROM matches
+                    WHERE winner_id = :player_id AND loser_id = :opponent_id
+                    OR winner_id = :opponent_id AND loser_id = :player_id""",
+                        {"player_id": player_id, "opponent_id": opponent_id},
+                    )
+                    == (wins + losses, last_played)
+                )
+
+            swings = {}
+            for row in head_to_head:
+                swings[row[0]] = swings.get(row[0], 0) + row[5]
+            for user_id, rating in ratings.items():
+                assert swings[user_id] == pytest.approx(
+                    utils.ranked_stats.conservative_rating(rating)
+                    - utils.ranked_stats.conservative_rating(trueskill.Rating())
+                )
+
+            async with db.transaction() as conn:
+                await utils.ranked_stats.rebuild_head_to_head(conn, [3, 7])
+                await conn.execute("""DELETE FROM head_to_head WHERE player_id = 0""")
+                await utils.ranked_stats.rebuild_head_to_head(conn, [0])
+            assert await db.fetchall(
+                """SELECT * FROM head_to_head ORDER BY player_id, opponent_id"""
+            ) == pytest.approx(head_to_head)
+
+            async with db.transaction() as conn:
+                await utils.ranked_stats.rebuild_head_to_head(conn)
+            rebuilt = await db.fetchall(
+                """SELECT * FROM head_to_head ORDER BY player_id, opponent_id"""
+            )
+            assert [row[:5] for row in rebuilt] == [row[:5] for row in head_to_head]
+            assert [row[5] for row in rebuilt] == pytest.approx(
+                [row[5] for row in head_to_head]
+            )
+        finally:
+            await db.close()
+
+    asyncio.run(run())
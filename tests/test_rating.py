@@ -0,0 +1,280 @@
+import asyncio
+import random
+
+import pytest
+import trueskill
+
+import utils.rating
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.rating import (
+    DECAY_FACTOR,
+    MAX_DEVIATION,
+    RatingReplay,
+    rate_1vs1,
+    replay_season,
+    rerate_match,
+)
+from utils.sqlite import setup_db
+
+
+def naive_replay(matches: list[tuple[int, int, int]], start: int, end: int) -> dict:
+    players = {}
+
+    for winner_id, loser_id, timestamp in matches:
+        if not start <= timestamp <= end:
+            continue
+
+        for user_id in (winner_id, loser_id):
+            players.setdefault(
+                user_id, {"rating": trueskill.Rating(), "wins": 0, "losses": 0}
+            )
+
+        winner, loser = players[winner_id], players[loser_id]
+        winner["rating"], loser["rating"] = trueskill.rate_1vs1(
+            winner["rating"], loser["rating"]
+        )
+        winner["wins"] += 1
+        loser["losses"] += 1
+
+    return players
+
+
+def assert_same_players(players: dict, expected: dict) -> None:
+    # The shortcut in rate_1vs1 and storing ratings in checkpoints can both be off by a rounding error.
+    assert players.keys() == expected.keys()
+
+    for user_id, player in players.items():
+        assert player["wins"] == expected[user_id]["wins"]
+        assert player["losses"] == expected[user_id]["losses"]
+        assert player["rating"].mu == pytest.approx(expected[user_id]["rating"].mu)
+        assert player["rating"].sigma == pytest.approx(
+            expected[user_id]["rating"].sigma
+        )
+
+
+def test_rate_1vs1() -> None:
+    random.seed(1)
+
+    for _ in range(1000):
+        winner = trueskill.Rating(random.uniform(0, 50), random.uniform(0.5, 8.4))
+        loser = trueskill.Rating(random.uniform(0, 50), random.uniform(0.5, 8.4))
+
+        for new, expected in zip(
+            rate_1vs1(winner, loser), trueskill.rate_1vs1(winner, loser)
+        ):
+            assert new.mu == pytest.approx(expected.mu)
+            assert new.sigma == pytest.approx(expected.sigma)
+
+
+def test_rating_replay() -> None:
+    replay = RatingReplay()
+    replay.add_match(1, 2)
+    replay.add_match(1, 3)
+
+    snapshot = replay.snapshot()
+    replay.add_match(3, 1)
+
+    assert snapshot[1]["wins"] == 2 and snapshot[1]["losses"] == 0
+    assert replay.players[1]["losses"] == 1
+    assert replay.players[1]["rating"] != snapshot[1]["rating"]
+    assert replay.matches == 3
+
+
+def test_replay_season(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(utils.rating, "CHECKPOINT_INTERVAL", 50)
+    filepath = str(tmp_path / "database.db")
+
+    random.seed(3)
+    # Some matches share a timestamp, which checkpoints must not split up.
+    matches = []
+    for i in range(600):
+        winner_id, loser_id = random.sample(range(30), 2)
+        matches.append((winner_id, loser_id, 1000 + i // 3))
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.executemany(
+                """INSERT INTO matches (match_id, winner_id, loser_id, timestamp) VALUES (:match_id, :winner_id, :loser_id, :timestamp)""",
+                [
+                    {
+                        "match_id": i,
+                        "winner_id": winner_id,
+                        "loser_id": loser_id,
+                        "timestamp": timestamp,
+                    }
+                    for i, (winner_id, loser_id, timestamp) in enumerate(matches)
+                ],
+            )
+
+            # The first run has to replay everything and stores checkpoints along the way.
+            assert_same_players(
+                await replay_season(db, 1010, 1150), naive_replay(matches, 1010, 1150)
+            )
+            checkpoints = await db.fetchall(
+                """SELECT DISTINCT season_start, timestamp FROM rating_checkpoints"""
+            )
+            assert len(checkpoints) == 8
+            assert all(start == 1010 for start, _ in checkpoints)
+
+            # The next runs start from a checkpoint, but end up at the same result.
+            for end in (1150, 1100, 1199, 1050):
+                assert_same_players(
+                    await replay_season(db, 1010, end),
+                    naive_replay(matches, 1010, end),
+                )
+
+            # Other seasons do not use them.
+            assert_same_players(
+                await replay_season(db, 1011, 1120), naive_replay(matches, 1011, 1120)
+            )
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+def simulate(events: list[tuple]) -> tuple[dict, dict]:
+    """Plays through matches and monthly decays like the bot does,
+    and gets you the match rows and the ranked profiles at the end.
+    """
+    players = {}
+    matches = {}
+
+    for event in events:
+        if event[0] == "decay":
+            rating = players[event[1]]["rating"]
+            players[event[1]]["rating"] = trueskill.Rating(
+                rating.mu, min(rating.sigma * DECAY_FACTOR, MAX_DEVIATION)
+            )
+            continue
+
+        _, match_id, winner_id, loser_id, timestamp = event
+        for user_id in (winner_id, loser_id):
+            players.setdefault(
+                user_id,
+                {"rating": trueskill.Rating(), "wins": 0, "losses": 0},
+            )
+
+        winner, loser = players[winner_id], players[loser_id]
+        old_winner, old_loser = winner["rating"], loser["rating"]
+        winner["rating"], loser["rating"] = trueskill.rate_1vs1(old_winner, old_loser)
+        winner["wins"] += 1
+        loser["losses"] += 1
+
+        matches[match_id] = (
+            match_id,
+            winner_id,
+            loser_id,
+            timestamp,
+            old_winner.mu,
+            old_winner.sigma,
+            old_loser.mu,
+            old_loser.sigma,
+            winner["rating"].mu,
+            winner["rating"].sigma,
+            loser["rating"].mu,
+            loser["rating"].sigma,
+        )
+
+    return (matches, players)
+
+
+def test_rerate_match(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+
+    random.seed(5)
+    events = []
+    for i in range(300):
+        # Players 0 to 5 only ever play each other, and 6 and 7 stop playing early on.
+        if i < 20:
+            winner_id, loser_id = random.sample(range(8), 2)
+        elif i % 3 == 0:
+            winner_id, loser_id = random.sample(range(8, 10), 2)
+        else:
+            winner_id, loser_id = random.sample(range(6), 2)
+        events.append(("match", 1000 + i, winner_id, loser_id, i // 2))
+
+        if i == 150:
+            events.append(("decay", 0))
+            events.append(("decay", 6))
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            matches, players = simulate(events)
+            await db.executemany(
+                """INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                list(matches.values()),
+            )
+            await db.executemany(
+                """INSERT INTO trueskill (user_id, rating, deviation, wins, losses) VALUES (?, ?, ?, ?, ?)""",
+                [
+                    (
+                        user_id,
+                        p["rating"].mu,
+                        p["rating"].sigma,
+                        p["wins"],
+                        p["losses"],
+                    )
+                    for user_id, p in players.items()
+                ],
+            )
+
+            async def check(expected_events: list[tuple]) -> None:
+                expected_matches, expected_players = simulate(expected_events)
+
+                rows = await db.fetchall("""SELECT * FROM matches""")
+                assert len(rows) == len(expected_matches)
+                for row in rows:
+                    assert row[:4] == expected_matches[row[0]][:4]
+                    assert row[4:] == pytest.approx(expected_matches[row[0]][4:])
+
+                rows = await db.fetchall(
+                    """SELECT user_id, rating, deviation, wins, losses FROM trueskill"""
+                )
+                for user_id, rating, deviation, wins, losses in rows:
+                    expected = expected_players[user_id]
+                    assert (wins, losses) == (expected["wins"], expected["losses"])
+                    assert rating == pytest.approx(expected["rating"].mu)
+                    assert deviation == pytest.approx(expected["rating"].sigma)
+
+            # Swapping a match that players 8 and 9 were never part of.
+            swapped = [
+                (e[0], e[1], e[3], e[2], e[4]) if e[:2] == ("match", 1050) else e
+                for e in events
+            ]
+            async with db.transaction() as conn:
+                rerated, affected = await rerate_match(conn, 1050, swap=True)
+            await check(swapped)
+            assert 8 not in affected and 9 not in affected
+            # Only the later matches that actually changed got re-calculated.
+            swapped_matches, _ = simulate(swapped)
+            assert rerated == len(
+                [
+                    match_id
+                    for match_id, row in swapped_matches.items()
+                    if match_id > 1050 and row != matches[match_id]
+                ]
+            )
+
+            # Deleting one of the first matches.
+            deleted = [e for e in swapped if e[:2] != ("match", 1003)]
+            async with db.transaction() as conn:
+                await rerate_match(conn, 1003)
+            await check(deleted)
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,131 @@
+import asyncio
+import datetime
+import random
+
+import pytest
+
+import utils.rating_decay
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.rating import DECAY_FACTOR, MAX_DEVIATION
+from utils.sqlite import setup_db
+
+
+def test_decay_periods() -> None:
+    assert utils.rating_decay.get_period(2024, 0) == "2023-12"
+    assert utils.rating_decay.get_period(2024, 13) == "2025-01"
+    assert utils.rating_decay.get_next_period("2024-12") == "2025-01"
+
+    assert (
+        utils.rating_decay.get_due_period(datetime.datetime(2024, 5, 1, 11, 59))
+        == "2024-04"
+    )
+    assert (
+        utils.rating_decay.get_due_period(datetime.datetime(2024, 5, 1, 12))
+        == "2024-05"
+    )
+    assert (
+        utils.rating_decay.get_due_period(datetime.datetime(2024, 1, 1, 0)) == "2023-12"
+    )
+
+    # Being offline over new year.
+    assert utils.rating_decay.get_missed_periods(
+        "2023-11", datetime.datetime(2024, 2, 3)
+    ) == ["2023-12", "2024-01", "2024-02"]
+    assert (
+        utils.rating_decay.get_missed_periods("2024-02", datetime.datetime(2024, 2, 3))
+        == []
+    )
+    assert utils.rating_decay.get_missed_periods(
+        None, datetime.datetime(2024, 2, 3)
+    ) == ["2024-02"]
+
+
+def test_decay_period(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+    random.seed(3)
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.execute("""DELETE FROM rating_decay_runs""")
+
+            deviations = {
+                user_id: random.choice([2.5, 4.0, 8.2, MAX_DEVIATION])
+                for user_id in range(50)
+            }
+            await db.executemany(
+                """INSERT INTO trueskill (user_id, rating, deviation, wins, losses) VALUES (:user_id, 25, :deviation, 0, 0)""",
+                [
+                    {"user_id": user_id, "deviation": deviation}
+                    for user_id, deviation in deviations.items()
+                ],
+            )
+
+            # Matches all over April and May, some right at the edges of the month.
+            april = utils.rating_decay.get_period_start("2024-04").timestamp()
+            may = utils.rating_decay.get_period_start("2024-05").timestamp()
+            timestamps = [april, april + 1, may, may + 1] + [
+                random.uniform(april - 10**6, may + 10**6) for _ in range(20)
+            ]
+            matches = [
+                (match_id, *random.sample(range(50), 2), int(timestamp))
+                for match_id, timestamp in enumerate(timestamps)
+            ]
+            await db.executemany(
+                """INSERT INTO matches (match_id, winner_id, loser_id, timestamp) VALUES (?, ?, ?, ?)""",
+                matches,
+            )
+
+            # How the old decay task did it, one player at a time.
+            active_players = set()
+            for _, winner_id, loser_id, timestamp in matches:
+                if april < timestamp <= may:
+                    active_players.update((winner_id, loser_id))
+
+            expected = {
+                user_id: (
+                    deviation
+                    if user_id in active_players
+                    else min(deviation * DECAY_FACTOR, MAX_DEVIATION)
+                )
+                for user_id, deviation in deviations.items()
+            }
+            touched = [
+                user_id
+                for user_id in deviations
+                if user_id not in active_players and deviations[user_id] < MAX_DEVIATION
+            ]
+
+            async with db.transaction() as conn:
+                assert await utils.rating_decay.decay_period(
+                    conn, "2024-05", dry_run=True
+                ) == len(touched)
+            assert await db.fetchall(
+                """SELECT user_id, deviation FROM trueskill ORDER BY user_id"""
+            ) == list(deviations.items())
+
+            async with db.transaction() as conn:
+                assert await utils.rating_decay.decay_period(conn, "2024-05") == len(
+                    touched
+                )
+                # Only ever once per month.
+                assert await utils.rating_decay.decay_period(conn, "2024-05") == 0
+                assert await utils.rating_decay.get_last_period(conn) == "2024-05"
+
+            decayed = await db.fetchall(
+                """SELECT user_id, deviation FROM trueskill ORDER BY user_id"""
+            )
+            assert dict(decayed) == pytest.approx(expected)
+            assert await db.fetchone(
+                """SELECT period, players FROM rating_decay_runs"""
+            ) == ("2024-05", len(touched))
+        finally:
+            await db.close()
+
+    asyncio.run(run())
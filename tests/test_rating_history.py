@@ -0,0 +1,176 @@
+import asyncio
+import datetime
+import random
+
+import pytest
+import trueskill
+
+import utils.rating_history
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.sqlite import setup_db
+
+
+def test_periods() -> None:
+    timestamp = int(
+        datetime.datetime(2024, 5, 16, 13, 30, tzinfo=datetime.timezone.utc).timestamp()
+    )
+
+    day = utils.rating_history.get_period_start(timestamp, "daily")
+    week = utils.rating_history.get_period_start(timestamp, "weekly")
+    assert datetime.datetime.fromtimestamp(
+        day, datetime.timezone.utc
+    ) == datetime.datetime(2024, 5, 16, tzinfo=datetime.timezone.utc)
+    # The Monday of that week.
+    assert datetime.datetime.fromtimestamp(
+        week, datetime.timezone.utc
+    ) == datetime.datetime(2024, 5, 13, tzinfo=datetime.timezone.utc)
+
+    assert utils.rating_history.get_sparkline([]) == ""
+    assert utils.rating_history.get_sparkline([1, 1]) == "▅▅"
+    assert utils.rating_history.get_sparkline([0, 3.5, 7]) == "▁▅█"
+
+
+def test_rating_history(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+    random.seed(5)
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            ratings = {user_id: trueskill.Rating() for user_id in range(8)}
+            timestamp = 1_700_000_000
+
+            for match_id in range(300):
+                # A couple of matches at the same time, to make sure the order they were logged in counts.
+                timestamp += random.choice([0, 600, 3 * 60 * 60, 2 * 24 * 60 * 60])
+                winner_id, loser_id = random.sample(range(8), 2)
+                old_winner, old_loser = ratings[winner_id], ratings[loser_id]
+                new_winner, new_loser = trueskill.rate_1vs1(old_winner, old_loser)
+                ratings[winner_id], ratings[loser_id] = new_winner, new_loser
+
+                async with db.transaction() as conn:
+                    await conn.execute(
+                        """INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (match_id, winner_id, loser_id, timestamp)
+                        + (
+                            old_winner.mu,
+                            old_winner.sigma,
+                            old_loser.mu,
+                            old_loser.sigma,
+                        )
+                        + (
+                            new_winner.mu,
+                            new_winner.sigma,
+                            new_loser.mu,
+                            new_loser.sigma,
+                        ),
+                    )
+                    await utils.rating_history.record_history(
+                        conn,
+                        match_id,
+                        timestamp,
+                        [
+                            (winner_id, old_winner, new_winner),
+                            (loser_id, old_loser, new_loser),
+                        ],
+                    )
+
+            history = await db.fetchall(
+                """SELECT * FROM rating_history ORDER BY user_id, match_id"""
+            )
+            summaries = await db.fetchall(
+                """SELECT * FROM rating_history_summary ORDER BY user_id, period, period_start"""
+            )
+
+            assert len(history) == 600
+            for user_id, rating in ratings.items():
+                latest = await db.fetchone(
+                    """SELECT rating, deviation FROM rating_history WHERE user_id = :user_id
+                    ORDER BY timestamp DESC, rowid DESC LIMIT 1""",
+                    {"user_id": user_id},
+                )
+                assert latest == (rating.mu, rating.sigma)
+
+            for period in utils.rating_history.PERIODS:
+                rows = [row for row in summaries if row[1] == period]
+                assert sum(row[3] for row in rows) == 600
+
+                # Every period picks up where the last one left off.
+                for previous, current in zip(rows, rows[1:]):
+                    if previous[0] == current[0]:
+                        assert previous[2] < current[2]
+                        assert previous[5] == current[4]
+                    assert current[6] <= min(current[4], current[5])
+                    assert current[7] >= max(current[4], current[5])
+
+            # Rebuilding from the match history gets us to the same place.
+            async with db.transaction() as conn:
+                await utils.rating_history.rebuild_history(conn, [2, 5])
+            assert (
+                await db.fetchall(
+                    """SELECT * FROM rating_history ORDER BY user_id, match_id"""
+                )
+                == history
+            )
+            assert (
+                await db.fetchall(
+                    """SELECT * FROM rating_history_summary ORDER BY user_id, period, period_start"""
+                )
+                == summaries
+            )
+
+            async with db.transaction() as conn:
+                await utils.rating_history.rebuild_history(conn)
+            assert (
+                await db.fetchall(
+                    """SELECT * FROM rating_history ORDER BY user_id, match_id"""
+                )
+                == history
+            )
+            rebuilt = await db.fetchall(
+                """SELECT * FROM rating_history_summary ORDER BY user_id, period, period_start"""
+            )
+            for old_row, new_row in zip(summaries, rebuilt, strict=True):
+                assert old_row[:4] == new_row[:4]
+                assert old_row[4:] == pytest.approx(new_row[4:])
+
+            # Match IDs are random, so two matches can end up with the same one.
+            async with db.transaction() as conn:
+                for timestamp in (timestamp, timestamp + 600):
+                    await conn.execute(
+                        """INSERT INTO matches VALUES (0, 100, 101, ?, 25, 8, 25, 8, 26, 7, 24, 7)""",
+                        (timestamp,),
+                    )
+                    await utils.rating_history.record_history(
+                        conn,
+                        0,
+                        timestamp,
+                        [
+                            (100, trueskill.Rating(25, 8), trueskill.Rating(26, 7)),
+                            (101, trueskill.Rating(25, 8), trueskill.Rating(24, 7)),
+                        ],
+                    )
+            async with db.transaction() as conn:
+                await utils.rating_history.rebuild_history(conn, [100, 101])
+            assert (
+                await db.fetchall(
+                    """SELECT user_id, match_id, timestamp FROM rating_history WHERE user_id >= 100
+                ORDER BY user_id, rowid"""
+                )
+                == [
+                    (100, 0, timestamp - 600),
+                    (100, 0, timestamp),
+                    (101, 0, timestamp - 600),
+                    (101, 0, timestamp),
+                ]
+            )
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,112 @@
+import asyncio
+import math
+import random
+
+import numpy as np
+import pytest
+
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.rating import DECAY_FACTOR, RatingReplay
+from utils.rating_decay import get_period_start
+from utils.rating_lab import (
+    RatingParameters,
+    build_history,
+    erfc,
+    get_decay_points,
+    load_history,
+    run_experiments,
+)
+from utils.sqlite import setup_db
+
+
+def test_erfc() -> None:
+    x = np.linspace(-6, 6, 1001)
+    assert erfc(x) == pytest.approx([math.erfc(value) for value in x], abs=1e-7)
+
+
+def test_rating_lab(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+    random.seed(8)
+
+    # Players with a hidden skill, the better one wins more often.
+    skills = {user_id: random.gauss(0, 1) for user_id in range(40)}
+    start = int(get_period_start("2024-03").timestamp())
+    matches = []
+    for i in range(3000):
+        first, second = random.sample(range(40), 2)
+        chance = 1 / (1 + math.exp(skills[second] - skills[first]))
+        winner, loser = (first, second) if random.random() < chance else (second, first)
+        matches.append((winner, loser, start + i * 60))
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.executemany(
+                """INSERT INTO matches (match_id, winner_id, loser_id, timestamp) VALUES (?, ?, ?, ?)""",
+                [(i, *match) for i, match in enumerate(matches)],
+            )
+            async with db.reader() as conn:
+                return await load_history(conn)
+        finally:
+            await db.close()
+
+    history = asyncio.run(run())
+    assert len(history) == 3000
+    assert history.user_ids[history.winners[5]] == matches[5][0]
+    assert history.user_ids[history.losers[5]] == matches[5][1]
+
+    # Without decay, the defaults are the same as replaying the matches like the bot does.
+    replay = RatingReplay()
+    for winner, loser, _ in matches:
+        replay.add_match(winner, loser)
+
+    default, too_certain, no_decay = run_experiments(
+        history,
+        [
+            RatingParameters(decay_factor=1),
+            RatingParameters(beta=0.1, tau=2, decay_factor=1),
+            RatingParameters(decay_factor=1),
+        ],
+    )
+    for i, user_id in enumerate(history.user_ids):
+        rating = replay.players[int(user_id)]["rating"]
+        assert default.ratings[i] == pytest.approx(rating.mu, rel=1e-5)
+        assert default.deviations[i] == pytest.approx(rating.sigma, rel=1e-5)
+    assert np.array_equal(default.ratings, no_decay.ratings)
+
+    # Sensible parameters predict the matches better than guessing, bad ones do worse.
+    assert default.log_loss < math.log(2) < too_certain.log_loss
+    assert default.accuracy > 0.6
+
+
+def test_rating_lab_decay() -> None:
+    april = int(get_period_start("2024-04").timestamp())
+    may = int(get_period_start("2024-05").timestamp())
+
+    # Player 3 only plays in March, so they get decayed in May but not in April.
+    history = build_history(
+        [
+            (1, 3, april - 100),
+            (1, 2, april + 1),
+            (1, 2, may + 10),
+            (1, 2, may + 20),
+        ]
+    )
+    assert get_decay_points(history) == [
+        (1, int(get_period_start("2024-03").timestamp())),
+        (2, april),
+    ]
+
+    with_decay, without_decay = run_experiments(
+        history, [RatingParameters(), RatingParameters(decay_factor=1)]
+    )
+    assert np.array_equal(with_decay.deviations[:2], without_decay.deviations[:2])
+    assert with_decay.deviations[2] == pytest.approx(
+        without_decay.deviations[2] * DECAY_FACTOR
+    )
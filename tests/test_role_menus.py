@@ -0,0 +1,70 @@
+import asyncio
+
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.role_menus import RoleMenuIndex
+from utils.sqlite import setup_db
+
+
+def test_role_menus(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.executemany(
+                """INSERT INTO reactrole VALUES (?, ?, ?, ?, ?)""",
+                [
+                    (100, 1, "7 8", "🍎", 1),
+                    (100, 1, "7 8", "<a:dance:123456789012345678>", 2),
+                    (100, 1, "7 8", "🍎", 3),
+                ],
+            )
+
+            menus = RoleMenuIndex(db)
+            await menus.load()
+            assert 100 in menus
+            assert 200 not in menus
+
+            menu = menus.get(100)
+            assert menu.exclusive
+            assert menu.required_role_ids == [7, 8]
+            assert menu.get_role_ids() == [1, 2, 3]
+            assert menu.get_roles_to_add("🍎") == [1, 3]
+            assert menu.get_roles_to_add("🍌") == []
+            # Removing only goes by the emoji ID, since the event does not know if it is animated.
+            assert menu.get_roles_to_add("<:dance:123456789012345678>") == []
+            assert menu.get_roles_to_remove("<:dance:123456789012345678>") == [2]
+
+            # New entries keep the settings of the menu, new menus get the defaults.
+            await menus.add_entry(100, "🍌", 4)
+            await menus.add_entry(200, "🍌", 5)
+            assert menus.get(100).get_roles_to_add("🍌") == [4]
+            assert menus.get(100).exclusive
+            assert not menus.get(200).exclusive
+            assert menus.get(200).required_role_ids == []
+
+            assert await menus.modify(200, True, "9")
+            assert not await menus.modify(300, True, None)
+            assert menus.get(200).required_role_ids == [9]
+
+            assert await menus.delete(100)
+            assert not await menus.delete(100)
+            assert menus.get_message_ids() == [200]
+
+            # Everything made it into the database too.
+            reloaded = RoleMenuIndex(db)
+            await reloaded.load()
+            assert reloaded.get_message_ids() == [200]
+            assert reloaded.get(200).exclusive
+            assert reloaded.get(200).rolereq == "9"
+            assert reloaded.get(200).entries == [("🍌", 5)]
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+from utils.ids import GuildIDs, TGLevelRoleIDs, TGMatchmakingRoleIDs
+from utils.role_tiers import RoleTiers, get_level_tiers, get_ranked_tiers
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, role_ids: list[int]) -> None:
+        self.id = guild_id
+        self.roles = {role_id: f"role {role_id}" for role_id in role_ids}
+        self.lookups = 0
+
+    def get_role(self, role_id: int):
+        self.lookups += 1
+        return self.roles.get(role_id)
+
+
+def test_role_tiers() -> None:
+    tiers = get_ranked_tiers(GuildIDs.TRAINING_GROUNDS)
+    guild = FakeGuild(GuildIDs.TRAINING_GROUNDS, [role_id for _, role_id in tiers])
+    ranked_roles = RoleTiers(get_ranked_tiers)
+
+    # Same as the old if/elif chain.
+    for rating, role_id in [
+        (0, TGMatchmakingRoleIDs.ONE_STAR),
+        (1799, TGMatchmakingRoleIDs.ONE_STAR),
+        (1800, TGMatchmakingRoleIDs.TWO_STAR),
+        (3000, TGMatchmakingRoleIDs.THREE_STAR),
+        (3400, TGMatchmakingRoleIDs.FOUR_STAR),
+        (4999, TGMatchmakingRoleIDs.FIVE_STAR),
+        (5000, TGMatchmakingRoleIDs.GROUNDS_MASTER),
+        (9000, TGMatchmakingRoleIDs.GROUNDS_MASTER),
+    ]:
+        assert ranked_roles.get_role(guild, rating) == f"role {role_id}"
+
+    # The roles are only looked up once.
+    assert guild.lookups == len(tiers)
+    assert len(ranked_roles.get_roles(guild)) == 6
+
+    # Until the roles of the guild change.
+    ranked_roles.clear(guild.id)
+    ranked_roles.get_role(guild, 1000)
+    assert guild.lookups == 2 * len(tiers)
+
+    # Guilds without ranked roles.
+    assert RoleTiers(get_ranked_tiers).get_role(FakeGuild(1, []), 1000) is None
+
+    # A missing role is not cached, it might just not be loaded yet.
+    incomplete = FakeGuild(GuildIDs.TRAINING_GROUNDS, [TGLevelRoleIDs.RECRUIT_ROLE])
+    level_roles = RoleTiers(get_level_tiers)
+    assert level_roles.get_role(incomplete, 50) is None
+    incomplete.roles[TGLevelRoleIDs.LEVEL_50_ROLE] = "level 50"
+    assert level_roles.get_role(incomplete, 74) == "level 50"
+
+    assert level_roles.get_next_tier(incomplete, 9) == (
+        10,
+        None,
+    )
+    assert level_roles.get_next_tier(incomplete, 49) == (50, "level 50")
+    assert level_roles.get_next_tier(incomplete, 100) is None
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from utils.starboard import StarboardConfig, StarCounter, load_config, save_config
+
+
+def test_starboard_config(tmp_path) -> None:
+    path = str(tmp_path / "starboard.json")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"emoji": "⭐"}, f)
+    assert load_config(path) == StarboardConfig("⭐", 100)
+
+    save_config(path, StarboardConfig("⭐", 5))
+    assert load_config(path) == StarboardConfig("⭐", 5)
+
+
+def test_star_counter() -> None:
+    async def run() -> None:
+        stars = StarCounter()
+        fetches = []
+
+        async def seed() -> int:
+            fetches.append(1)
+            await asyncio.sleep(0.01)
+            return 3
+
+        # Only the first reaction fetches the message, the second one is already in there.
+        first, second = await asyncio.gather(
+            stars.update(100, 1, seed), stars.update(100, 1, seed)
+        )
+        assert first == second == 3
+        assert len(fetches) == 1
+
+        # After that, reactions only change the count.
+        assert await stars.update(100, 1, seed) == 4
+        assert await stars.update(100, -1, seed) == 3
+        assert len(fetches) == 1
+
+        async def deleted() -> None:
+            return None
+
+        assert await stars.update(200, 1, deleted) is None
+        assert 200 not in stars
+        assert not stars.seeding
+
+        async def seed_zero() -> int:
+            return 0
+
+        assert await stars.update(300, -1, seed_zero) == 0
+        assert await stars.update(300, -1, seed_zero) == 0
+
+        # Reseeding throws away the old count, like after missing some events.
+        assert await stars.update(100, 1, seed) == 4
+        assert await stars.reseed(100, seed) == 3
+        assert len(fetches) == 2
+
+        stars.forget(100)
+        assert 100 not in stars
+        assert await stars.update(100, 1, seed) == 3
+        assert len(fetches) == 3
+
+        assert stars.prune(200) == [100]
+        assert 100 not in stars
+        assert len(stars) == 1
+
+    asyncio.run(run())
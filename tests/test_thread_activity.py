@@ -0,0 +1,68 @@
+import asyncio
+import datetime
+import time
+
+import discord
+
+from utils.thread_activity import ThreadActivityTracker, get_last_activity
+
+
+class FakeGuild:
+    id = 1
+
+
+class FakeThread:
+    def __init__(self, created_at: float, last_message_at: float = None) -> None:
+        self.id = discord.utils.time_snowflake(
+            datetime.datetime.fromtimestamp(created_at, datetime.timezone.utc)
+        )
+        self.last_message_id = (
+            discord.utils.time_snowflake(
+                datetime.datetime.fromtimestamp(last_message_at, datetime.timezone.utc)
+            )
+            if last_message_at
+            else None
+        )
+        self.guild = FakeGuild()
+
+
+def test_thread_activity() -> None:
+    async def run() -> None:
+        inactive = []
+        tracker = ThreadActivityTracker(
+            3600, lambda thread_id, guild_id: inactive.append(thread_id)
+        )
+        now = time.time()
+
+        # The snowflakes are only precise to the millisecond.
+        new_thread = FakeThread(now - 10)
+        assert abs(get_last_activity(new_thread) - (now - 10)) < 0.01
+        old_thread = FakeThread(now - 7200, now - 3599.95)
+        assert abs(get_last_activity(old_thread) - (now - 3599.95)) < 0.01
+        assert not tracker.is_inactive(old_thread)
+
+        tracker.track(new_thread)
+        tracker.track(old_thread)
+        assert new_thread.id in tracker
+        assert len(tracker) == 2
+
+        # Deleted right at their deadline, not on the next sweep.
+        await asyncio.sleep(0.1)
+        assert inactive == [old_thread.id]
+        assert tracker.is_inactive(old_thread)
+
+        # A new message pushes the deadline back.
+        tracker.touch(new_thread.id, 1, now - 3599.9)
+        tracker.touch(new_thread.id, 1, now)
+        await asyncio.sleep(0.2)
+        assert inactive == [old_thread.id]
+
+        tracker.touch(new_thread.id, 1, now - 3600)
+        tracker.remove(new_thread.id)
+        await asyncio.sleep(0.01)
+        assert inactive == [old_thread.id]
+        assert len(tracker) == 0
+
+        tracker.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+import asyncio
+
+import discord
+
+from utils.users import UserResolver
+
+
+class FakeResponse:
+    status = 404
+    reason = "Not Found"
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.cached = {1: "cached user"}
+        self.fetches = []
+        self.running = 0
+        self.max_running = 0
+
+    def get_user(self, user_id: int):
+        return self.cached.get(user_id)
+
+    async def fetch_user(self, user_id: int):
+        self.fetches.append(user_id)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+
+        if user_id == 404:
+            raise discord.NotFound(FakeResponse(), "Unknown User")
+        return f"fetched user {user_id}"
+
+
+def test_user_resolver() -> None:
+    async def run() -> None:
+        client = FakeClient()
+        resolver = UserResolver(client, max_size=5, concurrency=2)
+
+        users = await resolver.resolve([1, 2, 3, 2, 404, 4, 5])
+        assert users == {
+            1: "cached user",
+            2: "fetched user 2",
+            3: "fetched user 3",
+            404: None,
+            4: "fetched user 4",
+            5: "fetched user 5",
+        }
+        # Duplicates are only fetched once, and never more than 2 at a time.
+        assert sorted(client.fetches) == [2, 3, 4, 5, 404]
+        assert client.max_running == 2
+        assert (resolver.gateway_hits, resolver.cache_hits, resolver.misses) == (
+            1,
+            0,
+            5,
+        )
+
+        # Now they are cached, including the user that does not exist.
+        assert await resolver.resolve_one(404) is None
+        assert await resolver.resolve_one(2) == "fetched user 2"
+        assert len(client.fetches) == 5
+        assert resolver.cache_hits == 2
+
+        # The least recently used user gets dropped when the cache is full.
+        await resolver.resolve([6])
+        assert 3 not in resolver.fetched_users
+        assert 2 in resolver.fetched_users
+        assert resolver.hit_rate == 3 / 9
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import os
+
+from utils.word_filter import WordFilter
+
+
+def test_word_filter() -> None:
+    word_filter = WordFilter(["cat", "Dog", "ass", "bad", "badder"])
+
+    assert word_filter.find("what a nice day") is None
+    assert word_filter.find("my CAT is here") == "cat"
+    assert word_filter.find("my dog and my cat") == "cat"
+    # Separators between the letters do not help.
+    assert word_filter.find("you are b(a)d") == "bad"
+    # Words can overlap, the first one of the list gets reported.
+    assert word_filter.find("ba(dog") == "Dog"
+
+    # A word right next to a letter or digit does not count, anywhere in the message.
+    assert word_filter.find("first class") is None
+    assert word_filter.find("class ass") is None
+    assert word_filter.find("badcat bad") is None
+    assert word_filter.find("cat5") is None
+    # Here "bad" is part of "badder", so only the longer one counts.
+    assert word_filter.find("bad, badder") == "badder"
+
+    assert WordFilter([]).find("cat") is None
+
+
+def test_word_filter_reload(tmp_path) -> None:
+    path = str(tmp_path / "badwords.txt")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("cat\ndog")
+
+    word_filter = WordFilter.from_file(path)
+    assert len(word_filter) == 2
+    assert not word_filter.is_outdated()
+    assert word_filter.find("hot dog") == "dog"
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("cat\nbird\n")
+    # Making sure the timestamp changes, even on file systems that are not very precise.
+    os.utime(path, ns=(0, 0))
+    assert word_filter.is_outdated()
+
+    word_filter = WordFilter.from_file(path)
+    assert not word_filter.is_outdated()
+    assert word_filter.find("hot dog") is None
+    assert word_filter.find("big bird") == "bird"
+
+    os.remove(path)
+    assert word_filter.is_outdated()
@@ -0,0 +1,41 @@
+from utils.xp import get_level_from_xp, get_xp_for_level, get_xp_till_next_level
+
+
+def naive_xp_for_level(level: int) -> int:
+    if level < 0:
+        return 0
+
+    return sum(get_xp_till_next_level(i, 0) for i in range(level))
+
+
+def naive_level_from_xp(xp: int) -> int:
+    level = 0
+    while naive_xp_for_level(level) <= xp:
+        level += 1
+    return max(level - 1, 0)
+
+
+def test_get_xp_for_level() -> None:
+    assert get_xp_for_level(-5) == 0
+    assert get_xp_for_level(0) == 0
+    assert get_xp_for_level(1) == 100
+    assert get_xp_for_level(2) == 255
+
+    for level in range(0, 150):
+        assert get_xp_for_level(level) == naive_xp_for_level(level)
+
+
+def test_get_level_from_xp() -> None:
+    assert get_level_from_xp(-100) == 0
+    assert get_level_from_xp(0) == 0
+    assert get_level_from_xp(99) == 0
+    assert get_level_from_xp(100) == 1
+    assert get_level_from_xp(254) == 1
+    assert get_level_from_xp(255) == 2
+
+    for xp in range(0, 200_000, 137):
+        assert get_level_from_xp(xp) == naive_level_from_xp(xp)
+
+    # Way past what anyone has right now, this extends the table a couple of times.
+    assert get_level_from_xp(get_xp_for_level(500)) == 500
+    assert get_level_from_xp(get_xp_for_level(500) - 1) == 499
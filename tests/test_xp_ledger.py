@@ -0,0 +1,104 @@
+import asyncio
+
+import aiosqlite
+
+from utils.database import Database
+from utils.migrations import run_migrations
+from utils.sqlite import setup_db
+from utils.xp_ledger import XPLedger
+
+
+def get_level_from_xp(xp: int) -> int:
+    return xp // 100
+
+
+def test_xp_ledger(tmp_path) -> None:
+    filepath = str(tmp_path / "database.db")
+
+    async def run() -> None:
+        await setup_db(filepath)
+        await run_migrations(filepath)
+
+        db = Database(filepath, readers=1, commit_window=0)
+        await db.connect()
+
+        try:
+            await db.execute("""INSERT INTO level VALUES (1, 1, 150, 10)""")
+
+            ledger = XPLedger(db, get_level_from_xp)
+
+            # Gains are visible right away, but not written yet.
+            assert await ledger.add_xp(1, 60) == (1, 2, 210)
+            assert await ledger.add_xp(2, 20) == (0, 0, 20)
+            assert await ledger.add_xp(2, 20) == (0, 0, 40)
+            assert await ledger.get(3) == (0, 0, 0)
+            assert await db.fetchall("""SELECT * FROM level ORDER BY id""") == [
+                (1, 1, 150, 10)
+            ]
+
+            await ledger.flush()
+            assert await db.fetchall("""SELECT * FROM level ORDER BY id""") == [
+                (1, 2, 210, 11),
+                (2, 0, 40, 2),
+                (3, 0, 0, 0),
+            ]
+
+            # Only the deltas are written, so this does not double count anything.
+            assert await ledger.add_xp(2, -30, 0) == (0, 0, 10)
+            await ledger.flush()
+            await ledger.flush()
+            assert await db.fetchone("""SELECT * FROM level WHERE id = 2""") == (
+                2,
+                0,
+                10,
+                2,
+            )
+
+            # A failed flush keeps the changes, and the next one writes them together with the new ones.
+            executemany = db.executemany
+
+            async def fail(*args) -> None:
+                raise aiosqlite.OperationalError("database is locked")
+
+            db.executemany = fail
+            await ledger.add_xp(2, 5)
+            assert not await ledger.flush()
+
+            db.executemany = executemany
+            await ledger.add_xp(2, 5)
+            assert await ledger.flush()
+            assert await db.fetchone("""SELECT * FROM level WHERE id = 2""") == (
+                2,
+                0,
+                20,
+                4,
+            )
+            assert not ledger.buffer
+
+            # Loading everything in for the leaderboard.
+            ledger = XPLedger(db, get_level_from_xp)
+            await ledger.load()
+            assert await ledger.add_xp(4, 500) == (0, 5, 500)
+            assert ledger.get_leaderboard(1, 10) == [
+                (1, 4, 5, 500, 1),
+                (2, 1, 2, 210, 11),
+                (3, 2, 0, 20, 4),
+                (4, 3, 0, 0, 0),
+            ]
+            assert ledger.get_rank(2) == 3
+            assert ledger.get_by_rank(2) == (2, 1, 2, 210, 11)
+            assert ledger.get_by_rank(0) is None
+            assert ledger.get_by_rank(5) is None
+
+            await ledger.add_xp(2, 300)
+            assert ledger.get_rank(2) == 2
+            assert ledger.get_leaderboard(2, 2) == [
+                (2, 2, 3, 320, 5),
+                (3, 1, 2, 210, 11),
+            ]
+            assert (ledger.total_xp, ledger.total_messages) == (1030, 17)
+
+        finally:
+            await db.close()
+
+    asyncio.run(run())
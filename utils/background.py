@@ -0,0 +1,31 @@
+import asyncio
+from typing import Coroutine
+
+import utils.logger
+
+
+class BackgroundTasks:
+    """Runs coroutines without waiting for them, and logs it if they fail.
+    Keeps a reference to every running task, otherwise they could be garbage collected before they are done.
+    """
+
+    def __init__(self, logger_name: str) -> None:
+        self.tasks: set[asyncio.Task] = set()
+        self.logger = utils.logger.get_logger(logger_name)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def run(self, coroutine: Coroutine) -> asyncio.Task:
+        """Starts running something in the background and gets you its task."""
+
+        async def run() -> None:
+            try:
+                await coroutine
+            except Exception:
+                self.logger.exception("Background task failed!")
+
+        task = asyncio.create_task(run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
@@ -0,0 +1,67 @@
+from typing import Callable, Generic, Optional, TypeVar
+
+import utils.database
+import utils.logger
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class CounterBuffer(Generic[K, V]):
+    """Collects changes to counters in memory and writes them to the database in one batch on flush.
+    The statement only adds the changes onto what is stored, like uses = uses + :uses,
+    so a flush that failed can just be tried again later without counting anything twice.
+    """
+
+    def __init__(
+        self,
+        db: utils.database.Database,
+        sql: str,
+        get_parameters: Callable[[K, V], dict],
+        merge: Callable[[dict[K, V], K, V], None],
+        logger_name: str,
+    ) -> None:
+        self.db = db
+        self.sql = sql
+        # Turns a key and its change into the parameters of the statement.
+        self.get_parameters = get_parameters
+        # Merges a change that failed to write back into the newer pending changes.
+        self.merge = merge
+
+        # The changes since the last flush.
+        self.pending: dict[K, V] = {}
+
+        self.logger = utils.logger.get_logger(logger_name)
+
+    def __bool__(self) -> bool:
+        return bool(self.pending)
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    async def flush(self) -> Optional[dict[K, V]]:
+        """Writes every pending change to the database and gets you what was written.
+        If that fails, the error is logged, the changes are kept around for the next try and you get None.
+        This does not raise, so that the loop calling it keeps running.
+        """
+        if not self.pending:
+            return {}
+
+        pending, self.pending = self.pending, {}
+
+        try:
+            await self.db.executemany(
+                self.sql,
+                [self.get_parameters(key, value) for key, value in pending.items()],
+            )
+        except Exception:
+            # There could have been new changes in the meantime.
+            for key, value in pending.items():
+                self.merge(self.pending, key, value)
+
+            self.logger.exception(
+                f"Writing {len(pending)} pending change(s) failed, trying again on the next flush."
+            )
+            return None
+
+        return pending
@@ -0,0 +1,243 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Iterable, Optional, Union
+
+import aiosqlite
+
+import utils.logger
+
+Parameters = Optional[Union[Iterable[Any], dict[str, Any]]]
+
+
+class Database:
+    """A small pool of long-lived connections to one of our SQLite databases.
+    Opening a new connection spins up a new worker thread and SQLite handle every time,
+    so instead we open them once at startup and share them across every cog.
+
+    There is exactly one writer connection, since SQLite only ever allows one writer anyways,
+    and a handful of reader connections in a queue, every read takes the one that has been idle the longest.
+    The database runs in WAL mode, so the readers never have to wait on the writer.
+
+    Single writes are not committed right away, but queued up for a writer task.
+    It collects every write that arrives within the commit window and commits them together,
+    so we only wait on the disk once per batch instead of once per chat message.
+    Every write in a batch runs in its own savepoint, so a failing one leaves nothing behind.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        readers: int = 4,
+        commit_window: float = 0.05,
+        max_batch_size: int = 500,
+    ) -> None:
+        self.filepath = filepath
+        self.reader_count = readers
+
+        # How long the writer task waits for more writes before committing, in seconds.
+        # This is also the longest a write can sit in memory before it is on disk.
+        self.commit_window = commit_window
+        self.max_batch_size = max_batch_size
+
+        self.writer: Optional[aiosqlite.Connection] = None
+        self.write_lock = asyncio.Lock()
+        self.write_queue: asyncio.Queue[Optional[tuple]] = asyncio.Queue()
+        self.writer_task: Optional[asyncio.Task] = None
+
+        self.readers: list[aiosqlite.Connection] = []
+        self.idle_readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+        self.logger = utils.logger.get_logger("bot.db")
+
+    async def connect(self) -> None:
+        """Opens the writer and reader connections and starts the writer task."""
+        self.writer = await aiosqlite.connect(self.filepath)
+
+        # WAL mode persists in the database file, but it does not hurt to set it every time.
+        # With WAL, NORMAL is still safe from corruption and only syncs on checkpoints,
+        # at worst we lose the last few commits on a power loss.
+        await self.writer.execute("PRAGMA journal_mode=WAL")
+        await self.writer.execute("PRAGMA synchronous=NORMAL")
+
+        for _ in range(self.reader_count):
+            reader = await aiosqlite.connect(self.filepath)
+            self.readers.append(reader)
+            self.idle_readers.put_nowait(reader)
+
+        self.writer_task = asyncio.create_task(self.write_loop())
+
+        self.logger.info(
+            f"Opened {self.reader_count} reader connection(s) and 1 writer connection to {self.filepath}."
+        )
+
+    async def close(self) -> None:
+        """Closes every connection.
+        Flushes the queued writes and waits for a running write to finish first,
+        so we do not lose anything or cut it off halfway.
+        """
+        await self.flush()
+
+        async with self.write_lock:
+            if self.writer is not None:
+                await self.writer.close()
+                self.writer = None
+
+        for reader in self.readers:
+            await reader.close()
+
+        self.readers = []
+        self.idle_readers = asyncio.Queue()
+
+        self.logger.info(f"Closed all connections to {self.filepath}.")
+
+    async def flush(self) -> None:
+        """Commits every queued write and stops the writer task."""
+        if self.writer_task is None:
+            return
+
+        # The writer task stops once it reaches this in the queue,
+        # after committing everything that was queued up before.
+        self.write_queue.put_nowait(None)
+        await self.writer_task
+        self.writer_task = None
+
+    async def write_loop(self) -> None:
+        """Commits the queued writes in batches, until it receives None."""
+        running = True
+
+        while running:
+            batch = [await self.write_queue.get()]
+
+            # Giving the other writes some time to come in.
+            if batch[0] is not None:
+                await asyncio.sleep(self.commit_window)
+
+            while len(batch) < self.max_batch_size and not self.write_queue.empty():
+                batch.append(self.write_queue.get_nowait())
+
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+
+            if batch:
+                await self.commit_batch(batch)
+
+    async def run_batch(self, batch: list[tuple]) -> list[Optional[BaseException]]:
+        """Runs a batch of queued writes in one transaction and commits it.
+        Every write gets its own savepoint, so if one fails, be it halfway through an executemany,
+        just that write is rolled back and the others still go through.
+        Gets you the error of every write, or None if it worked.
+        """
+        results: list[Optional[BaseException]] = []
+
+        if not self.writer.in_transaction:
+            await self.writer.execute("BEGIN")
+
+        for sql, parameters, many, _ in batch:
+            await self.writer.execute("SAVEPOINT queued_write")
+            try:
+                if many:
+                    await self.writer.executemany(sql, parameters)
+                else:
+                    await self.writer.execute(sql, parameters)
+                results.append(None)
+            except Exception as exc:
+                await self.writer.execute("ROLLBACK TO queued_write")
+                results.append(exc)
+            await self.writer.execute("RELEASE queued_write")
+
+        await self.writer.commit()
+        return results
+
+    async def commit_batch(self, batch: list[tuple]) -> None:
+        """Runs a batch of queued writes and hands every caller their result.
+        If the transaction itself fails, every write in the batch fails.
+        This never raises, so the writer task keeps going and no caller is left waiting.
+        """
+        results: Optional[list[Optional[BaseException]]] = None
+
+        try:
+            async with self.write_lock:
+                try:
+                    results = await self.run_batch(batch)
+                except Exception as exc:
+                    self.logger.exception(f"Committing {len(batch)} write(s) failed!")
+                    results = [exc] * len(batch)
+
+                    try:
+                        await self.writer.rollback()
+                    except Exception:
+                        self.logger.exception(
+                            "Rolling back the failed batch failed too!"
+                        )
+        finally:
+            # Only None if we got cancelled, the callers still need to hear about it.
+            if results is None:
+                results = [asyncio.CancelledError()] * len(batch)
+
+            for (*_, future), result in zip(batch, results):
+                # The caller might have been cancelled in the meantime.
+                if future.done():
+                    continue
+
+                if result is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(result)
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrows a reader connection from the pool, for running multiple reads in a row."""
+        reader = await self.idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self.idle_readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Gives you exclusive access to the writer connection.
+        Everything executed inside is committed together at the end,
+        or rolled back if something goes wrong along the way.
+        Use this for writes that depend on each other, or on something you read before.
+        """
+        async with self.write_lock:
+            try:
+                yield self.writer
+            except BaseException:
+                await self.writer.rollback()
+                raise
+            else:
+                await self.writer.commit()
+
+    async def fetchall(self, sql: str, parameters: Parameters = None) -> list[tuple]:
+        """Runs a read query and returns every row."""
+        async with self.reader() as db:
+            return list(await db.execute_fetchall(sql, parameters))
+
+    async def fetchone(
+        self, sql: str, parameters: Parameters = None
+    ) -> Optional[tuple]:
+        """Runs a read query and returns the first row, if there is one."""
+        async with self.reader() as db:
+            async with db.execute(sql, parameters) as cursor:
+                return await cursor.fetchone()
+
+    async def queue_write(self, sql: str, parameters: Any, many: bool) -> None:
+        """Queues up a write for the writer task and waits until it is committed."""
+        if self.writer_task is None:
+            raise RuntimeError(f"The connection to {self.filepath} is closed.")
+
+        future = asyncio.get_running_loop().create_future()
+        self.write_queue.put_nowait((sql, parameters, many, future))
+        await future
+
+    async def execute(self, sql: str, parameters: Parameters = None) -> None:
+        """Runs a single write statement and waits until it is committed."""
+        await self.queue_write(sql, parameters, False)
+
+    async def executemany(
+        self, sql: str, parameters: Iterable[Union[Iterable[Any], dict[str, Any]]]
+    ) -> None:
+        """Runs a write statement for every set of parameters and waits until they are committed."""
+        await self.queue_write(sql, list(parameters), True)
@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Hashable, Optional
+
+import utils.logger
+
+
+class ExpiryTracker:
+    """Keeps track of keys that expire after a while, like cooldowns or recent pings.
+    Instead of keeping a sleeping task around for every single entry,
+    one background task sleeps until the next entry is due and expires everything that is.
+
+    Looking up a key is a dict lookup, adding one is a push onto a min-heap.
+    When a key is added again, the old heap entry is not removed but just skipped over
+    once it comes up, since the dict always has the current expiry time.
+    """
+
+    def __init__(
+        self, on_expire: Optional[Callable[[Hashable, Any], None]] = None
+    ) -> None:
+        # Called with the key and value of every entry that expires.
+        self.on_expire = on_expire
+
+        # The expiry time and value of every entry, by key.
+        self.entries: dict[Hashable, tuple[float, Any]] = {}
+        # The expiry time of every entry, plus a counter to break ties between equal times.
+        self.heap: list[tuple[float, int, Hashable]] = []
+        self.counter = itertools.count()
+
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+
+        self.logger = utils.logger.get_logger("bot.expiry")
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Gets you the value of a key, if it has not expired yet."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def time_left(self, key: Hashable) -> float:
+        """Gets you the seconds until a key expires, or 0 if it is not in here."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return 0
+        return max(entry[0] - time.monotonic(), 0)
+
+    def next_expiry(self) -> Optional[float]:
+        """Gets you the seconds until the next entry expires, if there is one."""
+        self.clean_heap()
+        if not self.heap:
+            return None
+        return max(self.heap[0][0] - time.monotonic(), 0)
+
+    def add(self, key: Hashable, ttl: float, value: Any = True) -> None:
+        """Adds a key that expires in the given amount of seconds.
+        If the key is already in here, its expiry time and value get replaced.
+        """
+        expires_at = time.monotonic() + ttl
+
+        self.entries[key] = (expires_at, value)
+        heapq.heappush(self.heap, (expires_at, next(self.counter), key))
+
+        self.ensure_running()
+
+        # If this is the new earliest entry, the background task has to wake up sooner.
+        if self.heap[0][2] == key:
+            self.wakeup.set()
+
+    def remove(self, key: Hashable) -> Any:
+        """Removes a key without it counting as expired and returns its value, if it had one.
+        Its heap entry is dropped later on.
+        """
+        entry = self.entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        """Removes every entry without it counting as expired."""
+        self.entries = {}
+        self.heap = []
+
+    def clean_heap(self) -> None:
+        """Drops the heap entries at the top that belong to removed or re-added keys."""
+        while self.heap:
+            expires_at, _, key = self.heap[0]
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                return
+            heapq.heappop(self.heap)
+
+    def expire(self) -> list[tuple[Hashable, Any]]:
+        """Removes every entry that is due and returns their keys and values."""
+        now = time.monotonic()
+        expired = []
+
+        while self.heap and self.heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self.heap)
+
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != expires_at:
+                continue
+
+            del self.entries[key]
+            expired.append((key, entry[1]))
+
+        if self.on_expire:
+            for key, value in expired:
+                try:
+                    self.on_expire(key, value)
+                except Exception:
+                    self.logger.exception(f"Failed to expire {key}!")
+
+        return expired
+
+    def ensure_running(self) -> None:
+        """Starts the background task, if it is not running already.
+        This happens on the first add, since we need a running event loop for it.
+        """
+        if self.task is not None and not self.task.done():
+            return
+
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self) -> None:
+        """Sleeps until the next entry is due, or a new earlier one was added, and expires them."""
+        while True:
+            self.wakeup.clear()
+
+            timeout = self.next_expiry()
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            self.expire()
+
+    def stop(self) -> None:
+        """Stops the background task. The entries stay, but they will not expire on their own anymore."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -0,0 +1,120 @@
+from typing import NamedTuple, Optional
+
+import utils.counter_buffer
+import utils.database
+
+
+class Macro(NamedTuple):
+    name: str
+    payload: str
+    uses: int
+    author_id: int
+
+
+def get_use_parameters(name: str, uses: int) -> dict:
+    return {"name": name, "uses": uses}
+
+
+class MacroTable:
+    """Keeps every macro in memory, so looking one up for a message is a single dict lookup.
+    Creating and deleting macros goes through here, which keeps the table in sync with the database.
+
+    The use counters are only written to the database in batches when flush is called,
+    so using a macro costs no write at all.
+    """
+
+    def __init__(self, db: utils.database.Database) -> None:
+        self.db = db
+
+        # Every macro by name, with the uses as of the last flush.
+        self.macros: dict[str, Macro] = {}
+        # The uses of every macro since the last flush.
+        self.buffer: utils.counter_buffer.CounterBuffer[str, int] = (
+            utils.counter_buffer.CounterBuffer(
+                db,
+                """UPDATE macros SET uses = uses + :uses WHERE name = :name""",
+                get_use_parameters,
+                self.merge_uses,
+                "bot.macros",
+            )
+        )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.macros
+
+    def __len__(self) -> int:
+        return len(self.macros)
+
+    async def load(self) -> None:
+        """Loads every macro from the database."""
+        macros = await self.db.fetchall(
+            """SELECT name, payload, uses, author FROM macros"""
+        )
+        self.macros = {macro[0]: Macro(*macro) for macro in macros}
+
+    def get_names(self) -> list[str]:
+        return list(self.macros)
+
+    def get(self, name: str) -> Optional[Macro]:
+        """Gets you a macro, with the uses that were not written yet included."""
+        macro = self.macros.get(name)
+        if macro is None:
+            return None
+
+        return macro._replace(uses=macro.uses + self.buffer.pending.get(name, 0))
+
+    def add_use(self, name: str) -> None:
+        """Counts a use of a macro, which gets written on the next flush."""
+        if name in self.macros:
+            self.buffer.pending[name] = self.buffer.pending.get(name, 0) + 1
+
+    async def create(self, name: str, payload: str, author_id: int) -> bool:
+        """Creates a new macro, returns False if the name was already taken."""
+        if name in self.macros:
+            return False
+
+        # Taking the name before waiting on the write, so that a second create with it fails right away.
+        self.macros[name] = Macro(name, payload, 0, author_id)
+
+        try:
+            await self.db.execute(
+                """INSERT INTO macros VALUES (:name, :payload, :uses, :author)""",
+                {"name": name, "payload": payload, "uses": 0, "author": author_id},
+            )
+        except Exception:
+            del self.macros[name]
+            self.buffer.pending.pop(name, None)
+            raise
+
+        return True
+
+    async def delete(self, name: str) -> bool:
+        """Deletes a macro, returns False if there was none with this name."""
+        if name not in self.macros:
+            return False
+
+        await self.db.execute(
+            """DELETE FROM macros WHERE name = :name""", {"name": name}
+        )
+        del self.macros[name]
+        self.buffer.pending.pop(name, None)
+        return True
+
+    def merge_uses(self, pending: dict[str, int], name: str, uses: int) -> None:
+        """Adds the uses of a failed flush back in, unless the macro got deleted in the meantime."""
+        if name in self.macros:
+            pending[name] = pending.get(name, 0) + uses
+
+    async def flush(self) -> bool:
+        """Writes the uses since the last flush to the database in one batch.
+        If that fails, they are kept around for the next try.
+        Returns False if it failed.
+        """
+        written = await self.buffer.flush()
+        if written is None:
+            return False
+
+        for name, uses in written.items():
+            if (macro := self.macros.get(name)) is not None:
+                self.macros[name] = macro._replace(uses=macro.uses + uses)
+        return True
@@ -0,0 +1,169 @@
+import time
+from collections import deque
+from typing import Awaitable, Callable, Iterable, NamedTuple, Optional
+
+import discord
+
+import utils.logger
+
+# The order the stages run in, lowest first.
+# The filter goes first so that a deleted message does not earn XP or trigger anything,
+# and a macro stops the message from also being looked up as a command.
+FILTER_STAGE = 100
+ACTIVITY_STAGE = 200
+XP_STAGE = 300
+MACRO_STAGE = 400
+COMMAND_STAGE = 500
+
+# How many of the latest durations of every stage we keep around for the percentiles.
+RECENT_DURATIONS = 1000
+
+
+class MessageContext:
+    """The facts about a message that most stages need, worked out once instead of in every single stage."""
+
+    def __init__(
+        self,
+        message: discord.Message,
+        own_id: int,
+        prefix: str,
+        blacklisted_channels: frozenset[int],
+    ) -> None:
+        self.message = message
+
+        self.is_bot = message.author.bot
+        # Messages of the bot itself, so that nothing reacts to itself.
+        self.is_own = message.author.id == own_id
+        self.is_system = message.is_system()
+
+        self.guild_id = message.guild.id if message.guild else None
+        self.channel_id = message.channel.id
+        self.is_blacklisted_channel = self.channel_id in blacklisted_channels
+
+        # The prefix if the message starts with it, and then the first word after it.
+        # That word is what a command or macro would be called, only split at spaces like before.
+        if message.content.startswith(prefix):
+            self.prefix = prefix
+            self.invoked_name = message.content[len(prefix) :].partition(" ")[0]
+        else:
+            self.prefix = None
+            self.invoked_name = None
+
+
+class Stage(NamedTuple):
+    """One step of handling a message.
+    The callback returns True if it consumed the message, so no later stage gets to see it.
+    """
+
+    name: str
+    order: int
+    callback: Callable[[MessageContext], Awaitable[bool]]
+    # Most stages do not care about messages of bots, so those get skipped without calling them.
+    ignore_bots: bool
+
+
+class StageStats:
+    """How often a stage ran and how long it took, in seconds."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.consumed = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=RECENT_DURATIONS)
+
+    def add(self, duration: float, consumed: bool) -> None:
+        self.calls += 1
+        self.consumed += consumed
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.recent.append(duration)
+
+    def get_average(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def get_percentile(self, percentile: float) -> float:
+        """Gets you a percentile of the latest durations, from 0 to 1."""
+        if not self.recent:
+            return 0.0
+
+        durations = sorted(self.recent)
+        return durations[min(int(len(durations) * percentile), len(durations) - 1)]
+
+
+class MessagePipeline:
+    """Runs every message through the registered stages, one after another in their order.
+    The cogs register their stages instead of all listening to on_message on their own,
+    so the common checks are done once, the order is always the same,
+    and we stop as soon as a stage consumed the message.
+    The time every stage takes is recorded, including the time spent waiting on the database or discord.
+    """
+
+    def __init__(self, prefix: str, blacklisted_channels: Iterable[int]) -> None:
+        self.prefix = prefix
+        self.blacklisted_channels = frozenset(blacklisted_channels)
+
+        # Sorted by their order.
+        self.stages: list[Stage] = []
+        self.stats: dict[str, StageStats] = {}
+        # The time of the whole pipeline per message.
+        self.total = StageStats()
+
+        self.logger = utils.logger.get_logger("bot.messages")
+
+    def add_stage(
+        self,
+        name: str,
+        order: int,
+        callback: Callable[[MessageContext], Awaitable[bool]],
+        ignore_bots: bool = True,
+    ) -> None:
+        """Adds a stage, or replaces the one with the same name, like when a cog gets reloaded."""
+        self.remove_stage(name)
+        self.stages.append(Stage(name, order, callback, ignore_bots))
+        self.stages.sort(key=lambda stage: stage.order)
+        self.stats.setdefault(name, StageStats())
+
+    def remove_stage(self, name: str) -> None:
+        self.stages = [stage for stage in self.stages if stage.name != name]
+
+    def get_stats(self) -> list[tuple[str, StageStats]]:
+        """Gets you the stats of every current stage in their order, and the total at the end."""
+        return [(stage.name, self.stats[stage.name]) for stage in self.stages] + [
+            ("total", self.total)
+        ]
+
+    async def process(self, message: discord.Message, own_id: int) -> Optional[str]:
+        """Runs a message through the stages.
+        Returns the name of the stage that consumed it, if one did.
+        """
+        start = time.perf_counter()
+        context = MessageContext(
+            message, own_id, self.prefix, self.blacklisted_channels
+        )
+        consumed_by = None
+
+        for stage in self.stages:
+            if stage.ignore_bots and context.is_bot:
+                continue
+
+            stage_start = time.perf_counter()
+            try:
+                consumed = await stage.callback(context)
+            except Exception:
+                # One broken stage should not stop the others, just like separate listeners.
+                self.stats[stage.name].errors += 1
+                self.logger.exception(
+                    f"Message stage {stage.name} failed on message {message.id}!"
+                )
+                consumed = False
+
+            self.stats[stage.name].add(time.perf_counter() - stage_start, consumed)
+
+            if consumed:
+                consumed_by = stage.name
+                break
+
+        self.total.add(time.perf_counter() - start, consumed_by is not None)
+        return consumed_by
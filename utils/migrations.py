@@ -0,0 +1,460 @@
+import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+import aiosqlite
+
+import utils.logger
+import utils.ranked_stats
+import utils.rating_history
+
+# The tables that only ever hold one row per key.
+# The original schema had no constraints at all, so over the years some duplicates
+# snuck in through double inserts. When rebuilding we keep the oldest row per key,
+# since that is the one the bot always read anyways.
+PRIMARY_KEYS = {
+    "level": (
+        """CREATE TABLE level(
+                id INTEGER PRIMARY KEY,
+                level INTEGER,
+                xp INTEGER,
+                messages INTEGER)""",
+        "id",
+    ),
+    "trueskill": (
+        """CREATE TABLE trueskill(
+                user_id INTEGER PRIMARY KEY,
+                rating REAL,
+                deviation REAL,
+                wins INTEGER,
+                losses INTEGER,
+                matches TEXT)""",
+        "user_id",
+    ),
+    "muted": (
+        """CREATE TABLE muted(
+                user_id INTEGER PRIMARY KEY,
+                muted INTEGER)""",
+        "user_id",
+    ),
+    "profile": (
+        """CREATE TABLE profile(
+                user_id INTEGER PRIMARY KEY,
+                tag TEXT,
+                region TEXT,
+                mains TEXT,
+                secondaries TEXT,
+                pockets TEXT,
+                note TEXT,
+                colour INTEGER)""",
+        "user_id",
+    ),
+    "userbadges": (
+        """CREATE TABLE userbadges(
+                user_id INTEGER PRIMARY KEY,
+                badges TEXT)""",
+        "user_id",
+    ),
+    "badgeinfo": (
+        """CREATE TABLE badgeinfo(
+                badge TEXT PRIMARY KEY,
+                info TEXT)""",
+        "badge",
+    ),
+    "macros": (
+        """CREATE TABLE macros(
+                name TEXT PRIMARY KEY,
+                payload TEXT,
+                uses INTEGER,
+                author INTEGER)""",
+        "name",
+    ),
+    "commands": (
+        """CREATE TABLE commands(
+                command TEXT PRIMARY KEY,
+                uses INTEGER,
+                last_used INTEGER)""",
+        "command",
+    ),
+    "starboardmessages": (
+        """CREATE TABLE starboardmessages(
+                original_id INTEGER PRIMARY KEY,
+                starboard_id INTEGER)""",
+        "original_id",
+    ),
+}
+
+
+async def rebuild_table(
+    db: aiosqlite.Connection, table: str, create_sql: str, key: str
+) -> int:
+    """Rebuilds a table with a new schema, since SQLite cannot add constraints to an existing table.
+    Follows the usual create, copy, drop, rename procedure.
+    Rows with a duplicate or missing key are dropped, and we return how many.
+    The column order has to stay the same, since we insert positionally all over the place.
+    """
+    temp_table = f"{table}_new"
+
+    await db.execute(f"DROP TABLE IF EXISTS {temp_table}")
+    await db.execute(create_sql.replace(f"TABLE {table}(", f"TABLE {temp_table}(", 1))
+
+    await db.execute(
+        f"""INSERT INTO {temp_table} SELECT * FROM {table}
+            WHERE rowid IN (SELECT MIN(rowid) FROM {table} WHERE {key} IS NOT NULL GROUP BY {key})"""
+    )
+
+    old_count = await db.execute_fetchall(f"SELECT COUNT(*) FROM {table}")
+    new_count = await db.execute_fetchall(f"SELECT COUNT(*) FROM {temp_table}")
+
+    await db.execute(f"DROP TABLE {table}")
+    await db.execute(f"ALTER TABLE {temp_table} RENAME TO {table}")
+
+    return old_count[0][0] - new_count[0][0]
+
+
+async def add_primary_keys(db: aiosqlite.Connection) -> None:
+    """Adds primary keys to the tables that are looked up by a single key."""
+    logger = utils.logger.get_logger("bot.db")
+
+    for table, (create_sql, key) in PRIMARY_KEYS.items():
+        dropped = await rebuild_table(db, table, create_sql, key)
+        if dropped:
+            logger.warning(f"Dropped {dropped} duplicate row(s) from {table}.")
+
+
+async def add_indexes(db: aiosqlite.Connection) -> None:
+    """Adds indexes for the queries we run all the time,
+    which are not covered by a primary key.
+    """
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_matches_winner ON matches(winner_id, timestamp)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_matches_loser ON matches(loser_id, timestamp)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_matches_timestamp ON matches(timestamp)"""
+    )
+    # Match IDs are random, so in theory they could collide.
+    # That's why this one is not unique, deleting or correcting a match only touches the first one with that ID.
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_matches_match_id ON matches(match_id)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_reminder_date ON reminder(date)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_reminder_user ON reminder(user_id, reminder_id)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_warnings_user ON warnings(user_id, warn_id)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_warnings_timestamp ON warnings(timestamp)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_notes_user ON notes(user_id, note_id)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_usernames_user ON usernames(user_id, timestamp)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_nicknames_user ON nicknames(user_id, timestamp)"""
+    )
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_reactrole_message ON reactrole(message_id)"""
+    )
+    await db.execute("""CREATE INDEX IF NOT EXISTS idx_level_xp ON level(xp DESC)""")
+
+
+async def add_rating_checkpoints(db: aiosqlite.Connection) -> None:
+    """Adds the table for the rating checkpoints of the season leaderboard."""
+    await db.execute("""CREATE TABLE IF NOT EXISTS rating_checkpoints(
+            season_start INTEGER,
+            timestamp INTEGER,
+            user_id INTEGER,
+            rating REAL,
+            deviation REAL,
+            wins INTEGER,
+            losses INTEGER,
+            PRIMARY KEY (season_start, timestamp, user_id))""")
+
+
+async def add_ranked_player_stats(db: aiosqlite.Connection) -> None:
+    """Adds the table for the ranked stats of every player, and fills it from the match history."""
+    await db.execute("""CREATE TABLE IF NOT EXISTS ranked_player_stats(
+            user_id INTEGER PRIMARY KEY,
+            position INTEGER,
+            peak_rating REAL,
+            peak_deviation REAL,
+            peak_timestamp INTEGER,
+            best_win_opponent INTEGER,
+            best_win_rating REAL,
+            best_win_deviation REAL,
+            best_win_timestamp INTEGER,
+            opponent_rank_sum INTEGER,
+            opponents INTEGER,
+            recent_ratings TEXT)""")
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_ranked_player_stats_position ON ranked_player_stats(position)"""
+    )
+
+    await request_rebuild(db, "ranked_stats")
+
+
+def get_compact_form(history: Optional[str]) -> tuple[int, int, int, int, int]:
+    """Converts a W/L history string, oldest result first, into the columns compact_ranked_form adds.
+    Those are the last 16 results as bits with the most recent one in the lowest bit, how many of them there are,
+    the current streak, negative for losses, and the longest win and losing streak.
+    This is a copy of RecentForm as it was back then, so that changing it later does not change this migration.
+    """
+    results = count = streak = longest_winstreak = longest_losestreak = 0
+
+    for result in history or "":
+        won = result == "W"
+        results = ((results << 1) | won) & 0xFFFF
+        count = min(count + 1, 16)
+
+        if won:
+            streak = max(streak, 0) + 1
+            longest_winstreak = max(longest_winstreak, streak)
+        else:
+            streak = min(streak, 0) - 1
+            longest_losestreak = max(longest_losestreak, -streak)
+
+    return (results, count, streak, longest_winstreak, longest_losestreak)
+
+
+async def compact_ranked_form(db: aiosqlite.Connection) -> None:
+    """Replaces the W/L history of every ranked profile, which grew with every match,
+    with a fixed size recent form and streak counters.
+    """
+    for column in (
+        "recent_results",
+        "recent_count",
+        "current_streak",
+        "longest_winstreak",
+        "longest_losestreak",
+    ):
+        await db.execute(
+            f"""ALTER TABLE trueskill ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"""
+        )
+
+    players = await db.execute_fetchall("""SELECT user_id, matches FROM trueskill""")
+    await db.executemany(
+        """UPDATE trueskill SET recent_results = ?, recent_count = ?, current_streak = ?,
+        longest_winstreak = ?, longest_losestreak = ? WHERE user_id = ?""",
+        [get_compact_form(history) + (user_id,) for user_id, history in players],
+    )
+
+    await db.execute("""ALTER TABLE trueskill DROP COLUMN matches""")
+
+
+async def add_head_to_head(db: aiosqlite.Connection) -> None:
+    """Adds the table for the head to head records between players, and fills it from the match history."""
+    await db.execute("""CREATE TABLE IF NOT EXISTS head_to_head(
+            player_id INTEGER,
+            opponent_id INTEGER,
+            wins INTEGER,
+            losses INTEGER,
+            last_played INTEGER,
+            rating_swing REAL,
+            PRIMARY KEY (player_id, opponent_id))""")
+
+    await request_rebuild(db, "head_to_head")
+
+
+async def add_rating_history(db: aiosqlite.Connection) -> None:
+    """Adds the tables for the rating history of every player and its daily and weekly summaries,
+    and fills them from the match history.
+    """
+    await db.execute("""CREATE TABLE IF NOT EXISTS rating_history(
+            user_id INTEGER,
+            match_id INTEGER,
+            timestamp INTEGER,
+            rating REAL,
+            deviation REAL)""")
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_rating_history_user_timestamp ON rating_history(user_id, timestamp)"""
+    )
+    await db.execute("""CREATE TABLE IF NOT EXISTS rating_history_summary(
+            user_id INTEGER,
+            period TEXT,
+            period_start INTEGER,
+            matches INTEGER,
+            open_rating REAL,
+            close_rating REAL,
+            low_rating REAL,
+            high_rating REAL,
+            PRIMARY KEY (user_id, period, period_start))""")
+
+    await request_rebuild(db, "rating_history")
+
+
+async def add_rating_decay_runs(db: aiosqlite.Connection) -> None:
+    """Adds the table that records every month the ratings were decayed for.
+    The old decay task already took care of the current month, so that one is marked as done.
+    """
+    await db.execute("""CREATE TABLE IF NOT EXISTS rating_decay_runs(
+            period TEXT PRIMARY KEY,
+            timestamp INTEGER,
+            players INTEGER,
+            duration REAL)""")
+
+    # The old task decayed the ratings on the first of every month at 12:00, local time.
+    now = datetime.datetime.now()
+    year, month = now.year, now.month
+    if now < datetime.datetime(year, month, 1, 12):
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+    await db.execute(
+        """INSERT OR IGNORE INTO rating_decay_runs VALUES (:period, strftime('%s', 'now'), NULL, NULL)""",
+        {"period": f"{year:04d}-{month:02d}"},
+    )
+
+
+async def add_matchmaking_pings(db: aiosqlite.Connection) -> None:
+    """Adds the table for the recent matchmaking pings, so they survive a restart."""
+    await db.execute("""CREATE TABLE IF NOT EXISTS matchmaking_pings(
+            mm_type TEXT,
+            user_id INTEGER,
+            channel_id INTEGER,
+            guild_id INTEGER,
+            timestamp REAL,
+            PRIMARY KEY (mm_type, user_id))""")
+
+
+async def add_leaderboard_index(db: aiosqlite.Connection) -> None:
+    """Replaces the stored leaderboard positions, which had to be re-numbered after every match,
+    with a partial index on the conservative rating of the players on the leaderboard.
+    The position is counted from that index whenever it is needed.
+    """
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_trueskill_leaderboard ON trueskill((rating - 3 * deviation))
+        WHERE wins + losses > 4"""
+    )
+    await db.execute("""DROP INDEX IF EXISTS idx_ranked_player_stats_position""")
+    await db.execute("""ALTER TABLE ranked_player_stats DROP COLUMN position""")
+
+
+# Every migration, in the order they need to run.
+# The version number of a migration is its position in this list, starting at 1.
+# Never remove or reorder these, only ever append new ones at the end.
+# A migration only ever deals with the schema of its own version, so it must not call into the rest of the bot,
+# whose code always expects the latest schema. Tables filled from other data ask for a rebuild instead.
+MIGRATIONS: list[Callable[[aiosqlite.Connection], Awaitable[None]]] = [
+    add_primary_keys,
+    add_indexes,
+    add_rating_checkpoints,
+    add_ranked_player_stats,
+    compact_ranked_form,
+    add_head_to_head,
+    add_rating_history,
+    add_rating_decay_runs,
+    add_matchmaking_pings,
+    add_leaderboard_index,
+]
+
+
+# The tables that are calculated from other data, and how to rebuild them from scratch.
+# These run with the current code once every migration is done, so they always see the latest schema.
+REBUILDS: dict[str, Callable[[aiosqlite.Connection], Awaitable[Any]]] = {
+    "ranked_stats": utils.ranked_stats.rebuild_stats,
+    "head_to_head": utils.ranked_stats.rebuild_head_to_head,
+    "rating_history": utils.rating_history.rebuild_history,
+}
+
+
+async def request_rebuild(db: aiosqlite.Connection, name: str) -> None:
+    """Marks one of the rebuilds to run after the migrations.
+    Being in the same transaction as the migration, the request is only kept if the migration went through.
+    """
+    await db.execute(
+        """INSERT OR IGNORE INTO pending_rebuilds VALUES (:name)""", {"name": name}
+    )
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    """Gets the version of the last migration that ran on this database."""
+    await db.execute("""CREATE TABLE IF NOT EXISTS schema_version(
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            timestamp INTEGER)""")
+    await db.execute("""CREATE TABLE IF NOT EXISTS pending_rebuilds(
+            name TEXT PRIMARY KEY)""")
+
+    async with db.execute("""SELECT MAX(version) FROM schema_version""") as cursor:
+        version = (await cursor.fetchone())[0]
+
+    return version or 0
+
+
+async def run_migrations(filepath: str = "./db/database.db") -> int:
+    """Brings the database schema up to date by running every migration we have not run yet.
+    Needs to run after setup_db, which creates the original tables.
+    Every migration runs in its own transaction, so if one fails nothing of it is kept
+    and we just try again on the next startup.
+    Returns the schema version after migrating.
+    """
+    logger = utils.logger.get_logger("bot.db")
+
+    # We manage the transactions ourselves,
+    # otherwise the table rebuilds would not be atomic.
+    async with aiosqlite.connect(filepath, isolation_level=None) as db:
+        version = await get_schema_version(db)
+
+        for new_version, migration in enumerate(
+            MIGRATIONS[version:], start=version + 1
+        ):
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                await migration(db)
+                await db.execute(
+                    """INSERT INTO schema_version VALUES (:version, :name, strftime('%s', 'now'))""",
+                    {"version": new_version, "name": migration.__name__},
+                )
+            except Exception:
+                await db.execute("ROLLBACK")
+                logger.exception(
+                    f"Migration {new_version} ({migration.__name__}) failed!"
+                )
+                raise
+
+            await db.execute("COMMIT")
+            logger.info(f"Ran migration {new_version} ({migration.__name__}).")
+            version = new_version
+
+        await run_rebuilds(db)
+
+    return version
+
+
+async def run_rebuilds(db: aiosqlite.Connection) -> None:
+    """Runs every rebuild the migrations asked for, each in its own transaction.
+    If one fails, the error is logged and it stays requested, so we try again on the next startup.
+    It does not raise, the bot still works without the rebuilt tables and should not crash on every startup.
+    """
+    logger = utils.logger.get_logger("bot.db")
+
+    pending = {
+        name for name, in await db.execute_fetchall("SELECT name FROM pending_rebuilds")
+    }
+
+    for name, rebuild in REBUILDS.items():
+        if name not in pending:
+            continue
+
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            await rebuild(db)
+            await db.execute(
+                """DELETE FROM pending_rebuilds WHERE name = :name""", {"name": name}
+            )
+        except Exception:
+            await db.execute("ROLLBACK")
+            logger.exception(
+                f"Rebuilding {name} failed, trying again on the next startup!"
+            )
+            continue
+
+        await db.execute("COMMIT")
+        logger.info(f"Rebuilt {name}.")
@@ -0,0 +1,179 @@
+from bisect import bisect_left, insort
+from itertools import chain
+from typing import Any, Iterable, Iterator
+
+
+class FenwickTree:
+    """A Fenwick tree (or binary indexed tree) over a list of numbers.
+    Updating a number and getting the sum of the first n numbers both take O(log n).
+    """
+
+    def __init__(self, values: Iterable[int]) -> None:
+        self.tree = [0] + list(values)
+
+        # Building it in O(n), every node passes its sum on to its parent.
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index: int, delta: int) -> None:
+        """Adds the delta to the number at the index."""
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, end: int) -> int:
+        """Gets you the sum of the numbers before the index."""
+        total = 0
+        while end > 0:
+            total += self.tree[end]
+            end -= end & -end
+        return total
+
+    def find(self, position: int) -> tuple[int, int]:
+        """Finds the index where the running sum passes the position,
+        and how far into the number at that index the position is.
+        """
+        index = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+
+        while step:
+            next_index = index + step
+            if next_index < len(self.tree) and self.tree[next_index] <= position:
+                index = next_index
+                position -= self.tree[next_index]
+            step >>= 1
+
+        return (index, position)
+
+
+class OrderStatisticList:
+    """A sorted list that can tell you the position of a value, and the value at a position, in O(log n).
+    The values are split into buckets of a couple hundred sorted values each,
+    and a Fenwick tree over the bucket sizes tells us how many values come before a bucket.
+    Inserting and removing only touches a single bucket, unless it has to be split up or dropped.
+    """
+
+    def __init__(self, values: Iterable[Any] = (), load: int = 500) -> None:
+        # Buckets get split once they grow to twice this size.
+        self.load = load
+        self.size = 0
+
+        self.buckets: list[list[Any]] = []
+        # The largest value of every bucket, for finding the right bucket with bisect.
+        self.maxes: list[Any] = []
+        self.tree = FenwickTree([])
+
+        values = sorted(values)
+        self.buckets = [
+            values[i : i + self.load] for i in range(0, len(values), self.load)
+        ]
+        self.rebuild()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain.from_iterable(self.buckets)
+
+    def __contains__(self, value: Any) -> bool:
+        bucket_index = bisect_left(self.maxes, value)
+        if bucket_index == len(self.maxes):
+            return False
+
+        bucket = self.buckets[bucket_index]
+        position = bisect_left(bucket, value)
+        return bucket[position] == value
+
+    def __getitem__(self, position: int) -> Any:
+        if position < 0:
+            position += self.size
+
+        if not 0 <= position < self.size:
+            raise IndexError("OrderStatisticList index out of range")
+
+        bucket_index, offset = self.tree.find(position)
+        return self.buckets[bucket_index][offset]
+
+    def rebuild(self) -> None:
+        """Rebuilds the bucket maxes and the Fenwick tree, after a bucket was split or dropped."""
+        self.buckets = [bucket for bucket in self.buckets if bucket]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self.tree = FenwickTree(len(bucket) for bucket in self.buckets)
+        self.size = sum(len(bucket) for bucket in self.buckets)
+
+    def add(self, value: Any) -> None:
+        """Inserts a value at the right position."""
+        if not self.buckets:
+            self.buckets = [[value]]
+            self.rebuild()
+            return
+
+        bucket_index = min(bisect_left(self.maxes, value), len(self.buckets) - 1)
+        bucket = self.buckets[bucket_index]
+
+        insort(bucket, value)
+        self.maxes[bucket_index] = bucket[-1]
+        self.size += 1
+
+        if len(bucket) > self.load * 2:
+            self.buckets[bucket_index : bucket_index + 1] = [
+                bucket[: self.load],
+                bucket[self.load :],
+            ]
+            self.rebuild()
+        else:
+            self.tree.add(bucket_index, 1)
+
+    def remove(self, value: Any) -> None:
+        """Removes a value. Raises a ValueError if it is not in the list."""
+        bucket_index = bisect_left(self.maxes, value)
+        if bucket_index == len(self.maxes):
+            raise ValueError(f"{value} is not in the list")
+
+        bucket = self.buckets[bucket_index]
+        position = bisect_left(bucket, value)
+        if bucket[position] != value:
+            raise ValueError(f"{value} is not in the list")
+
+        del bucket[position]
+        self.size -= 1
+
+        if bucket:
+            self.maxes[bucket_index] = bucket[-1]
+            self.tree.add(bucket_index, -1)
+        else:
+            self.rebuild()
+
+    def index(self, value: Any) -> int:
+        """Gets you the position of a value. Raises a ValueError if it is not in the list."""
+        bucket_index = bisect_left(self.maxes, value)
+        if bucket_index == len(self.maxes):
+            raise ValueError(f"{value} is not in the list")
+
+        bucket = self.buckets[bucket_index]
+        position = bisect_left(bucket, value)
+        if bucket[position] != value:
+            raise ValueError(f"{value} is not in the list")
+
+        return self.tree.prefix_sum(bucket_index) + position
+
+    def slice(self, start: int, stop: int) -> list[Any]:
+        """Gets you the values from the start position up to the stop position."""
+        start = max(start, 0)
+        stop = min(stop, self.size)
+        if start >= stop:
+            return []
+
+        bucket_index, offset = self.tree.find(start)
+        values = []
+
+        while len(values) < stop - start:
+            bucket = self.buckets[bucket_index]
+            values.extend(bucket[offset : offset + stop - start - len(values)])
+            bucket_index += 1
+            offset = 0
+
+        return values
@@ -0,0 +1,115 @@
+import heapq
+from collections import deque
+from typing import NamedTuple
+
+import utils.database
+
+
+class Ping(NamedTuple):
+    user_id: int
+    channel_id: int
+    guild_id: int
+    timestamp: float
+
+
+class PingRegistry:
+    """Keeps the recent matchmaking pings of every type, in the order they came in.
+    Every type and guild gets its own queue, new pings go on the right and expired ones come off the left,
+    so evicting them is amortised O(1) and a guild never has to look at the pings of another one.
+
+    Only the latest ping of a user per type counts. If someone pings again,
+    the old entry stays in its queue but is skipped over until it expires.
+
+    Every ping is also written to the database, so that they survive a restart.
+    """
+
+    def __init__(self, db: utils.database.Database, max_age: float) -> None:
+        self.db = db
+        # How long a ping counts as recent, in seconds.
+        self.max_age = max_age
+
+        # The pings of every type and guild, oldest first.
+        self.queues: dict[tuple[str, int], deque[Ping]] = {}
+        # The latest ping of every user, by type and user ID.
+        self.latest: dict[tuple[str, int], Ping] = {}
+
+    def is_current(self, mm_type: str, ping: Ping) -> bool:
+        """Checks if a ping is the latest one of the user."""
+        return self.latest.get((mm_type, ping.user_id)) is ping
+
+    def evict(self, mm_type: str, guild_id: int, timestamp: float) -> None:
+        """Takes the pings of a guild off the queue that are expired at this point in time."""
+        queue = self.queues.get((mm_type, guild_id))
+        if queue is None:
+            return
+
+        while queue and timestamp - queue[0].timestamp >= self.max_age:
+            ping = queue.popleft()
+            if self.is_current(mm_type, ping):
+                del self.latest[(mm_type, ping.user_id)]
+
+        if not queue:
+            del self.queues[(mm_type, guild_id)]
+
+    def store(self, mm_type: str, ping: Ping) -> None:
+        """Adds a ping to memory only, see add for also saving it."""
+        self.evict(mm_type, ping.guild_id, ping.timestamp)
+
+        self.queues.setdefault((mm_type, ping.guild_id), deque()).append(ping)
+        self.latest[(mm_type, ping.user_id)] = ping
+
+    async def add(self, mm_type: str, ping: Ping) -> None:
+        """Adds a ping and saves it to the database, replacing the last ping of the user."""
+        self.store(mm_type, ping)
+
+        await self.db.execute(
+            """INSERT OR REPLACE INTO matchmaking_pings
+            VALUES (:mm_type, :user_id, :channel_id, :guild_id, :timestamp)""",
+            {"mm_type": mm_type} | ping._asdict(),
+        )
+
+    def get_recent(self, mm_type: str, guild_id: int, timestamp: float) -> list[Ping]:
+        """Gets you the recent pings of a type in a guild, the newest first."""
+        self.evict(mm_type, guild_id, timestamp)
+
+        return [
+            ping
+            for ping in reversed(self.queues.get((mm_type, guild_id), ()))
+            if self.is_current(mm_type, ping)
+        ]
+
+    def get_all_recent(self, mm_type: str, timestamp: float) -> list[Ping]:
+        """Gets you the recent pings of a type in every guild, the newest first."""
+        return list(
+            heapq.merge(
+                *[
+                    self.get_recent(mm_type, guild_id, timestamp)
+                    for queue_type, guild_id in list(self.queues)
+                    if queue_type == mm_type
+                ],
+                key=lambda ping: ping.timestamp,
+                reverse=True,
+            )
+        )
+
+    async def load(self, timestamp: float) -> None:
+        """Loads the pings that are still recent from the database, and deletes the rest."""
+        await self.db.execute(
+            """DELETE FROM matchmaking_pings WHERE timestamp <= :cutoff""",
+            {"cutoff": timestamp - self.max_age},
+        )
+
+        pings = await self.db.fetchall(
+            """SELECT mm_type, user_id, channel_id, guild_id, timestamp
+            FROM matchmaking_pings ORDER BY timestamp"""
+        )
+
+        for mm_type, *ping in pings:
+            self.store(mm_type, Ping(*ping))
+
+    async def clear(self) -> None:
+        """Deletes every ping, in memory and in the database."""
+        self.queues.clear()
+        self.latest.clear()
+
+        await self.db.execute("""DELETE FROM matchmaking_pings""")
@@ -0,0 +1,135 @@
+import time
+from typing import Callable, Optional
+
+from utils.order_statistics import OrderStatisticList
+
+# How long you stay in the queue, in seconds.
+# Has to stay below 15 minutes, after that we cannot respond to a slash command anymore.
+QUEUE_TIME = 10 * 60
+
+# How far apart two players can be in conservative rating to get paired.
+# A difference of 1 equals 100 points of the displayed rank.
+# The window starts out narrow for good matches, and widens the longer you wait.
+BASE_WINDOW = 2.0
+WINDOW_GROWTH = 1.0 / 60
+MAX_WINDOW = 10.0
+
+
+class RankedQueue:
+    """The players waiting for a ranked match, sorted by their conservative rating.
+    When someone joins, we only have to look at their two neighbours in the sorted order,
+    since they are the closest players in rating. Both the insert and the lookup are O(log n).
+
+    The players who did not find anyone right away are paired up later on,
+    once their rating windows have grown wide enough.
+    """
+
+    def __init__(
+        self,
+        base_window: float = BASE_WINDOW,
+        window_growth: float = WINDOW_GROWTH,
+        max_window: float = MAX_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.base_window = base_window
+        self.window_growth = window_growth
+        self.max_window = max_window
+        self.clock = clock
+
+        # The rating and join time of every waiting player, by user ID.
+        self.players: dict[int, tuple[float, float]] = {}
+        # Every waiting player as (rating, user ID), sorted.
+        self.ordered = OrderStatisticList()
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.players
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def get_window(self, user_id: int, now: float) -> float:
+        """Gets you how far off in rating an opponent of this player can be right now."""
+        _, joined_at = self.players[user_id]
+        return min(
+            self.base_window + (now - joined_at) * self.window_growth, self.max_window
+        )
+
+    def is_compatible(self, first: int, second: int, now: float) -> bool:
+        """Checks if two players are close enough in rating for both of their windows."""
+        difference = abs(self.players[first][0] - self.players[second][0])
+        return difference <= min(
+            self.get_window(first, now), self.get_window(second, now)
+        )
+
+    def remove(self, user_id: int) -> bool:
+        """Takes a player out of the queue. Returns if they were in it."""
+        if user_id not in self.players:
+            return False
+
+        rating, _ = self.players.pop(user_id)
+        self.ordered.remove((rating, user_id))
+        return True
+
+    def join(self, user_id: int, rating: float) -> Optional[int]:
+        """Adds a player to the queue, or updates their rating if they are in it already.
+        If there is a compatible opponent waiting, both are taken out of the queue and you get the opponent.
+        """
+        now = self.clock()
+        joined_at = self.players[user_id][1] if user_id in self.players else now
+
+        self.remove(user_id)
+        self.players[user_id] = (rating, joined_at)
+        self.ordered.add((rating, user_id))
+
+        position = self.ordered.index((rating, user_id))
+        neighbours = [
+            self.ordered[i][1]
+            for i in (position - 1, position + 1)
+            if 0 <= i < len(self.ordered)
+        ]
+
+        candidates = [
+            opponent
+            for opponent in neighbours
+            if self.is_compatible(user_id, opponent, now)
+        ]
+        if not candidates:
+            return None
+
+        opponent = min(
+            candidates, key=lambda opponent: abs(self.players[opponent][0] - rating)
+        )
+        self.remove(user_id)
+        self.remove(opponent)
+        return opponent
+
+    def pair_waiting(self) -> list[tuple[int, int]]:
+        """Pairs up the waiting players whose windows have grown enough to fit each other.
+        Only neighbours in the sorted order are considered, the closest pairs go first.
+        Every pair is returned with the player who waited longer first.
+        """
+        now = self.clock()
+        pairs = []
+
+        while True:
+            ordered = list(self.ordered)
+            candidates = sorted(
+                (second[0] - first[0], first[1], second[1])
+                for first, second in zip(ordered, ordered[1:])
+                if self.is_compatible(first[1], second[1], now)
+            )
+            if not candidates:
+                return pairs
+
+            paired = set()
+            for _, first, second in candidates:
+                if first in paired or second in paired:
+                    continue
+
+                paired.update((first, second))
+                if self.players[second][1] < self.players[first][1]:
+                    first, second = second, first
+                pairs.append((first, second))
+
+            for user_id in paired:
+                self.remove(user_id)
@@ -0,0 +1,442 @@
+import json
+from typing import Iterable, Optional
+
+import aiosqlite
+import trueskill
+
+from utils.rating import get_display_rank
+
+# How many matches back the recent performance in the ranked stats goes.
+RECENT_MATCHES = 5
+
+# How many results we keep in the recent form of a player.
+# They are stored as bits in a single integer, the most recent one in the lowest bit.
+RECENT_RESULTS = 16
+RESULTS_MASK = (1 << RECENT_RESULTS) - 1
+
+# Same as RecentForm.add_result, but right in the UPDATE statement of a ranked profile.
+# Every expression reads the old values, so there is no need to read the profile first.
+# The :won parameter has to be 1 for a win and 0 for a loss.
+ADD_RESULT_SQL = f"""recent_results = ((recent_results << 1) | :won) & {RESULTS_MASK},
+    recent_count = MIN(recent_count + 1, {RECENT_RESULTS}),
+    current_streak = CASE WHEN :won THEN MAX(current_streak, 0) + 1 ELSE MIN(current_streak, 0) - 1 END,
+    longest_winstreak = CASE WHEN :won
+        THEN MAX(longest_winstreak, MAX(current_streak, 0) + 1) ELSE longest_winstreak END,
+    longest_losestreak = CASE WHEN :won
+        THEN longest_losestreak ELSE MAX(longest_losestreak, 1 - MIN(current_streak, 0)) END"""
+
+# The columns RecentForm is loaded from, in order.
+FORM_COLUMNS = """recent_results, recent_count, current_streak, longest_winstreak, longest_losestreak"""
+
+
+class RecentForm:
+    """The last couple of results and the streaks of a player.
+    Unlike the whole W/L history, this stays the same size no matter how many matches someone plays.
+    """
+
+    def __init__(
+        self,
+        results: int = 0,
+        count: int = 0,
+        current_streak: int = 0,
+        longest_winstreak: int = 0,
+        longest_losestreak: int = 0,
+    ) -> None:
+        # The last results as bits, 1 for a win and 0 for a loss, the most recent one in the lowest bit.
+        self.results = results
+        self.count = count
+        # Positive for a win streak, negative for a losing streak.
+        self.current_streak = current_streak
+        self.longest_winstreak = longest_winstreak
+        self.longest_losestreak = longest_losestreak
+
+    @classmethod
+    def from_history(cls, history: Optional[str]) -> "RecentForm":
+        """Converts the old W/L history string, oldest result first."""
+        form = cls()
+        for result in history or "":
+            form.add_result(result == "W")
+        return form
+
+    @property
+    def current_winstreak(self) -> int:
+        return max(self.current_streak, 0)
+
+    @property
+    def current_losestreak(self) -> int:
+        return max(-self.current_streak, 0)
+
+    def add_result(self, won: bool) -> None:
+        """Adds the result of the next match."""
+        self.results = ((self.results << 1) | won) & RESULTS_MASK
+        self.count = min(self.count + 1, RECENT_RESULTS)
+
+        if won:
+            self.current_streak = max(self.current_streak, 0) + 1
+            self.longest_winstreak = max(self.longest_winstreak, self.current_streak)
+        else:
+            self.current_streak = min(self.current_streak, 0) - 1
+            self.longest_losestreak = max(self.longest_losestreak, -self.current_streak)
+
+    def last_results(self, amount: int = RECENT_MATCHES) -> str:
+        """Gets you the last results as a W/L string, the most recent one first."""
+        return "".join(
+            "W" if self.results >> i & 1 else "L"
+            for i in range(min(amount, self.count))
+        )
+
+    def to_parameters(self, user_id: int) -> dict:
+        """Gets you the parameters for storing this form in the database."""
+        return {
+            "user_id": user_id,
+            "recent_results": self.results,
+            "recent_count": self.count,
+            "current_streak": self.current_streak,
+            "longest_winstreak": self.longest_winstreak,
+            "longest_losestreak": self.longest_losestreak,
+        }
+
+
+async def save_form(conn: aiosqlite.Connection, forms: dict[int, RecentForm]) -> None:
+    """Stores the recent form of some players on their ranked profiles."""
+    await conn.executemany(
+        """UPDATE trueskill SET recent_results = :recent_results, recent_count = :recent_count,
+        current_streak = :current_streak, longest_winstreak = :longest_winstreak,
+        longest_losestreak = :longest_losestreak WHERE user_id = :user_id""",
+        [form.to_parameters(user_id) for user_id, form in forms.items()],
+    )
+
+
+async def rebuild_form(conn: aiosqlite.Connection, user_ids: Iterable[int]) -> None:
+    """Re-calculates the recent form of some players from the matches they played,
+    for when a match in the middle of their history gets deleted or corrected.
+    """
+    forms = {}
+
+    for user_id in user_ids:
+        form = RecentForm()
+        async with conn.execute(
+            """SELECT winner_id FROM matches WHERE winner_id = :user_id OR loser_id = :user_id
+            ORDER BY timestamp, rowid""",
+            {"user_id": user_id},
+        ) as cursor:
+            cursor.arraysize = 1000
+            async for (winner_id,) in cursor:
+                form.add_result(winner_id == user_id)
+        forms[user_id] = form
+
+    await save_form(conn, forms)
+
+
+def conservative_rating(rating: trueskill.Rating) -> float:
+    """The rating we sort players by, same as the display rank but without scaling and rounding."""
+    return rating.mu - 3 * rating.sigma
+
+
+class PlayerStats:
+    """The ranked stats of a player that would otherwise need a scan over every match they played.
+    They only ever move forward one match at a time, so they are cheap to keep up to date.
+    """
+
+    def __init__(self, row: Optional[tuple] = None) -> None:
+        # The highest rating they had, by conservative rating.
+        self.peak: Optional[trueskill.Rating] = None
+        self.peak_timestamp: Optional[int] = None
+
+        # The highest rated opponent they beat, at the time of the match.
+        self.best_win_opponent: Optional[int] = None
+        self.best_win: Optional[trueskill.Rating] = None
+        self.best_win_timestamp: Optional[int] = None
+
+        # The summed up display ranks of every opponent, for the average.
+        self.opponent_rank_sum = 0
+        self.opponents = 0
+
+        # Their rating before each of their last couple of matches, oldest first.
+        self.recent_ratings: list[list[float]] = []
+
+        if row is not None:
+            (
+                peak_rating,
+                peak_deviation,
+                self.peak_timestamp,
+                self.best_win_opponent,
+                best_win_rating,
+                best_win_deviation,
+                self.best_win_timestamp,
+                self.opponent_rank_sum,
+                self.opponents,
+                recent_ratings,
+            ) = row
+
+            if peak_rating is not None:
+                self.peak = trueskill.Rating(peak_rating, peak_deviation)
+            if best_win_rating is not None:
+                self.best_win = trueskill.Rating(best_win_rating, best_win_deviation)
+            self.recent_ratings = json.loads(recent_ratings or "[]")
+
+    def add_match(
+        self,
+        won: bool,
+        timestamp: int,
+        old_rating: trueskill.Rating,
+        new_rating: trueskill.Rating,
+        opponent_id: int,
+        opponent_rating: trueskill.Rating,
+    ) -> None:
+        """Adds the next match of the player. The opponent rating is the one before the match."""
+        self.opponent_rank_sum += get_display_rank(opponent_rating)
+        self.opponents += 1
+
+        # You can gain rating by losing, but you cannot lose rating by winning.
+        # So after a loss, the rating before the match might have been the higher one.
+        peak = new_rating
+        if not won and conservative_rating(old_rating) > conservative_rating(
+            new_rating
+        ):
+            peak = old_rating
+
+        if self.peak is None or conservative_rating(peak) > conservative_rating(
+            self.peak
+        ):
+            self.peak = peak
+            self.peak_timestamp = timestamp
+
+        if won and (
+            self.best_win is None
+            or conservative_rating(opponent_rating) > conservative_rating(self.best_win)
+        ):
+            self.best_win_opponent = opponent_id
+            self.best_win = opponent_rating
+            self.best_win_timestamp = timestamp
+
+        self.recent_ratings.append([old_rating.mu, old_rating.sigma])
+        del self.recent_ratings[:-RECENT_MATCHES]
+
+    def to_parameters(self, user_id: int) -> dict:
+        """Gets you the parameters for storing these stats in the database."""
+        return {
+            "user_id": user_id,
+            "peak_rating": self.peak.mu if self.peak else None,
+            "peak_deviation": self.peak.sigma if self.peak else None,
+            "peak_timestamp": self.peak_timestamp,
+            "best_win_opponent": self.best_win_opponent,
+            "best_win_rating": self.best_win.mu if self.best_win else None,
+            "best_win_deviation": self.best_win.sigma if self.best_win else None,
+            "best_win_timestamp": self.best_win_timestamp,
+            "opponent_rank_sum": self.opponent_rank_sum,
+            "opponents": self.opponents,
+            "recent_ratings": json.dumps(self.recent_ratings),
+        }
+
+
+# The columns PlayerStats is loaded from, in order.
+STATS_COLUMNS = """peak_rating, peak_deviation, peak_timestamp,
+    best_win_opponent, best_win_rating, best_win_deviation, best_win_timestamp,
+    opponent_rank_sum, opponents, recent_ratings"""
+
+# The leaderboard position of the player in the trueskill row of the outer query, NULL if they are not on it.
+# It counts the players rated higher, which is a range scan over the partial index of the leaderboard.
+# So a match does not need to re-number everyone, and there is no stored position to keep in sync.
+# The filter and the rating have to be written exactly like in the index, otherwise SQLite does not use it.
+POSITION_SQL = """CASE WHEN trueskill.wins + trueskill.losses > 4 THEN (
+    SELECT COUNT(*) + 1 FROM trueskill AS higher WHERE higher.wins + higher.losses > 4
+    AND (higher.rating - 3 * higher.deviation) > (trueskill.rating - 3 * trueskill.deviation)
+    ) END"""
+
+# The amount of players on the leaderboard, which only scans the partial index.
+LEADERBOARD_SIZE_SQL = """(SELECT COUNT(*) FROM trueskill WHERE wins + losses > 4)"""
+
+
+async def save_stats(conn: aiosqlite.Connection, stats: dict[int, PlayerStats]) -> None:
+    """Stores the stats of some players, replacing the old ones."""
+    await conn.executemany(
+        f"""INSERT OR REPLACE INTO ranked_player_stats (user_id, {STATS_COLUMNS}) VALUES (
+        :user_id,
+        :peak_rating,
+        :peak_deviation,
+        :peak_timestamp,
+        :best_win_opponent,
+        :best_win_rating,
+        :best_win_deviation,
+        :best_win_timestamp,
+        :opponent_rank_sum,
+        :opponents,
+        :recent_ratings)""",
+        [player.to_parameters(user_id) for user_id, player in stats.items()],
+    )
+
+
+async def record_match(
+    conn: aiosqlite.Connection,
+    winner_id: int,
+    loser_id: int,
+    timestamp: int,
+    old_winner: trueskill.Rating,
+    new_winner: trueskill.Rating,
+    old_loser: trueskill.Rating,
+    new_loser: trueskill.Rating,
+) -> None:
+    """Adds a new match to the stats of both players.
+    Should run in the same transaction as logging the match.
+    """
+    stats = {}
+
+    for user_id in (winner_id, loser_id):
+        async with conn.execute(
+            f"""SELECT {STATS_COLUMNS} FROM ranked_player_stats WHERE user_id = :user_id""",
+            {"user_id": user_id},
+        ) as cursor:
+            stats[user_id] = PlayerStats(await cursor.fetchone())
+
+    stats[winner_id].add_match(
+        True, timestamp, old_winner, new_winner, loser_id, old_loser
+    )
+    stats[loser_id].add_match(
+        False, timestamp, old_loser, new_loser, winner_id, old_winner
+    )
+
+    await save_stats(conn, stats)
+
+
+async def rebuild_stats(
+    conn: aiosqlite.Connection, user_ids: Optional[Iterable[int]] = None
+) -> int:
+    """Re-calculates the stats of some players, or everyone, from their match history.
+    Needed after matches get deleted or re-rated, since the stats can only move forward.
+    Returns the amount of players that were rebuilt.
+    """
+    if user_ids is None:
+        players = await conn.execute_fetchall("""SELECT user_id FROM trueskill""")
+        stats = {user_id: PlayerStats() for user_id, in players}
+        await conn.execute("""DELETE FROM ranked_player_stats""")
+    else:
+        stats = {user_id: PlayerStats() for user_id in user_ids}
+
+    async with conn.execute(
+        """SELECT winner_id, loser_id, timestamp, old_winner_rating, old_winner_deviation,
+        old_loser_rating, old_loser_deviation, new_winner_rating, new_winner_deviation,
+        new_loser_rating, new_loser_deviation
+        FROM matches ORDER BY timestamp, rowid"""
+    ) as cursor:
+        cursor.arraysize = 1000
+        async for (
+            winner_id,
+            loser_id,
+            timestamp,
+            old_winner_rating,
+            old_winner_deviation,
+            old_loser_rating,
+            old_loser_deviation,
+            new_winner_rating,
+            new_winner_deviation,
+            new_loser_rating,
+            new_loser_deviation,
+        ) in cursor:
+            if winner_id not in stats and loser_id not in stats:
+                continue
+
+            old_winner = trueskill.Rating(old_winner_rating, old_winner_deviation)
+            old_loser = trueskill.Rating(old_loser_rating, old_loser_deviation)
+
+            if winner_id in stats:
+                stats[winner_id].add_match(
+                    True,
+                    timestamp,
+                    old_winner,
+                    trueskill.Rating(new_winner_rating, new_winner_deviation),
+                    loser_id,
+                    old_loser,
+                )
+            if loser_id in stats:
+                stats[loser_id].add_match(
+                    False,
+                    timestamp,
+                    old_loser,
+                    trueskill.Rating(new_loser_rating, new_loser_deviation),
+                    winner_id,
+                    old_winner,
+                )
+
+    await save_stats(conn, stats)
+
+    return len(stats)
+
+
+# Every match from the view of both players, with how much their conservative rating changed.
+PLAYER_MATCHES_SQL = """SELECT winner_id AS player_id, loser_id AS opponent_id, 1 AS won, timestamp,
+    (new_winner_rating - 3 * new_winner_deviation) - (old_winner_rating - 3 * old_winner_deviation) AS swing
+    FROM matches
+    UNION ALL
+    SELECT loser_id, winner_id, 0, timestamp,
+    (new_loser_rating - 3 * new_loser_deviation) - (old_loser_rating - 3 * old_loser_deviation)
+    FROM matches"""
+
+
+async def record_head_to_head(
+    conn: aiosqlite.Connection,
+    winner_id: int,
+    loser_id: int,
+    timestamp: int,
+    old_winner: trueskill.Rating,
+    new_winner: trueskill.Rating,
+    old_loser: trueskill.Rating,
+    new_loser: trueskill.Rating,
+) -> None:
+    """Adds a new match to the head to head records of both players against each other."""
+    await conn.executemany(
+        """INSERT INTO head_to_head VALUES (:player_id, :opponent_id, :won, 1 - :won, :timestamp, :swing)
+        ON CONFLICT (player_id, opponent_id) DO UPDATE SET
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        last_played = MAX(last_played, excluded.last_played),
+        rating_swing = rating_swing + excluded.rating_swing""",
+        [
+            {
+                "player_id": winner_id,
+                "opponent_id": loser_id,
+                "won": 1,
+                "timestamp": timestamp,
+                "swing": conservative_rating(new_winner)
+                - conservative_rating(old_winner),
+            },
+            {
+                "player_id": loser_id,
+                "opponent_id": winner_id,
+                "won": 0,
+                "timestamp": timestamp,
+                "swing": conservative_rating(new_loser)
+                - conservative_rating(old_loser),
+            },
+        ],
+    )
+
+
+async def rebuild_head_to_head(
+    conn: aiosqlite.Connection, user_ids: Optional[Iterable[int]] = None
+) -> None:
+    """Re-calculates the head to head records of some players, or everyone, from the match history.
+    Their opponents' records against them are only affected if the opponents are in here, too.
+    """
+    if user_ids is None:
+        await conn.execute("""DELETE FROM head_to_head""")
+        await conn.execute(f"""INSERT INTO head_to_head
+            SELECT player_id, opponent_id, SUM(won), SUM(1 - won), MAX(timestamp), SUM(swing)
+            FROM ({PLAYER_MATCHES_SQL}) GROUP BY player_id, opponent_id""")
+        return
+
+    # Passing the IDs as a JSON array, so we do not run into the limit of parameters.
+    parameters = {"user_ids": json.dumps(list(user_ids))}
+
+    await conn.execute(
+        """DELETE FROM head_to_head WHERE player_id IN (SELECT value FROM json_each(:user_ids))""",
+        parameters,
+    )
+    await conn.execute(
+        f"""INSERT INTO head_to_head
+        SELECT player_id, opponent_id, SUM(won), SUM(1 - won), MAX(timestamp), SUM(swing)
+        FROM ({PLAYER_MATCHES_SQL})
+        WHERE player_id IN (SELECT value FROM json_each(:user_ids))
+        GROUP BY player_id, opponent_id""",
+        parameters,
+    )
@@ -0,0 +1,411 @@
+import math
+import time
+from typing import Optional
+
+import aiosqlite
+import trueskill
+
+import utils.database
+
+# How many matches we replay before we store a checkpoint of everyone's ratings.
+CHECKPOINT_INTERVAL = 1000
+
+# A checkpoint has to be at least this many seconds old,
+# so that no match reported later on can still have the same timestamp.
+CHECKPOINT_MIN_AGE = 60
+
+# Inactive players get their deviation multiplied by this every month, up to the default deviation.
+DECAY_FACTOR = 31 / 30
+MAX_DEVIATION = 25 / 3
+
+
+def get_display_rank(rating: trueskill.Rating) -> int:
+    """Gets the conservatively estimated rank of a player, scaled."""
+    # This is the formula used by Microsoft, for example in Halo 3.
+    # But we multiply by 100 and add 1000 to get a nicer number.
+    return max(round(((rating.mu - 3 * rating.sigma) * 100) + 1000), 0)
+
+
+def rate_1vs1(
+    winner: trueskill.Rating, loser: trueskill.Rating
+) -> tuple[trueskill.Rating, trueskill.Rating]:
+    """Gets you the new ratings of the winner and loser of a match, same as trueskill.rate_1vs1.
+    With only two players the factor graph boils down to a couple of formulas,
+    so we can skip building and running it, which is about 40x faster.
+    The results are the same, apart from rounding errors.
+    """
+    env = trueskill.global_env()
+    draw_margin = trueskill.calc_draw_margin(env.draw_probability, 2, env)
+
+    # The dynamics factor, adding a bit of uncertainty before every match.
+    winner_variance = winner.sigma**2 + env.tau**2
+    loser_variance = loser.sigma**2 + env.tau**2
+
+    total_variance = 2 * env.beta**2 + winner_variance + loser_variance
+    c = math.sqrt(total_variance)
+
+    v = env.v_win((winner.mu - loser.mu) / c, draw_margin / c)
+    w = env.w_win((winner.mu - loser.mu) / c, draw_margin / c)
+
+    return (
+        trueskill.Rating(
+            winner.mu + winner_variance / c * v,
+            math.sqrt(winner_variance * (1 - winner_variance / total_variance * w)),
+        ),
+        trueskill.Rating(
+            loser.mu - loser_variance / c * v,
+            math.sqrt(loser_variance * (1 - loser_variance / total_variance * w)),
+        ),
+    )
+
+
+class RatingReplay:
+    """Re-calculates the ratings of every player from a list of matches,
+    with every player starting out at the default rating.
+    The players are stored in a dict by their user ID, so looking them up does not get slower with more players.
+    """
+
+    def __init__(self, players: Optional[dict[int, dict]] = None) -> None:
+        # The rating, wins and losses of every player, by user ID.
+        self.players: dict[int, dict] = players or {}
+        self.matches = 0
+
+    def get_player(self, user_id: int) -> dict:
+        """Gets you a player, or adds them with the default rating if they are not in here yet."""
+        if user_id not in self.players:
+            self.players[user_id] = {
+                "rating": trueskill.Rating(),
+                "wins": 0,
+                "losses": 0,
+            }
+
+        return self.players[user_id]
+
+    def add_match(self, winner_id: int, loser_id: int) -> None:
+        """Updates the ratings, wins and losses of both players of a match."""
+        winner = self.get_player(winner_id)
+        loser = self.get_player(loser_id)
+
+        winner["rating"], loser["rating"] = rate_1vs1(winner["rating"], loser["rating"])
+
+        winner["wins"] += 1
+        loser["losses"] += 1
+        self.matches += 1
+
+    def snapshot(self) -> dict[int, dict]:
+        """Gets you a copy of every player, that does not change when more matches are added."""
+        return {user_id: dict(player) for user_id, player in self.players.items()}
+
+
+async def load_checkpoint(
+    db: utils.database.Database, start: int, end: int
+) -> tuple[int, dict[int, dict]]:
+    """Gets you the latest checkpoint of a season that does not go past the end,
+    plus the timestamp of the last match it includes.
+    If there is none, you get an empty season right before the start.
+    """
+    async with db.reader() as conn:
+        async with conn.execute(
+            """SELECT MAX(timestamp) FROM rating_checkpoints WHERE season_start = :start AND timestamp <= :end""",
+            {"start": start, "end": end},
+        ) as cursor:
+            checkpoint = (await cursor.fetchone())[0]
+
+        if checkpoint is None:
+            return (start - 1, {})
+
+        players = {}
+
+        async with conn.execute(
+            """SELECT user_id, rating, deviation, wins, losses FROM rating_checkpoints
+            WHERE season_start = :start AND timestamp = :timestamp""",
+            {"start": start, "timestamp": checkpoint},
+        ) as cursor:
+            cursor.arraysize = 1000
+            async for user_id, rating, deviation, wins, losses in cursor:
+                players[user_id] = {
+                    "rating": trueskill.Rating(rating, deviation),
+                    "wins": wins,
+                    "losses": losses,
+                }
+
+    return (checkpoint, players)
+
+
+async def save_checkpoints(
+    db: utils.database.Database, start: int, checkpoints: dict[int, dict[int, dict]]
+) -> None:
+    """Stores the checkpoints of a season, by the timestamp of the last match they include."""
+    await db.executemany(
+        """INSERT OR REPLACE INTO rating_checkpoints
+        VALUES (:start, :timestamp, :user_id, :rating, :deviation, :wins, :losses)""",
+        [
+            {
+                "start": start,
+                "timestamp": timestamp,
+                "user_id": user_id,
+                "rating": player["rating"].mu,
+                "deviation": player["rating"].sigma,
+                "wins": player["wins"],
+                "losses": player["losses"],
+            }
+            for timestamp, players in checkpoints.items()
+            for user_id, player in players.items()
+        ],
+    )
+
+
+async def replay_season(
+    db: utils.database.Database, start: int, end: int
+) -> dict[int, dict]:
+    """Re-calculates the ratings of every player who played between the start and end timestamps.
+    Starts from the closest checkpoint of the same season, if there is one,
+    and stores new checkpoints along the way, so the next time we do not have to start from scratch.
+    """
+    last_timestamp, players = await load_checkpoint(db, start, end)
+    replay = RatingReplay(players)
+
+    checkpoints = {}
+    since_checkpoint = 0
+    newest_checkpoint = time.time() - CHECKPOINT_MIN_AGE
+
+    async with db.reader() as conn:
+        # Streaming the matches, instead of loading all of them into memory first.
+        async with conn.execute(
+            """SELECT winner_id, loser_id, timestamp FROM matches
+            WHERE timestamp > :after AND timestamp <= :end ORDER BY timestamp, rowid""",
+            {"after": last_timestamp, "end": end},
+        ) as cursor:
+            # Otherwise we would fetch them one row at a time.
+            cursor.arraysize = 1000
+            async for winner_id, loser_id, timestamp in cursor:
+                # We only store a checkpoint once every match with the same timestamp is included.
+                if (
+                    since_checkpoint >= CHECKPOINT_INTERVAL
+                    and timestamp > last_timestamp
+                    and last_timestamp < newest_checkpoint
+                ):
+                    checkpoints[last_timestamp] = replay.snapshot()
+                    since_checkpoint = 0
+
+                replay.add_match(winner_id, loser_id)
+                since_checkpoint += 1
+                last_timestamp = timestamp
+
+    if since_checkpoint >= CHECKPOINT_INTERVAL and last_timestamp < newest_checkpoint:
+        checkpoints[last_timestamp] = replay.snapshot()
+
+    if checkpoints:
+        await save_checkpoints(db, start, checkpoints)
+
+    return replay.players
+
+
+def carry_decay(
+    rating: trueskill.Rating, before: float, after: float
+) -> trueskill.Rating:
+    """Applies the decay a player got between two matches to a re-calculated rating.
+    Before and after are the deviations we had stored at the end of the first match
+    and at the start of the next one, the decay is the only thing that changes them in between.
+    """
+    if after <= before:
+        return rating
+
+    # Once the deviation hits the cap, it does not matter where it started from.
+    if math.isclose(after, MAX_DEVIATION):
+        return trueskill.Rating(rating.mu, MAX_DEVIATION)
+
+    steps = round(math.log(after / before) / math.log(DECAY_FACTOR))
+    return trueskill.Rating(
+        rating.mu, min(rating.sigma * DECAY_FACTOR**steps, MAX_DEVIATION)
+    )
+
+
+async def rerate_match(
+    conn: aiosqlite.Connection, match_id: int, swap: bool = False
+) -> tuple[int, set[int]]:
+    """Deletes a match, or swaps its winner and loser if it was reported the wrong way around,
+    and re-calculates the ratings of every later match that is affected by it.
+    That is every match of the two players, then every match of their opponents after that, and so on.
+    Matches of players who never came into contact with the change are not touched.
+
+    The recent form of the two players is not touched, see utils.ranked_stats.rebuild_form for that.
+
+    Has to run inside of a transaction, so that nothing gets reported in the meantime.
+    Returns the amount of later matches that were re-calculated and the IDs of every affected player.
+    """
+    match = await (
+        await conn.execute(
+            """SELECT rowid, * FROM matches WHERE match_id = :match_id""",
+            {"match_id": match_id},
+        )
+    ).fetchone()
+
+    (
+        match_rowid,
+        _,
+        winner_id,
+        loser_id,
+        match_timestamp,
+        old_winner_rating,
+        old_winner_deviation,
+        old_loser_rating,
+        old_loser_deviation,
+        new_winner_rating,
+        new_winner_deviation,
+        new_loser_rating,
+        new_loser_deviation,
+    ) = match
+
+    # The current rating of every affected player, and the deviation we had stored for them after their last match.
+    # We compare that one to the deviation at the start of their next match, to carry over any decay.
+    ratings = {
+        winner_id: trueskill.Rating(old_winner_rating, old_winner_deviation),
+        loser_id: trueskill.Rating(old_loser_rating, old_loser_deviation),
+    }
+    stored_deviations = {
+        winner_id: new_winner_deviation,
+        loser_id: new_loser_deviation,
+    }
+
+    if swap:
+        ratings[loser_id], ratings[winner_id] = rate_1vs1(
+            ratings[loser_id], ratings[winner_id]
+        )
+        await conn.execute(
+            """UPDATE matches SET winner_id = :winner_id, loser_id = :loser_id,
+            old_winner_rating = :old_winner_rating, old_winner_deviation = :old_winner_deviation,
+            old_loser_rating = :old_loser_rating, old_loser_deviation = :old_loser_deviation,
+            new_winner_rating = :new_winner_rating, new_winner_deviation = :new_winner_deviation,
+            new_loser_rating = :new_loser_rating, new_loser_deviation = :new_loser_deviation
+            WHERE rowid = :rowid""",
+            {
+                "rowid": match_rowid,
+                "winner_id": loser_id,
+                "loser_id": winner_id,
+                "old_winner_rating": old_loser_rating,
+                "old_winner_deviation": old_loser_deviation,
+                "old_loser_rating": old_winner_rating,
+                "old_loser_deviation": old_winner_deviation,
+                "new_winner_rating": ratings[loser_id].mu,
+                "new_winner_deviation": ratings[loser_id].sigma,
+                "new_loser_rating": ratings[winner_id].mu,
+                "new_loser_deviation": ratings[winner_id].sigma,
+            },
+        )
+    else:
+        await conn.execute(
+            """DELETE FROM matches WHERE rowid = :rowid""", {"rowid": match_rowid}
+        )
+
+    updates = []
+
+    async with conn.execute(
+        """SELECT rowid, winner_id, loser_id, timestamp, old_winner_rating, old_winner_deviation,
+        old_loser_rating, old_loser_deviation, new_winner_deviation, new_loser_deviation
+        FROM matches WHERE timestamp >= :timestamp ORDER BY timestamp, rowid""",
+        {"timestamp": match_timestamp},
+    ) as cursor:
+        cursor.arraysize = 1000
+        async for (
+            rowid,
+            winner,
+            loser,
+            timestamp,
+            winner_rating,
+            winner_deviation,
+            loser_rating,
+            loser_deviation,
+            stored_winner_deviation,
+            stored_loser_deviation,
+        ) in cursor:
+            # Matches with the same timestamp, that were reported before this one.
+            if (timestamp, rowid) <= (match_timestamp, match_rowid):
+                continue
+
+            if winner not in ratings and loser not in ratings:
+                continue
+
+            for user_id, rating, deviation in (
+                (winner, winner_rating, winner_deviation),
+                (loser, loser_rating, loser_deviation),
+            ):
+                if user_id in ratings:
+                    ratings[user_id] = carry_decay(
+                        ratings[user_id], stored_deviations[user_id], deviation
+                    )
+                else:
+                    # Everything before this match is unaffected, so we can start from what we have stored.
+                    ratings[user_id] = trueskill.Rating(rating, deviation)
+
+            stored_deviations[winner] = stored_winner_deviation
+            stored_deviations[loser] = stored_loser_deviation
+
+            old_winner, old_loser = ratings[winner], ratings[loser]
+            ratings[winner], ratings[loser] = rate_1vs1(old_winner, old_loser)
+
+            updates.append(
+                {
+                    "rowid": rowid,
+                    "old_winner_rating": old_winner.mu,
+                    "old_winner_deviation": old_winner.sigma,
+                    "old_loser_rating": old_loser.mu,
+                    "old_loser_deviation": old_loser.sigma,
+                    "new_winner_rating": ratings[winner].mu,
+                    "new_winner_deviation": ratings[winner].sigma,
+                    "new_loser_rating": ratings[loser].mu,
+                    "new_loser_deviation": ratings[loser].sigma,
+                }
+            )
+
+    await conn.executemany(
+        """UPDATE matches SET
+        old_winner_rating = :old_winner_rating, old_winner_deviation = :old_winner_deviation,
+        old_loser_rating = :old_loser_rating, old_loser_deviation = :old_loser_deviation,
+        new_winner_rating = :new_winner_rating, new_winner_deviation = :new_winner_deviation,
+        new_loser_rating = :new_loser_rating, new_loser_deviation = :new_loser_deviation
+        WHERE rowid = :rowid""",
+        updates,
+    )
+
+    # The decay since their last match still has to be carried over to the current ratings.
+    players = await conn.execute_fetchall(
+        f"""SELECT user_id, deviation FROM trueskill WHERE user_id IN ({", ".join("?" * len(ratings))})""",
+        list(ratings),
+    )
+
+    player_updates = []
+
+    for user_id, deviation in players:
+        rating = carry_decay(ratings[user_id], stored_deviations[user_id], deviation)
+        wins, losses = 0, 0
+
+        if user_id == winner_id:
+            wins, losses = -1, int(swap)
+        elif user_id == loser_id:
+            wins, losses = int(swap), -1
+
+        player_updates.append(
+            {
+                "user_id": user_id,
+                "rating": rating.mu,
+                "deviation": rating.sigma,
+                "wins": wins,
+                "losses": losses,
+            }
+        )
+
+    await conn.executemany(
+        """UPDATE trueskill SET rating = :rating, deviation = :deviation,
+        wins = wins + :wins, losses = losses + :losses
+        WHERE user_id = :user_id""",
+        player_updates,
+    )
+
+    # The season checkpoints that include this match are not valid anymore.
+    await conn.execute(
+        """DELETE FROM rating_checkpoints WHERE timestamp >= :timestamp""",
+        {"timestamp": match_timestamp},
+    )
+
+    return (len(updates), set(ratings))
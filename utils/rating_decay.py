@@ -0,0 +1,126 @@
+import datetime
+import time
+from typing import Optional
+
+import aiosqlite
+
+from utils.rating import DECAY_FACTOR, MAX_DEVIATION
+
+# The decay runs on the first of every month at 12:00, chose the first cause why not.
+# Timezones really dont matter too much here, so this is just the local time of the bot.
+DECAY_DAY = 1
+DECAY_TIME = datetime.time(12, 0, 0)
+
+# Everyone who played no match in the month before the decay and is not at the maximum deviation yet.
+# Both lookups use the indexes on (winner_id, timestamp) and (loser_id, timestamp) of the matches.
+INACTIVE_PLAYERS_SQL = """deviation < :max_deviation
+    AND NOT EXISTS (
+        SELECT 1 FROM matches WHERE winner_id = trueskill.user_id
+        AND timestamp > :since AND timestamp <= :until
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM matches WHERE loser_id = trueskill.user_id
+        AND timestamp > :since AND timestamp <= :until
+    )"""
+
+
+def get_period_start(period: str) -> datetime.datetime:
+    """Gets you the time the decay of a period is due, the periods are months like 2024-05."""
+    year, month = (int(part) for part in period.split("-"))
+    return datetime.datetime.combine(datetime.date(year, month, DECAY_DAY), DECAY_TIME)
+
+
+def get_period(year: int, month: int) -> str:
+    """Gets you the period of a month, wrapping around the years."""
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return f"{year:04d}-{month:02d}"
+
+
+def get_next_period(period: str) -> str:
+    """Gets you the period after this one."""
+    year, month = (int(part) for part in period.split("-"))
+    return get_period(year, month + 1)
+
+
+def get_due_period(now: datetime.datetime) -> str:
+    """Gets you the latest period whose decay is due at this point in time."""
+    period = get_period(now.year, now.month)
+    if now < get_period_start(period):
+        return get_period(now.year, now.month - 1)
+    return period
+
+
+def get_missed_periods(last_period: Optional[str], now: datetime.datetime) -> list[str]:
+    """Gets you every period that is due but was not decayed yet, the oldest first.
+    If nothing was ever decayed, only the latest due period is returned.
+    """
+    due_period = get_due_period(now)
+
+    if last_period is None:
+        return [due_period]
+
+    periods = []
+    period = get_next_period(last_period)
+    while period <= due_period:
+        periods.append(period)
+        period = get_next_period(period)
+
+    return periods
+
+
+async def get_last_period(conn: aiosqlite.Connection) -> Optional[str]:
+    """Gets you the latest period that was decayed."""
+    async with conn.execute("""SELECT MAX(period) FROM rating_decay_runs""") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def decay_period(
+    conn: aiosqlite.Connection, period: str, dry_run: bool = False
+) -> int:
+    """Decays the deviation of everyone who was inactive in the month before the period, in a single pass.
+    Every period is only ever decayed once, so running this again for the same period does nothing.
+    In a dry run nothing is changed, you only get the amount of players that would be decayed.
+    Should run inside of a transaction. Returns the amount of players that were decayed.
+    """
+    start = time.perf_counter()
+
+    async with conn.execute(
+        """SELECT 1 FROM rating_decay_runs WHERE period = :period""",
+        {"period": period},
+    ) as cursor:
+        if await cursor.fetchone():
+            return 0
+
+    until = get_period_start(period)
+    parameters = {
+        "factor": DECAY_FACTOR,
+        "max_deviation": MAX_DEVIATION,
+        "since": get_period_start(get_period(until.year, until.month - 1)).timestamp(),
+        "until": until.timestamp(),
+    }
+
+    if dry_run:
+        async with conn.execute(
+            f"""SELECT COUNT(*) FROM trueskill WHERE {INACTIVE_PLAYERS_SQL}""",
+            parameters,
+        ) as cursor:
+            return (await cursor.fetchone())[0]
+
+    cursor = await conn.execute(
+        f"""UPDATE trueskill SET deviation = MIN(deviation * :factor, :max_deviation)
+        WHERE {INACTIVE_PLAYERS_SQL}""",
+        parameters,
+    )
+    players = cursor.rowcount
+
+    await conn.execute(
+        """INSERT INTO rating_decay_runs VALUES (:period, :timestamp, :players, :duration)""",
+        {
+            "period": period,
+            "timestamp": int(time.time()),
+            "players": players,
+            "duration": time.perf_counter() - start,
+        },
+    )
+
+    return players
@@ -0,0 +1,174 @@
+import json
+from typing import Iterable, Optional
+
+import aiosqlite
+import trueskill
+
+from utils.ranked_stats import conservative_rating
+
+# The lengths of the periods we summarise the rating history into, in seconds.
+# Weeks start on Monday, the unix epoch was on a Thursday so they are offset by 4 days.
+PERIODS = {
+    "daily": (24 * 60 * 60, 0),
+    "weekly": (7 * 24 * 60 * 60, 4 * 24 * 60 * 60),
+}
+
+# How many periods the rating history command shows, and how many of those in detail.
+HISTORY_PERIODS = 30
+HISTORY_DETAILS = 5
+
+# The characters of the sparkline, from lowest to highest.
+SPARK_CHARACTERS = "▁▂▃▄▅▆▇█"
+
+# Every match from the view of both players, with their conservative rating before and after.
+PLAYER_RATINGS_SQL = """SELECT winner_id AS user_id, match_id, timestamp, rowid AS match_order,
+    new_winner_rating AS rating, new_winner_deviation AS deviation,
+    old_winner_rating - 3 * old_winner_deviation AS old_rating,
+    new_winner_rating - 3 * new_winner_deviation AS new_rating
+    FROM matches
+    UNION ALL
+    SELECT loser_id, match_id, timestamp, rowid,
+    new_loser_rating, new_loser_deviation,
+    old_loser_rating - 3 * old_loser_deviation,
+    new_loser_rating - 3 * new_loser_deviation
+    FROM matches"""
+
+
+def get_period_start(timestamp: int, period: str) -> int:
+    """Gets you the start of the day or week a timestamp falls into, in UTC."""
+    length, offset = PERIODS[period]
+    return (timestamp - offset) // length * length + offset
+
+
+def get_display_rating(rating: float) -> int:
+    """Scales a conservative rating the same way as utils.rating.get_display_rank."""
+    return max(round(rating * 100 + 1000), 0)
+
+
+def get_sparkline(values: list[float]) -> str:
+    """Draws a list of values as a line of block characters, scaled between their lowest and highest value."""
+    if not values:
+        return ""
+
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARACTERS[len(SPARK_CHARACTERS) // 2] * len(values)
+
+    steps = len(SPARK_CHARACTERS) - 1
+    return "".join(
+        SPARK_CHARACTERS[round((value - low) / (high - low) * steps)]
+        for value in values
+    )
+
+
+async def record_history(
+    conn: aiosqlite.Connection,
+    match_id: int,
+    timestamp: int,
+    ratings: list[tuple[int, trueskill.Rating, trueskill.Rating]],
+) -> None:
+    """Adds a new match to the rating history and the daily and weekly summaries of the players.
+    The ratings are the user ID, the old and the new rating of every player in the match.
+    Should run in the same transaction as logging the match.
+    """
+    await conn.executemany(
+        """INSERT INTO rating_history VALUES (:user_id, :match_id, :timestamp, :rating, :deviation)""",
+        [
+            {
+                "user_id": user_id,
+                "match_id": match_id,
+                "timestamp": timestamp,
+                "rating": new_rating.mu,
+                "deviation": new_rating.sigma,
+            }
+            for user_id, _, new_rating in ratings
+        ],
+    )
+
+    summaries = []
+    for user_id, old_rating, new_rating in ratings:
+        old_rating = conservative_rating(old_rating)
+        new_rating = conservative_rating(new_rating)
+
+        for period in PERIODS:
+            summaries.append(
+                {
+                    "user_id": user_id,
+                    "period": period,
+                    "period_start": get_period_start(timestamp, period),
+                    "old_rating": old_rating,
+                    "new_rating": new_rating,
+                    "low_rating": min(old_rating, new_rating),
+                    "high_rating": max(old_rating, new_rating),
+                }
+            )
+
+    # Matches are logged as they happen, so the new rating is always the latest one of the period.
+    await conn.executemany(
+        """INSERT INTO rating_history_summary VALUES (
+        :user_id, :period, :period_start, 1, :old_rating, :new_rating, :low_rating, :high_rating)
+        ON CONFLICT (user_id, period, period_start) DO UPDATE SET
+        matches = matches + 1,
+        close_rating = excluded.close_rating,
+        low_rating = MIN(low_rating, excluded.low_rating),
+        high_rating = MAX(high_rating, excluded.high_rating)""",
+        summaries,
+    )
+
+
+async def rebuild_history(
+    conn: aiosqlite.Connection, user_ids: Optional[Iterable[int]] = None
+) -> None:
+    """Re-calculates the rating history of some players, or everyone, from the match history.
+    Needed after matches get deleted or re-rated, since every later rating of the players changes.
+    """
+    if user_ids is None:
+        await conn.execute("""DELETE FROM rating_history""")
+        await conn.execute("""DELETE FROM rating_history_summary""")
+        condition = ""
+        parameters = {}
+    else:
+        # Passing the IDs as a JSON array, so we do not run into the limit of parameters.
+        condition = "WHERE user_id IN (SELECT value FROM json_each(:user_ids))"
+        parameters = {"user_ids": json.dumps(list(user_ids))}
+
+        await conn.execute(
+            f"""DELETE FROM rating_history {condition}""",
+            parameters,
+        )
+        await conn.execute(
+            f"""DELETE FROM rating_history_summary {condition}""",
+            parameters,
+        )
+
+    # Match IDs are random and not unique, so the order they were logged in is what tells the matches apart.
+    await conn.execute(
+        f"""INSERT INTO rating_history
+        SELECT user_id, match_id, timestamp, rating, deviation
+        FROM ({PLAYER_RATINGS_SQL}) {condition}
+        ORDER BY timestamp, match_order""",
+        parameters,
+    )
+
+    for period, (length, offset) in PERIODS.items():
+        # The first and last match of every period, in the order they were logged.
+        await conn.execute(
+            f"""INSERT INTO rating_history_summary
+            SELECT user_id, :period, period_start, COUNT(*),
+            MAX(CASE WHEN match_number = 1 THEN old_rating END),
+            MAX(CASE WHEN match_number = period_matches THEN new_rating END),
+            MIN(MIN(old_rating, new_rating)),
+            MAX(MAX(old_rating, new_rating))
+            FROM (
+                SELECT user_id, old_rating, new_rating, period_start,
+                row_number() OVER periods AS match_number,
+                COUNT(*) OVER (PARTITION BY user_id, period_start) AS period_matches
+                FROM (
+                    SELECT *, (timestamp - :offset) / :length * :length + :offset AS period_start
+                    FROM ({PLAYER_RATINGS_SQL}) {condition}
+                )
+                WINDOW periods AS (PARTITION BY user_id, period_start ORDER BY timestamp, match_order)
+            )
+            GROUP BY user_id, period_start""",
+            parameters | {"period": period, "length": length, "offset": offset},
+        )
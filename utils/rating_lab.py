@@ -0,0 +1,285 @@
+"""Re-calculates the whole match history with different TrueSkill parameters, to see which ones predict our matches best.
+This is only for experimenting offline and needs numpy, which the bot itself does not use.
+Install it with: pip install -r requirements-lab.txt
+"""
+
+import datetime
+import math
+from statistics import NormalDist
+from typing import NamedTuple
+
+import aiosqlite
+import numpy as np
+
+import utils.rating_decay
+from utils.rating import DECAY_FACTOR
+
+# The coefficients of the approximation of the complementary error function, lowest power first.
+ERFC_COEFFICIENTS = [
+    -1.26551223,
+    1.00002368,
+    0.37409196,
+    0.09678418,
+    -0.18628806,
+    0.27886807,
+    -1.13520398,
+    1.48851587,
+    -0.82215223,
+    0.17087277,
+]
+
+# Below this, the winning chance of the actual winner is too small to divide by.
+# Same cutoff as in the trueskill package.
+MIN_DENOMINATOR = 2.222758749e-162
+
+
+class RatingParameters(NamedTuple):
+    """One set of parameters to try out. The defaults are the ones the bot uses."""
+
+    mu: float = 25.0
+    sigma: float = 25 / 3
+    beta: float = 25 / 6
+    tau: float = 25 / 300
+    draw_probability: float = 0.1
+    # Inactive players get their deviation multiplied by this every month, 1 turns the decay off.
+    decay_factor: float = DECAY_FACTOR
+
+    def get_draw_margin(self) -> float:
+        """Same as trueskill.calc_draw_margin for two players."""
+        return (
+            NormalDist().inv_cdf((self.draw_probability + 1) / 2)
+            * math.sqrt(2)
+            * self.beta
+        )
+
+
+class ExperimentResult(NamedTuple):
+    """How well a set of parameters predicted the matches, plus the ratings everyone ends up with."""
+
+    parameters: RatingParameters
+    # The average negative log likelihood of the actual winner winning, lower is better.
+    log_loss: float
+    # The share of matches where the actual winner was the favourite.
+    accuracy: float
+    # The final rating and deviation of every player, in the order of MatchHistory.user_ids.
+    ratings: np.ndarray
+    deviations: np.ndarray
+
+
+class MatchHistory(NamedTuple):
+    """Every match in the order they were played, with the players as indexes into user_ids."""
+
+    user_ids: np.ndarray
+    winners: np.ndarray
+    losers: np.ndarray
+    timestamps: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+def erfc(x: np.ndarray) -> np.ndarray:
+    """The complementary error function, from Numerical Recipes, precise to about 1e-7.
+    Numpy does not come with one, and we do not want to pull in scipy just for this.
+    """
+    z = np.abs(x)
+    t = 1 / (1 + z / 2)
+
+    polynomial = np.zeros_like(t)
+    for coefficient in reversed(ERFC_COEFFICIENTS):
+        polynomial = polynomial * t + coefficient
+
+    result = t * np.exp(-z * z + polynomial)
+    return np.where(x >= 0, result, 2 - result)
+
+
+def normal_cdf(x: np.ndarray) -> np.ndarray:
+    return erfc(-x / math.sqrt(2)) / 2
+
+
+def normal_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+
+def build_history(matches: list[tuple[int, int, int]]) -> MatchHistory:
+    """Turns a list of (winner ID, loser ID, timestamp), in the order they were played, into arrays."""
+    if not matches:
+        empty = np.zeros(0, dtype=np.int64)
+        return MatchHistory(empty, empty, empty, empty)
+
+    players = np.array([(winner, loser) for winner, loser, _ in matches], np.int64)
+    user_ids, indexes = np.unique(players, return_inverse=True)
+    indexes = indexes.reshape(players.shape)
+
+    return MatchHistory(
+        user_ids,
+        indexes[:, 0],
+        indexes[:, 1],
+        np.array([timestamp for _, _, timestamp in matches], np.int64),
+    )
+
+
+async def load_history(conn: aiosqlite.Connection) -> MatchHistory:
+    """Loads every match from the database, in the order they were played."""
+    async with conn.execute(
+        """SELECT winner_id, loser_id, timestamp FROM matches ORDER BY timestamp, rowid"""
+    ) as cursor:
+        cursor.arraysize = 1000
+        return build_history([tuple(match) async for match in cursor])
+
+
+def get_decay_points(history: MatchHistory) -> list[tuple[int, int]]:
+    """Gets you every monthly decay in the timeframe of the matches.
+    Every decay is the index of the first match after it, and the start of its activity window.
+    Players whose last match is not after the start of the window get decayed.
+    """
+    if not len(history):
+        return []
+
+    decays = []
+    last_timestamp = int(history.timestamps[-1])
+    period = utils.rating_decay.get_next_period(
+        utils.rating_decay.get_due_period(
+            datetime.datetime.fromtimestamp(int(history.timestamps[0]))
+        )
+    )
+
+    while (until := utils.rating_decay.get_period_start(period)).timestamp() <= (
+        last_timestamp
+    ):
+        since = utils.rating_decay.get_period_start(
+            utils.rating_decay.get_period(until.year, until.month - 1)
+        )
+        index = int(np.searchsorted(history.timestamps, until.timestamp(), "right"))
+        decays.append((index, int(since.timestamp())))
+        period = utils.rating_decay.get_next_period(period)
+
+    return decays
+
+
+def get_steps(history: MatchHistory) -> list[tuple[np.ndarray, list[int]]]:
+    """Splits the matches into steps that can be calculated at the same time,
+    plus the activity windows of the decays that are due before every step.
+
+    A match has to wait for the last match of both of its players, but not for anything else,
+    so every match goes into the step right after the later one of those.
+    A decay has to wait for every match before it, and every match after it has to wait for the decay.
+    """
+    decays = get_decay_points(history)
+    decay = 0
+
+    # The step of the last match of every player, and of the last decay.
+    last_steps = np.zeros(len(history.user_ids), np.int64)
+    decay_step = 0
+    latest_step = 0
+    decay_windows: dict[int, list[int]] = {}
+
+    steps = np.zeros(len(history), np.int64)
+    for i, (winner, loser) in enumerate(
+        zip(history.winners.tolist(), history.losers.tolist())
+    ):
+        while decay < len(decays) and decays[decay][0] == i:
+            decay_step = latest_step
+            decay_windows.setdefault(decay_step + 1, []).append(decays[decay][1])
+            decay += 1
+
+        step = max(last_steps[winner], last_steps[loser], decay_step) + 1
+        last_steps[winner] = last_steps[loser] = step
+        steps[i] = step
+        latest_step = max(latest_step, step)
+
+    # Sorting stably, so the matches in a step stay in the order they were played.
+    order = np.argsort(steps, kind="stable")
+    boundaries = np.flatnonzero(np.diff(steps[order])) + 1
+
+    return [
+        (indexes, decay_windows.get(int(steps[indexes[0]]), []))
+        for indexes in np.split(order, boundaries)
+        if len(indexes)
+    ]
+
+
+def run_experiments(
+    history: MatchHistory, parameter_sets: list[RatingParameters]
+) -> list[ExperimentResult]:
+    """Re-calculates the ratings of every match for every set of parameters at once.
+    Every set of parameters is one column of the arrays, and every match that does not depend on another one
+    is one row, so a whole step of matches costs the same handful of numpy operations no matter how many sets we try.
+
+    The predictions are the chance of the winner winning before the match was played,
+    with the draw margin left out since we do not have draws.
+    """
+    players = len(history.user_ids)
+    sets = len(parameter_sets)
+
+    def column(name: str) -> np.ndarray:
+        return np.array([getattr(parameters, name) for parameters in parameter_sets])
+
+    start_sigma = column("sigma")
+    beta_squared = column("beta") ** 2
+    tau_squared = column("tau") ** 2
+    decay_factor = column("decay_factor")
+    draw_margin = np.array(
+        [parameters.get_draw_margin() for parameters in parameter_sets]
+    )
+
+    # One row per player, one column per set of parameters.
+    mu = np.tile(column("mu"), (players, 1))
+    sigma = np.tile(start_sigma, (players, 1))
+    last_played = np.full(players, np.iinfo(np.int64).min)
+
+    loss = np.zeros(sets)
+    correct = np.zeros(sets)
+
+    for step, decay_windows in get_steps(history):
+        # The monthly decays that are due before these matches.
+        for since in decay_windows:
+            inactive = last_played <= since
+            sigma[inactive] = np.minimum(sigma[inactive] * decay_factor, start_sigma)
+
+        # Nobody plays twice in a step, so these do not depend on each other.
+        winners = history.winners[step]
+        losers = history.losers[step]
+        winner_mu, loser_mu = mu[winners], mu[losers]
+        winner_sigma, loser_sigma = sigma[winners], sigma[losers]
+
+        difference = winner_mu - loser_mu
+        base_variance = 2 * beta_squared + winner_sigma**2 + loser_sigma**2
+        chance = normal_cdf(difference / np.sqrt(base_variance))
+        loss -= np.log(np.maximum(chance, 1e-15)).sum(axis=0)
+        correct += (chance > 0.5).sum(axis=0)
+
+        # The same formulas as utils.rating.rate_1vs1, for every match and set at once.
+        winner_variance = winner_sigma**2 + tau_squared
+        loser_variance = loser_sigma**2 + tau_squared
+        total_variance = base_variance + 2 * tau_squared
+        c = np.sqrt(total_variance)
+
+        x = (difference - draw_margin) / c
+        denominator = normal_cdf(x)
+        safe = denominator >= MIN_DENOMINATOR
+        v = np.where(safe, normal_pdf(x) / np.where(safe, denominator, 1), -x)
+        w = np.where(safe, v * (v + x), np.where(x < 0, 1, 0))
+
+        mu[winners] = winner_mu + winner_variance / c * v
+        mu[losers] = loser_mu - loser_variance / c * v
+        sigma[winners] = np.sqrt(
+            winner_variance * (1 - winner_variance / total_variance * w)
+        )
+        sigma[losers] = np.sqrt(
+            loser_variance * (1 - loser_variance / total_variance * w)
+        )
+
+        last_played[winners] = last_played[losers] = history.timestamps[step]
+
+    matches = max(len(history), 1)
+    return [
+        ExperimentResult(
+            parameters,
+            loss[i] / matches,
+            correct[i] / matches,
+            mu[:, i].copy(),
+            sigma[:, i].copy(),
+        )
+        for i, parameters in enumerate(parameter_sets)
+    ]
@@ -0,0 +1,149 @@
+from typing import Optional
+
+import utils.database
+
+
+def get_removal_key(emoji: str) -> str:
+    """The last 20 digits are the emoji ID, if it is custom.
+    We have to do this because of animated emojis,
+    the reaction remove event doesnt send any information on whether or not the emoji is animated.
+    """
+    return emoji[-20:]
+
+
+class RoleMenu:
+    """Every entry of one role menu message, with the roles looked up by emoji."""
+
+    def __init__(
+        self,
+        exclusive: bool,
+        rolereq: Optional[str],
+        entries: list[tuple[str, int]],
+    ) -> None:
+        # If you can only have one of the roles at once.
+        self.exclusive = bool(exclusive)
+        # The role IDs separated by spaces, as they are stored in the database.
+        self.rolereq = rolereq
+        # You need one of these roles to use the menu, if there are any.
+        self.required_role_ids = [int(role_id) for role_id in (rolereq or "").split()]
+        # The emoji and role ID of every entry, in the order they were added.
+        self.entries = entries
+
+        self.roles: dict[str, list[int]] = {}
+        self.removal_roles: dict[str, list[int]] = {}
+        for emoji, role_id in entries:
+            self.roles.setdefault(emoji, []).append(role_id)
+            self.removal_roles.setdefault(get_removal_key(emoji), []).append(role_id)
+
+    def get_role_ids(self) -> list[int]:
+        return [role_id for _, role_id in self.entries]
+
+    def get_roles_to_add(self, emoji: str) -> list[int]:
+        """Gets you the role IDs for adding a reaction with this emoji."""
+        return self.roles.get(emoji, [])
+
+    def get_roles_to_remove(self, emoji: str) -> list[int]:
+        """Gets you the role IDs for removing a reaction with this emoji, going by the emoji ID only."""
+        return self.removal_roles.get(get_removal_key(emoji), [])
+
+
+class RoleMenuIndex:
+    """Keeps every role menu in memory by message ID,
+    so a reaction on any other message is rejected with a single lookup,
+    and reactions on role menus never need to touch the database.
+    Every change to the role menus goes through here, which keeps it in sync with the database.
+    """
+
+    def __init__(self, db: utils.database.Database) -> None:
+        self.db = db
+
+        self.menus: dict[int, RoleMenu] = {}
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self.menus
+
+    def __len__(self) -> int:
+        return len(self.menus)
+
+    def get(self, message_id: int) -> Optional[RoleMenu]:
+        return self.menus.get(message_id)
+
+    def get_message_ids(self) -> list[int]:
+        return list(self.menus)
+
+    async def load(self) -> None:
+        """Loads every role menu from the database."""
+        entries = await self.db.fetchall(
+            """SELECT message_id, exclusive, rolereq, emoji, role FROM reactrole ORDER BY rowid"""
+        )
+
+        grouped: dict[int, list[tuple]] = {}
+        for entry in entries:
+            grouped.setdefault(entry[0], []).append(entry)
+
+        # These values *should* be the same for every entry of a message, so we go with the first.
+        self.menus = {
+            message_id: RoleMenu(
+                entries[0][1],
+                entries[0][2],
+                [(emoji, role_id) for _, _, _, emoji, role_id in entries],
+            )
+            for message_id, entries in grouped.items()
+        }
+
+    async def add_entry(self, message_id: int, emoji: str, role_id: int) -> RoleMenu:
+        """Adds an entry to a role menu, or creates a new role menu.
+        An existing role menu keeps its exclusivity and role requirements.
+        """
+        menu = self.menus.get(message_id)
+        exclusive, rolereq = (menu.exclusive, menu.rolereq) if menu else (False, None)
+
+        await self.db.execute(
+            """INSERT INTO reactrole VALUES (:message_id, :exclusive, :rolereq, :emoji, :role)""",
+            {
+                "message_id": message_id,
+                "exclusive": exclusive,
+                "rolereq": rolereq,
+                "emoji": emoji,
+                "role": role_id,
+            },
+        )
+
+        entries = menu.entries if menu else []
+        self.menus[message_id] = RoleMenu(
+            exclusive, rolereq, entries + [(emoji, role_id)]
+        )
+        return self.menus[message_id]
+
+    async def modify(
+        self, message_id: int, exclusive: bool, rolereq: Optional[str]
+    ) -> bool:
+        """Changes the exclusivity and role requirements of a role menu.
+        Returns False if there is no role menu on this message.
+        """
+        menu = self.menus.get(message_id)
+        if menu is None:
+            return False
+
+        await self.db.execute(
+            """UPDATE reactrole SET exclusive = :exclusive, rolereq = :rolereq WHERE message_id = :message_id""",
+            {"exclusive": exclusive, "rolereq": rolereq, "message_id": message_id},
+        )
+
+        self.menus[message_id] = RoleMenu(exclusive, rolereq, menu.entries)
+        return True
+
+    async def delete(self, message_id: int) -> bool:
+        """Deletes every entry of a role menu.
+        Returns False if there is no role menu on this message.
+        """
+        if message_id not in self.menus:
+            return False
+
+        await self.db.execute(
+            """DELETE FROM reactrole WHERE message_id = :message_id""",
+            {"message_id": message_id},
+        )
+
+        del self.menus[message_id]
+        return True
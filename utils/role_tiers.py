@@ -0,0 +1,108 @@
+import bisect
+from typing import Callable, Optional
+
+import discord
+
+from utils.ids import GetIDFunctions, TGLevelRoleIDs
+
+
+def get_ranked_tiers(guild_id: int) -> list[tuple[int, int]]:
+    """Gets you the display rank you need for every ranked role of a guild, with the role ID."""
+    RoleClass = GetIDFunctions.get_mm_role_class(guild_id)
+
+    if RoleClass is None:
+        return []
+
+    # We multiply the rating by 100 and add 1000, compared to the original
+    # Microsoft TrueSkill algorithm. So a rating of 5000 equals a rank of 40,
+    # the ranks were used in Halo 3 where 50 was the highest rank.
+    # A rating of 40 was also fairly hard to achieve
+    # so this is the current max rank for us.
+    # The lowest role should hopefully also be fairly hard to keep,
+    # if you do not lose every single match.
+    # This would equal a rank of below 8 in Halo 3.
+    return [
+        (0, RoleClass.ONE_STAR),
+        (1800, RoleClass.TWO_STAR),
+        (2600, RoleClass.THREE_STAR),
+        (3400, RoleClass.FOUR_STAR),
+        (4200, RoleClass.FIVE_STAR),
+        (5000, RoleClass.GROUNDS_MASTER),
+    ]
+
+
+def get_level_tiers(guild_id: int) -> list[tuple[int, int]]:
+    """Gets you the level you need for every level role, with the role ID."""
+    return [
+        (0, TGLevelRoleIDs.RECRUIT_ROLE),
+        (10, TGLevelRoleIDs.LEVEL_10_ROLE),
+        (25, TGLevelRoleIDs.LEVEL_25_ROLE),
+        (50, TGLevelRoleIDs.LEVEL_50_ROLE),
+        (75, TGLevelRoleIDs.LEVEL_75_ROLE),
+        (100, TGLevelRoleIDs.LEVEL_100_ROLE),
+    ]
+
+
+class RoleTiers:
+    """The roles you get for reaching a certain rating or level, per guild.
+    The thresholds and role objects of a guild are looked up once and then cached,
+    so finding the role for a value is a binary search instead of going through the role list of the guild.
+    The cache of a guild has to be cleared whenever its roles change.
+    """
+
+    def __init__(self, get_tiers: Callable[[int], list[tuple[int, int]]]) -> None:
+        # Gets you the thresholds and role IDs of a guild, sorted by the threshold.
+        self.get_tiers = get_tiers
+
+        # The thresholds and roles by guild ID.
+        self.tables: dict[int, tuple[list[int], list[Optional[discord.Role]]]] = {}
+
+    def get_table(
+        self, guild: discord.Guild
+    ) -> tuple[list[int], list[Optional[discord.Role]]]:
+        """Gets you the thresholds and roles of a guild, lowest first."""
+        if guild.id in self.tables:
+            return self.tables[guild.id]
+
+        tiers = self.get_tiers(guild.id)
+        table = (
+            [threshold for threshold, _ in tiers],
+            [guild.get_role(role_id) for _, role_id in tiers],
+        )
+
+        # If a role is missing the guild is probably not fully loaded yet, so we try again next time.
+        if None not in table[1]:
+            self.tables[guild.id] = table
+
+        return table
+
+    def get_roles(self, guild: discord.Guild) -> list[Optional[discord.Role]]:
+        """Gets you every role of a guild, lowest first."""
+        return self.get_table(guild)[1]
+
+    def get_role(self, guild: discord.Guild, value: int) -> Optional[discord.Role]:
+        """Gets you the highest role a value qualifies for.
+        Values below the first threshold still get the lowest role.
+        """
+        thresholds, roles = self.get_table(guild)
+
+        if not roles:
+            return None
+
+        return roles[max(bisect.bisect_right(thresholds, value) - 1, 0)]
+
+    def get_next_tier(
+        self, guild: discord.Guild, value: int
+    ) -> Optional[tuple[int, Optional[discord.Role]]]:
+        """Gets you the threshold and role of the next role above a value, if there is any."""
+        thresholds, roles = self.get_table(guild)
+        index = bisect.bisect_right(thresholds, value)
+
+        if index >= len(thresholds):
+            return None
+
+        return (thresholds[index], roles[index])
+
+    def clear(self, guild_id: int) -> None:
+        """Clears the cache of a guild, so the roles get looked up again."""
+        self.tables.pop(guild_id, None)
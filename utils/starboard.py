@@ -0,0 +1,96 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+
+class StarboardConfig(NamedTuple):
+    # The defaults prevent error messages in the console if the setup wasnt done yet.
+    emoji: str = "placeholder"
+    threshold: int = 100
+
+
+def load_config(path: str) -> StarboardConfig:
+    """Reads the starboard config file, falling back to the defaults for anything missing."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    return StarboardConfig(
+        **{key: data[key] for key in StarboardConfig._fields if key in data}
+    )
+
+
+def save_config(path: str, config: StarboardConfig) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config._asdict(), f, indent=4)
+
+
+class StarCounter:
+    """Keeps track of the star count of messages from the raw reaction events,
+    so that a reaction is just adding or subtracting one instead of fetching the whole message.
+
+    The first time we see a message, its count is seeded from a single fetch.
+    Reactions that come in while that fetch is running are left out,
+    since the fetched message already has them.
+    """
+
+    def __init__(self) -> None:
+        # The current star count by message ID.
+        self.counts: dict[int, int] = {}
+        # The messages currently being fetched, set once the fetch is done.
+        self.seeding: dict[int, asyncio.Event] = {}
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self.counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    async def update(
+        self,
+        message_id: int,
+        delta: int,
+        seed: Callable[[], Awaitable[Optional[int]]],
+    ) -> Optional[int]:
+        """Adds the delta to the star count of a message and gets you the new count.
+        If we do not know the message yet, the count comes from calling seed instead.
+        Returns None if seeding did not work, like when the message was deleted.
+        """
+        if message_id in self.counts:
+            self.counts[message_id] = max(self.counts[message_id] + delta, 0)
+            return self.counts[message_id]
+
+        if (seeding := self.seeding.get(message_id)) is not None:
+            await seeding.wait()
+            return self.counts.get(message_id)
+
+        self.seeding[message_id] = asyncio.Event()
+        try:
+            count = await seed()
+            if count is not None:
+                self.counts[message_id] = count
+        finally:
+            self.seeding.pop(message_id).set()
+
+        return count
+
+    def forget(self, message_id: int) -> None:
+        """Drops the count of a message, so the next reaction seeds it again."""
+        self.counts.pop(message_id, None)
+
+    async def reseed(
+        self, message_id: int, seed: Callable[[], Awaitable[Optional[int]]]
+    ) -> Optional[int]:
+        """Throws away the count of a message and seeds it again,
+        so that any events we missed, like while reconnecting, do not stick around.
+        """
+        self.forget(message_id)
+        return await self.update(message_id, 0, seed)
+
+    def prune(self, before_id: int) -> list[int]:
+        """Forgets every message with an ID below this one, which means it was sent before.
+        Gets you the IDs of the forgotten messages.
+        """
+        pruned = [message_id for message_id in self.counts if message_id < before_id]
+        for message_id in pruned:
+            del self.counts[message_id]
+        return pruned
@@ -0,0 +1,65 @@
+import time
+from typing import Callable
+
+import discord
+
+import utils.expiry
+
+
+def get_last_activity(thread: discord.Thread) -> float:
+    """Gets you the timestamp of the last message in a thread, or of its creation if there is none.
+    Both are read from the snowflake IDs, so this needs no API call.
+    """
+    return discord.utils.snowflake_time(thread.last_message_id or thread.id).timestamp()
+
+
+class ThreadActivityTracker:
+    """Keeps track of when threads were last active, and calls back once one was inactive for long enough.
+    The deadlines sit in an expiry tracker, so every thread is handled right when its deadline passes,
+    and a new message just pushes the deadline of its thread back.
+    """
+
+    def __init__(
+        self,
+        inactivity: float,
+        on_inactive: Callable[[int, int], None],
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        # How many seconds without a message it takes for a thread to count as inactive.
+        self.inactivity = inactivity
+        # Called with the thread ID and guild ID of every thread that became inactive.
+        self.on_inactive = on_inactive
+        self.clock = clock
+
+        # The deadline of every thread by its ID, with the guild ID as the value.
+        self.deadlines = utils.expiry.ExpiryTracker(on_inactive)
+
+    def __contains__(self, thread_id: int) -> bool:
+        return thread_id in self.deadlines
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def get_time_left(self, last_activity: float) -> float:
+        """Gets you the seconds until a thread with this last activity becomes inactive."""
+        return last_activity + self.inactivity - self.clock()
+
+    def is_inactive(self, thread: discord.Thread) -> bool:
+        """Checks if a thread has been inactive for long enough, going by its last message."""
+        return self.get_time_left(get_last_activity(thread)) <= 0
+
+    def touch(self, thread_id: int, guild_id: int, last_activity: float) -> None:
+        """Sets the last activity of a thread, which moves its deadline."""
+        self.deadlines.add(thread_id, self.get_time_left(last_activity), guild_id)
+
+    def track(self, thread: discord.Thread) -> None:
+        """Starts tracking a thread, or updates it, going by its last message."""
+        self.touch(thread.id, thread.guild.id, get_last_activity(thread))
+
+    def remove(self, thread_id: int) -> None:
+        """Stops tracking a thread, for example when it got deleted."""
+        self.deadlines.remove(thread_id)
+
+    def stop(self) -> None:
+        """Stops the background task of the deadlines."""
+        self.deadlines.stop()
@@ -0,0 +1,94 @@
+import asyncio
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import discord
+
+import utils.logger
+
+
+class UserResolver:
+    """Turns user IDs into users, for leaderboards and other lists of users.
+    First we look in the gateway cache, then in our own cache of users we fetched before,
+    and only then we fetch the rest from the API, all at the same time.
+    The semaphore keeps us from running into the rate limits when fetching a lot of users at once.
+    """
+
+    def __init__(
+        self, client: discord.Client, max_size: int = 2000, concurrency: int = 5
+    ) -> None:
+        self.client = client
+        self.max_size = max_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        # The users we had to fetch, least recently used first.
+        # Deleted users are stored as None, so we do not keep fetching them.
+        self.fetched_users: OrderedDict[int, Optional[discord.User]] = OrderedDict()
+
+        self.gateway_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+        self.failures = 0
+
+        self.logger = utils.logger.get_logger("bot.users")
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups that did not need to fetch anything, from 0 to 1."""
+        hits = self.gateway_hits + self.cache_hits
+        total = hits + self.misses
+        return hits / total if total else 1.0
+
+    def cache_user(self, user_id: int, user: Optional[discord.User]) -> None:
+        """Stores a fetched user, and drops the least recently used one if we have too many."""
+        self.fetched_users[user_id] = user
+        self.fetched_users.move_to_end(user_id)
+
+        while len(self.fetched_users) > self.max_size:
+            self.fetched_users.popitem(last=False)
+
+    async def fetch(self, user_id: int) -> Optional[discord.User]:
+        """Fetches a user from the API, if we have a free slot."""
+        async with self.semaphore:
+            try:
+                user = await self.client.fetch_user(user_id)
+            except discord.NotFound:
+                user = None
+            except discord.HTTPException as exc:
+                # Could just be a hiccup, so we do not remember this one.
+                self.failures += 1
+                self.logger.warning(f"Could not fetch user {user_id}: {exc}")
+                return None
+
+        self.cache_user(user_id, user)
+        return user
+
+    async def resolve(
+        self, user_ids: Iterable[int]
+    ) -> dict[int, Optional[discord.User]]:
+        """Gets you the users for every ID. Users that do not exist (anymore) are None."""
+        users: dict[int, Optional[discord.User]] = {}
+        to_fetch: list[int] = []
+
+        # Getting rid of duplicates, but keeping the order.
+        for user_id in dict.fromkeys(user_ids):
+            if user := self.client.get_user(user_id):
+                self.gateway_hits += 1
+                users[user_id] = user
+            elif user_id in self.fetched_users:
+                self.cache_hits += 1
+                self.fetched_users.move_to_end(user_id)
+                users[user_id] = self.fetched_users[user_id]
+            else:
+                self.misses += 1
+                to_fetch.append(user_id)
+
+        if to_fetch:
+            fetched = await asyncio.gather(*[self.fetch(i) for i in to_fetch])
+            users.update(zip(to_fetch, fetched))
+
+        return users
+
+    async def resolve_one(self, user_id: int) -> Optional[discord.User]:
+        """Gets you a single user, or None if they do not exist (anymore)."""
+        return (await self.resolve([user_id]))[user_id]
@@ -0,0 +1,150 @@
+import os
+import re
+import string
+from typing import Optional
+
+# Characters that are allowed between the letters of a word, so that "b(a)d" counts as "bad".
+# This used to be an empty tuple formatted into the character class, which left exactly these two in there.
+# Add string.digits + string.whitespace + string.punctuation for very strict ruling, might end up with false positives.
+SEPARATORS = "()"
+# A word right next to one of these does not count, so that "class" does not count as "ass".
+# Add/remove these depending on strictness, do +'/'+'-' and so on for urls in the future maybe.
+EXCLUDED = string.ascii_letters + string.digits
+
+SEPARATOR_PATTERN = f"[{re.escape(SEPARATORS)}]*"
+
+# The key in the trie that marks the end of a word, with the index of the word as the value.
+END = ""
+
+
+def get_file_version(path: str) -> Optional[tuple[int, int]]:
+    """Gets you the modification time and size of a file, which change whenever it is edited."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_trie_pattern(node: dict) -> str:
+    """Turns a trie into one regex, so that words that start the same are only checked once.
+    Once a word ends, the longer words starting with it are left out,
+    since anything they match already contains the shorter word.
+    """
+    if END in node:
+        return ""
+
+    letters = []
+    branches = []
+    for letter, child in node.items():
+        if END in child:
+            letters.append(re.escape(letter))
+        else:
+            branches.append(
+                re.escape(letter) + SEPARATOR_PATTERN + get_trie_pattern(child)
+            )
+
+    if len(letters) == 1:
+        branches.append(letters[0])
+    elif letters:
+        branches.append(f"[{''.join(letters)}]")
+
+    if len(branches) == 1:
+        return branches[0]
+    return f"(?:{'|'.join(branches)})"
+
+
+class WordFilter:
+    """Finds blacklisted words in messages, with every word compiled into a single regex up front.
+
+    A word counts if its letters show up in order with only separators between them, ignoring case,
+    unless the word also shows up right next to a letter or digit somewhere in the message.
+    The regex only finds one word at every point, and most messages do not have one at all,
+    so only for the few that do we walk the trie of words from those points to find all of them.
+    Both work on the casefolded message, which is a lot faster than matching while ignoring case.
+    """
+
+    def __init__(self, words: list[str]) -> None:
+        # Kept in the order of the file, the first one that counts gets reported.
+        self.words = words
+
+        self.trie: dict = {}
+        for index, word in enumerate(words):
+            node = self.trie
+            for letter in word.casefold():
+                node = node.setdefault(letter, {})
+            node.setdefault(END, index)
+
+        self.pattern = re.compile(get_trie_pattern(self.trie)) if words else None
+        # The patterns for a word right next to a letter or digit, only compiled once a word comes up.
+        self.excluded_patterns: dict[str, re.Pattern] = {}
+
+        # Where the words were loaded from and which version of the file it was, for reloading.
+        self.path: Optional[str] = None
+        self.version: Optional[tuple[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @classmethod
+    def from_file(cls, path: str) -> "WordFilter":
+        """Loads the words of a file, separated by whitespace."""
+        version = get_file_version(path)
+        with open(path, encoding="utf-8") as file:
+            word_filter = cls(file.read().split())
+
+        word_filter.path = path
+        word_filter.version = version
+        return word_filter
+
+    def is_outdated(self) -> bool:
+        """Checks if the file of the words changed since we loaded it."""
+        return self.path is not None and get_file_version(self.path) != self.version
+
+    def get_words_at(self, content: str, start: int) -> list[int]:
+        """Gets you the index of every word that starts at this point of the casefolded message."""
+        indexes = []
+        node = self.trie
+
+        for i in range(start, len(content)):
+            character = content[i]
+            if (child := node.get(character)) is not None:
+                node = child
+            elif character in SEPARATORS and node is not self.trie:
+                continue
+            else:
+                break
+
+            if END in node:
+                indexes.append(node[END])
+
+        return indexes
+
+    def is_excluded(self, content: str, word: str) -> bool:
+        """Checks if a word shows up right next to a letter or digit, which means it is part of a harmless word."""
+        if (pattern := self.excluded_patterns.get(word)) is None:
+            escaped = re.escape(word)
+            pattern = self.excluded_patterns[word] = re.compile(
+                rf"([{EXCLUDED}]+{escaped})|({escaped}[{EXCLUDED}]+)", re.IGNORECASE
+            )
+
+        return pattern.search(content) is not None
+
+    def find(self, content: str) -> Optional[str]:
+        """Gets you the first word of the list that counts in the message, if there is one."""
+        folded = content.casefold()
+        if self.pattern is None or (match := self.pattern.search(folded)) is None:
+            return None
+
+        # Every match is the start of at least one word, but there can be more starting there or overlapping it.
+        indexes = set()
+        while match is not None:
+            indexes.update(self.get_words_at(folded, match.start()))
+            match = self.pattern.search(folded, match.start() + 1)
+
+        for index in sorted(indexes):
+            if not self.is_excluded(content, self.words[index]):
+                return self.words[index]
+
+        return None
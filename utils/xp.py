@@ -0,0 +1,38 @@
+from bisect import bisect_right
+
+# The total amount of XP you need to reach a level, the index being the level.
+# Calculated once and extended whenever someone needs a higher level than we have.
+XP_THRESHOLDS = [0]
+
+
+def get_xp_till_next_level(current_level: int, current_xp: int) -> int:
+    """Gets you the amount of XP you need to level up to the next level.
+    Taken from: https://github.com/Mee6/Mee6-documentation/blob/master/docs/levels_xp.md
+    Since we used to use Mee6, we decided to keep the same formula.
+    """
+    return max(5 * (current_level**2) + (50 * current_level) + 100 - current_xp, 0)
+
+
+def extend_thresholds(level: int) -> None:
+    """Extends the XP table so that it covers the given level."""
+    while len(XP_THRESHOLDS) <= level:
+        last_level = len(XP_THRESHOLDS) - 1
+        XP_THRESHOLDS.append(XP_THRESHOLDS[-1] + get_xp_till_next_level(last_level, 0))
+
+
+def get_xp_for_level(level: int) -> int:
+    """Gets you the amount of XP you need to reach a certain level."""
+    if level < 0:
+        return 0
+
+    extend_thresholds(level)
+    return XP_THRESHOLDS[level]
+
+
+def get_level_from_xp(xp: int) -> int:
+    """Gets you the level you are at from a certain amount of XP."""
+    # The table has to go at least one level past the XP, so we know where it ends.
+    while XP_THRESHOLDS[-1] <= xp:
+        extend_thresholds(len(XP_THRESHOLDS) * 2)
+
+    return max(bisect_right(XP_THRESHOLDS, xp) - 1, 0)
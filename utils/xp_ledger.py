@@ -0,0 +1,162 @@
+from typing import Callable, Optional
+
+import utils.counter_buffer
+import utils.database
+from utils.order_statistics import OrderStatisticList
+
+
+def get_xp_parameters(user_id: int, change: list[int]) -> dict:
+    level, xp, messages = change
+    return {"id": user_id, "level": level, "xp": xp, "messages": messages}
+
+
+def merge_xp(pending: dict[int, list[int]], user_id: int, change: list[int]) -> None:
+    """Adds the XP and messages of a failed flush back in, keeping the newer level if there is one."""
+    current = pending.setdefault(user_id, [change[0], 0, 0])
+    current[1] += change[1]
+    current[2] += change[2]
+
+
+class XPLedger:
+    """Keeps the level, XP and message count of everyone in memory.
+    Gains are applied right away, so level ups are detected instantly,
+    but they only get written to the database in batches when flush is called.
+    That way a busy chat costs a couple of writes per minute instead of a couple per message.
+
+    Once loaded, it also keeps everyone sorted by XP in an order statistic list,
+    so getting the rank of a user, or the user at a rank, does not need to sort the whole table.
+    """
+
+    def __init__(
+        self, db: utils.database.Database, get_level_from_xp: Callable[[int], int]
+    ) -> None:
+        self.db = db
+        self.get_level_from_xp = get_level_from_xp
+
+        # The current level, XP and messages of a user, including the changes not yet written.
+        self.profiles: dict[int, list[int]] = {}
+        # The XP and messages gained since the last flush, plus the current level.
+        self.buffer: utils.counter_buffer.CounterBuffer[int, list[int]] = (
+            utils.counter_buffer.CounterBuffer(
+                db,
+                """INSERT INTO level VALUES (:id, :level, :xp, :messages)
+                ON CONFLICT(id) DO UPDATE SET level = excluded.level,
+                xp = xp + excluded.xp, messages = messages + excluded.messages""",
+                get_xp_parameters,
+                merge_xp,
+                "bot.levels",
+            )
+        )
+
+        # Everyone, sorted by XP descending, then by user ID.
+        self.ranking = OrderStatisticList()
+        self.total_xp = 0
+        self.total_messages = 0
+        self.loaded = False
+
+    async def load(self) -> None:
+        """Loads every profile from the database, for the leaderboard."""
+        profiles = await self.db.fetchall(
+            """SELECT id, level, xp, messages FROM level"""
+        )
+
+        for user_id, level, xp, messages in profiles:
+            # Any pending changes are newer than what is in the database.
+            if user_id not in self.profiles:
+                self.profiles[user_id] = [level, xp, messages]
+
+        self.ranking = OrderStatisticList(
+            (-xp, user_id) for user_id, (_, xp, _) in self.profiles.items()
+        )
+        self.total_xp = sum(xp for _, xp, _ in self.profiles.values())
+        self.total_messages = sum(messages for _, _, messages in self.profiles.values())
+        self.loaded = True
+
+    def create_profile(self, user_id: int, profile: list[int]) -> None:
+        """Adds a profile to the ledger and the ranking."""
+        self.profiles[user_id] = profile
+
+        if self.loaded:
+            self.ranking.add((-profile[1], user_id))
+            self.total_xp += profile[1]
+            self.total_messages += profile[2]
+
+    async def get(self, user_id: int) -> tuple[int, int, int]:
+        """Gets you the level, XP and message count of a user.
+        If the user is not in the database yet, they start out at 0
+        and get written to the database on the next flush.
+        """
+        if user_id not in self.profiles:
+            # If everything is loaded already, we know that this is a new user.
+            matching_profile = None
+            if not self.loaded:
+                matching_profile = await self.db.fetchone(
+                    """SELECT level, xp, messages FROM level WHERE id = :id""",
+                    {"id": user_id},
+                )
+
+            # Someone else could have loaded the profile while we were waiting.
+            if user_id not in self.profiles:
+                if matching_profile is None:
+                    self.create_profile(user_id, [0, 0, 0])
+                    self.buffer.pending[user_id] = [0, 0, 0]
+                else:
+                    self.create_profile(user_id, list(matching_profile))
+
+        level, xp, messages = self.profiles[user_id]
+        return (level, xp, messages)
+
+    async def add_xp(
+        self, user_id: int, xp_gained: int, messages: int = 1
+    ) -> tuple[int, int, int]:
+        """Adds XP and messages to a user and returns the old level, new level and new XP."""
+        await self.get(user_id)
+
+        profile = self.profiles[user_id]
+        old_level = profile[0]
+
+        if self.loaded:
+            self.ranking.remove((-profile[1], user_id))
+            self.ranking.add((-profile[1] - xp_gained, user_id))
+            self.total_xp += xp_gained
+            self.total_messages += messages
+
+        profile[1] += xp_gained
+        profile[2] += messages
+        profile[0] = self.get_level_from_xp(profile[1])
+
+        pending = self.buffer.pending.setdefault(user_id, [0, 0, 0])
+        pending[0] = profile[0]
+        pending[1] += xp_gained
+        pending[2] += messages
+
+        return (old_level, profile[0], profile[1])
+
+    def get_rank(self, user_id: int) -> int:
+        """Gets you the leaderboard rank of a user, starting at 1.
+        Needs the ledger to be loaded, and the user to have a profile.
+        """
+        return self.ranking.index((-self.profiles[user_id][1], user_id)) + 1
+
+    def get_by_rank(self, rank: int) -> Optional[tuple[int, int, int, int, int]]:
+        """Gets you the rank, user ID, level, XP and messages of the user at a rank, if there is one."""
+        leaderboard = self.get_leaderboard(rank, 1)
+        return leaderboard[0] if leaderboard else None
+
+    def get_leaderboard(
+        self, start: int, count: int
+    ) -> list[tuple[int, int, int, int, int]]:
+        """Gets you the rank, user ID, level, XP and messages of the users from the starting rank onwards."""
+        return [
+            (rank, user_id, *self.profiles[user_id])
+            for rank, (_, user_id) in enumerate(
+                self.ranking.slice(start - 1, start - 1 + count), start=max(start, 1)
+            )
+        ]
+
+    async def flush(self) -> bool:
+        """Writes every pending change to the database in one batch.
+        If that fails, the changes are kept around for the next try.
+        Returns False if it failed.
+        """
+        return await self.buffer.flush() is not None
@@ -1,4 +1,3 @@
-import aiosqlite
 import discord
 
 
@@ -31,36 +30,24 @@ class MacroModal(discord.ui.Modal, title="Create a new macro"):
         for command in interaction.client.commands:
             command_list.extend(iter(command.aliases))
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            matching_macro = await db.execute_fetchall(
-                """SELECT name FROM macros WHERE name = :name""", {"name": macro_name}
+        # Basic checks for invalid stuff.
+        if macro_name in interaction.client.macros:
+            await interaction.response.send_message(
+                "This name was already taken. "
+                "If you want to update this macro please delete it first and then create it again."
             )
+            return
 
-            # Basic checks for invalid stuff.
-            if len(matching_macro) != 0:
-                await interaction.response.send_message(
-                    "This name was already taken. "
-                    "If you want to update this macro please delete it first and then create it again."
-                )
-                return
-
-            if macro_name in command_list:
-                await interaction.response.send_message(
-                    "This name is already being used for a command! Please use a different one."
-                )
-                return
-
-            await db.execute(
-                """INSERT INTO macros VALUES (:name, :payload, :uses, :author)""",
-                {
-                    "name": macro_name,
-                    "payload": self.payload.value,
-                    "uses": 0,
-                    "author": interaction.user.id,
-                },
+        if macro_name in command_list:
+            await interaction.response.send_message(
+                "This name is already being used for a command! Please use a different one."
             )
+            return
 
-            await db.commit()
+        # This also adds it to the macros in memory, so it works right away.
+        await interaction.client.macros.create(
+            macro_name, self.payload.value, interaction.user.id
+        )
 
         await interaction.response.send_message(
             f"New macro `{macro_name}` was created.\nOutput:\n`{self.payload.value}`"
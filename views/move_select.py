@@ -1,4 +1,3 @@
-import aiosqlite
 import discord
 
 from utils.character import match_character
@@ -55,13 +54,12 @@ class MoveSelect(discord.ui.Select):
             self.view.stop()
             return
 
-        async with aiosqlite.connect("./db/ultimateframedata.db") as db:
-            actual_move = await db.execute_fetchall(
-                """SELECT * FROM moves WHERE character = :character AND TRIM(input) = :move_name COLLATE NOCASE 
-                OR character = :character AND TRIM(move_name) = :move_name COLLATE NOCASE
-                OR character = :character AND TRIM(full_move_name) = :move_name COLLATE NOCASE""",
-                {"character": self.character, "move_name": self.values[0]},
-            )
+        actual_move = await interaction.client.ufd_db.fetchall(
+            """SELECT * FROM moves WHERE character = :character AND TRIM(input) = :move_name COLLATE NOCASE 
+            OR character = :character AND TRIM(move_name) = :move_name COLLATE NOCASE
+            OR character = :character AND TRIM(full_move_name) = :move_name COLLATE NOCASE""",
+            {"character": self.character, "move_name": self.values[0]},
+        )
 
         # Otherwise the move should be found, but just in case we'll check again.
         if len(actual_move) == 0 or actual_move[0] is None:
@@ -1,7 +1,6 @@
 import json
 from typing import Optional
 
-import aiosqlite
 import discord
 
 
@@ -91,15 +90,12 @@ class CharacterView(discord.ui.View):
 
         chars = "" if len(self.current_values) == 0 else " ".join(self.current_values)
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """UPDATE profile SET """
-                + self.character_type
-                + """ = :chars WHERE user_id = :user_id""",
-                {"chars": chars, "user_id": self.user.id},
-            )
-
-            await db.commit()
+        await interaction.client.db.execute(
+            """UPDATE profile SET """
+            + self.character_type
+            + """ = :chars WHERE user_id = :user_id""",
+            {"chars": chars, "user_id": self.user.id},
+        )
 
         if not chars:
             await interaction.response.send_message(
@@ -163,13 +159,10 @@ class RegionDropdown(discord.ui.Select):
         if region == "None":
             region = ""
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """UPDATE profile SET region = :region WHERE user_id = :user_id""",
-                {"region": region, "user_id": self.user.id},
-            )
-
-            await db.commit()
+        await interaction.client.db.execute(
+            """UPDATE profile SET region = :region WHERE user_id = :user_id""",
+            {"region": region, "user_id": self.user.id},
+        )
 
         if not region:
             await interaction.response.send_message(
@@ -295,13 +288,10 @@ class ColourDropdown(discord.ui.Select):
     async def callback(self, interaction: discord.Interaction) -> None:
         colour = self.values[0]
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """UPDATE profile SET colour = :colour WHERE user_id = :user_id""",
-                {"colour": int(colour, 16), "user_id": self.user.id},
-            )
-
-            await db.commit()
+        await interaction.client.db.execute(
+            """UPDATE profile SET colour = :colour WHERE user_id = :user_id""",
+            {"colour": int(colour, 16), "user_id": self.user.id},
+        )
 
         await interaction.response.send_message(
             f"{self.user.mention}, I have set your colour to: {colour}"
@@ -352,13 +342,10 @@ class ColourModal(discord.ui.Modal, title="Custom Colour Picker"):
 
             return
 
-        async with aiosqlite.connect("./db/database.db") as db:
-            await db.execute(
-                """UPDATE profile SET colour = :colour WHERE user_id = :user_id""",
-                {"colour": hex_colour, "user_id": self.user.id},
-            )
-
-            await db.commit()
+        await interaction.client.db.execute(
+            """UPDATE profile SET colour = :colour WHERE user_id = :user_id""",
+            {"colour": hex_colour, "user_id": self.user.id},
+        )
 
         await interaction.response.send_message(
             f"{self.user.mention}, I have set your colour to: {colour}"